@@ -0,0 +1,27 @@
+"""
+Exam-day load test: drives the HTTP API the way a real exam does and reports
+throughput and p50/p95/p99 latency per endpoint.
+
+Phases (all students act concurrently, bounded by --concurrency):
+
+1. login burst        POST /api/auth/login for every student and the teacher;
+2. start burst        POST /api/exams/{exam_id}/attempts released together;
+3. exam taking        GET /api/attempts/{attempt_id}, then periodic autosaves
+                      POST /api/attempts/{attempt_id}/answers while the teacher
+                      keeps refreshing GET /api/exams/{exam_id}/journal;
+4. submit storm       POST /api/attempts/{attempt_id}/submit at the deadline;
+5. teacher review     GET /api/exams/{exam_id}/journal after the storm.
+
+By default an in-process uvicorn server is started against a temporary SQLite
+file (a stand-in for PostgreSQL) and seeded with a course, a teacher, the
+students and a published exam. With --base-url the driver targets an already
+running server instead; seeding then needs --database-url pointing at the same
+database. Run from the repo root:
+
+    python -m benchmarks.exam_day --students 200
+    python -m benchmarks.exam_day --students 500 --output exam_day.json
+    python -m benchmarks.exam_day --compare exam_day.json --tolerance 0.25
+
+--compare exits with status 1 when an endpoint's p95/p99 regressed by more than
+the tolerance against a previous --output report.
+"""
@@ -0,0 +1,142 @@
+"""Command line entry point: python -m benchmarks.exam_day --help"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.exam_day", description="Exam-day load test")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=200, help="max in-flight requests")
+    parser.add_argument("--autosave-rounds", type=int, default=5, help="autosaves per student")
+    parser.add_argument("--autosave-interval", type=float, default=1.0, help="mean seconds between autosaves")
+    parser.add_argument("--journal-interval", type=float, default=2.0, help="seconds between teacher refreshes")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for answer choice and pacing")
+    parser.add_argument("--base-url", help="target an already running server instead of an in-process one")
+    parser.add_argument("--database-url", help="database to seed (default: temporary SQLite file)")
+    parser.add_argument("--output", help="write the per-endpoint report as JSON")
+    parser.add_argument("--compare", help="previous --output report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95/p99 growth for --compare")
+    return parser.parse_args(argv)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(port: int):
+    """Run the real application under uvicorn in a background thread."""
+    import uvicorn
+    from src.api.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise RuntimeError("uvicorn did not start")
+        time.sleep(0.05)
+    return server, thread
+
+
+async def _drive(base_url: str, data, args, recorder) -> None:
+    import httpx
+    from benchmarks.exam_day.scenario import ExamDayScenario, ScenarioConfig
+
+    config = ScenarioConfig(
+        concurrency=args.concurrency,
+        autosave_rounds=args.autosave_rounds,
+        autosave_interval=args.autosave_interval,
+        journal_interval=args.journal_interval,
+        seed=args.seed,
+    )
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        await ExamDayScenario(client, data, config, recorder).run()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.base_url and not args.database_url:
+        sys.exit("--base-url needs --database-url of the same database to seed the exam day")
+
+    tmpdir = None
+    if args.database_url:
+        database_url = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        database_url = f"sqlite:///{os.path.join(tmpdir.name, 'exam_day.db')}?timeout=30"
+    # The application reads DATABASE_URL when src.api.database is first imported
+    os.environ["DATABASE_URL"] = database_url
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.api.database import Base
+    from src.models import (  # noqa: F401 — реєструємо всі таблиці в metadata
+        users, roles, user_roles, exams, courses, majors, user_majors, attempts,
+        course_exams, course_supervisors, exam_participants, exam_email_notifications,
+    )
+    from benchmarks.exam_day.seed import seed_exam_day
+    from benchmarks.exam_day.stats import LatencyRecorder, compare_reports, format_report, save_report
+
+    server = thread = None
+    if args.base_url:
+        base_url = args.base_url.rstrip("/")
+    else:
+        port = _free_port()
+        server, thread = _start_server(port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    seeded_at = time.perf_counter()
+    data = seed_exam_day(sessionmaker(autoflush=False, bind=engine), args.students, args.questions)
+    print(f"Seeded {args.students} students and {args.questions} questions "
+          f"in {time.perf_counter() - seeded_at:.1f}s; driving {base_url}")
+
+    recorder = LatencyRecorder()
+    try:
+        asyncio.run(_drive(base_url, data, args, recorder))
+    finally:
+        recorder.stop()
+        if server is not None:
+            server.should_exit = True
+            thread.join(timeout=30)
+        engine.dispose()
+
+    summary = recorder.summary()
+    print(format_report(summary))
+    print(f"wall time: {recorder.finished - recorder.started:.1f}s")
+
+    if args.output:
+        meta = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+        meta["database"] = engine.dialect.name
+        save_report(args.output, summary, meta)
+        print(f"report written to {args.output}")
+
+    status = 0
+    if args.compare:
+        regressions = compare_reports(args.compare, summary, args.tolerance)
+        if regressions:
+            print("\nRegressions against", args.compare)
+            print("\n".join(f"  {line}" for line in regressions))
+            status = 1
+        else:
+            print(f"\nNo regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+    if tmpdir is not None:
+        tmpdir.cleanup()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Asynchronous httpx driver for the exam-day phases."""
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+from benchmarks.exam_day.seed import PASSWORD, ExamDayData
+from benchmarks.exam_day.stats import LatencyRecorder
+
+
+@dataclass
+class ScenarioConfig:
+    concurrency: int = 200
+    autosave_rounds: int = 5
+    autosave_interval: float = 1.0
+    journal_interval: float = 2.0
+    seed: int = 0
+
+
+@dataclass
+class Student:
+    email: str
+    token: Optional[str] = None
+    attempt_id: Optional[str] = None
+
+
+class ExamDayScenario:
+    def __init__(self, client: httpx.AsyncClient, data: ExamDayData, config: ScenarioConfig,
+                 recorder: LatencyRecorder) -> None:
+        self.client = client
+        self.data = data
+        self.config = config
+        self.recorder = recorder
+        self.students = [Student(email) for email in data.student_emails]
+        self.teacher_token: Optional[str] = None
+        self.random = random.Random(config.seed)
+        self._slots = asyncio.Semaphore(config.concurrency)
+
+    async def request(self, endpoint: str, method: str, url: str, token: Optional[str] = None, **kwargs):
+        """Send one request and record its latency under `endpoint`; returns the response or None."""
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        async with self._slots:
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, headers=headers, **kwargs)
+            except httpx.HTTPError:
+                self.recorder.record(endpoint, time.perf_counter() - started, ok=False)
+                return None
+            self.recorder.record(endpoint, time.perf_counter() - started, ok=response.is_success)
+            return response
+
+    async def run(self) -> None:
+        await self.login_burst()
+        await self.start_burst()
+        await self.exam_taking()
+        await self.submit_storm()
+        await self.teacher_review()
+
+    async def _login(self, email: str) -> Optional[str]:
+        response = await self.request("POST /auth/login", "POST", "/api/auth/login",
+                                      json={"email": email, "password": PASSWORD})
+        if response is None or not response.is_success:
+            return None
+        return response.json()["access_token"]
+
+    async def login_burst(self) -> None:
+        tokens = await asyncio.gather(
+            self._login(self.data.teacher_email), *(self._login(s.email) for s in self.students)
+        )
+        self.teacher_token = tokens[0]
+        for student, token in zip(self.students, tokens[1:]):
+            student.token = token
+
+    async def _start(self, student: Student) -> None:
+        if not student.token:
+            return
+        response = await self.request("POST /exams/{exam_id}/attempts", "POST",
+                                      f"/api/exams/{self.data.exam_id}/attempts", student.token)
+        if response is not None and response.is_success:
+            student.attempt_id = response.json()["id"]
+
+    async def start_burst(self) -> None:
+        await asyncio.gather(*(self._start(student) for student in self.students))
+
+    def _random_answer(self) -> dict:
+        question_id = self.random.choice(list(self.data.questions))
+        question = self.data.questions[question_id]
+        if question["type"] == "single_choice":
+            return {"question_id": str(question_id), "selected_option_ids": [str(o) for o in question["options"]]}
+        return {"question_id": str(question_id), "text": str(self.random.randint(0, 100))}
+
+    async def _take_exam(self, student: Student) -> None:
+        if not student.attempt_id:
+            return
+        await self.request("GET /attempts/{attempt_id}", "GET", f"/api/attempts/{student.attempt_id}", student.token)
+        for _ in range(self.config.autosave_rounds):
+            # Students answer at different paces: spread the saves around the interval
+            await asyncio.sleep(self.random.uniform(0.5, 1.5) * self.config.autosave_interval)
+            await self.request("POST /attempts/{attempt_id}/answers", "POST",
+                               f"/api/attempts/{student.attempt_id}/answers", student.token,
+                               json=self._random_answer())
+
+    async def _journal(self) -> None:
+        if self.teacher_token:
+            await self.request("GET /exams/{exam_id}/journal", "GET",
+                               f"/api/exams/{self.data.exam_id}/journal", self.teacher_token)
+
+    async def _teacher_refreshing(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            await self._journal()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.config.journal_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def exam_taking(self) -> None:
+        stop = asyncio.Event()
+        teacher = asyncio.create_task(self._teacher_refreshing(stop))
+        await asyncio.gather(*(self._take_exam(student) for student in self.students))
+        stop.set()
+        await teacher
+
+    async def _submit(self, student: Student) -> None:
+        if student.attempt_id:
+            await self.request("POST /attempts/{attempt_id}/submit", "POST",
+                               f"/api/attempts/{student.attempt_id}/submit", student.token)
+
+    async def submit_storm(self) -> None:
+        await asyncio.gather(*(self._submit(student) for student in self.students))
+
+    async def teacher_review(self) -> None:
+        await self._journal()
@@ -0,0 +1,99 @@
+"""Seeds a course, a teacher, the students and a published exam directly through the models."""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+from uuid import UUID, uuid4
+
+from src.api.services.exam_snapshot_service import ExamSnapshotService
+from src.models.course_exams import CourseExam
+from src.models.courses import Course, CourseEnrollment
+from src.models.exam_participants import ExamParticipant
+from src.models.exams import Exam, ExamStatusEnum, Option, Question, QuestionType
+from src.models.roles import Role
+from src.models.user_roles import UserRole
+from src.models.users import User
+from src.utils.hashing import get_password_hash
+
+PASSWORD = "exam-day-password"
+
+
+@dataclass
+class ExamDayData:
+    exam_id: UUID
+    teacher_email: str
+    student_emails: List[str]
+    # question_id -> {"type": ..., "options": [correct option ids]} used to build autosaves
+    questions: Dict[UUID, dict] = field(default_factory=dict)
+
+
+def _role(db, name: str) -> Role:
+    role = db.query(Role).filter(Role.name == name).first()
+    if role is None:
+        role = Role(name=name)
+        db.add(role)
+        db.flush()
+    return role
+
+
+def seed_exam_day(session_factory, students: int, questions: int, duration_minutes: int = 90) -> ExamDayData:
+    """
+    Create the exam-day dataset: `questions` alternate between single-choice and
+    short-answer. The bcrypt hash is computed once and shared, so seeding
+    thousands of students stays fast while login still pays the real verify cost.
+    """
+    run = uuid4().hex[:8]
+    hashed = get_password_hash(PASSWORD)
+    db = session_factory()
+    try:
+        student_role, teacher_role = _role(db, "student"), _role(db, "teacher")
+        now = datetime.now(timezone.utc)
+
+        teacher = User(email=f"teacher-{run}@example.com", hashed_password=hashed, first_name="Teacher", last_name=run)
+        db.add(teacher)
+        db.flush()
+        db.add(UserRole(user_id=teacher.id, role_id=teacher_role.id))
+
+        course = Course(name=f"Exam day {run}", code=f"ED-{run}", owner_id=teacher.id)
+        exam = Exam(title=f"Exam day {run}", start_at=now - timedelta(minutes=1), end_at=now + timedelta(hours=3),
+                    owner_id=teacher.id, status=ExamStatusEnum.published, duration_minutes=duration_minutes,
+                    max_attempts=1)
+        db.add_all([course, exam])
+        db.flush()
+        db.add(CourseExam(exam_id=exam.id, course_id=course.id))
+
+        data = ExamDayData(exam_id=exam.id, teacher_email=teacher.email, student_emails=[])
+        for position in range(1, questions + 1):
+            if position % 2:
+                question = Question(exam_id=exam.id, question_type=QuestionType.single_choice,
+                                    title=f"Q{position}", position=position, points=1)
+                db.add(question)
+                db.flush()
+                right = Option(question_id=question.id, text="right", is_correct=True)
+                db.add_all([right, Option(question_id=question.id, text="wrong")])
+                db.flush()
+                data.questions[question.id] = {"type": "single_choice", "options": [right.id]}
+            else:
+                question = Question(exam_id=exam.id, question_type=QuestionType.short_answer,
+                                    title=f"Q{position}", position=position, points=1)
+                db.add(question)
+                db.flush()
+                db.add(Option(question_id=question.id, text="42", is_correct=True))
+                data.questions[question.id] = {"type": "short_answer"}
+
+        for i in range(students):
+            student = User(email=f"student-{i}-{run}@example.com", hashed_password=hashed,
+                           first_name="Student", last_name=str(i))
+            db.add(student)
+            db.flush()
+            db.add_all([
+                UserRole(user_id=student.id, role_id=student_role.id),
+                CourseEnrollment(course_id=course.id, user_id=student.id),
+                ExamParticipant(exam_id=exam.id, user_id=student.id, is_active=True),
+            ])
+            data.student_emails.append(student.email)
+        db.commit()
+
+        ExamSnapshotService().create_version(db, exam.id)
+        return data
+    finally:
+        db.close()
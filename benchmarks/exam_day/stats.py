@@ -0,0 +1,92 @@
+"""Per-endpoint latency recording, reporting and comparison with a stored report."""
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class LatencyRecorder:
+    """Collects request latencies per endpoint name (e.g. "POST /attempts/{attempt_id}/answers")."""
+
+    def __init__(self) -> None:
+        self._latencies: Dict[str, List[float]] = defaultdict(list)
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self._latencies[endpoint].append(seconds)
+            if not ok:
+                self._errors[endpoint] += 1
+
+    def stop(self) -> None:
+        self.finished = time.perf_counter()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, errors, throughput over the whole run and latency percentiles in ms per endpoint."""
+        wall = (self.finished or time.perf_counter()) - self.started
+        report = {}
+        for endpoint, latencies in sorted(self._latencies.items()):
+            ms = [latency * 1000 for latency in latencies]
+            entry = {
+                "count": len(ms),
+                "errors": self._errors.get(endpoint, 0),
+                "rps": len(ms) / wall if wall else 0.0,
+                "max_ms": max(ms),
+            }
+            for q in PERCENTILES:
+                entry[f"p{q}_ms"] = percentile(ms, q)
+            report[endpoint] = entry
+        return report
+
+
+def format_report(summary: Dict[str, Dict[str, float]]) -> str:
+    header = f"{'endpoint':48s} {'count':>7s} {'errors':>6s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'max ms':>8s}"
+    lines = [header, "-" * len(header)]
+    for endpoint, s in summary.items():
+        lines.append(
+            f"{endpoint:48s} {s['count']:7d} {s['errors']:6d} {s['rps']:8.1f} "
+            f"{s['p50_ms']:8.1f} {s['p95_ms']:8.1f} {s['p99_ms']:8.1f} {s['max_ms']:8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def save_report(path: str, summary: Dict[str, Dict[str, float]], meta: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "endpoints": summary}, f, indent=2, ensure_ascii=False)
+
+
+def compare_reports(
+    baseline_path: str, summary: Dict[str, Dict[str, float]], tolerance: float
+) -> List[str]:
+    """Endpoints whose p95/p99 grew by more than `tolerance` (0.25 = 25%) or that started failing."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["endpoints"]
+
+    regressions = []
+    for endpoint, current in summary.items():
+        previous = baseline.get(endpoint)
+        if previous is None:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if previous[key] and current[key] > previous[key] * (1 + tolerance):
+                regressions.append(
+                    f"{endpoint}: {key} {previous[key]:.1f} -> {current[key]:.1f} ms "
+                    f"(+{(current[key] / previous[key] - 1) * 100:.0f}%)"
+                )
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{endpoint}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
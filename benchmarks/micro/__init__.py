@@ -0,0 +1,17 @@
+"""
+Micro-benchmarks for the CPU-bound hot functions, with a stored baseline.
+
+Each case prepares its data outside the timed region (seeded in-memory SQLite
+for the cases that need a session) and times one call of the function under
+test. A case is calibrated so a round lasts at least --min-time seconds, then
+timed for --rounds rounds; the per-call median is compared with
+benchmarks/micro/baseline.json. Run from the repo root:
+
+    python -m benchmarks.micro                     # run all, compare with the baseline
+    python -m benchmarks.micro -k grading -k review
+    python -m benchmarks.micro --save-baseline     # record a new baseline
+    python -m benchmarks.micro --fail-on-regression --threshold 0.2
+
+Baselines are machine-specific: record one on the machine that runs the
+comparison (e.g. the CI runner) before relying on --fail-on-regression.
+"""
@@ -0,0 +1,59 @@
+"""Command line entry point: python -m benchmarks.micro --help"""
+import argparse
+import os
+import sys
+
+from benchmarks.micro import cases  # noqa: F401 — реєструємо всі кейси
+from benchmarks.micro.runner import compare, load_baseline, save_baseline, select, time_case
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.micro", description="Hot-path micro-benchmarks")
+    parser.add_argument("-k", dest="patterns", action="append", help="run only cases whose name contains this")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per round")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed median slowdown, 0.2 = 20%%")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if a case exceeds --threshold")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    selected = select(args.patterns)
+    if args.list:
+        for case in selected:
+            print(f"{case.name:38s} {case.description}")
+        return 0
+    if not selected:
+        print("No benchmark matches", args.patterns)
+        return 1
+
+    timings = []
+    for case in selected:
+        print(f"running {case.name} ...", file=sys.stderr)
+        timings.append(time_case(case, args.rounds, args.min_time))
+
+    baseline = load_baseline(args.baseline)
+    regressions = compare(timings, baseline, args.threshold)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, timings, merge_with=baseline)
+        print(f"\nbaseline written to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"\nno baseline at {args.baseline}; record one with --save-baseline")
+    elif regressions:
+        print(f"\n{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}: "
+              + ", ".join(regressions))
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
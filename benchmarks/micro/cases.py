@@ -0,0 +1,180 @@
+"""
+Benchmark cases. Each setup builds its data once and returns the call to time;
+cases that need a session seed their own in-memory SQLite database.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from benchmarks.bench_highlight_spans import make_essays
+from benchmarks.micro.runner import benchmark
+
+QUESTIONS = 50
+CANDIDATE_ESSAYS = 200
+TRANSCRIPT_COURSES = 30
+
+
+def _session():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from src.api.database import Base
+    from src.models import (  # noqa: F401 — реєструємо всі таблиці в metadata
+        users, roles, user_roles, exams, courses, majors, user_majors, attempts,
+        course_exams, course_supervisors, exam_participants, exam_email_notifications,
+    )
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def _user(db, name: str):
+    from src.models.users import User
+
+    user = User(email=f"{name}-{uuid4().hex[:8]}@example.com", hashed_password="x", first_name=name, last_name="Bench")
+    db.add(user)
+    db.flush()
+    return user
+
+
+def _seed_answered_exam(db, questions: int = QUESTIONS):
+    """
+    A published, snapshotted exam whose questions cycle through single-choice,
+    multi-choice, short-answer and long-answer, plus a submitted attempt that
+    answers every question (right and wrong answers alternate).
+    """
+    from src.api.services.exam_snapshot_service import ExamSnapshotService
+    from src.models.attempts import Answer, AnswerOption, Attempt, AttemptStatus
+    from src.models.exams import Exam, ExamStatusEnum, Option, Question, QuestionType
+
+    now = datetime.now(timezone.utc)
+    owner, student = _user(db, "owner"), _user(db, "student")
+    exam = Exam(title="Micro-benchmark", start_at=now - timedelta(hours=1), end_at=now + timedelta(hours=1),
+                owner_id=owner.id, status=ExamStatusEnum.published, duration_minutes=60, max_attempts=1)
+    db.add(exam)
+    db.flush()
+    attempt = Attempt(exam_id=exam.id, user_id=student.id, status=AttemptStatus.submitted,
+                      started_at=now, due_at=now + timedelta(hours=1), submitted_at=now)
+    db.add(attempt)
+    db.flush()
+
+    kinds = [QuestionType.single_choice, QuestionType.multi_choice, QuestionType.short_answer, QuestionType.long_answer]
+    for position in range(questions):
+        kind = kinds[position % len(kinds)]
+        right_answer = position % 2 == 0
+        question = Question(exam_id=exam.id, question_type=kind, title=f"Q{position}", position=position, points=1)
+        db.add(question)
+        db.flush()
+        answer = Answer(attempt_id=attempt.id, question_id=question.id, saved_at=now)
+
+        if kind in (QuestionType.single_choice, QuestionType.multi_choice):
+            options = [Option(question_id=question.id, text=f"option {i}", is_correct=i < (1 if kind == QuestionType.single_choice else 2))
+                       for i in range(4)]
+            db.add_all(options)
+            db.add(answer)
+            db.flush()
+            chosen = options[:2] if kind == QuestionType.multi_choice else options[:1]
+            if not right_answer:
+                chosen = options[-1:]
+            db.add_all([AnswerOption(answer_id=answer.id, selected_option_id=o.id) for o in chosen])
+        elif kind == QuestionType.short_answer:
+            db.add(Option(question_id=question.id, text="3.14", is_correct=True))
+            answer.answer_text = " 3,14 " if right_answer else "2.71"
+            db.add(answer)
+        else:
+            answer.answer_text = "A long free-text answer graded by the teacher. " * 20
+            db.add(answer)
+    db.commit()
+
+    version = ExamSnapshotService().create_version(db, exam.id)
+    db.query(Attempt).filter(Attempt.id == attempt.id).update({Attempt.exam_version: version})
+    db.commit()
+    return attempt.id
+
+
+@benchmark("grading.calculate_score", "GradingService.calculate_score, 50 mixed questions, warm key cache")
+def grading_calculate_score():
+    from src.api.repositories.attempts_repository import AttemptsRepository
+    from src.api.services.grading_service import AnswerKeyCache, GradingService
+
+    db = _session()
+    attempt = AttemptsRepository(db).get_attempt_for_review(_seed_answered_exam(db))
+    service = GradingService(key_cache=AnswerKeyCache())
+    return lambda: service.calculate_score(db, attempt)
+
+
+@benchmark("review.get_attempt_review", "ExamReviewService.get_attempt_review, 50 mixed questions")
+def review_get_attempt_review():
+    from src.api.services.exam_review_service import ExamReviewService
+
+    db = _session()
+    attempt_id = _seed_answered_exam(db)
+    service = ExamReviewService()
+
+    def run():
+        service.get_attempt_review(attempt_id, db)
+        # Кожен виклик має читати з БД, як окремий запит
+        db.expunge_all()
+    return run
+
+
+@benchmark("plagiarism.tfidf_similarities", "PlagiarismService._compute_tfidf_similarities, 200 essays")
+def plagiarism_tfidf_similarities():
+    from src.api.services.plagiarism_service import PlagiarismService
+
+    rng = random.Random(0)
+    vocab = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 9))) for _ in range(4000)]
+    base = " ".join(rng.choices(vocab, k=400))
+    candidates = [" ".join(rng.choices(vocab, k=400)) for _ in range(CANDIDATE_ESSAYS)]
+    return lambda: PlagiarismService._compute_tfidf_similarities(base, candidates)
+
+
+@benchmark("plagiarism.highlight_spans", "PlagiarismService._compute_highlight_spans, two 5k-word essays")
+def plagiarism_highlight_spans():
+    from src.api.services.plagiarism_service import PlagiarismService
+
+    base, other = make_essays()
+    return lambda: PlagiarismService._compute_highlight_spans(base, other, min_match_len=20)
+
+
+@benchmark("largest_remainder.distribute", "distribute_largest_remainder, 200 weighted items")
+def largest_remainder_distribute():
+    from src.utils.largest_remainder import distribute_largest_remainder
+
+    rng = random.Random(0)
+    items = {f"q{i}": rng.uniform(0.1, 5.0) for i in range(200)}
+    return lambda: distribute_largest_remainder(items, target_total=100)
+
+
+@benchmark("transcript.get_transcript_for_user", "TranscriptService.get_transcript_for_user, 30 courses")
+def transcript_get_transcript_for_user():
+    from src.api.services.transcript_service import TranscriptService
+    from src.models.attempts import Attempt, AttemptStatus
+    from src.models.course_exams import CourseExam
+    from src.models.courses import Course, CourseEnrollment
+    from src.models.exams import Exam, ExamStatusEnum
+
+    db = _session()
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc)
+    owner, student = _user(db, "owner"), _user(db, "student")
+    for i in range(TRANSCRIPT_COURSES):
+        course = Course(name=f"Course {i}", code=f"C-{i}", owner_id=owner.id)
+        exam = Exam(title=f"Exam {i}", start_at=now - timedelta(days=30), end_at=now - timedelta(days=29),
+                    owner_id=owner.id, status=ExamStatusEnum.published, pass_threshold=60, max_attempts=3)
+        db.add_all([course, exam])
+        db.flush()
+        db.add_all([CourseExam(exam_id=exam.id, course_id=course.id),
+                    CourseEnrollment(course_id=course.id, user_id=student.id)])
+        # Кілька курсів ще без спроб, решта — до трьох оцінених спроб
+        for _ in range(rng.randint(0, 3)):
+            db.add(Attempt(exam_id=exam.id, user_id=student.id, status=AttemptStatus.completed,
+                           started_at=now, due_at=now, submitted_at=now, earned_points=rng.uniform(30, 100)))
+    db.commit()
+    service, student_id = TranscriptService(), student.id
+
+    def run():
+        service.get_transcript_for_user(student_id, db, sort_by="rating", order="desc")
+        db.expunge_all()
+    return run
@@ -0,0 +1,146 @@
+"""Benchmark registry, timing loop, baseline storage and the comparison report."""
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+# A case's setup function prepares the data and returns the zero-argument call to time
+Setup = Callable[[], Callable[[], object]]
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Setup
+    description: str = ""
+
+
+@dataclass
+class Timing:
+    name: str
+    number: int
+    rounds: int
+    min: float
+    median: float
+    mean: float
+    stdev: float
+
+    def to_json(self) -> dict:
+        return {"number": self.number, "rounds": self.rounds, "min": self.min, "median": self.median,
+                "mean": self.mean, "stdev": self.stdev}
+
+
+CASES: Dict[str, Case] = {}
+
+
+def benchmark(name: str, description: str = "") -> Callable[[Setup], Setup]:
+    """Register `setup` as the benchmark case `name`."""
+    def register(setup: Setup) -> Setup:
+        if name in CASES:
+            raise ValueError(f"Duplicate benchmark name: {name}")
+        CASES[name] = Case(name, setup, description or (setup.__doc__ or "").strip().split("\n")[0])
+        return setup
+    return register
+
+
+def select(patterns: Optional[List[str]]) -> List[Case]:
+    cases = list(CASES.values())
+    if patterns:
+        cases = [case for case in cases if any(pattern in case.name for pattern in patterns)]
+    return cases
+
+
+def time_case(case: Case, rounds: int, min_time: float) -> Timing:
+    """Calibrate calls per round so a round takes at least `min_time`, then time `rounds` rounds."""
+    fn = case.setup()
+    fn()  # прогрів: ліниві імпорти, кеші, JIT-подібні ефекти бібліотек
+
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    per_call = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - started) / number)
+
+    return Timing(
+        name=case.name,
+        number=number,
+        rounds=rounds,
+        min=min(per_call),
+        median=statistics.median(per_call),
+        mean=statistics.mean(per_call),
+        stdev=statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+    )
+
+
+def environment() -> dict:
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def load_baseline(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path: str, timings: List[Timing], merge_with: Optional[dict] = None) -> None:
+    """Write the timings as the new baseline; cases that were not run keep their previous entry."""
+    entries = dict((merge_with or {}).get("benchmarks", {}))
+    entries.update({timing.name: timing.to_json() for timing in timings})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "benchmarks": dict(sorted(entries.items()))}, f, indent=2)
+        f.write("\n")
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit:2s}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def compare(timings: List[Timing], baseline: Optional[dict], threshold: float) -> List[str]:
+    """Print the report; returns the names of cases slower than the baseline by more than `threshold`."""
+    previous = (baseline or {}).get("benchmarks", {})
+    regressions = []
+    print(f"{'benchmark':38s} {'median':>11s} {'min':>11s} {'stdev':>11s} {'baseline':>11s} {'change':>8s}")
+    print("-" * 96)
+    for timing in timings:
+        entry = previous.get(timing.name)
+        if entry:
+            ratio = timing.median / entry["median"]
+            change = f"{(ratio - 1) * 100:+7.1f}%"
+            if ratio > 1 + threshold:
+                change += "  SLOWER"
+                regressions.append(timing.name)
+            elif ratio < 1 - threshold:
+                change += "  faster"
+            base = _format_seconds(entry["median"])
+        else:
+            change, base = "     new", "          -"
+        print(f"{timing.name:38s} {_format_seconds(timing.median)} {_format_seconds(timing.min)} "
+              f"{_format_seconds(timing.stdev)} {base} {change}")
+    return regressions
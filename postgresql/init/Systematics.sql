@@ -122,6 +122,20 @@ CREATE TYPE public.plagiarismstatus AS ENUM (
 
 ALTER TYPE public.plagiarismstatus OWNER TO postgres;
 
+--
+-- Name: plagiarismcheckstate; Type: TYPE; Schema: public; Owner: postgres
+--
+
+CREATE TYPE public.plagiarismcheckstate AS ENUM (
+    'pending',
+    'running',
+    'done',
+    'failed'
+);
+
+
+ALTER TYPE public.plagiarismcheckstate OWNER TO postgres;
+
 --
 -- TOC entry 914 (class 1247 OID 16618)
 -- Name: question_type_enum; Type: TYPE; Schema: public; Owner: postgres
@@ -404,7 +418,8 @@ CREATE TABLE public.attempts (
     earned_points real,
     correct_answers integer,
     incorrect_answers integer,
-    pending_count integer
+    pending_count integer,
+    exam_version integer
 );
 
 
@@ -465,6 +480,21 @@ CREATE TABLE public.courses (
 
 ALTER TABLE public.courses OWNER TO postgres;
 
+--
+-- Name: exam_snapshots; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.exam_snapshots (
+    id uuid DEFAULT public.uuid_generate_v4() NOT NULL,
+    exam_id uuid NOT NULL,
+    version integer NOT NULL,
+    content jsonb NOT NULL,
+    created_at timestamp with time zone DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+
+ALTER TABLE public.exam_snapshots OWNER TO postgres;
+
 --
 -- TOC entry 239 (class 1259 OID 17005)
 -- Name: exam_participants; Type: TABLE; Schema: public; Owner: postgres
@@ -646,16 +676,34 @@ ALTER TABLE public.options OWNER TO postgres;
 CREATE TABLE public.plagiarism_checks (
     id uuid NOT NULL,
     attempt_id uuid NOT NULL,
-    uniqueness_percent double precision NOT NULL,
-    max_similarity double precision NOT NULL,
-    status public.plagiarism_status NOT NULL,
+    uniqueness_percent double precision,
+    max_similarity double precision,
+    status public.plagiarism_status,
+    state public.plagiarismcheckstate DEFAULT 'done'::public.plagiarismcheckstate NOT NULL,
     details jsonb,
-    created_at timestamp with time zone DEFAULT now() NOT NULL
+    created_at timestamp with time zone DEFAULT now() NOT NULL,
+    started_at timestamp with time zone,
+    finished_at timestamp with time zone
 );
 
 
 ALTER TABLE public.plagiarism_checks OWNER TO postgres;
 
+--
+-- Name: plagiarism_signatures; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.plagiarism_signatures (
+    attempt_id uuid NOT NULL,
+    exam_id uuid NOT NULL,
+    num_perm integer NOT NULL,
+    signature bytea NOT NULL,
+    created_at timestamp with time zone DEFAULT now() NOT NULL
+);
+
+
+ALTER TABLE public.plagiarism_signatures OWNER TO postgres;
+
 --
 -- TOC entry 235 (class 1259 OID 16723)
 -- Name: question_type_weights; Type: TABLE; Schema: public; Owner: postgres
@@ -765,7 +813,8 @@ CREATE TABLE public.users (
     last_name text NOT NULL,
     patronymic text,
     notification_settings jsonb DEFAULT '{"enabled": false, "remind_before_hours": []}'::jsonb NOT NULL,
-    avatar_url character varying(255)
+    avatar_url character varying(255),
+    token_version integer DEFAULT 0 NOT NULL
 );
 
 
@@ -1357,6 +1406,22 @@ ALTER TABLE ONLY public.attempts
     ADD CONSTRAINT exam_attempts_pkey PRIMARY KEY (id);
 
 
+--
+-- Name: exam_snapshots exam_snapshots_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.exam_snapshots
+    ADD CONSTRAINT exam_snapshots_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: exam_snapshots exam_snapshots_exam_id_version_key; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.exam_snapshots
+    ADD CONSTRAINT exam_snapshots_exam_id_version_key UNIQUE (exam_id, version);
+
+
 --
 -- TOC entry 4945 (class 2606 OID 17011)
 -- Name: exam_participants exam_participants_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
@@ -1456,6 +1521,14 @@ ALTER TABLE ONLY public.plagiarism_checks
     ADD CONSTRAINT plagiarism_checks_pkey PRIMARY KEY (id);
 
 
+--
+-- Name: plagiarism_signatures plagiarism_signatures_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.plagiarism_signatures
+    ADD CONSTRAINT plagiarism_signatures_pkey PRIMARY KEY (attempt_id);
+
+
 --
 -- TOC entry 4933 (class 2606 OID 16728)
 -- Name: question_type_weights question_type_weights_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
@@ -1603,6 +1676,13 @@ CREATE INDEX idx_questions_on_exam_id ON public.questions USING btree (exam_id);
 CREATE INDEX idx_student_answers_on_attempt_id ON public.answers USING btree (attempt_id);
 
 
+--
+-- Name: ix_plagiarism_signatures_exam_id; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX ix_plagiarism_signatures_exam_id ON public.plagiarism_signatures USING btree (exam_id);
+
+
 --
 -- TOC entry 4975 (class 2620 OID 16731)
 -- Name: questions questions_count_update_trigger; Type: TRIGGER; Schema: public; Owner: postgres
@@ -1689,6 +1769,14 @@ ALTER TABLE ONLY public.attempts
     ADD CONSTRAINT exam_attempts_exam_id_fkey FOREIGN KEY (exam_id) REFERENCES public.exams(id) ON DELETE CASCADE;
 
 
+--
+-- Name: exam_snapshots exam_snapshots_exam_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.exam_snapshots
+    ADD CONSTRAINT exam_snapshots_exam_id_fkey FOREIGN KEY (exam_id) REFERENCES public.exams(id) ON DELETE CASCADE;
+
+
 --
 -- TOC entry 4970 (class 2606 OID 17012)
 -- Name: exam_participants exam_participants_exam_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
@@ -1788,6 +1876,22 @@ ALTER TABLE ONLY public.plagiarism_checks
     ADD CONSTRAINT plagiarism_checks_attempt_id_fkey FOREIGN KEY (attempt_id) REFERENCES public.attempts(id);
 
 
+--
+-- Name: plagiarism_signatures plagiarism_signatures_attempt_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.plagiarism_signatures
+    ADD CONSTRAINT plagiarism_signatures_attempt_id_fkey FOREIGN KEY (attempt_id) REFERENCES public.attempts(id) ON DELETE CASCADE;
+
+
+--
+-- Name: plagiarism_signatures plagiarism_signatures_exam_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.plagiarism_signatures
+    ADD CONSTRAINT plagiarism_signatures_exam_id_fkey FOREIGN KEY (exam_id) REFERENCES public.exams(id) ON DELETE CASCADE;
+
+
 --
 -- TOC entry 4958 (class 2606 OID 16638)
 -- Name: questions questions_exam_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
@@ -0,0 +1,345 @@
+"""
+Буфер автозбережень відповідей (write-behind).
+
+Автозбереження не пишеться в БД одразу: відповідь кладеться в буфер і
+підтверджується клієнту. Повторні збереження того самого питання спроби
+зливаються в одне (перемагає останнє), а буфер скидається в БД пачкою —
+періодично (AUTOSAVE_FLUSH_SECONDS), перед submit спроби, перед масовим
+оцінюванням закритих іспитів і при зупинці додатку.
+
+Гарантії:
+- підтверджене збереження потрапляє в БД не пізніше наступного скидання;
+  при аварійному завершенні процесу (kill -9, OOM) втрачаються збереження
+  щонайбільше за останні AUTOSAVE_FLUSH_SECONDS секунд;
+- submit записує буфер своєї спроби в тій самій транзакції, тож оцінюються
+  всі підтверджені відповіді; якщо транзакція не вдалася — записи
+  повертаються в буфер;
+- якщо скидання не вдалося, записи повертаються в буфер (крім тих, для яких
+  за цей час прийшло новіше збереження) і пишуться наступного разу; спроби
+  пишуться в окремих SAVEPOINT, тож помилка однієї не затримує інші, а
+  масове оцінювання не чіпає спроби з незаписаними збереженнями;
+- збереження спроби, що на момент скидання вже не in_progress, відкидаються,
+  як і раніше відповідь після здачі не приймалася.
+
+Буфер живе в пам'яті процесу: при кількох інстансах API збереження однієї
+спроби мають потрапляти в той самий процес (sticky sessions), інакше варто
+вимкнути буфер (AUTOSAVE_FLUSH_SECONDS=0) — тоді кожне збереження
+пишеться в БД одразу.
+"""
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Set, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy.orm import Session
+
+from src.api.database import SessionLocal
+from src.api.errors.app_errors import ConflictError, NotFoundError
+from src.api.repositories.attempts_repository import AttemptsRepository
+from src.api.schemas.attempts import AnswerUpsert
+from src.core.config import AUTOSAVE_FLUSH_SECONDS
+from src.models.attempts import AttemptStatus
+from src.models.exams import QuestionType
+from src.utils.datetime_utils import as_utc
+
+logger = logging.getLogger(__name__)
+
+# Скільки секунд довіряти закешованому стану спроби (status), перш ніж перечитати його з БД
+ATTEMPT_CONTEXT_TTL_SECONDS = 60
+
+# Типи питань, для яких зберігаються обрані варіанти (див. AttemptsRepository.answer_values)
+_CHOICE_TYPES = (QuestionType.single_choice, QuestionType.multi_choice)
+
+
+@dataclass
+class BufferedAnswer:
+    """Останнє збереження відповіді на питання спроби, що ще не записане в БД."""
+    attempt_id: UUID
+    question_id: UUID
+    answer_id: UUID
+    question_type: QuestionType
+    payload: AnswerUpsert
+    saved_at: datetime
+    seq: int = 0
+
+    def to_row(self) -> dict:
+        return {
+            "id": self.answer_id,
+            "attempt_id": self.attempt_id,
+            "question_id": self.question_id,
+            "saved_at": self.saved_at,
+            **AttemptsRepository.answer_values(self.question_type, self.payload),
+        }
+
+
+@dataclass
+class _AttemptContext:
+    due_at: datetime
+    question_types: Dict[UUID, QuestionType]
+    option_ids: Dict[UUID, Set[UUID]]
+    answer_ids: Dict[UUID, UUID]
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+class AnswerWriteBuffer:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        flush_interval: float = AUTOSAVE_FLUSH_SECONDS,
+        context_ttl: float = ATTEMPT_CONTEXT_TTL_SECONDS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.context_ttl = context_ttl
+        self._pending: Dict[Tuple[UUID, UUID], BufferedAnswer] = {}
+        self._contexts: Dict[UUID, _AttemptContext] = {}
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_interval > 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def put(self, db: Session, attempt_id: UUID, payload: AnswerUpsert) -> BufferedAnswer:
+        """
+        Приймає автозбереження. Стан спроби й питання іспиту перевіряються за
+        закешованим контекстом спроби (БД читається лише при першому збереженні
+        та після ATTEMPT_CONTEXT_TTL_SECONDS або due_at). Якщо буфер вимкнено,
+        відповідь одразу записується й комітиться в сесії `db`.
+        """
+        return self.put_many(db, attempt_id, [payload], write_through=not self.enabled)[0]
+
+    def put_many(
+        self,
+        db: Session,
+        attempt_id: UUID,
+        payloads: List[AnswerUpsert],
+        write_through: bool = False,
+    ) -> List[BufferedAnswer]:
+        """
+        Приймає кілька відповідей спроби (для повторів питання перемагає остання).
+        Якщо хоча б одне питання не належить іспиту або обраний варіант не
+        належить питанню, не приймається жодна.
+        З write_through відповіді одразу записуються одним пакетним upsert і
+        комітяться в сесії `db`, а старіші збереження цих питань з буфера відкидаються.
+        """
+        context = self._get_context(db, attempt_id)
+        latest: Dict[UUID, AnswerUpsert] = {}
+        for payload in payloads:
+            if payload.question_id not in context.question_types:
+                raise NotFoundError("Question not found")
+            if (context.question_types[payload.question_id] in _CHOICE_TYPES
+                    and not set(payload.selected_option_ids or ()) <= context.option_ids[payload.question_id]):
+                raise NotFoundError("Option not found")
+            latest.pop(payload.question_id, None)
+            latest[payload.question_id] = payload
+
+        saved_at = datetime.now(timezone.utc)
+        with self._lock:
+            entries = [
+                BufferedAnswer(
+                    attempt_id=attempt_id,
+                    question_id=question_id,
+                    answer_id=context.answer_ids.setdefault(question_id, uuid4()),
+                    question_type=context.question_types[question_id],
+                    payload=payload,
+                    saved_at=saved_at,
+                    seq=next(self._seq),
+                )
+                for question_id, payload in latest.items()
+            ]
+            if not write_through:
+                for entry in entries:
+                    self._pending[(attempt_id, entry.question_id)] = entry
+                return entries
+
+        # Періодичне скидання не повинно паралельно записати старіші значення цих питань
+        with self._flush_lock:
+            with self._lock:
+                superseded = [
+                    self._pending.pop(key)
+                    for key in [(attempt_id, entry.question_id) for entry in entries]
+                    if key in self._pending
+                ]
+            try:
+                answer_ids = AttemptsRepository(db).upsert_answers([entry.to_row() for entry in entries])
+                db.commit()
+            except Exception:
+                db.rollback()
+                self.restore(superseded)
+                raise
+
+        with self._lock:
+            for entry in entries:
+                entry.answer_id = answer_ids[(attempt_id, entry.question_id)]
+                context.answer_ids[entry.question_id] = entry.answer_id
+        return entries
+
+    def flush(self) -> int:
+        """
+        Записує весь буфер у власній сесії одним комітом. Якщо пакетний запис
+        не вдався, кожна спроба пишеться у власному SAVEPOINT, тож помилкова
+        відповідь однієї спроби не затримує відповіді інших.
+        Повертає кількість записаних відповідей; незаписані повертаються в буфер
+        (див. pending_attempt_ids).
+        """
+        with self._flush_lock:
+            with self._lock:
+                entries = list(self._pending.values())
+                self._pending.clear()
+                self._prune_contexts()
+            if not entries:
+                return 0
+
+            db = self.session_factory()
+            try:
+                written, failed = self._write(db, entries)
+                db.commit()
+            except Exception as e:
+                logger.error(f"Flushing {len(entries)} buffered answers failed: {e}", exc_info=True)
+                db.rollback()
+                self.restore(entries)
+                return 0
+            finally:
+                db.close()
+            if failed:
+                self.restore(failed)
+            return written
+
+    def flush_attempt(self, db: Session, attempt_id: UUID) -> List[BufferedAnswer]:
+        """
+        Записує збереження однієї спроби в сесії `db` без коміту (submit робить
+        його сам) і забуває контекст спроби. Повертає записані елементи, щоб
+        викликач міг повернути їх у буфер (restore), якщо транзакція не вдалася.
+        Чекає на паралельне періодичне скидання, щоб не пропустити його записи.
+        """
+        with self._flush_lock, self._lock:
+            entries = [
+                self._pending.pop(key) for key in [key for key in self._pending if key[0] == attempt_id]
+            ]
+            self._contexts.pop(attempt_id, None)
+        if entries:
+            try:
+                AttemptsRepository(db).upsert_answers([entry.to_row() for entry in entries])
+            except Exception:
+                self.restore(entries)
+                raise
+        return entries
+
+    def restore(self, entries: List[BufferedAnswer]) -> None:
+        """Повертає незаписані елементи в буфер, якщо для питання ще немає новішого збереження."""
+        with self._lock:
+            for entry in entries:
+                key = (entry.attempt_id, entry.question_id)
+                current = self._pending.get(key)
+                if current is None or current.seq < entry.seq:
+                    self._pending[key] = entry
+
+    def pending_attempt_ids(self) -> Set[UUID]:
+        """Спроби, збереження яких ще не записані в БД (наприклад, після невдалого скидання)."""
+        with self._lock:
+            return {attempt_id for attempt_id, _ in self._pending}
+
+    def forget(self, attempt_ids: List[UUID]) -> None:
+        """Скидає закешований стан спроб (наприклад, після їх здачі в іншому місці)."""
+        with self._lock:
+            for attempt_id in attempt_ids:
+                self._contexts.pop(attempt_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+            self._contexts.clear()
+
+    def shutdown(self) -> int:
+        """Фінальне скидання при зупинці додатку."""
+        return self.flush()
+
+    def _write(self, db: Session, entries: List[BufferedAnswer]) -> Tuple[int, List[BufferedAnswer]]:
+        """Записує елементи без коміту. Повертає (кількість записаних, елементи, які записати не вдалося)."""
+        repo = AttemptsRepository(db)
+        open_ids = repo.get_in_progress_attempt_ids(list({entry.attempt_id for entry in entries}))
+        closed = {entry.attempt_id for entry in entries} - open_ids
+        if closed:
+            logger.warning(f"Dropping buffered answers of {len(closed)} attempts that are no longer in progress")
+            self.forget(list(closed))
+
+        to_write = [entry for entry in entries if entry.attempt_id in open_ids]
+        failed: List[BufferedAnswer] = []
+        try:
+            with db.begin_nested():
+                answer_ids = repo.upsert_answers([entry.to_row() for entry in to_write])
+        except Exception as e:
+            logger.warning(f"Batch write of {len(to_write)} buffered answers failed, writing attempts one by one: {e}")
+            by_attempt: Dict[UUID, List[BufferedAnswer]] = {}
+            for entry in to_write:
+                by_attempt.setdefault(entry.attempt_id, []).append(entry)
+            answer_ids = {}
+            for attempt_id, attempt_entries in by_attempt.items():
+                try:
+                    with db.begin_nested():
+                        answer_ids.update(repo.upsert_answers([entry.to_row() for entry in attempt_entries]))
+                except Exception as attempt_error:
+                    logger.error(f"Buffered answers of attempt {attempt_id} could not be written: {attempt_error}")
+                    failed.extend(attempt_entries)
+
+        # Відповідь могла з'явитися в БД в обхід буфера — надалі віддаємо її справжній id
+        with self._lock:
+            for (attempt_id, question_id), answer_id in answer_ids.items():
+                context = self._contexts.get(attempt_id)
+                if context is not None:
+                    context.answer_ids[question_id] = answer_id
+        return len(to_write) - len(failed), failed
+
+    def _get_context(self, db: Session, attempt_id: UUID) -> _AttemptContext:
+        with self._lock:
+            context = self._contexts.get(attempt_id)
+        if context is not None and self._is_fresh(context):
+            return context
+
+        data = AttemptsRepository(db).get_answer_context(attempt_id)
+        if data is None:
+            raise NotFoundError("Attempt not found")
+        if data["status"] != AttemptStatus.in_progress:
+            self.forget([attempt_id])
+            raise ConflictError("Attempt is locked or submitted")
+
+        with self._lock:
+            answer_ids = data["answer_ids"]
+            if context is not None:
+                # Не губимо id, видані для ще не записаних відповідей
+                answer_ids = {**context.answer_ids, **answer_ids}
+            context = _AttemptContext(
+                due_at=as_utc(data["due_at"]),
+                question_types=data["question_types"],
+                option_ids=data["option_ids"],
+                answer_ids=answer_ids,
+            )
+            self._contexts[attempt_id] = context
+        return context
+
+    def _is_fresh(self, context: _AttemptContext) -> bool:
+        if time.monotonic() - context.loaded_at > self.context_ttl:
+            return False
+        return datetime.now(timezone.utc) <= context.due_at
+
+    def _prune_contexts(self) -> None:
+        # Викликається під self._lock: забуваємо застарілі контексти спроб без збережень у буфері
+        active = {attempt_id for attempt_id, _ in self._pending}
+        for attempt_id in [
+            attempt_id for attempt_id, context in self._contexts.items()
+            if attempt_id not in active and not self._is_fresh(context)
+        ]:
+            del self._contexts[attempt_id]
+
+
+# Спільний буфер процесу: скидається планувальником (див. src/api/main.py)
+answer_buffer = AnswerWriteBuffer()
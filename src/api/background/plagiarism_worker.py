@@ -0,0 +1,114 @@
+"""
+Фонові перевірки на плагіат.
+
+Черга — це сама таблиця plagiarism_checks: submit у своїй транзакції ставить
+запис у стан pending, а воркер після коміту забирає його (pending -> running)
+і виконує перевірку у пулі потоків. Періодична задача `process_pending`
+підбирає те, що не встигли обробити (рестарт процесу, інший інстанс API).
+"""
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from src.api.database import SessionLocal
+from src.api.repositories.plagiarism_repository import PlagiarismRepository
+from src.api.services.plagiarism_service import PlagiarismService
+from src.core.config import PLAGIARISM_STALE_AFTER_MINUTES, PLAGIARISM_WORKERS
+from src.models.attempts import PlagiarismCheckState
+
+logger = logging.getLogger(__name__)
+
+# Скільки перевірок з черги обробляти за один прохід періодичної задачі
+PENDING_BATCH_SIZE = 50
+
+
+class PlagiarismWorker:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        service: Optional[PlagiarismService] = None,
+        max_workers: int = PLAGIARISM_WORKERS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self._service = service
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def service(self) -> PlagiarismService:
+        # Створюємо ліниво: модель парафраз не потрібна, поки немає жодної перевірки
+        if self._service is None:
+            self._service = PlagiarismService(repo=PlagiarismRepository())
+        return self._service
+
+    def enqueue(self, attempt_id: UUID) -> Future:
+        """Запускає перевірку вже закоміченого pending-запису у фоновому потоці."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="plagiarism"
+                )
+            return self._executor.submit(self.run, attempt_id)
+
+    def run(self, attempt_id: UUID) -> None:
+        db = self.session_factory()
+        try:
+            self.service.run_pending_check(db, attempt_id)
+        except Exception as e:
+            logger.error(f"Background plagiarism check failed for attempt {attempt_id}: {e}", exc_info=True)
+            db.rollback()
+            self._mark_failed(db, attempt_id, str(e))
+        finally:
+            db.close()
+
+    def process_pending(self) -> int:
+        """
+        Періодична задача: повертає в чергу завислі перевірки й обробляє pending.
+        Повертає кількість оброблених перевірок.
+        """
+        db = self.session_factory()
+        try:
+            stale_before = datetime.now(timezone.utc) - timedelta(minutes=PLAGIARISM_STALE_AFTER_MINUTES)
+            requeued = PlagiarismRepository.requeue_stale_running(db, started_before=stale_before)
+            if requeued:
+                logger.warning(f"Requeued {requeued} stale plagiarism checks")
+            attempt_ids: List[UUID] = PlagiarismRepository.list_pending_attempt_ids(db, limit=PENDING_BATCH_SIZE)
+        except Exception as e:
+            logger.error(f"Error reading plagiarism queue: {e}", exc_info=True)
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+
+        for attempt_id in attempt_ids:
+            self.run(attempt_id)
+        return len(attempt_ids)
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    @staticmethod
+    def _mark_failed(db: Session, attempt_id: UUID, error: str) -> None:
+        try:
+            check = PlagiarismRepository.get_by_attempt_id(db, attempt_id)
+            if check is not None and check.state != PlagiarismCheckState.done:
+                check.state = PlagiarismCheckState.failed
+                check.details = {"matches": [], "error": error}
+                check.finished_at = datetime.now(timezone.utc)
+                db.commit()
+        except Exception:
+            logger.error(f"Could not mark plagiarism check for attempt {attempt_id} as failed", exc_info=True)
+            db.rollback()
+
+
+# Спільний для процесу воркер
+plagiarism_worker = PlagiarismWorker()
@@ -1,22 +1,21 @@
 from sqlalchemy.orm import Session, joinedload
 from uuid import UUID
-from fastapi import APIRouter, status, Depends, HTTPException, Path
-from src.api.schemas.attempts import AnswerUpsert, Answer, Attempt as AttemptSchema, AttemptResultResponse, AnswerScoreUpdate, FinalScoreUpdate, AddTimeRequest, ActiveAttemptInfo
+from fastapi import APIRouter, status, Depends, HTTPException, Path, Response
+from src.api.schemas.attempts import AnswerUpsert, AnswerBatchUpsert, Answer, Attempt as AttemptSchema, AttemptResultResponse, AnswerScoreUpdate, FinalScoreUpdate, AddTimeRequest, ActiveAttemptInfo
 from src.api.schemas.exam_review import ExamAttemptReviewResponse
 from src.api.services.attempts_service import AttemptsService
 from src.api.services.exam_review_service import ExamReviewService
 from src.api.repositories.attempts_repository import AttemptsRepository
-from src.api.repositories.weights_repository import WeightsRepository
 from src.models.attempts import Answer as AnswerModel, Attempt as AttemptModel
 from src.models.exams import QuestionType, Question
-from src.utils.largest_remainder import distribute_largest_remainder
-from src.utils.auth import get_current_user_with_role, require_role
-from src.models.users import User
+from src.utils.auth import get_current_user_with_role, require_role, Principal
 from src.api.errors.app_errors import NotFoundError
 from .versioning import require_api_version
-from src.api.database import get_db
+from src.api.database import get_db, statement_timeout
+from src.core.config import AUTOSAVE_STATEMENT_TIMEOUT_MS
 from typing import List, Optional
 from src.api.schemas.plagiarism import (
+    PlagiarismCheckStatusResponse,
     PlagiarismCheckSummary, 
     PlagiarismComparisonResponse,
     FlaggedAnswerResponse,
@@ -35,34 +34,16 @@ class AttemptsController:
 
     @staticmethod
     def _calculate_max_points(db: Session, attempt_id: UUID, question_id: UUID) -> float:
-        """Calculate max points for a question based on exam weights."""
-        attempts_repo = AttemptsRepository(db)
-        weights_repo = WeightsRepository(db)
-        attempt = attempts_repo.get_attempt(attempt_id)
+        """Calculate max points for a question from the exam version the attempt was started on."""
+        attempt = AttemptsRepository(db).get_attempt(attempt_id)
         
-        if not attempt or not attempt.exam:
+        if not attempt:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Attempt not found"
             )
         
-        weights_map = weights_repo.get_all_weights()
-        total_exam_weight = sum(
-            weights_map.get(q.question_type, 1) for q in attempt.exam.questions
-        )
-        
-        if total_exam_weight == 0:
-            points_per_weight_unit = 0.0
-        else:
-            points_per_weight_unit = 100.0 / total_exam_weight
-        
-        true_points_map = {
-            q.id: weights_map.get(q.question_type, 1) * points_per_weight_unit
-            for q in attempt.exam.questions
-        }
-        
-        final_points_map = distribute_largest_remainder(true_points_map, target_total=100)
-        return final_points_map.get(question_id, 0)
+        return AttemptsService._calculate_final_points_map(db, attempt).get(question_id, 0)
 
     def _setup_routes(self):
         """Setup all route handlers for the attempts router."""
@@ -71,7 +52,7 @@ class AttemptsController:
         self._register_flagged_answers_route()
 
     @staticmethod
-    def _require_teacher(current_user: User) -> None:
+    def _require_teacher(current_user: Principal) -> None:
         user_role = str(current_user.role).lower().strip() if current_user.role else None
         if user_role != 'teacher':
             raise HTTPException(
@@ -80,10 +61,10 @@ class AttemptsController:
             )
 
     # Extracted route handlers below. They are registered in `_register_flagged_answers_route`.
-    def _list_flagged_answers(self, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+    def _list_flagged_answers(self, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
         return self.service.list_flagged_answers(db=db, current_user=current_user)
 
-    def _add_answer(self, payload: AnswerUpsert, attempt_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+    def _add_answer(self, payload: AnswerUpsert, attempt_id: UUID, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
         # Перевірка ролі: тільки студент може зберігати відповіді
         if current_user.role != 'student':
             raise HTTPException(
@@ -92,7 +73,16 @@ class AttemptsController:
             )
         return self.service.add_answer(db, attempt_id, payload)
 
-    def _submit(self, attempt_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+    def _add_answers_batch(self, payload: AnswerBatchUpsert, attempt_id: UUID, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
+        # Перевірка ролі: тільки студент може зберігати відповіді
+        if current_user.role != 'student':
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Тільки студенти можуть зберігати відповіді"
+            )
+        return self.service.add_answers(db, attempt_id, payload.answers)
+
+    def _submit(self, attempt_id: UUID, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
         # Перевірка ролі: тільки студент може завершувати спробу
         if current_user.role != 'student':
             raise HTTPException(
@@ -101,16 +91,17 @@ class AttemptsController:
             )
         return self.service.submit(db, attempt_id)
 
-    def _get_attempt_details(self, attempt_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+    def _get_attempt_details(self, attempt_id: UUID, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
         # Перевірка ролі: студент або вчитель можуть переглядати деталі спроби
         if current_user.role not in ['student', 'teacher']:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Доступ дозволений тільки студентам та вчителям"
             )
-        return self.service.get_attempt_details(db, attempt_id)
+        # Питання іспиту приходять з кешу вже серіалізованими — віддаємо байти без повторного кодування
+        return Response(content=self.service.get_attempt_details_json(db, attempt_id), media_type="application/json")
 
-    def _read_attempt_result(self, attempt_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+    def _read_attempt_result(self, attempt_id: UUID, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
         # Перевірка ролі: студент або вчитель можуть переглядати результати
         if current_user.role not in ['student', 'teacher']:
             raise HTTPException(
@@ -119,14 +110,14 @@ class AttemptsController:
             )
         return self.service.get_attempt_result(db, attempt_id=attempt_id)
 
-    def _get_exam_attempt_review(self, attempt_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+    def _get_exam_attempt_review(self, attempt_id: UUID, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
         return self.review_service.get_attempt_review(attempt_id=attempt_id, db=db, current_user=current_user)
 
     def _update_answer_score(self, attempt_id: UUID = Path(..., description=ATTEMPT_ID_DESCRIPTION),
                                    question_id: UUID = Path(..., description="ID питання"),
                                    payload: AnswerScoreUpdate = ...,
                                    db: Session = Depends(get_db),
-                                   current_user: User = Depends(get_current_user_with_role)):
+                                   current_user: Principal = Depends(get_current_user_with_role)):
         # Перевірка ролі вчителя
         self._require_teacher(current_user)
 
@@ -152,7 +143,7 @@ class AttemptsController:
     def _update_final_score(self, attempt_id: UUID = Path(..., description=ATTEMPT_ID_DESCRIPTION),
                                    payload: FinalScoreUpdate = ...,
                                    db: Session = Depends(get_db),
-                                   current_user: User = Depends(get_current_user_with_role)):
+                                   current_user: Principal = Depends(get_current_user_with_role)):
         # Перевірка ролі вчителя
         self._require_teacher(current_user)
         
@@ -164,29 +155,34 @@ class AttemptsController:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
     def _list_plagiarism_checks(self, exam_id: UUID, max_uniqueness: Optional[float] = None,
-                                      db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+                                      db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
         # Перевірка ролі: тільки вчитель може переглядати перевірки на плагіат
         self._require_teacher(current_user)
         return self.service.get_exam_plagiarism_checks(db=db, exam_id=exam_id, current_user=current_user, max_uniqueness=max_uniqueness)
 
-    def _compare_attempts(self, attempt_id: UUID, other_attempt_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+    def _get_plagiarism_status(self, attempt_id: UUID = Path(..., description=ATTEMPT_ID_DESCRIPTION), db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
+        # Перевірка ролі: тільки вчитель може переглядати перевірки на плагіат
+        self._require_teacher(current_user)
+        return self.service.get_plagiarism_check_status(db=db, attempt_id=attempt_id, current_user=current_user)
+
+    def _compare_attempts(self, attempt_id: UUID, other_attempt_id: UUID, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
         # Перевірка ролі: тільки вчитель може порівнювати спроби
         self._require_teacher(current_user)
         return self.service.get_attempts_comparison(db=db, base_attempt_id=attempt_id, other_attempt_id=other_attempt_id, current_user=current_user)
 
-    def _flag_answer(self, answer_id: UUID = Path(..., description="ID відповіді"), db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+    def _flag_answer(self, answer_id: UUID = Path(..., description="ID відповіді"), db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
         self._require_teacher(current_user)
         return self.service.flag_answer_for_plagiarism_check(db=db, answer_id=answer_id, current_user=current_user)
 
-    def _unflag_answer(self, answer_id: UUID = Path(..., description="ID відповіді"), db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+    def _unflag_answer(self, answer_id: UUID = Path(..., description="ID відповіді"), db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
         self._require_teacher(current_user)
         self.service.unflag_answer(db=db, answer_id=answer_id, current_user=current_user)
 
-    def _compare_answers(self, answer1_id: UUID = Path(..., description="ID першої відповіді"), answer2_id: UUID = Path(..., description="ID другої відповіді"), db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+    def _compare_answers(self, answer1_id: UUID = Path(..., description="ID першої відповіді"), answer2_id: UUID = Path(..., description="ID другої відповіді"), db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
         self._require_teacher(current_user)
         return self.service.compare_two_answers(db=db, answer1_id=answer1_id, answer2_id=answer2_id, current_user=current_user)
 
-    def _get_answer_id(self, attempt_id: UUID = Path(..., description=ATTEMPT_ID_DESCRIPTION), question_id: UUID = Path(..., description="ID питання"), db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+    def _get_answer_id(self, attempt_id: UUID = Path(..., description=ATTEMPT_ID_DESCRIPTION), question_id: UUID = Path(..., description="ID питання"), db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user_with_role)):
         self._require_teacher(current_user)
 
         attempt = db.query(AttemptModel).filter(AttemptModel.id == attempt_id).first()
@@ -257,6 +253,17 @@ class AttemptsController:
             methods=["POST"],
             status_code=status.HTTP_201_CREATED,
             summary="Save or update an answer",
+            # Автозбереження має бути швидким: довгий запит краще обірвати, клієнт повторить
+            dependencies=[Depends(statement_timeout(AUTOSAVE_STATEMENT_TIMEOUT_MS))],
+        )
+
+        self.router.add_api_route(
+            "/{attempt_id}/answers:batch",
+            endpoint=self._add_answers_batch,
+            response_model=List[Answer],
+            methods=["PUT"],
+            summary="Save or update many answers at once",
+            dependencies=[Depends(statement_timeout(AUTOSAVE_STATEMENT_TIMEOUT_MS))],
         )
 
         self.router.add_api_route(
@@ -316,6 +323,14 @@ class AttemptsController:
             summary="Список результатів перевірки на плагіат для іспиту (лише викладач)",
         )
 
+        self.router.add_api_route(
+            "/{attempt_id}/plagiarism",
+            endpoint=self._get_plagiarism_status,
+            response_model=PlagiarismCheckStatusResponse,
+            methods=["GET"],
+            summary="Стан фонової перевірки на плагіат спроби (лише викладач)",
+        )
+
         self.router.add_api_route(
             "/{attempt_id}/plagiarism/compare/{other_attempt_id}",
             endpoint=self._compare_attempts,
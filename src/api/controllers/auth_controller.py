@@ -20,7 +20,7 @@ class AuthController:
             status_code=status.HTTP_200_OK,
             summary="User login"
         )
-        async def login(request: LoginRequest, db: Session = Depends(get_db)):
+        def login(request: LoginRequest, db: Session = Depends(get_db)):
             return self.service.login(db, request)
 
         @self.router.post(
@@ -29,6 +29,6 @@ class AuthController:
             status_code=status.HTTP_201_CREATED,
             summary="User registration"
         )
-        async def register(request: RegisterRequest, db: Session = Depends(get_db)):
+        def register(request: RegisterRequest, db: Session = Depends(get_db)):
             """Реєстрація нового користувача. За замовчуванням призначається роль 'student'."""
             return self.service.register(db, request)
@@ -5,7 +5,6 @@ from fastapi import APIRouter, Depends, status, Query, HTTPException
 from sqlalchemy.orm import Session
 
 from src.api.schemas.analytics import CourseAnalyticsResponse, GroupScoreAnalytics
-from src.models.users import User
 from src.api.schemas.exams import CourseExamsPage
 from src.api.schemas.courses import (
     Course,
@@ -18,8 +17,8 @@ from src.api.schemas.courses import (
 )
 from src.api.services.courses_service import CoursesService
 from src.api.services.exams_service import ExamsService
-from src.api.database import get_db
-from src.utils.auth import get_current_user_with_role, require_role
+from src.api.database import get_db, get_read_db
+from src.utils.auth import get_current_user_with_role, require_role, Principal
 from .versioning import require_api_version
 
 TEACHER_ONLY_ACCESS = "Цей функціонал доступний лише для викладачів"
@@ -119,7 +118,7 @@ class CoursesController:
 
     @staticmethod
     def _ensure_role(
-        current_user: User,
+        current_user: Principal,
         allowed_roles: set[str],
         detail: str,
     ) -> None:
@@ -145,7 +144,7 @@ class CoursesController:
         limit: int = Query(10, ge=1, le=100),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user_with_role),
+        current_user: Principal = Depends(get_current_user_with_role),
     ):
         """
         Отримує список курсів, які були створені поточним викладачем.
@@ -180,7 +179,7 @@ class CoursesController:
         limit: int = Query(100, ge=1, le=100),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user_with_role),
+        current_user: Principal = Depends(get_current_user_with_role),
     ):
         """
         Отримує список усіх курсів. Доступно для студентів.
@@ -218,7 +217,7 @@ class CoursesController:
         limit: int = Query(50, ge=1, le=200),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db),
-        current_user: User = Depends(require_role("supervisor")),
+        current_user: Principal = Depends(require_role("supervisor")),
     ):
         """
         Список курсів для наглядача з фільтрами.
@@ -239,7 +238,7 @@ class CoursesController:
         self,
         course_id: UUID,
         db: Session = Depends(get_db),
-        current_user: User = Depends(require_role("supervisor")),
+        current_user: Principal = Depends(require_role("supervisor")),
     ):
         """
         Деталізована інформація про курс для наглядача.
@@ -251,8 +250,8 @@ class CoursesController:
     def get_course_analytics(
         self,
         course_id: UUID,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user_with_role),
+        db: Session = Depends(get_read_db),
+        current_user: Principal = Depends(get_current_user_with_role),
     ):
         self._ensure_role(current_user, {"teacher"}, TEACHER_ONLY_ACCESS)
         return self.service.get_course_exam_statistics(db, course_id)
@@ -260,8 +259,8 @@ class CoursesController:
     def get_group_analytics(
         self,
         course_id: UUID,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user_with_role),
+        db: Session = Depends(get_read_db),
+        current_user: Principal = Depends(get_current_user_with_role),
     ):
         self._ensure_role(current_user, {"teacher"}, TEACHER_ONLY_ACCESS)
         return self.service.get_group_analytics(db, current_user.id, course_id)
@@ -270,7 +269,7 @@ class CoursesController:
         self,
         payload: CourseCreate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user_with_role),
+        current_user: Principal = Depends(get_current_user_with_role),
     ):
         self._ensure_role(
             current_user,
@@ -283,7 +282,7 @@ class CoursesController:
         self,
         course_id: UUID,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user_with_role),
+        current_user: Principal = Depends(get_current_user_with_role),
     ):
         """Отримує деталізовану інформацію про один курс за його ID."""
         return self.service.get(db, course_id)
@@ -293,7 +292,7 @@ class CoursesController:
         course_id: UUID,
         patch: CourseUpdate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user_with_role),
+        current_user: Principal = Depends(get_current_user_with_role),
     ):
         """
         Оновлює інформацію про курс.
@@ -309,7 +308,7 @@ class CoursesController:
         self,
         course_id: UUID,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user_with_role),
+        current_user: Principal = Depends(get_current_user_with_role),
     ):
         """
         Видаляє курс за його ID.
@@ -325,7 +324,7 @@ class CoursesController:
         self,
         course_id: UUID,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user_with_role),
+        current_user: Principal = Depends(get_current_user_with_role),
     ):
         """
         Записує поточного студента на курс.
@@ -341,7 +340,7 @@ class CoursesController:
         self,
         course_id: UUID,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user_with_role),
+        current_user: Principal = Depends(get_current_user_with_role),
     ):
         """
         Виписує поточного студента з курсу.
@@ -357,7 +356,7 @@ class CoursesController:
         self,
         course_id: UUID,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user_with_role),
+        current_user: Principal = Depends(get_current_user_with_role),
     ):
         """
         Отримує список іспитів для курсу. Доступно для викладачів та наглядачів.
@@ -10,8 +10,7 @@ from src.api.schemas.exam_participants import (
     ExamParticipantAttendanceUpdate,
 )
 from src.api.services.exam_participants_service import ExamParticipantsService
-from src.utils.auth import require_role
-from src.models.users import User
+from src.utils.auth import require_role, Principal
 from .versioning import require_api_version
 
 SUPERVISOR_ACCESS_DENIED = "Доступ дозволений лише наглядачам"
@@ -30,10 +29,10 @@ class ExamParticipantsController:
             response_model=list[ExamParticipantResponse],
             summary="Список активних учасників іспиту"
         )
-        async def list_participants(
+        def list_participants(
             exam_id: UUID = Path(...),
             db: Session = Depends(get_db),
-            current_user: User = Depends(require_role('supervisor')),
+            current_user: Principal = Depends(require_role('supervisor')),
         ):
             return self.service.list(db, exam_id)
 
@@ -43,11 +42,11 @@ class ExamParticipantsController:
             status_code=status.HTTP_201_CREATED,
             summary="Додати студента до іспиту (заборонено, якщо не зарахований на курс)"
         )
-        async def add_participant(
+        def add_participant(
             payload: ExamParticipantCreate,
             exam_id: UUID = Path(...),
             db: Session = Depends(get_db),
-            current_user: User = Depends(require_role('supervisor')),
+            current_user: Principal = Depends(require_role('supervisor')),
         ):
             return self.service.add(db, exam_id, payload)
 
@@ -56,11 +55,11 @@ class ExamParticipantsController:
             summary="Видалити студента (завершити активну спробу, якщо йде тест)",
             status_code=status.HTTP_200_OK
         )
-        async def remove_participant(
+        def remove_participant(
             user_id: UUID,
             exam_id: UUID = Path(...),
             db: Session = Depends(get_db),
-            current_user: User = Depends(require_role('supervisor')),
+            current_user: Principal = Depends(require_role('supervisor')),
         ):
             return self.service.remove(db, exam_id, user_id)
 
@@ -69,12 +68,12 @@ class ExamParticipantsController:
             response_model=ExamParticipantResponse,
             summary="Позначити студента як присутнього або відсутнього"
         )
-        async def set_attendance(
+        def set_attendance(
             user_id: UUID,
             update: ExamParticipantAttendanceUpdate,
             exam_id: UUID = Path(...),
             db: Session = Depends(get_db),
-            current_user: User = Depends(require_role('supervisor')),
+            current_user: Principal = Depends(require_role('supervisor')),
         ):
             return self.service.set_attendance(db, exam_id, user_id, update)
 
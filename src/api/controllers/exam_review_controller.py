@@ -5,8 +5,7 @@ from uuid import UUID
 from src.api.database import get_db
 from src.api.services.exam_review_service import ExamReviewService
 from src.api.schemas.exam_review import ExamAttemptReviewResponse
-from src.utils.auth import get_current_user_with_role
-from src.models.users import User
+from src.utils.auth import get_current_user_with_role, Principal
 
 router = APIRouter(
     prefix="/attempts",
@@ -22,10 +21,10 @@ def get_exam_review_service() -> ExamReviewService:
     response_model=ExamAttemptReviewResponse,
     summary="Отримати детальний огляд спроби іспиту"
 )
-async def get_exam_attempt_review(
+def get_exam_attempt_review(
     attempt_id: UUID = Path(..., description="ID спроби іспиту"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_with_role),
+    current_user: Principal = Depends(get_current_user_with_role),
     review_service: ExamReviewService = Depends(get_exam_review_service)
 ):
     """
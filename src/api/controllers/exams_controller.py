@@ -5,16 +5,14 @@ from src.api.schemas.analytics import ExamProgress, GroupAnalytics
 from src.api.schemas.exams import Exam, ExamCreate, ExamStatistics, ExamUpdate, CourseExamsPage, ExamWithQuestions, ExamsResponse
 from src.api.schemas.journal import ExamJournalResponse
 from src.api.schemas.attempts import Attempt
-from src.models.users import User
-from src.utils.auth import get_current_user_id, get_current_user_with_role 
+from src.utils.auth import get_current_user_id, get_current_user_with_role, Principal
 from src.api.services.exams_service import ExamsService
 from src.api.services.journal_service import JournalService
 from .versioning import require_api_version
-from src.api.database import get_db
+from src.api.database import get_db, get_read_db
 from typing import List
 
 TEACHER_ONLY_ACCESS = "Цей функціонал доступний лише для викладачів"
-import inspect
 
 class ExamsController:
     def __init__(self, service: ExamsService) -> None:
@@ -61,16 +59,10 @@ class ExamsController:
         self._register_get_exam_journal()
 
     @staticmethod
-    async def _safe_call(fn, *args, **kwargs):
-        """Run a function and convert unexpected exceptions to HTTP 500.
-
-        Supports both sync and async callables.
-        """
+    def _safe_call(fn, *args, **kwargs):
+        """Run a function and convert unexpected exceptions to HTTP 500."""
         try:
-            result = fn(*args, **kwargs)
-            if inspect.isawaitable(result):
-                return await result
-            return result
+            return fn(*args, **kwargs)
         except HTTPException:
             raise
         except Exception as e:
@@ -80,7 +72,7 @@ class ExamsController:
             )
 
     @staticmethod
-    def _require_teacher(user: User):
+    def _require_teacher(user: Principal):
         if user.role != 'teacher':
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -90,9 +82,9 @@ class ExamsController:
     def _register_list_exams(self):
         """Реєструє маршрут для списку іспитів."""
         @self.router.get("", response_model=ExamsResponse, summary="List exams")
-        async def list_exams(
+        def list_exams(
             db: Session = Depends(get_db),
-            current_user: User = Depends(get_current_user_with_role),
+            current_user: Principal = Depends(get_current_user_with_role),
             limit: int = Query(10, ge=1, le=100),
             offset: int = Query(0, ge=0)
         ):
@@ -121,10 +113,10 @@ class ExamsController:
     def _register_create_exam(self):
         """Реєструє маршрут для створення іспиту."""
         @self.router.post("", response_model=Exam, status_code=status.HTTP_201_CREATED, summary="Create exam")
-        async def create_exam(
+        def create_exam(
             payload: ExamCreate, 
             db: Session = Depends(get_db), 
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки вчитель може створювати іспити
             if current_user.role != 'teacher':
@@ -146,11 +138,11 @@ class ExamsController:
     def _register_link_exam_to_course(self):
         """Реєструє маршрут для зв'язування іспиту з курсом."""
         @self.router.post("/{exam_id}/courses/{course_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Link exam to course")
-        async def link_exam_to_course(
+        def link_exam_to_course(
             exam_id: UUID = Path(...),
             course_id: UUID = Path(...),
             db: Session = Depends(get_db),
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки вчитель може зв'язувати іспити з курсами
             if current_user.role != 'teacher':
@@ -165,10 +157,10 @@ class ExamsController:
     def _register_get_exam(self):
         """Реєструє маршрут для отримання іспиту за ID."""
         @self.router.get("/{exam_id}", response_model=Exam, summary="Get exam by id")
-        async def get_exam(
+        def get_exam(
             exam_id: UUID, 
             db: Session = Depends(get_db),
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: всі автентифіковані користувачі можуть переглядати іспити
             try:
@@ -190,10 +182,10 @@ class ExamsController:
     def _register_get_exam_for_edit(self):
         """Реєструє маршрут для отримання іспиту для редагування."""
         @self.router.get("/{exam_id}/edit", response_model=ExamWithQuestions, summary="Get exam with questions for editing")
-        async def get_exam_for_edit(
+        def get_exam_for_edit(
             exam_id: UUID = Path(...),
             db: Session = Depends(get_db),
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки вчитель може редагувати іспити
             if current_user.role != 'teacher':
@@ -207,11 +199,11 @@ class ExamsController:
     def _register_update_exam(self):
         """Реєструє маршрут для оновлення іспиту."""
         @self.router.patch("/{exam_id}", response_model=Exam, summary="Update exam (partial)")
-        async def update_exam(
+        def update_exam(
             patch: ExamUpdate, 
             exam_id: UUID, 
             db: Session = Depends(get_db),
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки вчитель може оновлювати іспити
             if current_user.role != 'teacher':
@@ -224,10 +216,10 @@ class ExamsController:
     def _register_publish_exam(self):
         """Реєструє маршрут для публікації іспиту."""
         @self.router.post("/{exam_id}/publish", response_model=Exam, summary="Publish exam")
-        async def publish_exam(
+        def publish_exam(
             exam_id: UUID = Path(...),
             db: Session = Depends(get_db),
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки вчитель може публікувати іспити
             if current_user.role != 'teacher':
@@ -241,10 +233,10 @@ class ExamsController:
     def _register_delete_exam(self):
         """Реєструє маршрут для видалення іспиту."""
         @self.router.delete("/{exam_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete exam")
-        async def delete_exam(
+        def delete_exam(
             exam_id: UUID, 
             db: Session = Depends(get_db),
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки вчитель може видаляти іспити
             if current_user.role != 'teacher':
@@ -258,11 +250,11 @@ class ExamsController:
     def _register_start_attempt(self):
         """Реєструє маршрут для початку спроби іспиту."""
         @self.router.post("/{exam_id}/attempts", response_model=Attempt, status_code=status.HTTP_201_CREATED, summary="Start an attempt for exam")
-        async def start_attempt(
+        def start_attempt(
             user_id: UUID = Depends(get_current_user_id), 
             exam_id: UUID = Path(...), 
             db: Session = Depends(get_db),
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки студент може починати спроби
             if current_user.role != 'student':
@@ -275,11 +267,11 @@ class ExamsController:
     def _register_create_question(self):
         """Реєструє маршрут для створення питання."""
         @self.router.post("/{exam_id}/questions", status_code=status.HTTP_201_CREATED, summary="Create question for exam")
-        async def create_question(
+        def create_question(
             exam_id: UUID, 
             payload: dict, 
             db: Session = Depends(get_db), 
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки вчитель може створювати питання
             if current_user.role != 'teacher':
@@ -292,12 +284,12 @@ class ExamsController:
     def _register_update_question(self):
         """Реєструє маршрут для оновлення питання."""
         @self.router.patch("/{exam_id}/questions/{question_id}", summary="Update question")
-        async def update_question(
+        def update_question(
             exam_id: UUID, 
             question_id: UUID, 
             patch: dict, 
             db: Session = Depends(get_db), 
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки вчитель може оновлювати питання
             if current_user.role != 'teacher':
@@ -310,11 +302,11 @@ class ExamsController:
     def _register_delete_question(self):
         """Реєструє маршрут для видалення питання."""
         @self.router.delete("/{exam_id}/questions/{question_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete question")
-        async def delete_question(
+        def delete_question(
             exam_id: UUID, 
             question_id: UUID, 
             db: Session = Depends(get_db), 
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки вчитель може видаляти питання
             if current_user.role != 'teacher':
@@ -328,12 +320,12 @@ class ExamsController:
     def _register_create_option(self):
         """Реєструє маршрут для створення опції."""
         @self.router.post("/{exam_id}/questions/{question_id}/options", status_code=status.HTTP_201_CREATED, summary="Create option for question")
-        async def create_option(
+        def create_option(
             exam_id: UUID, 
             question_id: UUID, 
             payload: dict, 
             db: Session = Depends(get_db), 
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки вчитель може створювати опції
             if current_user.role != 'teacher':
@@ -346,13 +338,13 @@ class ExamsController:
     def _register_update_option(self):
         """Реєструє маршрут для оновлення опції."""
         @self.router.patch("/{exam_id}/questions/{question_id}/options/{option_id}", summary="Update option")
-        async def update_option(
+        def update_option(
             exam_id: UUID, 
             question_id: UUID, 
             option_id: UUID, 
             patch: dict, 
             db: Session = Depends(get_db), 
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки вчитель може оновлювати опції
             if current_user.role != 'teacher':
@@ -365,12 +357,12 @@ class ExamsController:
     def _register_delete_option(self):
         """Реєструє маршрут для видалення опції."""
         @self.router.delete("/{exam_id}/questions/{question_id}/options/{option_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete option")
-        async def delete_option(
+        def delete_option(
             exam_id: UUID, 
             question_id: UUID, 
             option_id: UUID, 
             db: Session = Depends(get_db), 
-            current_user: User = Depends(get_current_user_with_role)
+            current_user: Principal = Depends(get_current_user_with_role)
         ):
             # Перевірка ролі: тільки вчитель може видаляти опції
             if current_user.role != 'teacher':
@@ -388,13 +380,13 @@ class ExamsController:
             response_model=CourseExamsPage,
             summary="Список іспитів для курсу (лише для викладача)",
         )
-        async def list_course_exams(
+        def list_course_exams(
             course_id: UUID = Query(..., description="ID курсу для фільтрації іспитів"),
             db: Session = Depends(get_db),
-            current_user: User = Depends(get_current_user_with_role),
+            current_user: Principal = Depends(get_current_user_with_role),
         ):
             self._require_teacher(current_user)
-            return await self._safe_call(self.service.get_exams_for_course, db, course_id)
+            return self._safe_call(self.service.get_exams_for_course, db, course_id)
 
     def _register_get_exam_journal(self):
         """Реєструє маршрут для отримання журналу іспиту."""
@@ -403,13 +395,13 @@ class ExamsController:
             response_model=ExamJournalResponse,
             summary="Отримати журнал іспиту для перевірки (лише для викладача)",
         )
-        async def get_exam_journal(
+        def get_exam_journal(
             exam_id: UUID,
-            db: Session = Depends(get_db),
-            current_user: User = Depends(get_current_user_with_role),
+            db: Session = Depends(get_read_db),
+            current_user: Principal = Depends(get_current_user_with_role),
         ):
             self._require_teacher(current_user)
-            return await self._safe_call(self.journal_service.get_journal_for_exam, db, exam_id)
+            return self._safe_call(self.journal_service.get_journal_for_exam, db, exam_id)
 
     def _register_analytics_routes(self):
         """Реєструє маршрути для аналітики."""
@@ -420,21 +412,21 @@ class ExamsController:
     def _register_group_analytics(self):
         """Реєструє маршрут для аналітики групи."""
         @self.router.get("/{course_id}/analytics", response_model=List[GroupAnalytics], summary="Аналітика результатів групи")
-        async def get_group_analytics(course_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+        def get_group_analytics(course_id: UUID, db: Session = Depends(get_read_db), current_user: Principal = Depends(get_current_user_with_role)):
             self._require_teacher(current_user)
-            return await self._safe_call(self.service.get_group_statistics, db, course_id)
+            return self._safe_call(self.service.get_group_statistics, db, course_id)
 
     def _register_exam_statistics(self):
         """Реєструє маршрут для статистики іспиту."""
         @self.router.get("/{course_id}/exams/{exam_id}/statistics", response_model=ExamStatistics, summary="Статистика по іспиту")
-        async def get_exam_statistics(course_id: UUID, exam_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+        def get_exam_statistics(course_id: UUID, exam_id: UUID, db: Session = Depends(get_read_db), current_user: Principal = Depends(get_current_user_with_role)):
             self._require_teacher(current_user)
-            return await self._safe_call(self.service.get_exam_statistics, db, exam_id)
+            return self._safe_call(self.service.get_exam_statistics, db, exam_id)
 
     def _register_exam_progress(self):
         """Реєструє маршрут для динаміки результатів іспиту."""
         @self.router.get("/{course_id}/exams/{exam_id}/progress", response_model=List[ExamProgress], summary="Динаміка результатів по іспиту")
-        async def get_exam_progress(course_id: UUID, exam_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_with_role)):
+        def get_exam_progress(course_id: UUID, exam_id: UUID, db: Session = Depends(get_read_db), current_user: Principal = Depends(get_current_user_with_role)):
             self._require_teacher(current_user)
-            return await self._safe_call(self.service.get_exam_progress, db, exam_id)
+            return self._safe_call(self.service.get_exam_progress, db, exam_id)
         
\ No newline at end of file
@@ -0,0 +1,44 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+
+from src.api.background.answer_buffer import answer_buffer
+from src.api.database import engine, read_engine
+from src.api.pool_metrics import pool_metrics, pool_status, read_pool_metrics
+from src.api.services.exam_content_cache import exam_content_cache
+from src.api.services.exam_start_cache import exam_start_cache
+from src.api.services.grading_service import answer_key_cache
+from src.api.services.user_cache import user_cache
+from src.core.config import INTERNAL_METRICS_TOKEN
+
+
+def _cache_stats(cache) -> dict:
+    stats = {"hits": cache.hits, "misses": cache.misses}
+    if hasattr(cache, "__len__"):
+        stats["size"] = len(cache)
+    return stats
+
+
+class MetricsController:
+    """Внутрішні метрики для моніторингу: пул з'єднань з БД і кеші в пам'яті процесу."""
+
+    def __init__(self) -> None:
+        self.router = APIRouter(prefix="/internal", tags=["Internal"], include_in_schema=False)
+
+        @self.router.get("/metrics", summary="Метрики пулу з'єднань і кешів")
+        def get_metrics(x_metrics_token: Optional[str] = Header(None)):
+            # Без налаштованого токена ендпоінт для зовнішнього світу не існує
+            if not INTERNAL_METRICS_TOKEN or not hmac.compare_digest(x_metrics_token or "", INTERNAL_METRICS_TOKEN):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+            return {
+                "db_pool": {**pool_status(engine.pool), **pool_metrics.snapshot()},
+                "db_read_pool": {**pool_status(read_engine.pool), **read_pool_metrics.snapshot()},
+                "caches": {
+                    "answer_key": _cache_stats(answer_key_cache),
+                    "exam_content": _cache_stats(exam_content_cache),
+                    "exam_start": _cache_stats(exam_start_cache),
+                    "users": _cache_stats(user_cache),
+                },
+                "answer_buffer": {"pending": len(answer_buffer)},
+            }
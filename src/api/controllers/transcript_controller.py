@@ -2,9 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from src.api.schemas.transcript import TranscriptResponse
 from src.api.services.transcript_service import TranscriptService
-from src.utils.auth import get_current_user_with_role
-from src.api.database import get_db
-from src.models.users import User
+from src.utils.auth import get_current_user_with_role, Principal
+from src.api.database import get_read_db
 from typing import Optional
 from fastapi import Query
 
@@ -14,9 +13,9 @@ class TranscriptController:
         self.router = APIRouter(prefix="/transcript", tags=["Transcript"])
 
         @self.router.get("", response_model=TranscriptResponse, summary="Отримати атестат поточного користувача")
-        async def get_transcript(
-            current_user: User = Depends(get_current_user_with_role),
-            db: Session = Depends(get_db),
+        def get_transcript(
+            current_user: Principal = Depends(get_current_user_with_role),
+            db: Session = Depends(get_read_db),
             sort_by: Optional[str] = Query(None, description="Поле для сортування (напр., 'rating')"),
             order: str = Query("asc", description="Порядок сортування ('asc' або 'desc')")   
         ):
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, status, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List
-from src.models.users import User
 from src.models.majors import Major
 from src.api.database import get_db
 from src.utils.auth import get_current_user
+from src.api.services.user_cache import CachedUser
 from src.api.services.users_service import UsersService
 from src.api.schemas.users import UserProfileResponse, NotificationSettingsSchema, AvatarUpdateResponse
 from src.api.schemas.majors import MajorResponse
@@ -19,7 +19,7 @@ class UsersController:
             response_model=UserProfileResponse, 
             summary="Отримати профіль поточного користувача"
         )
-        async def get_me(current_user: User = Depends(get_current_user)):
+        def get_me(current_user: CachedUser = Depends(get_current_user)):
             """Повертає публічну інформацію профілю для автентифікованого користувача."""
             return self.service.get_user_profile(current_user)
 
@@ -28,7 +28,7 @@ class UsersController:
             response_model=NotificationSettingsSchema, 
             summary="Отримати налаштування сповіщень"
         )
-        async def get_my_notifications(current_user: User = Depends(get_current_user)):
+        def get_my_notifications(current_user: CachedUser = Depends(get_current_user)):
             """Повертає поточні налаштування сповіщень користувача."""
             return self.service.get_notification_settings(current_user)
 
@@ -37,9 +37,9 @@ class UsersController:
             status_code=status.HTTP_204_NO_CONTENT,
             summary="Оновити налаштування сповіщень"
         )
-        async def update_my_notifications(
+        def update_my_notifications(
             settings: NotificationSettingsSchema,
-            current_user: User = Depends(get_current_user),
+            current_user: CachedUser = Depends(get_current_user),
             db: Session = Depends(get_db)
         ):
             """Приймає та зберігає нові налаштування сповіщень для користувача."""
@@ -56,8 +56,8 @@ class UsersController:
             status_code=status.HTTP_201_CREATED,
             summary="Завантажити або оновити аватар"
         )
-        async def upload_my_avatar(
-            current_user: User = Depends(get_current_user),
+        def upload_my_avatar(
+            current_user: CachedUser = Depends(get_current_user),
             db: Session = Depends(get_db),
             avatar_file: UploadFile = File(...) 
         ):
@@ -71,7 +71,7 @@ class UsersController:
             response_model=List[MajorResponse],
             summary="Отримати список усіх спеціальностей"
         )
-        async def get_majors(db: Session = Depends(get_db)):
+        def get_majors(db: Session = Depends(get_db)):
             """Повертає список усіх доступних спеціальностей."""
             majors = db.query(Major).order_by(Major.name).all()
             return [MajorResponse(id=major.id, name=major.name) for major in majors]
\ No newline at end of file
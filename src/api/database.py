@@ -1,7 +1,21 @@
-from sqlalchemy import create_engine, JSON
-from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi import Depends
+from sqlalchemy import create_engine, event, JSON
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from sqlalchemy.dialects.postgresql import JSONB
-from src.core.config import DATABASE_URL
+from src.api.pool_metrics import InstrumentedQueuePool, ReadQueuePool
+from src.core.config import (
+    ANALYTICS_STATEMENT_TIMEOUT_MS,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_STATEMENT_TIMEOUT_MS,
+    READ_DATABASE_URL,
+    READ_DB_MAX_OVERFLOW,
+    READ_DB_POOL_SIZE,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,6 +23,31 @@ logger = logging.getLogger(__name__)
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL not found. Check your .env file!")
 
+IS_POSTGRES = "postgresql" in DATABASE_URL
+
+
+def _is_in_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def _pool_options(url: str, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW,
+                  poolclass=InstrumentedQueuePool) -> dict:
+    """
+    Параметри пулу з config.py. SQLite в пам'яті живе в одному з'єднанні
+    (SingletonThreadPool), тож для нього пул не налаштовуємо.
+    """
+    if _is_in_memory_sqlite(url):
+        return {}
+    return {
+        "poolclass": poolclass,  # Вимірює очікування на з'єднання для /internal/metrics
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+    }
+
+
 # Додаємо таймаути для з'єднань з БД
 # connect_args для SQLite, pool_pre_ping для перевірки з'єднань перед використанням
 engine = create_engine(
@@ -16,13 +55,48 @@ engine = create_engine(
     pool_pre_ping=True,  # Перевіряє з'єднання перед використанням
     connect_args={
         "connect_timeout": 10,  # Таймаут підключення (секунди)
-        "options": "-c statement_timeout=30000"  # Таймаут виконання запиту (30 секунд для PostgreSQL)
-    } if "postgresql" in DATABASE_URL else {}
+        "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"  # Типовий таймаут виконання запиту
+    } if IS_POSTGRES else {},
+    **_pool_options(DATABASE_URL),
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def create_read_engine(url: str):
+    """
+    Engine лише для читання з власним пулом. PostgreSQL відкриває кожну
+    транзакцію як READ ONLY і дозволяє довші запити аналітики; SQLite-файл
+    відкривається з query_only.
+    """
+    if "postgresql" in url:
+        connect_args = {
+            "connect_timeout": 10,
+            "options": f"-c statement_timeout={ANALYTICS_STATEMENT_TIMEOUT_MS} -c default_transaction_read_only=on",
+        }
+    else:
+        connect_args = {}
+    read_engine = create_engine(
+        url,
+        pool_pre_ping=True,
+        connect_args=connect_args,
+        **_pool_options(url, READ_DB_POOL_SIZE, READ_DB_MAX_OVERFLOW, ReadQueuePool),
+    )
+    if read_engine.dialect.name == "sqlite":
+        @event.listens_for(read_engine, "connect")
+        def _query_only(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA query_only = ON")
+    return read_engine
+
+
+# SQLite в пам'яті існує лише в одному з'єднанні основного engine — читаємо з нього ж
+if READ_DATABASE_URL == DATABASE_URL and _is_in_memory_sqlite(DATABASE_URL):
+    read_engine = engine
+else:
+    read_engine = create_read_engine(READ_DATABASE_URL)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
 def get_json_type():
     """
     Повертає відповідний JSON тип залежно від бази даних.
@@ -38,3 +112,40 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Сесія read-only engine для аналітики й звітів: не займає з'єднань основного пулу."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def apply_statement_timeout(db: Session, timeout_ms: int) -> None:
+    """
+    Задає statement_timeout для всіх транзакцій сесії (SET LOCAL на початку
+    кожної). Для не-PostgreSQL баз нічого не робить.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    statement = f"SET LOCAL statement_timeout = {int(timeout_ms)}"
+
+    @event.listens_for(db, "after_begin")
+    def _set_timeout(session, transaction, connection):
+        connection.exec_driver_sql(statement)
+
+    # Транзакція могла вже початися в іншій залежності (наприклад, автентифікації)
+    if db.in_transaction():
+        db.connection().exec_driver_sql(statement)
+
+
+def statement_timeout(timeout_ms: int):
+    """
+    Залежність маршруту з власним statement_timeout: коротким для автозбережень,
+    довшим для аналітики. Діє на ту ж сесію, що й get_db у цьому запиті.
+    """
+    def dependency(db: Session = Depends(get_db)) -> None:
+        apply_statement_timeout(db, timeout_ms)
+    return dependency
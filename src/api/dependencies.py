@@ -1,18 +1,15 @@
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from uuid import UUID
-from src.models.users import User
+from sqlalchemy.orm import Session
 from src.api.database import get_db
-from src.utils.auth import get_current_user_id
+from src.api.services.user_cache import CachedUser
+from src.utils.auth import Principal, get_cached_user, get_current_principal
 
-def get_current_user(db: Session = Depends(get_db), user_id: UUID = Depends(get_current_user_id)) -> User:
+def get_current_user(db: Session = Depends(get_db), principal: Principal = Depends(get_current_principal)) -> CachedUser:
     """
-    Залежність FastAPI, яка отримує ID користувача з токена,
-    завантажує об'єкт користувача та повертає його.
+    Залежність FastAPI, яка отримує користувача з токена та повертає
+    його закешовану копію (без запиту до БД, поки запис у кеші свіжий).
     """
-    user = db.query(User).options(
-        joinedload(User.major)
-    ).filter(User.id == user_id).first()
+    user = get_cached_user(db, principal.id)
 
     if not user:
         raise HTTPException(
@@ -29,15 +29,31 @@ from src.core.cloudinary import configure_cloudinary
 from src.models import exam_participants, course_exams, course_supervisors
 from src.api.services.exam_participants_service import ExamParticipantsService
 from src.api.controllers.exam_participants_controller import ExamParticipantsController
+from src.api.controllers.metrics_controller import MetricsController
 from src.models import exam_email_notifications 
 import asyncio
+import anyio.to_thread
+from src.core.config import REQUEST_THREADPOOL_SIZE
 from src.api.background.exam_email_scheduler import run_exam_email_scheduler
+from src.api.background.plagiarism_worker import plagiarism_worker
+from src.api.background.answer_buffer import answer_buffer
+from src.models.paraphrase import warm_up_paraphrase_model
 
 
 # Глобальна змінна для scheduler
 scheduler = None
 # Глобальна змінна для асинхронної задачі email-планувальника
 email_scheduler_task = None
+# Фоновий прогрів моделі парафраз (щоб перший запит не чекав на завантаження)
+paraphrase_warmup_task = None
+
+
+async def _warm_up_paraphrase_model():
+    try:
+        seconds = await asyncio.to_thread(warm_up_paraphrase_model)
+        print(f"Paraphrase model warmed up in {seconds:.2f}s")
+    except Exception as e:
+        print(f"Paraphrase model warm-up failed: {e}")
 
 
 @asynccontextmanager
@@ -46,7 +62,10 @@ async def lifespan(_app: FastAPI):  # noqa: PYL-W0613
     Lifespan context manager для FastAPI.
     Запускає обидва планувальники при старті додатку та зупиняє їх при завершенні.
     """
-    global scheduler, email_scheduler_task
+    global scheduler, email_scheduler_task, paraphrase_warmup_task
+
+    # 0. Синхронні обробники (і get_db) виконуються в пулі потоків anyio: задаємо його розмір
+    anyio.to_thread.current_default_thread_limiter().total_tokens = REQUEST_THREADPOOL_SIZE
     
     # 1. Запуск BackgroundScheduler (для статусів іспитів)
     scheduler = BackgroundScheduler()
@@ -57,6 +76,25 @@ async def lifespan(_app: FastAPI):  # noqa: PYL-W0613
         name='Update exam statuses from published to open',
         replace_existing=True
     )
+    # Підбирає перевірки на плагіат, що лишилися в черзі (рестарт, інший інстанс)
+    scheduler.add_job(
+        plagiarism_worker.process_pending,
+        trigger=IntervalTrigger(minutes=1),
+        id='process_pending_plagiarism_checks',
+        name='Process queued plagiarism checks',
+        replace_existing=True,
+        max_instances=1,
+    )
+    # Скидає буфер автозбережень відповідей у БД пачкою
+    if answer_buffer.enabled:
+        scheduler.add_job(
+            answer_buffer.flush,
+            trigger=IntervalTrigger(seconds=answer_buffer.flush_interval),
+            id='flush_answer_buffer',
+            name='Flush buffered answer autosaves',
+            replace_existing=True,
+            max_instances=1,
+        )
     scheduler.start()
     print("BackgroundScheduler started: exam status updates will run every minute")
     update_exam_statuses()
@@ -65,6 +103,9 @@ async def lifespan(_app: FastAPI):  # noqa: PYL-W0613
     # 2. Запуск асинхронного email-планувальника (для сповіщень)
     email_scheduler_task = asyncio.create_task(run_exam_email_scheduler())
     print("Async Email Scheduler task started.")
+
+    # 3. Прогрів моделі парафраз у фоні: старт додатку не чекає на завантаження
+    paraphrase_warmup_task = asyncio.create_task(_warm_up_paraphrase_model())
     
     yield
     
@@ -72,11 +113,20 @@ async def lifespan(_app: FastAPI):  # noqa: PYL-W0613
     if scheduler:
         scheduler.shutdown()
         print("BackgroundScheduler stopped")
+
+    # Після зупинки планувальника: жодне підтверджене автозбереження не лишається в пам'яті
+    flushed = answer_buffer.shutdown()
+    print(f"Answer buffer flushed: {flushed} answers")
     
     if email_scheduler_task:
         email_scheduler_task.cancel()
         print("Async Email Scheduler task cancelled.")
 
+    if paraphrase_warmup_task and not paraphrase_warmup_task.done():
+        paraphrase_warmup_task.cancel()
+
+    plagiarism_worker.shutdown(wait=False)
+
 
 def create_app() -> FastAPI:
     # Створюємо всі таблиці з усіх моделей при старті
@@ -143,6 +193,7 @@ def create_app() -> FastAPI:
     transcript_controller = TranscriptController(transcript_service)
     users_controller = UsersController(users_service)
     exam_participants_controller = ExamParticipantsController(exam_participants_service)
+    metrics_controller = MetricsController()
 
     #Ініціалізуємо конфігурацію cloudinary
     # configure_cloudinary() # Закоментовано, якщо потрібна конфігурація з config.py
@@ -156,6 +207,7 @@ def create_app() -> FastAPI:
     app.include_router(transcript_controller.router, prefix="/api")
     app.include_router(users_controller.router, prefix="/api")
     app.include_router(exam_participants_controller.router, prefix="/api")
+    app.include_router(metrics_controller.router, prefix="/api")
     
     # ... (код для роздачі статичних файлів фронтенду залишається без змін) ...
     current_file_path = os.path.dirname(os.path.abspath(__file__))
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Скільки останніх очікувань зберігаємо для перцентилів
+RECENT_WAITS = 2048
+
+
+class PoolMetrics:
+    """
+    Лічильники очікування на з'єднання з пулу: скільки разів брали з'єднання,
+    скільки чекали (сумарно, максимум, перцентилі останніх очікувань)
+    і скільки разів очікування завершилося таймаутом.
+    """
+
+    def __init__(self, recent: int = RECENT_WAITS):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=recent)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            self._recent.append(seconds)
+
+    @staticmethod
+    def _percentile(waits: list, fraction: float) -> float:
+        if not waits:
+            return 0.0
+        return waits[min(len(waits) - 1, int(fraction * len(waits)))]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = sorted(self._recent)
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.total_wait_seconds, 6),
+                "wait_seconds_mean": round(self.total_wait_seconds / attempts, 6) if attempts else 0.0,
+                "wait_seconds_max": round(self.max_wait_seconds, 6),
+                "wait_seconds_p50": round(self._percentile(waits, 0.50), 6),
+                "wait_seconds_p95": round(self._percentile(waits, 0.95), 6),
+                "wait_seconds_p99": round(self._percentile(waits, 0.99), 6),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+
+
+pool_metrics = PoolMetrics()
+read_pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, що вимірює час очікування на вільне з'єднання."""
+
+    metrics = pool_metrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+class ReadQueuePool(InstrumentedQueuePool):
+    """Пул read-only engine: очікування рахуються окремо від основного пулу."""
+
+    metrics = read_pool_metrics
+
+
+def pool_status(pool) -> dict:
+    """Поточний стан пулу: розмір, зайняті та вільні з'єднання, переповнення."""
+    if not isinstance(pool, QueuePool):
+        return {"pool_class": type(pool).__name__}
+    return {
+        "pool_class": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "timeout_seconds": pool.timeout(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
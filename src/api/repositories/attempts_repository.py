@@ -1,22 +1,33 @@
 from sqlalchemy.orm import Session, joinedload, selectinload
-from sqlalchemy import or_
-from uuid import UUID
+from sqlalchemy import and_, func, insert, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from uuid import UUID, uuid4
 import json
 from datetime import datetime, timedelta, timezone
 from src.api.services.statistics_service import StatisticsService
 from src.utils.datetime_utils import to_utc_iso
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set, Tuple
 
-from src.models.exams import Exam, Question, Option
+from src.models.exams import Exam, ExamSnapshot, Question, Option, QuestionType
 from src.models.attempts import Attempt, AttemptStatus, Answer, AnswerOption
 from src.models.matching_options import MatchingOption
 from src.api.schemas.attempts import AnswerUpsert
+from src.api.services.exam_content_cache import ExamContent, exam_content_cache
+
+# Діалекти з нативним INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+_ON_CONFLICT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+_ANSWER_COLUMNS = ("id", "attempt_id", "question_id", "answer_text", "answer_json", "saved_at")
+# Скільки відповідей в одному багаторядковому INSERT (ліміт параметрів запиту)
+UPSERT_CHUNK_SIZE = 500
 
 class AttemptsRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def create_attempt(self, exam_id: UUID, user_id: UUID, duration_minutes: int) -> Attempt:
+    def create_attempt(
+        self, exam_id: UUID, user_id: UUID, duration_minutes: int, exam_version: Optional[int] = None
+    ) -> Attempt:
         if not isinstance(duration_minutes, int) or duration_minutes <= 0:
             raise ValueError(f"Invalid duration_minutes: {duration_minutes}")
             
@@ -28,12 +39,63 @@ class AttemptsRepository:
             status="in_progress",
             started_at=started_at,
             due_at=due_at,
+            exam_version=exam_version,
         ) 
         self.db.add(new_attempt)
         self.db.commit()
         self.db.refresh(new_attempt)
         return new_attempt
 
+    def create_attempt_within_limit(
+        self,
+        exam_id: UUID,
+        user_id: UUID,
+        duration_minutes: int,
+        max_attempts: int,
+        exam_version: Optional[int] = None,
+    ) -> Optional[Attempt]:
+        """
+        Створює спробу одним INSERT ... SELECT ... WHERE (кількість спроб) < max_attempts
+        і комітить. Повертає None, якщо ліміт спроб вичерпано.
+        На PostgreSQL паралельні старти того самого користувача в іспиті
+        серіалізуються транзакційним advisory lock, тож ліміт не перевищується
+        навіть при подвійному кліку; SQLite і так серіалізує записи.
+        """
+        if not isinstance(duration_minutes, int) or duration_minutes <= 0:
+            raise ValueError(f"Invalid duration_minutes: {duration_minutes}")
+
+        if self.db.get_bind().dialect.name == "postgresql":
+            self.db.execute(
+                select(func.pg_advisory_xact_lock(func.hashtext(literal(f"attempt-start:{exam_id}:{user_id}"))))
+            )
+
+        started_at = datetime.now(timezone.utc)
+        attempts_count = (
+            select(func.count(Attempt.id))
+            .where(Attempt.exam_id == exam_id, Attempt.user_id == user_id)
+            .scalar_subquery()
+        )
+        values = select(
+            literal(uuid4(), Attempt.id.type),
+            literal(exam_id, Attempt.exam_id.type),
+            literal(user_id, Attempt.user_id.type),
+            literal(AttemptStatus.in_progress, Attempt.status.type),
+            literal(started_at, Attempt.started_at.type),
+            literal(started_at + timedelta(minutes=duration_minutes), Attempt.due_at.type),
+            literal(exam_version, Attempt.exam_version.type),
+        ).where(attempts_count < max_attempts)
+        stmt = (
+            insert(Attempt)
+            .from_select(["id", "exam_id", "user_id", "status", "started_at", "due_at", "exam_version"], values)
+            .returning(Attempt)
+        )
+        attempt = self.db.execute(stmt).scalars().first()
+        if attempt is not None:
+            # RETURNING уже заповнив усі колонки — від'єднуємо, щоб commit не змушував перечитувати спробу
+            self.db.expunge(attempt)
+        self.db.commit()
+        return attempt
+
     def get_attempt(self, attempt_id: UUID) -> Optional[Attempt]:
         return self.db.query(Attempt).filter(Attempt.id == attempt_id).first()
 
@@ -42,87 +104,184 @@ class AttemptsRepository:
         if not question:
             raise ValueError("Question not found")
 
-        answer = self.db.query(Answer).options(
-            joinedload(Answer.selected_options)
-        ).filter(
-            Answer.attempt_id == attempt_id,
-            Answer.question_id == payload.question_id,
-        ).first()
-
-        current_time = datetime.now(timezone.utc)
-
-        if not answer:
-            answer = Answer(
-                attempt_id=attempt_id,
-                question_id=payload.question_id,
-                saved_at=current_time, 
-            )
-            self.db.add(answer)
-            self.db.flush()
-        else:
-            answer.saved_at = current_time
+        answer_ids = self.upsert_answers([{
+            "id": uuid4(),
+            "attempt_id": attempt_id,
+            "question_id": payload.question_id,
+            "saved_at": datetime.now(timezone.utc),
+            **self.answer_values(question.question_type, payload),
+        }])
+        self.db.commit()
 
-        answer.saved_at = current_time
+        return self.db.query(Answer).options(
+            joinedload(Answer.selected_options)
+        ).filter(Answer.id == answer_ids[(attempt_id, payload.question_id)]).first()
 
-        q_type = str(question.question_type.value)
+    @staticmethod
+    def answer_values(question_type: QuestionType, payload: AnswerUpsert) -> Dict[str, Any]:
+        """
+        Значення рядка відповіді для типу питання: answer_text, answer_json
+        і selected_option_ids (None — варіанти не чіпаються, список — замінюються).
+        """
+        q_type = str(question_type.value)
+        values: Dict[str, Any] = {"answer_text": None, "answer_json": None, "selected_option_ids": None}
 
         if q_type in ('single_choice', 'multi_choice'):
-            self.db.query(AnswerOption).filter(
-                AnswerOption.answer_id == answer.id
-            ).delete(synchronize_session=False)
-
-            if payload.selected_option_ids:
-                for option_id in payload.selected_option_ids:
-                    new_answer_option = AnswerOption(
-                        answer_id=answer.id,
-                        selected_option_id=option_id
-                    )
-                    self.db.add(new_answer_option)
-            
-            answer.answer_text = None
-            answer.answer_json = None
-
+            values["selected_option_ids"] = list(payload.selected_option_ids or [])
         elif q_type in ('short_answer', 'long_answer'):
-            answer.answer_text = payload.text
-            answer.answer_json = None
+            values["answer_text"] = payload.text
 
-        elif q_type == 'matching':
-            answer.answer_text = None
         try:
             if payload.text:
-                answer.answer_json = json.loads(payload.text)
-            else:
-                answer.answer_json = None
+                values["answer_json"] = json.loads(payload.text)
         except (json.JSONDecodeError, TypeError):
-            answer.answer_json = None
-
-        self.db.commit()
-        self.db.refresh(answer)
-        
-        # Перезавантажуємо answer з selected_options після commit
-        answer = self.db.query(Answer).options(
-            joinedload(Answer.selected_options)
-        ).filter(Answer.id == answer.id).first()
-        
-        return answer
+            values["answer_json"] = None
+        return values
 
-    def submit_attempt(self, attempt_id: UUID) -> Optional[Attempt]:
-        attempt = self.get_attempt(attempt_id)
-        if not attempt:
+    def get_answer_context(self, attempt_id: UUID) -> Optional[Dict[str, Any]]:
+        """
+        Усе, що потрібно для прийому автозбережень спроби: status і due_at спроби,
+        типи питань (question_id -> QuestionType) і варіанти питань з вибором
+        (question_id -> множина option_id) тієї версії знімка, з якою розпочато
+        спробу (з exam_content_cache), та id вже збережених відповідей
+        (question_id -> answer_id). Повертає None, якщо спроби немає.
+        """
+        header = (
+            self.db.query(Attempt.status, Attempt.due_at, Attempt.exam_id, Attempt.exam_version)
+            .filter(Attempt.id == attempt_id)
+            .first()
+        )
+        if header is None:
             return None
+        status, due_at, exam_id, version = header
+
+        question_types: Dict[UUID, QuestionType] = {}
+        option_ids: Dict[UUID, Set[UUID]] = {}
+        for question in self.get_exam_content(exam_id, version).questions:
+            question_id = UUID(question["id"])
+            question_types[question_id] = QuestionType(question["question_type"])
+            option_ids[question_id] = {UUID(option["id"]) for option in question.get("options", [])}
+
+        answer_ids = dict(
+            self.db.query(Answer.question_id, Answer.id).filter(Answer.attempt_id == attempt_id).all()
+        )
+        return {
+            "status": status,
+            "due_at": due_at,
+            "question_types": question_types,
+            "option_ids": option_ids,
+            "answer_ids": answer_ids,
+        }
+
+    def get_in_progress_attempt_ids(self, attempt_ids: List[UUID]) -> Set[UUID]:
+        """Які з переданих спроб ще in_progress (один запит)."""
+        if not attempt_ids:
+            return set()
+        return {
+            attempt_id
+            for (attempt_id,) in self.db.query(Attempt.id).filter(
+                Attempt.id.in_(attempt_ids),
+                Attempt.status == AttemptStatus.in_progress,
+            ).all()
+        }
+
+    def upsert_answers(self, rows: List[Dict[str, Any]]) -> Dict[Tuple[UUID, UUID], UUID]:
+        """
+        Пакетний upsert відповідей (можливо, різних спроб) без коміту.
+        Кожен рядок: id (для нової відповіді), attempt_id, question_id, saved_at
+        та значення з answer_values; для повторів пари (attempt_id, question_id)
+        перемагає останній рядок. На PostgreSQL і SQLite відповіді пишуться одним
+        INSERT ... ON CONFLICT DO UPDATE RETURNING на частину з UPSERT_CHUNK_SIZE рядків
+        (id наявної відповіді зберігається), інакше — SELECT + INSERT + UPDATE.
+        Обрані варіанти замінюються одним DELETE та одним INSERT.
+        Повертає мапу (attempt_id, question_id) -> id відповіді в БД.
+        """
+        latest: Dict[Tuple[UUID, UUID], Dict[str, Any]] = {}
+        for row in rows:
+            latest[(row["attempt_id"], row["question_id"])] = row
+        if not latest:
+            return {}
+
+        rows = list(latest.values())
+        if self.db.get_bind().dialect.name in _ON_CONFLICT_INSERTS:
+            answer_ids = self._upsert_answers_on_conflict(rows)
+        else:
+            answer_ids = self._upsert_answers_select_first(rows)
+
+        options = {
+            answer_ids[key]: row["selected_option_ids"]
+            for key, row in latest.items()
+            if row["selected_option_ids"] is not None
+        }
+        if options:
+            self.db.query(AnswerOption).filter(
+                AnswerOption.answer_id.in_(list(options))
+            ).delete(synchronize_session=False)
+            option_rows = [
+                {"answer_id": answer_id, "selected_option_id": option_id}
+                for answer_id, option_ids in options.items()
+                for option_id in dict.fromkeys(option_ids)
+            ]
+            if option_rows:
+                self.db.execute(insert(AnswerOption), option_rows)
+        return answer_ids
+
+    def _upsert_answers_on_conflict(self, rows: List[Dict[str, Any]]) -> Dict[Tuple[UUID, UUID], UUID]:
+        dialect_insert = _ON_CONFLICT_INSERTS[self.db.get_bind().dialect.name]
+        answer_ids: Dict[Tuple[UUID, UUID], UUID] = {}
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            stmt = dialect_insert(Answer).values([
+                {column: row[column] for column in _ANSWER_COLUMNS}
+                for row in rows[start:start + UPSERT_CHUNK_SIZE]
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Answer.attempt_id, Answer.question_id],
+                set_={
+                    "saved_at": stmt.excluded.saved_at,
+                    "answer_text": stmt.excluded.answer_text,
+                    "answer_json": stmt.excluded.answer_json,
+                },
+            ).returning(Answer.id, Answer.attempt_id, Answer.question_id)
+            for answer_id, attempt_id, question_id in self.db.execute(stmt):
+                answer_ids[(attempt_id, question_id)] = answer_id
+        return answer_ids
+
+    def _upsert_answers_select_first(self, rows: List[Dict[str, Any]]) -> Dict[Tuple[UUID, UUID], UUID]:
+        """Запасний варіант для БД без ON CONFLICT: не захищений від гонок так, як нативний upsert."""
+        existing = {
+            (attempt_id, question_id): answer_id
+            for answer_id, attempt_id, question_id in self.db.query(
+                Answer.id, Answer.attempt_id, Answer.question_id
+            ).filter(
+                Answer.attempt_id.in_({row["attempt_id"] for row in rows}),
+                Answer.question_id.in_({row["question_id"] for row in rows}),
+            ).all()
+        }
+
+        inserts: List[Dict[str, Any]] = []
+        updates: List[Dict[str, Any]] = []
+        answer_ids: Dict[Tuple[UUID, UUID], UUID] = {}
+        for row in rows:
+            key = (row["attempt_id"], row["question_id"])
+            if key in existing:
+                answer_ids[key] = existing[key]
+                updates.append({
+                    "id": existing[key],
+                    "saved_at": row["saved_at"],
+                    "answer_text": row["answer_text"],
+                    "answer_json": row["answer_json"],
+                })
+            else:
+                answer_ids[key] = row["id"]
+                inserts.append({column: row[column] for column in _ANSWER_COLUMNS})
+
+        if inserts:
+            # render_nulls: рядки з None не розбиваються на окремі INSERT за набором ключів
+            self.db.execute(insert(Answer).execution_options(render_nulls=True), inserts)
+        if updates:
+            self.db.execute(update(Answer), updates)
+        return answer_ids
 
-        current_time = datetime.now(timezone.utc)
-        attempt.submitted_at = current_time
-        attempt.status = AttemptStatus.submitted
-    
-        if attempt.started_at:
-            time_difference = current_time - attempt.started_at
-            attempt.time_spent_seconds = int(time_difference.total_seconds())
-            
-        self.db.commit()
-        self.db.refresh(attempt)
-        return attempt
-    
     def extend_attempt_time(self, attempt_id: UUID, extra_minutes: int) -> Optional[Attempt]:
         """
         Подовжує дедлайн (due_at) для спроби іспиту на вказану кількість хвилин.
@@ -195,22 +354,37 @@ class AttemptsRepository:
             q_out['matching_data'] = match_by_q.get(q.id, {'prompts': [], 'matches': []})
         return q_out
 
-    def get_attempt_with_details(self, attempt_id: UUID) -> Optional[Dict[str, Any]]:
-        """Збирає та форматує всю інформацію для сторінки складання іспиту.
-
-        Цей метод агрегує дані про спробу, іспит, відсортовані питання,
-        варіанти відповідей, дані для питань на відповідність та збережені
-        відповіді користувача в один зручний для фронтенду об'єкт.
+    def get_exam_content(self, exam_id: UUID, version: Optional[int] = None) -> ExamContent:
         """
-        attempt = self.get_attempt(attempt_id)
-        if not attempt or not attempt.exam:
-            return None
-        exam = attempt.exam
+        Відформатовані питання іспиту (з варіантами та парами для matching).
+        Однакові для всіх спроб, тому беруться з exam_content_cache; при промаху
+        версія знімка читається одним рядком exam_snapshots, а живі питання
+        (version=None або знімка немає) збираються трьома запитами.
+        """
+        content = exam_content_cache.get(exam_id, version)
+        if content is not None:
+            return content
+
+        snapshot = None
+        if version is not None:
+            snapshot = (
+                self.db.query(ExamSnapshot.content)
+                .filter(ExamSnapshot.exam_id == exam_id, ExamSnapshot.version == version)
+                .scalar()
+            )
+        if snapshot is not None:
+            content = ExamContent(exam_id, snapshot["questions"], version)
+        else:
+            content = ExamContent(exam_id, self.build_exam_questions(exam_id), version)
+        exam_content_cache.put(content)
+        return content
 
+    def build_exam_questions(self, exam_id: UUID) -> List[Dict[str, Any]]:
+        """Питання іспиту для сторінки складання з поточних (живих) рядків, трьома запитами."""
         # 1. Завантажуємо питання, впорядковані за позицією
         questions: List[Question] = (
             self.db.query(Question)
-            .filter(Question.exam_id == exam.id)
+            .filter(Question.exam_id == exam_id)
             .order_by(Question.position)
             .all()
         )
@@ -221,10 +395,15 @@ class AttemptsRepository:
         match_by_q = self._load_matching_by_question(question_ids)
 
         # 3. Формуємо фінальний список питань для фронтенду
-        questions_out = [self._format_question(q, opts_by_q, match_by_q) for q in questions]
+        return [self._format_question(q, opts_by_q, match_by_q) for q in questions]
 
-        # 4. Збираємо все в один об'єкт-результат
-        result: Dict[str, Any] = {
+    def _get_attempt_header(self, attempt_id: UUID) -> Optional[Tuple[Dict[str, Any], UUID, Optional[int]]]:
+        """Поля конкретної спроби для сторінки складання іспиту (один запит разом з іспитом)."""
+        attempt = self.db.query(Attempt).options(joinedload(Attempt.exam)).filter(Attempt.id == attempt_id).first()
+        if not attempt or not attempt.exam:
+            return None
+        exam = attempt.exam
+        header: Dict[str, Any] = {
             'attempt_id': str(attempt.id),
             'exam_id': str(exam.id),
             'exam_title': exam.title,
@@ -232,9 +411,34 @@ class AttemptsRepository:
             'status': str(attempt.status.value) if hasattr(attempt.status, 'value') else str(attempt.status),
             'started_at': to_utc_iso(attempt.started_at),
             'due_at': to_utc_iso(attempt.due_at),
-            'questions': questions_out,
         }
-        return result
+        return header, exam.id, attempt.exam_version
+
+    def get_attempt_with_details(self, attempt_id: UUID) -> Optional[Dict[str, Any]]:
+        """Збирає та форматує всю інформацію для сторінки складання іспиту.
+
+        Поля спроби читаються одним запитом, а питання з варіантами
+        відповідей і даними для matching — з кешу вмісту іспиту (тієї версії
+        знімка, з якою розпочато спробу).
+        """
+        loaded = self._get_attempt_header(attempt_id)
+        if loaded is None:
+            return None
+        header, exam_id, version = loaded
+        return {**header, 'questions': self.get_exam_content(exam_id, version).questions}
+
+    def get_attempt_with_details_json(self, attempt_id: UUID) -> Optional[bytes]:
+        """
+        Те саме, що get_attempt_with_details, але одразу як JSON (bytes):
+        серіалізуються лише поля спроби, а вже серіалізовані питання з кешу
+        вставляються як є.
+        """
+        loaded = self._get_attempt_header(attempt_id)
+        if loaded is None:
+            return None
+        header, exam_id, version = loaded
+        header_json = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return header_json[:-1] + b',"questions":' + self.get_exam_content(exam_id, version).questions_json + b'}'
 
     # Note: previous implementation was refactored above; duplicate removed.
 
@@ -364,3 +568,81 @@ class AttemptsRepository:
                 Attempt.status == AttemptStatus.submitted
             )
         ).all()
+
+    # ---------- Масове оцінювання при закритті іспиту ----------
+
+    def list_ungraded_attempts_for_exam(
+        self, exam_id: UUID, due_before: Optional[datetime] = None
+    ) -> List[Tuple[UUID, AttemptStatus, datetime, datetime, Optional[int]]]:
+        """
+        Спроби іспиту, які ще треба оцінити: незавершені (in_progress) та здані,
+        але без підсумкової оцінки. Вже оцінені (в т.ч. вручну) не чіпаємо.
+        Якщо задано due_before, незавершені спроби з пізнішим due_at (подовжений
+        час) не повертаються — їх здасть наступний запуск після дедлайну.
+        Повертає кортежі (id, status, started_at, due_at, exam_version) без завантаження ORM-об'єктів.
+        """
+        in_progress = Attempt.status == AttemptStatus.in_progress
+        if due_before is not None:
+            in_progress = and_(in_progress, or_(Attempt.due_at.is_(None), Attempt.due_at <= due_before))
+        return [
+            tuple(row)
+            for row in self.db.query(
+                Attempt.id, Attempt.status, Attempt.started_at, Attempt.due_at, Attempt.exam_version
+            )
+            .filter(
+                Attempt.exam_id == exam_id,
+                or_(
+                    in_progress,
+                    and_(Attempt.status != AttemptStatus.in_progress, Attempt.earned_points.is_(None)),
+                ),
+            )
+            .order_by(Attempt.id)
+            .all()
+        ]
+
+    def get_answer_rows(self, attempt_ids: List[UUID]) -> List[Tuple[UUID, UUID, UUID, Optional[str], Any]]:
+        """Відповіді спроб одним запитом: (answer_id, attempt_id, question_id, answer_text, answer_json)."""
+        if not attempt_ids:
+            return []
+        return [
+            tuple(row)
+            for row in self.db.query(
+                Answer.id, Answer.attempt_id, Answer.question_id, Answer.answer_text, Answer.answer_json
+            ).filter(Answer.attempt_id.in_(attempt_ids)).all()
+        ]
+
+    def get_selected_option_ids(self, attempt_ids: List[UUID]) -> Dict[UUID, Set[UUID]]:
+        """Мапа answer_id -> множина обраних варіантів для всіх відповідей спроб (один запит)."""
+        selected: Dict[UUID, Set[UUID]] = {}
+        if not attempt_ids:
+            return selected
+        rows = (
+            self.db.query(AnswerOption.answer_id, AnswerOption.selected_option_id)
+            .join(Answer, Answer.id == AnswerOption.answer_id)
+            .filter(Answer.attempt_id.in_(attempt_ids))
+            .all()
+        )
+        for answer_id, option_id in rows:
+            selected.setdefault(answer_id, set()).add(option_id)
+        return selected
+
+    def bulk_update_attempt_results(self, results: List[Dict[str, Any]]) -> None:
+        """
+        Записує результати оцінювання багатьох спроб одним executemany
+        (UPDATE ... WHERE id = :id). Кожен словник має містити ключ "id".
+        Умова та сама, що в list_ungraded_attempts_for_exam: спробу, яку тим
+        часом здав студент чи оцінив викладач, не перезаписуємо.
+        Коміт робить викликач.
+        """
+        if results:
+            self.db.execute(
+                update(Attempt).where(
+                    or_(
+                        Attempt.status == AttemptStatus.in_progress,
+                        Attempt.earned_points.is_(None),
+                    )
+                ),
+                results,
+                # Масове оцінювання не завантажує ORM-об'єкти спроб, синхронізувати сесію нема чого
+                execution_options={"synchronize_session": None},
+            )
@@ -4,6 +4,7 @@ from sqlalchemy import func, or_, literal, case
 from uuid import UUID
 from fastapi import Query
 from src.api.repositories.exams_repository import ExamsRepository
+from src.api.services import exam_invalidation
 from src.api.schemas.exams import Exam
 from src.models.courses import Course, CourseEnrollment
 from src.models.course_exams import CourseExam
@@ -338,6 +339,7 @@ class CoursesRepository:
         if entity:
             self.db.delete(entity)
             self.db.commit()
+            exam_invalidation.course_exams_changed.send(course_id)
 
     def enroll(self, user_id, course_id: UUID) -> None:
         exists = (
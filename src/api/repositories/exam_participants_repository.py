@@ -9,6 +9,7 @@ from sqlalchemy import and_
 from src.models.exam_participants import ExamParticipant, AttendanceStatusEnum
 from src.models.attempts import Attempt, AttemptStatus
 from src.models.courses import CourseEnrollment
+from src.api.services.exam_start_cache import exam_start_cache
 
 class ExamParticipantsRepository:
     def __init__(self, db: Session):
@@ -38,6 +39,7 @@ class ExamParticipantsRepository:
             ep = ExamParticipant(exam_id=exam_id, user_id=user_id)
             self.db.add(ep)
         self.db.commit()
+        exam_start_cache.invalidate_participant(exam_id, user_id)
         self.db.refresh(ep)
         return ep
 
@@ -48,6 +50,7 @@ class ExamParticipantsRepository:
         ep.is_active = False
         ep.removed_at = datetime.now(timezone.utc)
         self.db.commit()
+        exam_start_cache.invalidate_participant(exam_id, user_id)
         return True
 
     # Відвідуваність
@@ -57,6 +60,7 @@ class ExamParticipantsRepository:
             return None
         ep.attendance_status = status
         self.db.commit()
+        exam_start_cache.invalidate_participant(exam_id, user_id)
         self.db.refresh(ep)
         return ep
 
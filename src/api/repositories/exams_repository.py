@@ -1,10 +1,11 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case
 from uuid import UUID
-from typing import List, Tuple, Optional
+from typing import Any, Dict, Iterable, List, Tuple, Optional
 import logging
 from src.api.services.statistics_service import StatisticsService
-from src.models.exams import Exam, ExamStatusEnum
+from src.api.services import exam_invalidation
+from src.models.exams import Exam, ExamSnapshot, ExamStatusEnum
 from src.models.exams import Question, Option
 from src.models.attempts import Attempt, AttemptStatus
 from src.models.courses import Course, CourseEnrollment
@@ -135,6 +136,7 @@ class ExamsRepository:
             self._add_matching_options(q.id, matching_data)
 
         self.db.commit()
+        self._invalidate_exam_caches(exam_id)
         self.db.refresh(q)
         return q
 
@@ -196,20 +198,26 @@ class ExamsRepository:
             setattr(q, k, v)
         self.db.commit()
         self.db.refresh(q)
+        # Тип, бали чи правильність питання могли змінитися — ключ відповідей і вміст іспиту застаріли
+        self._invalidate_exam_caches(q.exam_id)
         return q
 
     def delete_question(self, question_id: UUID) -> bool:
         q = self.db.query(Question).filter(Question.id == question_id).first()
         if not q:
             return False
+        exam_id = q.exam_id
         self.db.delete(q)
         self.db.commit()
+        self._invalidate_exam_caches(exam_id)
+        self._drop_plagiarism_indexes(question_ids=[question_id])
         return True
 
     def create_option(self, question_id: UUID, payload) -> Option:
         o = Option(question_id=question_id, text=payload.get('text'), is_correct=payload.get('is_correct', False))
         self.db.add(o)
         self.db.commit()
+        self._invalidate_caches_for_question(question_id)
         self.db.refresh(o)
         return o
 
@@ -221,16 +229,73 @@ class ExamsRepository:
             setattr(o, k, v)
         self.db.commit()
         self.db.refresh(o)
+        self._invalidate_caches_for_question(o.question_id)
         return o
 
     def delete_option(self, option_id: UUID) -> bool:
         o = self.db.query(Option).filter(Option.id == option_id).first()
         if not o:
             return False
+        question_id = o.question_id
         self.db.delete(o)
         self.db.commit()
+        self._invalidate_caches_for_question(question_id)
         return True
 
+    def get_status(self, exam_id: UUID) -> Optional[ExamStatusEnum]:
+        return self.db.query(Exam.status).filter(Exam.id == exam_id).scalar()
+
+    def get_exam_id_for_question(self, question_id: UUID) -> Optional[UUID]:
+        return self.db.query(Question.exam_id).filter(Question.id == question_id).scalar()
+
+    def get_exam_id_for_option(self, option_id: UUID) -> Optional[UUID]:
+        return (
+            self.db.query(Question.exam_id)
+            .join(Option, Option.question_id == Question.id)
+            .filter(Option.id == option_id)
+            .scalar()
+        )
+
+    # --- Знімки опублікованого іспиту ---
+    def get_latest_snapshot_version(self, exam_id: UUID) -> Optional[int]:
+        return self.db.query(func.max(ExamSnapshot.version)).filter(ExamSnapshot.exam_id == exam_id).scalar()
+
+    def get_snapshot_content(self, exam_id: UUID, version: int) -> Optional[Dict[str, Any]]:
+        return (
+            self.db.query(ExamSnapshot.content)
+            .filter(ExamSnapshot.exam_id == exam_id, ExamSnapshot.version == version)
+            .scalar()
+        )
+
+    def add_snapshot(self, exam_id: UUID, version: int, content: Dict[str, Any]) -> ExamSnapshot:
+        """Додає знімок і комітить; IntegrityError — таку версію вже створив інший запит."""
+        snapshot = ExamSnapshot(exam_id=exam_id, version=version, content=content)
+        self.db.add(snapshot)
+        self.db.commit()
+        # Нові спроби мають закріплюватися за новою версією
+        exam_invalidation.exam_snapshot_added.send(exam_id)
+        return snapshot
+
+    def _invalidate_caches_for_question(self, question_id: UUID) -> None:
+        """Скидає кеші іспиту, до якого належить питання."""
+        self._invalidate_exam_caches(self.get_exam_id_for_question(question_id))
+
+    @staticmethod
+    def _invalidate_exam_caches(exam_id: Optional[UUID]) -> None:
+        """Скидає скомпільований ключ відповідей, кешований вміст і параметри старту іспиту."""
+        exam_invalidation.exam_content_changed.send(exam_id)
+
+    @staticmethod
+    def _drop_plagiarism_indexes(question_ids: Iterable[UUID] = (), course_ids: Iterable[UUID] = ()) -> None:
+        """
+        Прибирає з пам'яті TF-IDF індекси видалених питань і LSH-індекси курсів,
+        що містили сигнатури видаленого іспиту (перевірка курсу завантажить їх з БД заново).
+        """
+        for question_id in question_ids:
+            exam_invalidation.question_deleted.send(question_id)
+        for course_id in course_ids:
+            exam_invalidation.course_exams_changed.send(course_id)
+
     # ВИПРАВЛЕНО: Замінено 'Exam | None' на 'Optional[Exam]'
     def update(self, exam_id: UUID, patch: ExamUpdate) -> Optional[Exam]:
         if not exam_id:
@@ -253,6 +318,7 @@ class ExamsRepository:
                     setattr(exam, key, value)
             
         self.db.commit()
+        exam_invalidation.exam_settings_changed.send(exam_id)
         self.db.refresh(exam)
         return exam
     
@@ -263,6 +329,7 @@ class ExamsRepository:
             return None
         exam.status = ExamStatusEnum.published
         self.db.commit()
+        exam_invalidation.exam_settings_changed.send(exam_id)
         self.db.refresh(exam)
         return exam
 
@@ -270,6 +337,8 @@ class ExamsRepository:
         exam = self.get(exam_id)
         if not exam:
             return False
+        question_ids = [row[0] for row in self.db.query(Question.id).filter(Question.exam_id == exam_id).all()]
+        course_ids = [row[0] for row in self.db.query(CourseExam.course_id).filter(CourseExam.exam_id == exam_id).all()]
         
         # Видаляємо в правильному порядку, щоб уникнути проблем з foreign key:
         # 1. Спочатку видаляємо plagiarism_checks (вони посилаються на attempts)
@@ -290,6 +359,8 @@ class ExamsRepository:
         # Видаляємо exam
         self.db.delete(exam)
         self.db.commit()
+        self._invalidate_exam_caches(exam_id)
+        self._drop_plagiarism_indexes(question_ids, course_ids)
         return True
 
     def get_by_course(self, course_id: UUID) -> List[Exam]:
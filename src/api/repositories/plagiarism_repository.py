@@ -1,9 +1,29 @@
-from typing import Optional, List, Dict, Any
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Iterable, Tuple
 from uuid import UUID
 
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.orm import Session
 
-from src.models.attempts import PlagiarismCheck, PlagiarismStatus
+from src.models.attempts import (
+    Attempt,
+    AttemptStatus,
+    Answer,
+    PlagiarismCheck,
+    PlagiarismCheckState,
+    PlagiarismSignature,
+    PlagiarismStatus,
+)
+from src.models.course_exams import CourseExam
+from src.models.exams import Question, QuestionType
+
+# Роздільник між long_answer відповідями в "тексті роботи"
+ATTEMPT_TEXT_SEPARATOR = "\n\n"
+
+# Маркер спроби, текст якої не дає жодного шингла: без нього така спроба
+# вважалася б непідписаною і перечитувалася б при кожній синхронізації індексу
+EMPTY_SIGNATURE = b""
 
 
 class PlagiarismRepository:
@@ -24,13 +44,17 @@ class PlagiarismRepository:
         max_similarity: float,
         status: PlagiarismStatus,
         details: Optional[Dict[str, Any]] = None,
+        state: PlagiarismCheckState = PlagiarismCheckState.done,
     ) -> PlagiarismCheck:
+        finished_at = datetime.now(timezone.utc)
         existing = self.get_by_attempt_id(db, attempt_id)
         if existing:
             existing.uniqueness_percent = uniqueness_percent
             existing.max_similarity = max_similarity
             existing.status = status
             existing.details = details
+            existing.state = state
+            existing.finished_at = finished_at
             return existing
 
         check = PlagiarismCheck(
@@ -39,10 +63,110 @@ class PlagiarismRepository:
             max_similarity=max_similarity,
             status=status,
             details=details,
+            state=state,
+            finished_at=finished_at,
         )
         db.add(check)
         return check
 
+    def mark_pending(self, db: Session, attempt_id: UUID) -> PlagiarismCheck:
+        """
+        Ставить перевірку спроби в чергу: створює/скидає запис зі станом pending.
+        Коміт робить викликач (разом з рештою транзакції submit).
+        """
+        check = self.get_by_attempt_id(db, attempt_id)
+        if check is None:
+            check = PlagiarismCheck(attempt_id=attempt_id)
+            db.add(check)
+        self._reset_to_pending(check)
+        return check
+
+    @staticmethod
+    def _reset_to_pending(check: PlagiarismCheck) -> None:
+        check.state = PlagiarismCheckState.pending
+        check.uniqueness_percent = None
+        check.max_similarity = None
+        check.status = None
+        check.details = None
+        check.started_at = None
+        check.finished_at = None
+
+    def mark_pending_many(self, db: Session, attempt_ids: List[UUID]) -> List[UUID]:
+        """
+        Ставить у чергу перевірки спроб, автоматично зданих масовим оцінюванням.
+        Додаються лише відсутні записи: перевірку, яку вже поставив submit
+        (або яку вже виконано), не скидаємо. Викликається після UPDATE спроб,
+        тож конкурентний submit на той момент уже закомічений разом зі своєю перевіркою.
+        Повертає attempt_id нових записів; коміт робить викликач.
+        """
+        if not attempt_ids:
+            return []
+        existing = {
+            attempt_id
+            for (attempt_id,) in db.query(PlagiarismCheck.attempt_id)
+            .filter(PlagiarismCheck.attempt_id.in_(attempt_ids))
+            .all()
+        }
+        created = [attempt_id for attempt_id in dict.fromkeys(attempt_ids) if attempt_id not in existing]
+        for attempt_id in created:
+            check = PlagiarismCheck(attempt_id=attempt_id)
+            self._reset_to_pending(check)
+            db.add(check)
+        return created
+
+    @staticmethod
+    def claim_pending(db: Session, attempt_id: UUID) -> bool:
+        """
+        Атомарно переводить перевірку з pending у running.
+        Повертає False, якщо її вже забрав інший воркер (або вона не в черзі).
+        """
+        claimed = (
+            db.query(PlagiarismCheck)
+            .filter(
+                PlagiarismCheck.attempt_id == attempt_id,
+                PlagiarismCheck.state == PlagiarismCheckState.pending,
+            )
+            .update(
+                {
+                    PlagiarismCheck.state: PlagiarismCheckState.running,
+                    PlagiarismCheck.started_at: datetime.now(timezone.utc),
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return claimed == 1
+
+    @staticmethod
+    def list_pending_attempt_ids(db: Session, *, limit: int) -> List[UUID]:
+        rows = (
+            db.query(PlagiarismCheck.attempt_id)
+            .filter(PlagiarismCheck.state == PlagiarismCheckState.pending)
+            .order_by(PlagiarismCheck.created_at)
+            .limit(limit)
+            .all()
+        )
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def requeue_stale_running(db: Session, *, started_before: datetime) -> int:
+        """
+        Повертає в чергу перевірки, що "зависли" у running (напр. процес впав посеред обробки).
+        """
+        count = (
+            db.query(PlagiarismCheck)
+            .filter(
+                PlagiarismCheck.state == PlagiarismCheckState.running,
+                PlagiarismCheck.started_at < started_before,
+            )
+            .update(
+                {PlagiarismCheck.state: PlagiarismCheckState.pending, PlagiarismCheck.started_at: None},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return count
+
     @staticmethod
     def list_by_exam_with_filter(
         db: Session,
@@ -61,3 +185,206 @@ class PlagiarismRepository:
         if max_uniqueness is not None:
             q = q.filter(PlagiarismCheck.uniqueness_percent <= max_uniqueness)
         return q.all()
+
+
+    @staticmethod
+    def get_long_answer_texts(
+        db: Session,
+        *,
+        exam_id: Optional[UUID] = None,
+        attempt_ids: Optional[Iterable[UUID]] = None,
+        submitted_only: bool = False,
+    ) -> Dict[UUID, str]:
+        """
+        Одним запитом повертає мапу attempt_id -> "текст роботи":
+        усі непорожні long_answer відповіді спроби, об'єднані в порядку позиції питань.
+        На PostgreSQL конкатенація виконується в БД через string_agg.
+        """
+        if attempt_ids is not None:
+            attempt_ids = list(attempt_ids)
+            if not attempt_ids:
+                return {}
+
+        filters = [
+            Question.question_type == QuestionType.long_answer,
+            Answer.answer_text.isnot(None),
+            Answer.answer_text != "",
+        ]
+        if attempt_ids is not None:
+            filters.append(Answer.attempt_id.in_(attempt_ids))
+
+        needs_attempt_join = exam_id is not None or submitted_only
+        if exam_id is not None:
+            filters.append(Attempt.exam_id == exam_id)
+        if submitted_only:
+            filters.append(Attempt.status != AttemptStatus.in_progress)
+
+        if db.get_bind().dialect.name == "postgresql":
+            q = db.query(
+                Answer.attempt_id,
+                func.string_agg(
+                    Answer.answer_text,
+                    aggregate_order_by(literal(ATTEMPT_TEXT_SEPARATOR), Question.position, Question.id),
+                ),
+            ).join(Question, Question.id == Answer.question_id)
+            if needs_attempt_join:
+                q = q.join(Attempt, Attempt.id == Answer.attempt_id)
+            rows = q.filter(*filters).group_by(Answer.attempt_id).all()
+            return {attempt_id: text for attempt_id, text in rows}
+
+        q = db.query(Answer.attempt_id, Answer.answer_text).join(
+            Question, Question.id == Answer.question_id
+        )
+        if needs_attempt_join:
+            q = q.join(Attempt, Attempt.id == Answer.attempt_id)
+        rows = q.filter(*filters).order_by(Answer.attempt_id, Question.position, Question.id).all()
+
+        parts: Dict[UUID, List[str]] = {}
+        for attempt_id, text in rows:
+            parts.setdefault(attempt_id, []).append(text)
+        return {attempt_id: ATTEMPT_TEXT_SEPARATOR.join(texts) for attempt_id, texts in parts.items()}
+
+    @staticmethod
+    def get_long_answers(
+        db: Session,
+        *,
+        exam_id: Optional[UUID] = None,
+        attempt_ids: Optional[Iterable[UUID]] = None,
+    ) -> Dict[UUID, Dict[UUID, str]]:
+        """
+        Одним запитом повертає мапу attempt_id -> {question_id: текст відповіді}
+        для непорожніх long_answer відповідей, питання — в порядку позиції.
+        """
+        if attempt_ids is not None:
+            attempt_ids = list(attempt_ids)
+            if not attempt_ids:
+                return {}
+
+        q = db.query(Answer.attempt_id, Answer.question_id, Answer.answer_text).join(
+            Question, Question.id == Answer.question_id
+        ).filter(
+            Question.question_type == QuestionType.long_answer,
+            Answer.answer_text.isnot(None),
+            Answer.answer_text != "",
+        )
+        if attempt_ids is not None:
+            q = q.filter(Answer.attempt_id.in_(attempt_ids))
+        if exam_id is not None:
+            q = q.join(Attempt, Attempt.id == Answer.attempt_id).filter(Attempt.exam_id == exam_id)
+
+        answers: Dict[UUID, Dict[UUID, str]] = {}
+        for attempt_id, question_id, text in q.order_by(Question.position, Question.id).all():
+            answers.setdefault(attempt_id, {})[question_id] = text
+        return answers
+
+    @staticmethod
+    def list_submitted_long_answers(
+        db: Session,
+        exam_id: UUID,
+        *,
+        question_ids: Iterable[UUID],
+        submitted_after: Optional[datetime] = None,
+    ) -> List[Tuple[UUID, UUID, str, Optional[datetime]]]:
+        """
+        Непорожні long_answer відповіді зданих спроб іспиту на вказані питання
+        як (attempt_id, question_id, текст, submitted_at), у порядку здачі.
+        `submitted_after` обмежує вибірку спробами, зданими після мітки попередньої синхронізації.
+        """
+        question_ids = list(question_ids)
+        if not question_ids:
+            return []
+        query = (
+            db.query(Answer.attempt_id, Answer.question_id, Answer.answer_text, Attempt.submitted_at)
+            .join(Attempt, Attempt.id == Answer.attempt_id)
+            .filter(
+                Attempt.exam_id == exam_id,
+                Attempt.status != AttemptStatus.in_progress,
+                Answer.question_id.in_(question_ids),
+                Answer.answer_text.isnot(None),
+                Answer.answer_text != "",
+            )
+        )
+        if submitted_after is not None:
+            # submitted_at зберігається без часового поясу (UTC)
+            if submitted_after.tzinfo is not None:
+                submitted_after = submitted_after.astimezone(timezone.utc).replace(tzinfo=None)
+            query = query.filter(Attempt.submitted_at > submitted_after)
+        rows = query.order_by(Attempt.submitted_at, Attempt.id).all()
+        return [(attempt_id, question_id, text, submitted_at) for attempt_id, question_id, text, submitted_at in rows]
+
+    # ---------- MinHash-сигнатури для пошуку між іспитами ----------
+
+    @staticmethod
+    def get_course_ids_for_exam(db: Session, exam_id: UUID) -> List[UUID]:
+        rows = db.query(CourseExam.course_id).filter(CourseExam.exam_id == exam_id).all()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def upsert_signature(
+        db: Session, *, attempt_id: UUID, exam_id: UUID, num_perm: int, signature: bytes
+    ) -> PlagiarismSignature:
+        existing = db.get(PlagiarismSignature, attempt_id)
+        if existing:
+            existing.exam_id = exam_id
+            existing.num_perm = num_perm
+            existing.signature = signature
+            # Оновлена сигнатура має потрапити в інкрементальну синхронізацію індексів інших процесів
+            existing.created_at = func.now()
+            return existing
+        record = PlagiarismSignature(
+            attempt_id=attempt_id, exam_id=exam_id, num_perm=num_perm, signature=signature
+        )
+        db.add(record)
+        return record
+
+    @staticmethod
+    def list_course_signatures(
+        db: Session, course_id: UUID, *, num_perm: int, created_after: Optional[datetime] = None
+    ) -> List[Tuple[UUID, UUID, bytes, datetime]]:
+        """
+        Збережені сигнатури іспитів курсу як (exam_id, attempt_id, signature, created_at).
+        `created_after` обмежує вибірку записами, новішими за мітку попередньої синхронізації.
+        Маркери порожніх сигнатур (EMPTY_SIGNATURE) не повертаються.
+        """
+        query = (
+            db.query(
+                PlagiarismSignature.exam_id,
+                PlagiarismSignature.attempt_id,
+                PlagiarismSignature.signature,
+                PlagiarismSignature.created_at,
+            )
+            .join(CourseExam, CourseExam.exam_id == PlagiarismSignature.exam_id)
+            .filter(
+                CourseExam.course_id == course_id,
+                PlagiarismSignature.num_perm == num_perm,
+                PlagiarismSignature.signature != EMPTY_SIGNATURE,
+            )
+        )
+        if created_after is not None:
+            query = query.filter(PlagiarismSignature.created_at > created_after)
+        return [(exam_id, attempt_id, signature, created_at) for exam_id, attempt_id, signature, created_at in query.all()]
+
+    @staticmethod
+    def list_unsigned_course_attempts(db: Session, course_id: UUID) -> List[Tuple[UUID, UUID]]:
+        """
+        Пари (exam_id, attempt_id) зданих спроб курсу з long_answer текстом,
+        для яких ще немає сигнатури або маркера EMPTY_SIGNATURE (здані до появи індексу).
+        """
+        rows = (
+            db.query(Attempt.exam_id, Attempt.id)
+            .join(CourseExam, CourseExam.exam_id == Attempt.exam_id)
+            .join(Answer, Answer.attempt_id == Attempt.id)
+            .join(Question, Question.id == Answer.question_id)
+            .outerjoin(PlagiarismSignature, PlagiarismSignature.attempt_id == Attempt.id)
+            .filter(
+                CourseExam.course_id == course_id,
+                Attempt.status != AttemptStatus.in_progress,
+                Question.question_type == QuestionType.long_answer,
+                Answer.answer_text.isnot(None),
+                Answer.answer_text != "",
+                PlagiarismSignature.attempt_id.is_(None),
+            )
+            .distinct()
+            .all()
+        )
+        return [(exam_id, attempt_id) for exam_id, attempt_id in rows]
@@ -1,5 +1,7 @@
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from uuid import UUID
+from src.api.services.user_cache import user_cache
 from src.models.users import User
 from src.models.roles import Role
 from src.models.user_roles import UserRole
@@ -18,7 +20,7 @@ class UserRepository:
         roles = (
             self.db.query(Role.name)
             .join(UserRole, UserRole.role_id == Role.id)
-            .filter(UserRole.user_id == user_id)
+            .filter(UserRole.user_id == UUID(str(user_id)))
             .all()
         )
         return [r[0] for r in roles]
@@ -30,7 +32,7 @@ class UserRepository:
         major = (
             self.db.query(Major.name)
             .join(UserMajor, UserMajor.major_id == Major.id)
-            .filter(UserMajor.user_id == user_id)
+            .filter(UserMajor.user_id == UUID(str(user_id)))
             .first()
         )
         return major[0] if major else None
@@ -50,6 +52,7 @@ class UserRepository:
         """
         setattr(user, settings_field, settings_data)
         self.db.commit()
+        user_cache.invalidate(user.id)
         self.db.refresh(user)
         return user
 
@@ -57,5 +60,21 @@ class UserRepository:
         """Оновлює URL аватара для користувача."""
         user.avatar_url = avatar_url
         self.db.commit()
+        user_cache.invalidate(user.id)
         self.db.refresh(user)
-        return user
\ No newline at end of file
+        return user
+
+    def bump_token_version(self, user_id: UUID) -> int:
+        """
+        Збільшує лічильник версії токенів користувача (викликати при зміні
+        ролей чи пароля): видані раніше токени відхиляються, щойно їхній claim
+        roles застаріє (ROLES_CLAIM_TTL_SECONDS). Коміт — на боці виклику.
+        """
+        version = self.db.execute(
+            update(User)
+            .where(User.id == UUID(str(user_id)))
+            .values(token_version=User.token_version + 1)
+            .returning(User.token_version)
+        ).scalar_one()
+        user_cache.invalidate(user_id)
+        return version
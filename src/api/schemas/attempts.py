@@ -24,6 +24,9 @@ class AnswerUpsert(BaseModel):
     text: Optional[constr(max_length=5000)] = Field(None, description="Free text answer") # type: ignore
     selected_option_ids: Optional[List[UUID]] = Field(None, description="Selected option ids for MCQ")
 
+class AnswerBatchUpsert(BaseModel):
+    answers: List[AnswerUpsert] = Field(..., min_length=1, max_length=1000, description="Answers to save in one request")
+
 class Answer(BaseModel):
     id: UUID
     attempt_id: UUID
@@ -1,13 +1,28 @@
 from __future__ import annotations
 
-from typing import List, Literal, Dict
+from datetime import datetime
+from typing import List, Literal, Dict, Optional
 from uuid import UUID
 from pydantic import BaseModel, Field
 
 StatusLiteral = Literal["ok", "suspicious", "high_risk"]
+CheckStateLiteral = Literal["pending", "running", "done", "failed"]
 MatchTypeLiteral = Literal["exact", "candidate", "paraphrase"]
 
 
+class PlagiarismQuestionMatch(BaseModel):
+    """
+    Схожість відповідей на одне питання в межах збігу з іншою спробою.
+    """
+    question_id: UUID = Field(..., description="ID питання")
+    similarity_score: Optional[float] = Field(
+        None,
+        ge=0.0,
+        le=1.0,
+        description="Схожість відповідей на це питання (0–1); null для збігів з інших іспитів",
+    )
+
+
 class PlagiarismMatch(BaseModel):
     """
     Один збіг з іншою спробою.
@@ -26,6 +41,10 @@ class PlagiarismMatch(BaseModel):
         ...,
         description="Тип збігу: exact (дослівно), paraphrase (перефраз), candidate (кандидат)",
     )
+    questions: List[PlagiarismQuestionMatch] = Field(
+        default_factory=list,
+        description="Оцінки по окремих питаннях",
+    )
 
 
 class PlagiarismReport(BaseModel):
@@ -54,21 +73,40 @@ class PlagiarismCheckSummary(BaseModel):
     """
     attempt_id: UUID = Field(..., description="ID спроби")
     student_id: UUID = Field(..., description="ID студента (user_id)")
-    uniqueness_percent: float = Field(
-        ...,
+    uniqueness_percent: Optional[float] = Field(
+        None,
         ge=0.0,
         le=100.0,
-        description="Оцінка унікальності роботи (0–100)",
+        description="Оцінка унікальності роботи (0–100); null, поки перевірка не завершена",
     )
-    max_similarity: float = Field(
-        ...,
+    max_similarity: Optional[float] = Field(
+        None,
         ge=0.0,
         le=1.0,
-        description="Максимальна схожість з іншою роботою (0–1)",
+        description="Максимальна схожість з іншою роботою (0–1); null, поки перевірка не завершена",
     )
-    status: StatusLiteral = Field(
-        ...,
-        description="ok / suspicious / high_risk",
+    status: Optional[StatusLiteral] = Field(
+        None,
+        description="ok / suspicious / high_risk; null, поки перевірка не завершена",
+    )
+    state: CheckStateLiteral = Field(
+        "done",
+        description="Стан фонової перевірки: pending / running / done / failed",
+    )
+
+
+class PlagiarismCheckStatusResponse(BaseModel):
+    """
+    Стан фонової перевірки на плагіат однієї спроби (для опитування з UI викладача).
+    """
+    attempt_id: UUID = Field(..., description="ID спроби")
+    state: CheckStateLiteral = Field(..., description="pending / running / done / failed")
+    queued_at: Optional[datetime] = Field(None, description="Коли перевірку поставлено в чергу")
+    started_at: Optional[datetime] = Field(None, description="Коли воркер почав перевірку")
+    finished_at: Optional[datetime] = Field(None, description="Коли перевірку завершено")
+    report: Optional[PlagiarismReport] = Field(
+        None,
+        description="Звіт; заповнюється лише у стані done",
     )
 
 
@@ -1,10 +1,11 @@
 from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import Optional, List
-from sqlalchemy import func
 from uuid import UUID
+from datetime import datetime, timezone
 
 from src.api.repositories.attempts_repository import AttemptsRepository
-from src.api.services.grading_service import GradingService
+from src.api.services.grading_service import CompiledAnswerKey, CompiledQuestionKey, GradingService
+from src.api.services.exam_snapshot_service import ExamSnapshotService
 from src.api.repositories.weights_repository import WeightsRepository
 from src.api.schemas.attempts import (
     AnswerUpsert,
@@ -18,76 +19,98 @@ from src.api.schemas.attempts import (
 )
 
 from src.api.schemas.plagiarism import (
+    PlagiarismCheckStatusResponse,
     PlagiarismCheckSummary,
     PlagiarismComparisonResponse,
 )
 
 from src.models.attempts import Attempt, AttemptStatus, Answer
-from src.models.exams import Exam, Question, QuestionType
+from src.models.exams import Question, QuestionType
 from src.api.errors.app_errors import NotFoundError, ConflictError, ForbiddenError
-from src.utils.largest_remainder import distribute_largest_remainder
+from src.utils.auth import Principal
+from src.utils.datetime_utils import as_utc
 
 from src.api.services.plagiarism_service import PlagiarismService
+from src.api.background.answer_buffer import AnswerWriteBuffer, BufferedAnswer, answer_buffer as default_answer_buffer
+from src.api.background.plagiarism_worker import PlagiarismWorker, plagiarism_worker as default_plagiarism_worker
 from src.api.repositories.plagiarism_repository import PlagiarismRepository
 from src.api.repositories.flagged_answers_repository import FlaggedAnswersRepository
 from src.api.schemas.plagiarism import FlaggedAnswerResponse, AnswerComparisonResponse
-from src.models.users import User
-from src.models.user_roles import UserRole
-from src.models.paraphrase import ParaphraseModel
+from src.models.paraphrase import get_paraphrase_model
 
 # Introduce Constant / Replace Magic Literal
 ATTEMPT_NOT_FOUND_MSG = "Attempt not found"
-TEACHER_ROLE_ID = 2
 
 class AttemptsService:
-    def __init__(self, plagiarism_service: Optional[PlagiarismService] = None) -> None:
+    def __init__(
+        self,
+        plagiarism_service: Optional[PlagiarismService] = None,
+        plagiarism_worker: Optional[PlagiarismWorker] = None,
+        answer_buffer: Optional[AnswerWriteBuffer] = None,
+    ) -> None:
         if plagiarism_service:
             self.plagiarism_service = plagiarism_service
         else:
             self.plagiarism_service = PlagiarismService(
                 repo=PlagiarismRepository(),
-                paraphrase_model=ParaphraseModel(),
+                paraphrase_model=get_paraphrase_model(),
             )
+        self.plagiarism_worker = plagiarism_worker or default_plagiarism_worker
+        self.answer_buffer = answer_buffer if answer_buffer is not None else default_answer_buffer
 
-    @staticmethod
     def add_answer(
-        db: Session, attempt_id: UUID, payload: AnswerUpsert
+        self, db: Session, attempt_id: UUID, payload: AnswerUpsert
     ) -> AnswerSchema:
-        repo = AttemptsRepository(db)
-        att = repo.get_attempt(attempt_id)
-        if not att:
-            raise NotFoundError(ATTEMPT_NOT_FOUND_MSG)
-        if att.status != "in_progress":
-            raise ConflictError("Attempt is locked or submitted")
-        
-        answer = repo.upsert_answer(attempt_id, payload)
-        
-        # Конвертуємо SQLAlchemy модель у Pydantic схему
-        # Отримуємо selected_option_ids для MCQ питань
-        selected_option_ids = None
-        if answer.selected_options:
-            selected_option_ids = [opt.selected_option_id for opt in answer.selected_options]
-        
+        """
+        Автозбереження відповіді: кладеться в буфер (AnswerWriteBuffer) і
+        підтверджується одразу, у БД потрапляє при найближчому скиданні буфера.
+        """
+        return self._answer_schema(self.answer_buffer.put(db, attempt_id, payload))
+
+    def add_answers(
+        self, db: Session, attempt_id: UUID, payloads: List[AnswerUpsert]
+    ) -> List[AnswerSchema]:
+        """
+        Синхронізація стану спроби одним запитом (наприклад, після перепідключення):
+        усі відповіді записуються одразу одним пакетним upsert і одним комітом,
+        старіші автозбереження цих питань з буфера відкидаються.
+        """
+        entries = self.answer_buffer.put_many(db, attempt_id, payloads, write_through=True)
+        return [self._answer_schema(entry) for entry in entries]
+
+    @staticmethod
+    def _answer_schema(entry: BufferedAnswer) -> AnswerSchema:
+        values = AttemptsRepository.answer_values(entry.question_type, entry.payload)
         return AnswerSchema(
-            id=answer.id,
-            attempt_id=answer.attempt_id,
-            question_id=answer.question_id,
-            text=answer.answer_text,
-            selected_option_ids=selected_option_ids,
-            saved_at=answer.saved_at
+            id=entry.answer_id,
+            attempt_id=entry.attempt_id,
+            question_id=entry.question_id,
+            text=values["answer_text"],
+            selected_option_ids=values["selected_option_ids"] or None,
+            saved_at=entry.saved_at
         )
 
     def submit(self, db: Session, attempt_id: UUID) -> AttemptSchema:
         """
         Завершує спробу, запускає повний процес оцінювання та зберігає результати.
+        Усе відбувається в одній транзакції: запис буферизованих автозбережень,
+        одне завантаження спроби з відповідями, оцінювання за скомпільованим
+        ключем відповідей (з кешу) і один коміт.
         """
-        repo = AttemptsRepository(db)
         grading_service = GradingService()
 
+        # Спочатку дописуємо відповіді спроби, що ще лежать у буфері автозбережень
+        buffered = self.answer_buffer.flush_attempt(db, attempt_id)
+        try:
+            return self._submit_loaded(db, attempt_id, grading_service)
+        except Exception:
+            db.rollback()
+            self.answer_buffer.restore(buffered)
+            raise
+
+    def _submit_loaded(self, db: Session, attempt_id: UUID, grading_service: GradingService) -> AttemptSchema:
+        # Питання іспиту не завантажуємо: оцінювання йде за скомпільованим ключем відповідей
         attempt = db.query(Attempt).filter(Attempt.id == attempt_id).options(
-            joinedload(Attempt.exam).selectinload(Exam.questions).selectinload(Question.options),
-            joinedload(Attempt.exam).selectinload(Exam.questions).selectinload(Question.matching_options),
-            selectinload(Attempt.answers).joinedload(Answer.question),
             selectinload(Attempt.answers).selectinload(Answer.selected_options)
         ).one_or_none()
 
@@ -96,15 +119,11 @@ class AttemptsService:
         if attempt.status != AttemptStatus.in_progress:
             raise ConflictError("Attempt is already submitted")
 
-        repo.submit_attempt(attempt.id)
-
         # Викликаємо сервіс оцінювання, який поверне нам статистику
         grading_result = grading_service.calculate_score(db, attempt)
-        
-        # Обчислюємо загальну вагу іспиту для розрахунку фінальної оцінки
-        total_exam_weight = db.query(func.sum(Question.points)).filter(
-            Question.exam_id == attempt.exam_id
-        ).scalar() or 0.0
+
+        # Загальна вага іспиту вже є в ключі відповідей (без окремого запиту)
+        total_exam_weight = grading_service.get_answer_key(db, attempt.exam_id, attempt.exam_version).total_points
 
         final_score = 0.0
         if total_exam_weight > 0:
@@ -112,23 +131,49 @@ class AttemptsService:
 
         final_score = min(100.0, final_score)
 
-        attempt.correct_answers = grading_result.correct_count
-        attempt.incorrect_answers = grading_result.incorrect_count
-        attempt.pending_count = grading_result.pending_count
-        attempt.earned_points = final_score
+        current_time = datetime.now(timezone.utc)
+        values = {
+            Attempt.submitted_at: current_time,
+            Attempt.correct_answers: grading_result.correct_count,
+            Attempt.incorrect_answers: grading_result.incorrect_count,
+            Attempt.pending_count: grading_result.pending_count,
+            Attempt.earned_points: final_score,
+            Attempt.status: AttemptStatus.submitted if grading_result.pending_count > 0 else AttemptStatus.completed,
+        }
+        if attempt.started_at:
+            values[Attempt.time_spent_seconds] = int((current_time - as_utc(attempt.started_at)).total_seconds())
 
-        if grading_result.pending_count > 0:
-            attempt.status = AttemptStatus.submitted
-        else:
-            attempt.status = AttemptStatus.completed
+        # Умовний UPDATE: паралельний submit чи масове оцінювання при закритті іспиту
+        # могли здати спробу після того, як ми її прочитали — тоді нічого не перезаписуємо
+        updated = (
+            db.query(Attempt)
+            .filter(Attempt.id == attempt_id, Attempt.status == AttemptStatus.in_progress)
+            .update(values, synchronize_session=False)
+        )
+        if updated != 1:
+            raise ConflictError("Attempt is already submitted")
 
-        # Автоматична перевірка на плагіат (тільки long_answer всередині сервісу)
-        self.plagiarism_service.check_attempt(db, attempt)
+        # Перевірка на плагіат виконується у фоні: тут лише ставимо її в чергу
+        # в тій самій транзакції, щоб submit не чекав на аналіз текстів
+        self.plagiarism_service.enqueue_check(db, attempt.id)
+
+        # Відповідь формуємо до коміту: після нього атрибути прострочені і db.refresh був би зайвим запитом
+        response = AttemptSchema(
+            id=attempt.id,
+            exam_id=attempt.exam_id,
+            user_id=attempt.user_id,
+            status=values[Attempt.status].value,
+            started_at=attempt.started_at,
+            due_at=attempt.due_at,
+            submitted_at=current_time,
+            time_spent_seconds=values.get(Attempt.time_spent_seconds, attempt.time_spent_seconds),
+        )
 
         db.commit()
-        db.refresh(attempt)
 
-        return attempt    
+        self.plagiarism_worker.enqueue(attempt_id)
+
+        return response
 
     @staticmethod
     def get_attempt_details(db: Session, attempt_id: UUID):
@@ -138,6 +183,14 @@ class AttemptsService:
             raise NotFoundError(ATTEMPT_NOT_FOUND_MSG)
         return att
 
+    @staticmethod
+    def get_attempt_details_json(db: Session, attempt_id: UUID) -> bytes:
+        """Деталі спроби як готовий JSON: вміст іспиту береться вже серіалізованим з кешу."""
+        payload = AttemptsRepository(db).get_attempt_with_details_json(attempt_id)
+        if payload is None:
+            raise NotFoundError(ATTEMPT_NOT_FOUND_MSG)
+        return payload
+
     @staticmethod
     def get_attempt_result(
         db: Session,
@@ -187,23 +240,17 @@ class AttemptsService:
         if payload.earned_points > max_points:
             raise ValueError(f"Оцінка не може перевищувати максимальну ({max_points})")
         
-        # Завантажуємо attempt з усіма даними для розрахунку масштабу
+        # Питання, бали й ключ беремо з версії іспиту, з якою спробу розпочато
         attempt = db.query(Attempt).options(
-            joinedload(Attempt.exam).selectinload(Exam.questions),
-            selectinload(Attempt.answers).joinedload(Answer.question)
+            selectinload(Attempt.answers).selectinload(Answer.selected_options)
         ).filter(Attempt.id == attempt_id).first()
         
         if not attempt:
             raise NotFoundError(ATTEMPT_NOT_FOUND_MSG)
         
-        # Знаходимо відповідь та питання
-        answer = None
-        question = None
-        for ans in attempt.answers:
-            if ans.id == answer_id:
-                answer = ans
-                question = ans.question
-                break
+        answer = next((ans for ans in attempt.answers if ans.id == answer_id), None)
+        key = GradingService().get_answer_key(db, attempt.exam_id, attempt.exam_version)
+        question = key.questions.get(answer.question_id) if answer else None
         
         if not answer or not question:
             raise NotFoundError("Answer or question not found")
@@ -211,26 +258,9 @@ class AttemptsService:
         if question.question_type != QuestionType.long_answer:
             raise ValueError("Цей endpoint призначений тільки для long_answer питань")
         
-        # Розраховуємо final_points для цього питання (масштабовані до 100 балів)
-        weights_repo = WeightsRepository(db)
-        weights_map = weights_repo.get_all_weights()
-        
-        total_exam_weight = sum(
-            weights_map.get(q.question_type, 1) for q in attempt.exam.questions
-        )
-        
-        if total_exam_weight == 0:
-            points_per_weight_unit = 0.0
-        else:
-            points_per_weight_unit = 100.0 / total_exam_weight
-        
-        true_points_map = {
-            q.id: weights_map.get(q.question_type, 1) * points_per_weight_unit
-            for q in attempt.exam.questions
-        }
-        
-        final_points_map = distribute_largest_remainder(true_points_map, target_total=100)
-        question_final_points = final_points_map.get(question.id, 0)
+        # final_points цього питання (масштабовані до 100 балів)
+        final_points_map = self._calculate_final_points_map(db, attempt)
+        question_final_points = final_points_map.get(answer.question_id, 0)
         
         # Зберігаємо earned_points в БД для long_answer питань
         # Оскільки це ручна оцінка вчителя, вона має зберігатися
@@ -242,10 +272,10 @@ class AttemptsService:
         db.commit()
         
         # Перераховуємо загальну оцінку
-        self._recalculate_attempt_score(db, attempt)
+        self._recalculate_attempt_score(db, attempt, key, final_points_map)
         
         # Перевіряємо, чи всі long_answer питання оцінені
-        self._check_and_update_attempt_status(db, attempt)
+        self._check_and_update_attempt_status(db, attempt, key)
         
         db.refresh(answer)
         return AnswerSchema(
@@ -294,25 +324,16 @@ class AttemptsService:
     
     @staticmethod
     def _calculate_final_points_map(db: Session, attempt: Attempt) -> dict:
-        """Розраховує фінальну мапу балів для питань (масштабовані до 100 балів)."""
-        weights_repo = WeightsRepository(db)
-        weights_map = weights_repo.get_all_weights()
-        
-        total_exam_weight = sum(
-            weights_map.get(q.question_type, 1) for q in attempt.exam.questions
-        )
-        
-        if total_exam_weight == 0:
-            points_per_weight_unit = 0.0
-        else:
-            points_per_weight_unit = 100.0 / total_exam_weight
-        
-        true_points_map = {
-            q.id: weights_map.get(q.question_type, 1) * points_per_weight_unit
-            for q in attempt.exam.questions
-        }
-        
-        return distribute_largest_remainder(true_points_map, target_total=100)
+        """
+        Розраховує фінальну мапу балів для питань (масштабовані до 100 балів)
+        за версією знімка спроби; спроби без знімка рахуються за живими питаннями.
+        """
+        if attempt.exam_version is not None:
+            points = ExamSnapshotService.get_points_distribution(db, attempt.exam_id, attempt.exam_version)
+            if points is not None:
+                return points
+        questions = db.query(Question).filter(Question.exam_id == attempt.exam_id).all()
+        return ExamSnapshotService.points_distribution(questions, WeightsRepository(db).get_all_weights())
     
     @staticmethod
     def _calculate_long_answer_score(answer: Answer) -> float:
@@ -323,81 +344,77 @@ class AttemptsService:
     
     @staticmethod
     def _calculate_auto_graded_score(
-        question: Question, 
+        question: CompiledQuestionKey,
         answer: Answer, 
         question_points: float,
-        grading_service: GradingService,
-        correct_data: dict
+        grading_service: GradingService
     ) -> float:
         """Розраховує бали для автоматично оцінюваних питань."""
         if not answer:
             return 0.0
         
-        base_question_points = float(question.points or 0.0)
-        if base_question_points == 0:
+        if not question.points:
             return 0.0
         
-        # Визначаємо метод оцінювання залежно від типу питання
-        grading_methods = {
-            QuestionType.single_choice: grading_service._grade_single_choice,
-            QuestionType.multi_choice: grading_service._grade_multi_choice,
-            QuestionType.short_answer: grading_service._grade_short_answer,
-            QuestionType.matching: grading_service._grade_matching,
-        }
-        
-        grade_method = grading_methods.get(question.question_type)
-        if not grade_method:
-            return 0.0
-        
-        earned_base, _ = grade_method(question, answer, correct_data.get(question.id, {}))
-        earned_scaled = (earned_base / base_question_points) * question_points
+        selected_ids = None
+        if question.question_type in (QuestionType.single_choice, QuestionType.multi_choice):
+            selected_ids = {o.selected_option_id for o in answer.selected_options}
+        earned_base, _ = grading_service.grade_values(question, selected_ids, answer.answer_text, answer.answer_json)
+        earned_scaled = (earned_base / question.points) * question_points
         return earned_scaled
     
-    def _recalculate_attempt_score(self, db: Session, attempt: Attempt) -> None:
+    def _recalculate_attempt_score(
+        self,
+        db: Session,
+        attempt: Attempt,
+        key: CompiledAnswerKey,
+        final_points_map: dict
+    ) -> None:
         """
         Перераховує загальну оцінку для спроби на основі всіх оцінок за питання.
         Використовує ту саму логіку, що й exam_review_service для консистентності.
         earned_points зберігається в масштабі points питання (які вже масштабовані до 100 балів).
+        Питання й правильні відповіді — з ключа версії іспиту, з якою спробу розпочато.
         """
-        final_points_map = self._calculate_final_points_map(db, attempt)
         answers_map = {ans.question_id: ans for ans in attempt.answers}
-        
         grading_service = GradingService()
-        correct_data = grading_service._build_correct_data(attempt.exam)
         
         total_earned = 0.0
-        for question in attempt.exam.questions:
-            answer = answers_map.get(question.id)
-            question_points = final_points_map.get(question.id, 0)
+        for question_id, question in key.questions.items():
+            answer = answers_map.get(question_id)
+            question_points = final_points_map.get(question_id, 0)
             
             if question.question_type == QuestionType.long_answer:
                 total_earned += self._calculate_long_answer_score(answer)
             else:
                 total_earned += self._calculate_auto_graded_score(
-                    question, answer, question_points, grading_service, correct_data
+                    question, answer, question_points, grading_service
                 )
         
         attempt.earned_points = min(100.0, max(0.0, total_earned))
         db.commit()
     
     @staticmethod
-    def _check_and_update_attempt_status(db: Session, attempt: Attempt) -> None:
+    def _check_and_update_attempt_status(db: Session, attempt: Attempt, key: CompiledAnswerKey) -> None:
         """
-        Перевіряє, чи всі long_answer питання оцінені.
+        Перевіряє, чи всі long_answer питання версії іспиту спроби оцінені.
         Якщо так, і статус submitted, змінює статус на completed.
         """
         # Знаходимо всі long_answer питання
-        long_answer_questions = [q for q in attempt.exam.questions if q.question_type == QuestionType.long_answer]
+        long_answer_question_ids = [
+            question_id for question_id, question in key.questions.items()
+            if question.question_type == QuestionType.long_answer
+        ]
         
-        if not long_answer_questions:
+        if not long_answer_question_ids:
             return
         
         # Перевіряємо, чи всі long_answer питання мають відповіді з оцінками
         answers_map = {ans.question_id: ans for ans in attempt.answers}
         all_graded = True
         
-        for question in long_answer_questions:
-            answer = answers_map.get(question.id)
+        for question_id in long_answer_question_ids:
+            answer = answers_map.get(question_id)
             if not answer or answer.earned_points is None:
                 all_graded = False
                 break
@@ -409,32 +426,21 @@ class AttemptsService:
             db.commit()
 
     @staticmethod
-    def _is_teacher(db: Session, user: User) -> bool:
-        """
-        Перевіряємо, чи має користувач роль викладача через таблицю user_roles.
-        TEACHER_ROLE_ID = 2.
-        """
-        return (
-            db.query(UserRole)
-            .filter(
-                UserRole.user_id == user.id,
-                UserRole.role_id == TEACHER_ROLE_ID,
-            )
-            .first()
-            is not None
-        )
+    def _is_teacher(user: Principal) -> bool:
+        """Перевіряємо роль викладача за ролями з токена (Principal.roles), без запиту до БД."""
+        return "teacher" in user.roles
     
     def get_exam_plagiarism_checks(
         self,
         db: Session,
         exam_id: UUID,
-        current_user: User,
+        current_user: Principal,
         max_uniqueness: Optional[float] = None,
     ) -> List[PlagiarismCheckSummary]:
         """
         Список результатів перевірки на плагіат по іспиту (лише викладач).
         """
-        if not self._is_teacher(db, current_user):
+        if not self._is_teacher(current_user):
             # Якщо нема окремої ForbiddenError – використовуємо ConflictError
             raise ConflictError("Only teacher can view plagiarism checks")
 
@@ -444,17 +450,31 @@ class AttemptsService:
             max_uniqueness=max_uniqueness,
         )
 
+    def get_plagiarism_check_status(
+        self,
+        db: Session,
+        attempt_id: UUID,
+        current_user: Principal,
+    ) -> PlagiarismCheckStatusResponse:
+        """
+        Стан фонової перевірки на плагіат спроби (лише викладач).
+        """
+        if not self._is_teacher(current_user):
+            raise ConflictError("Only teacher can view plagiarism checks")
+
+        return self.plagiarism_service.get_check_status(db, attempt_id)
+
     def get_attempts_comparison(
         self,
         db: Session,
         base_attempt_id: UUID,
         other_attempt_id: UUID,
-        current_user: User,
+        current_user: Principal,
     ) -> PlagiarismComparisonResponse:
         """
         Порівняння текстів двох спроб (лише викладач).
         """
-        if not self._is_teacher(db, current_user):
+        if not self._is_teacher(current_user):
             raise ConflictError("Only teacher can compare attempts for plagiarism")
 
         # Можна додатково перевірити, що обидві спроби існують:
@@ -473,10 +493,10 @@ class AttemptsService:
         self,
         db: Session,
         answer_id: UUID,
-        current_user: User,
+        current_user: Principal,
     ) -> FlaggedAnswerResponse:
         """Позначити відповідь для перевірки на плагіат (тільки для вчителя)"""
-        if not self._is_teacher(db, current_user):
+        if not self._is_teacher(current_user):
             raise ForbiddenError("Only teachers can flag answers for plagiarism check")
         
         # Перевіряємо, чи існує відповідь та чи це long_answer
@@ -523,10 +543,10 @@ class AttemptsService:
         self,
         db: Session,
         answer_id: UUID,
-        current_user: User,
+        current_user: Principal,
     ) -> None:
         """Зняти позначення з відповіді (тільки для вчителя)"""
-        if not self._is_teacher(db, current_user):
+        if not self._is_teacher(current_user):
             raise ForbiddenError("Only teachers can unflag answers")
         
         repo = FlaggedAnswersRepository()
@@ -537,10 +557,10 @@ class AttemptsService:
     def list_flagged_answers(
         self,
         db: Session,
-        current_user: User,
+        current_user: Principal,
     ) -> List[FlaggedAnswerResponse]:
         """Отримати список всіх позначених відповідей (тільки для вчителя)"""
-        if not self._is_teacher(db, current_user):
+        if not self._is_teacher(current_user):
             raise ForbiddenError("Only teachers can view flagged answers")
         
         repo = FlaggedAnswersRepository()
@@ -571,10 +591,10 @@ class AttemptsService:
         db: Session,
         answer1_id: UUID,
         answer2_id: UUID,
-        current_user: User,
+        current_user: Principal,
     ) -> AnswerComparisonResponse:
         """Порівняти дві конкретні відповіді на плагіат (тільки для вчителя)"""
-        if not self._is_teacher(db, current_user):
+        if not self._is_teacher(current_user):
             raise ForbiddenError("Only teachers can compare answers")
         
         # Отримуємо відповіді з повною інформацією
@@ -612,8 +632,8 @@ class AttemptsService:
         text1 = answer1.answer_text or ""
         text2 = answer2.answer_text or ""
         
-        # Використовуємо ParaphraseModel для порівняння
-        paraphrase_model = ParaphraseModel()
+        # Використовуємо спільну ParaphraseModel для порівняння
+        paraphrase_model = get_paraphrase_model()
         similarity_score = paraphrase_model.similarity(text1, text2)
         
         # Генеруємо ranges для підсвічування спільних фрагментів
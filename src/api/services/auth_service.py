@@ -12,23 +12,24 @@ from src.models.user_majors import UserMajor
 
 
 class AuthService:
-    def __init__(self):
-        self.user_repo = None
-
     def login(self, db: Session, request: LoginRequest) -> LoginResponse:
-        self.user_repo = UserRepository(db)
+        user_repo = UserRepository(db)
 
-        user = self.user_repo.get_user_by_email(request.email)
+        user = user_repo.get_user_by_email(request.email)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
 
+        # bcrypt — сотні мілісекунд CPU: не тримаємо з'єднання з пулу під час перевірки
+        db.expunge(user)
+        db.rollback()
+
         if not verify_password(request.password, user.hashed_password):
             raise HTTPException(status_code=401, detail="Invalid password")
 
-        roles = self.user_repo.get_user_roles(str(user.id))
-        major_name = self.user_repo.get_user_major(str(user.id))
+        roles = user_repo.get_user_roles(str(user.id))
+        major_name = user_repo.get_user_major(str(user.id))
 
-        token = create_access_token({"sub": str(user.id), "roles": roles})
+        token = create_access_token({"sub": str(user.id), "roles": roles, "ver": user.token_version})
 
         return LoginResponse(
             access_token=token,  # Changed from token= to access_token=
@@ -45,10 +46,10 @@ class AuthService:
 
     def register(self, db: Session, request: RegisterRequest) -> LoginResponse:
         """Реєстрація нового користувача з роллю 'student' за замовчуванням."""
-        self.user_repo = UserRepository(db)
+        user_repo = UserRepository(db)
 
         # Перевіряємо, чи користувач з таким email вже існує
-        existing_user = self.user_repo.get_user_by_email(request.email)
+        existing_user = user_repo.get_user_by_email(request.email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -91,10 +92,10 @@ class AuthService:
         db.refresh(new_user)
 
         # Автоматично логінимо користувача після реєстрації
-        roles = self.user_repo.get_user_roles(str(new_user.id))
-        major_name = self.user_repo.get_user_major(str(new_user.id))
+        roles = user_repo.get_user_roles(str(new_user.id))
+        major_name = user_repo.get_user_major(str(new_user.id))
 
-        token = create_access_token({"sub": str(new_user.id), "roles": roles})
+        token = create_access_token({"sub": str(new_user.id), "roles": roles, "ver": new_user.token_version})
 
         return LoginResponse(
             access_token=token,
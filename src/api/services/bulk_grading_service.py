@@ -0,0 +1,149 @@
+"""
+Масове оцінювання спроб при закритті іспиту.
+
+Ключ відповідей береться один раз на версію знімка іспиту (GradingService.get_answer_key),
+спроби обробляються частинами (BULK_GRADING_CHUNK_SIZE): відповіді й обрані
+варіанти кожної частини завантажуються двома запитами як "сирі" рядки,
+оцінюються по питаннях, а результати записуються одним bulk UPDATE
+і одним комітом на частину. Перевірки на плагіат автоматично зданих спроб
+після коміту передаються фоновому воркеру, як і при звичайному submit.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Any, Collection, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from src.api.background.plagiarism_worker import PlagiarismWorker, plagiarism_worker as default_plagiarism_worker
+from src.api.repositories.attempts_repository import AttemptsRepository
+from src.api.repositories.plagiarism_repository import PlagiarismRepository
+from src.api.services.grading_service import CompiledAnswerKey, GradingResult, GradingService
+from src.core.config import BULK_GRADING_CHUNK_SIZE
+from src.models.attempts import AttemptStatus
+from src.models.exams import QuestionType
+from src.utils.datetime_utils import as_utc
+
+logger = logging.getLogger(__name__)
+
+
+class BulkGradingService:
+    def __init__(
+        self,
+        grading_service: Optional[GradingService] = None,
+        plagiarism_repo: Optional[PlagiarismRepository] = None,
+        chunk_size: int = BULK_GRADING_CHUNK_SIZE,
+        plagiarism_worker: Optional[PlagiarismWorker] = None,
+    ) -> None:
+        self.grading_service = grading_service or GradingService()
+        self.plagiarism_repo = plagiarism_repo or PlagiarismRepository()
+        self.plagiarism_worker = plagiarism_worker or default_plagiarism_worker
+        self.chunk_size = chunk_size
+
+    def grade_exam(self, db: Session, exam_id: UUID, skip_attempt_ids: Collection[UUID] = ()) -> int:
+        """
+        Автоматично здає незавершені спроби іспиту, чий час вийшов (due_at <= now),
+        та оцінює всі неоцінені,
+        крім skip_attempt_ids (спроби з ще не записаними збереженнями).
+        Рахує так само, як AttemptsService.submit (GradingService.calculate_score),
+        і так само ставить здані спроби в чергу перевірки на плагіат та передає їх воркеру.
+        Повертає кількість оцінених спроб.
+        """
+        repo = AttemptsRepository(db)
+        now = datetime.now(timezone.utc)
+        # Спроби з подовженим часом (due_at після now) не здаємо примусово
+        attempts = [
+            attempt for attempt in repo.list_ungraded_attempts_for_exam(exam_id, due_before=now)
+            if attempt[0] not in skip_attempt_ids
+        ]
+        if not attempts:
+            return 0
+
+        # Скомпільовані ключі відповідей (з кешу) — по одному на версію знімка іспиту
+        keys: Dict[Optional[int], CompiledAnswerKey] = {}
+        for version in {attempt[4] for attempt in attempts}:
+            keys[version] = self.grading_service.get_answer_key(db, exam_id, version)
+
+        for start in range(0, len(attempts), self.chunk_size):
+            chunk = attempts[start:start + self.chunk_size]
+            results: Dict[UUID, GradingResult] = {}
+            for version, key in keys.items():
+                attempt_ids = [attempt[0] for attempt in chunk if attempt[4] == version]
+                if attempt_ids:
+                    results.update(self._grade_chunk(repo, attempt_ids, key))
+
+            updates: List[Dict[str, Any]] = []
+            for attempt_id, status, started_at, due_at, version in chunk:
+                result = results.get(attempt_id) or GradingResult()
+                total_exam_weight = keys[version].total_points
+                final_score = 0.0
+                if total_exam_weight > 0:
+                    final_score = min(100.0, (result.earned_weight / total_exam_weight) * 100)
+                row: Dict[str, Any] = {
+                    "id": attempt_id,
+                    "correct_answers": result.correct_count,
+                    "incorrect_answers": result.incorrect_count,
+                    "pending_count": result.pending_count,
+                    "earned_points": final_score,
+                    "status": AttemptStatus.submitted if result.pending_count > 0 else AttemptStatus.completed,
+                }
+                if status == AttemptStatus.in_progress:
+                    # Час спроби не може перевищити відведений (due_at)
+                    finished_at = min(now, as_utc(due_at)) if due_at else now
+                    row["submitted_at"] = now
+                    row["time_spent_seconds"] = max(0, int((finished_at - as_utc(started_at)).total_seconds()))
+                updates.append(row)
+
+            repo.bulk_update_attempt_results(updates)
+            queued = self.plagiarism_repo.mark_pending_many(
+                db, [attempt_id for attempt_id, status, *_ in chunk if status == AttemptStatus.in_progress]
+            )
+            db.commit()
+            # Воркер забирає лише закомічені pending-записи
+            for attempt_id in queued:
+                self.plagiarism_worker.enqueue(attempt_id)
+
+        logger.info(f"Bulk graded {len(attempts)} attempts of exam {exam_id}")
+        return len(attempts)
+
+    def _grade_chunk(
+        self,
+        repo: AttemptsRepository,
+        attempt_ids: List[UUID],
+        key: CompiledAnswerKey,
+    ) -> Dict[UUID, GradingResult]:
+        """
+        Оцінює відповіді частини спроб. Відповіді групуються по питаннях, тож
+        ключ питання визначається один раз для всієї групи.
+        """
+        answer_rows = repo.get_answer_rows(attempt_ids)
+        selected = repo.get_selected_option_ids(attempt_ids)
+
+        by_question: Dict[UUID, List[tuple]] = {}
+        for row in answer_rows:
+            by_question.setdefault(row[2], []).append(row)
+
+        results: Dict[UUID, GradingResult] = {}
+        for question_id, rows in by_question.items():
+            question = key.questions.get(question_id)
+            for answer_id, attempt_id, _, text, answer_json in rows:
+                result = results.setdefault(attempt_id, GradingResult())
+                result.total_answers_given += 1
+                if question is None:
+                    result.incorrect_count += 1
+                    continue
+                if question.question_type == QuestionType.long_answer:
+                    # Довга відповідь оцінюється вручну
+                    result.pending_count += 1
+                    continue
+
+                earned, is_correct = self.grading_service.grade_values(
+                    question, selected.get(answer_id, set()), text, answer_json
+                )
+                result.earned_weight += earned
+                if is_correct:
+                    result.correct_count += 1
+                else:
+                    result.incorrect_count += 1
+
+        return results
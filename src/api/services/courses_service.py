@@ -6,9 +6,8 @@ from src.api.services.journal_service import JournalService
 from src.api.repositories.courses_repository import CoursesRepository
 from src.api.schemas.courses import CourseCreate, CourseUpdate
 from src.models.courses import Course
-from src.api.repositories.user_repository import UserRepository
 from src.api.errors.app_errors import NotFoundError, ForbiddenError
-from src.models.users import User
+from src.utils.auth import Principal
 from src.models.course_supervisors import CourseSupervisor
 from src.api.services.exams_service import ExamsService
 
@@ -109,16 +108,14 @@ class CoursesService:
         )
 
     @staticmethod
-    def list_for_supervisor(db: Session, current_user: User, **filters):
-        roles = UserRepository(db).get_user_roles(str(current_user.id))
-        if "supervisor" not in roles:
+    def list_for_supervisor(db: Session, current_user: Principal, **filters):
+        if "supervisor" not in current_user.roles:
             raise ForbiddenError(SUPERVISOR_ONLY)
         return CoursesRepository(db).list_with_stats_for_supervisor(supervisor_id=current_user.id, **filters)
 
     @staticmethod
-    def get_course_details_for_supervisor(db: Session, current_user: User, course_id: UUID):
-        roles = UserRepository(db).get_user_roles(str(current_user.id))
-        if "supervisor" not in roles:
+    def get_course_details_for_supervisor(db: Session, current_user: Principal, course_id: UUID):
+        if "supervisor" not in current_user.roles:
             raise ForbiddenError(SUPERVISOR_ONLY)
 
         # Перевіряємо, чи наглядач прив'язаний до цього курсу
@@ -0,0 +1,78 @@
+"""
+Кеш вмісту іспиту для сторінки складання (питання, варіанти, пари для matching).
+
+Вміст однаковий для всіх спроб іспиту, тож він збирається один раз і
+зберігається і як список словників, і як уже серіалізований JSON (bytes),
+який ендпоінт деталей спроби вставляє у відповідь без повторної серіалізації.
+Вміст версії знімка (exam_snapshots) незмінний; вміст живих питань
+(version=None) скидається за подіями exam_invalidation, які ExamsRepository
+надсилає при редагуванні питань, варіантів та іспиту (в т.ч. публікації),
+а TTL обмежує застарілість в інших процесах.
+"""
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from src.api.services import exam_invalidation
+from src.core.config import EXAM_CONTENT_CACHE_TTL_SECONDS
+
+
+class ExamContent:
+    """Відформатовані питання іспиту; `questions` спільний для всіх запитів — не змінювати."""
+    def __init__(self, exam_id: UUID, questions: List[Dict[str, Any]], version: Optional[int] = None):
+        self.exam_id = exam_id
+        self.version = version
+        self.questions = questions
+        self.questions_json = json.dumps(questions, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.cached_at = time.monotonic()
+
+
+class ExamContentCache:
+    """Потокобезпечний in-process кеш ExamContent по (exam_id, version) з лічильниками hits/misses."""
+    def __init__(self, ttl_seconds: Optional[float] = EXAM_CONTENT_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._contents: Dict[Tuple[UUID, Optional[int]], ExamContent] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+    def get(self, exam_id: UUID, version: Optional[int] = None) -> Optional[ExamContent]:
+        with self._lock:
+            content = self._contents.get((exam_id, version))
+            if content is not None and self.ttl_seconds and time.monotonic() - content.cached_at > self.ttl_seconds:
+                del self._contents[(exam_id, version)]
+                content = None
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return content
+
+    def put(self, content: ExamContent) -> None:
+        with self._lock:
+            self._contents[(content.exam_id, content.version)] = content
+
+    def invalidate(self, exam_id: Optional[UUID]) -> None:
+        """Скидає весь вміст іспиту (живий і знімків)."""
+        if exam_id is None:
+            return
+        with self._lock:
+            for key in [k for k in self._contents if k[0] == exam_id]:
+                del self._contents[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._contents.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Спільний для процесу кеш вмісту іспитів
+exam_content_cache = ExamContentCache()
+exam_invalidation.exam_content_changed.connect(exam_content_cache.invalidate)
+exam_invalidation.exam_settings_changed.connect(exam_content_cache.invalidate)
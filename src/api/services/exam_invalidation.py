@@ -0,0 +1,62 @@
+"""
+Сповіщення про зміни іспитів і курсів для in-process кешів.
+
+Репозиторії надсилають події після коміту, а кеші підписуються на них у
+своїх модулях: ключі відповідей (grading_service), вміст іспиту
+(exam_content_cache), параметри старту (exam_start_cache) та індекси
+плагіату (plagiarism_service). Так репозиторії не імпортують сервіси й не
+тягнуть за собою стек перевірки плагіату (sklearn), а кеш, модуль якого в
+процесі не завантажено, і скидати не потрібно.
+"""
+import logging
+import threading
+from typing import Any, Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class ExamEvent:
+    """Подія з підписниками; помилка одного підписника не зупиняє інших."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._receivers: List[Callable[[Any], None]] = []
+
+    def connect(self, receiver: Callable[[Any], None]) -> Callable[[Any], None]:
+        with self._lock:
+            if receiver not in self._receivers:
+                self._receivers.append(receiver)
+        return receiver
+
+    def disconnect(self, receiver: Callable[[Any], None]) -> None:
+        with self._lock:
+            if receiver in self._receivers:
+                self._receivers.remove(receiver)
+
+    def send(self, key: Any) -> None:
+        if key is None:
+            return
+        with self._lock:
+            receivers = list(self._receivers)
+        for receiver in receivers:
+            try:
+                receiver(key)
+            except Exception:
+                logger.exception(f"Invalidation receiver of {self.name} failed for {key}")
+
+
+# Змінилися питання, варіанти чи бали іспиту, або іспит видалено (exam_id)
+exam_content_changed = ExamEvent("exam_content_changed")
+
+# Змінилися параметри чи статус іспиту без зміни питань (exam_id)
+exam_settings_changed = ExamEvent("exam_settings_changed")
+
+# Створено нову версію знімка іспиту (exam_id)
+exam_snapshot_added = ExamEvent("exam_snapshot_added")
+
+# Питання видалено (question_id)
+question_deleted = ExamEvent("question_deleted")
+
+# Курс видалено або з нього прибрано іспит (course_id)
+course_exams_changed = ExamEvent("course_exams_changed")
@@ -1,15 +1,16 @@
+from typing import Optional
 from uuid import UUID
 from sqlalchemy.orm import Session
 from src.models.attempts import Answer
 from src.models.exams import Question, QuestionType
-from src.models.users import User
+from src.utils.auth import Principal
 from src.api.repositories.attempts_repository import AttemptsRepository
 from src.api.repositories.weights_repository import WeightsRepository
 from src.api.repositories.flagged_answers_repository import FlaggedAnswersRepository
 from src.api.repositories.plagiarism_repository import PlagiarismRepository
 from src.api.errors.app_errors import NotFoundError
-from src.utils.largest_remainder import distribute_largest_remainder
 from src.api.services.grading_service import GradingService
+from src.api.services.exam_snapshot_service import ExamSnapshotService
 
 # Імпортуємо схеми Pydantic для відповіді
 from src.api.schemas.exam_review import (
@@ -29,7 +30,7 @@ from src.api.schemas.exam_review import (
 class ExamReviewService:
     # Конструктор не потрібен, сервіс залишається stateless
 
-    def get_attempt_review(self, attempt_id: UUID, db: Session, current_user: User = None) -> dict:
+    def get_attempt_review(self, attempt_id: UUID, db: Session, current_user: Optional[Principal] = None) -> dict:
         """
         Готує дані для огляду спроби з коректним розрахунком балів,
         масштабованих до 100-бальної системи.
@@ -49,8 +50,15 @@ class ExamReviewService:
             current_user, attempt, attempts_repo
         )
         
-        weights_map = weights_repo.get_all_weights()
-        final_points_map = self._calculate_final_points_map(attempt, weights_map)
+        # Бали спроби рахуються за версією іспиту, з якою її розпочато
+        final_points_map = None
+        if attempt.exam_version is not None:
+            final_points_map = ExamSnapshotService.get_points_distribution(
+                db, attempt.exam_id, attempt.exam_version
+            )
+        if final_points_map is None:
+            weights_map = weights_repo.get_all_weights()
+            final_points_map = self._calculate_final_points_map(attempt, weights_map)
         student_answers_map = {answer.question_id: answer for answer in attempt.answers}
         question_text_offsets = self._build_question_text_offsets(
             attempt.exam.questions, student_answers_map
@@ -84,7 +92,7 @@ class ExamReviewService:
     
     @staticmethod
     def _should_show_correct_answers(
-        current_user: User, attempt, attempts_repo
+        current_user: Optional[Principal], attempt, attempts_repo
     ) -> bool:
         """Визначає, чи потрібно показувати правильні відповіді."""
         if not current_user or not hasattr(current_user, 'role'):
@@ -102,25 +110,11 @@ class ExamReviewService:
     @staticmethod
     def _calculate_final_points_map(attempt, weights_map: dict) -> dict:
         """Розраховує фінальні бали для кожного питання."""
-        total_exam_weight = sum(
-            weights_map.get(q.question_type, 1) for q in attempt.exam.questions
-        )
-        
-        if total_exam_weight == 0:
-            points_per_weight_unit = 0.0
-        else:
-            points_per_weight_unit = 100.0 / total_exam_weight
-        
-        true_points_map = {
-            q.id: weights_map.get(q.question_type, 1) * points_per_weight_unit
-            for q in attempt.exam.questions
-        }
-        
-        return distribute_largest_remainder(true_points_map, target_total=100)
+        return ExamSnapshotService.points_distribution(attempt.exam.questions, weights_map)
     
     @staticmethod
     def _build_question_text_offsets(questions, student_answers_map: dict) -> dict:
-        """Будує мапу для перерахунку ranges з об'єднаного тексту на окремі питання."""
+        """Будує мапу для перерахунку ranges з об'єднаного тексту на окремі питання (старі перевірки без оцінок по питаннях)."""
         long_answer_questions = sorted(
             [q for q in questions if q.question_type == QuestionType.long_answer],
             key=lambda q: q.position
@@ -164,7 +158,8 @@ class ExamReviewService:
                 plagiarism_ranges = self._extract_plagiarism_ranges_for_question(
                     student_answer.answer_text or "",
                     plagiarism_matches,
-                    question_text_offsets.get(question.id)
+                    question_text_offsets.get(question.id),
+                    question_id=question.id,
                 )
             
             question_data = self._build_question_review_data(
@@ -310,15 +305,20 @@ class ExamReviewService:
         )
     
     @staticmethod
-    def _extract_plagiarism_ranges_for_question(question_text: str, matches: list, question_offset: tuple = None) -> list:
+    def _extract_plagiarism_ranges_for_question(
+        question_text: str, matches: list, question_offset: tuple = None, question_id: UUID = None
+    ) -> list:
         """
         Витягує ranges (start, end) сплагіачених частин тексту з matches для окремого питання.
-        Перераховує ranges з об'єднаного тексту всіх питань на окреме питання.
+        Перевірки, що зберігають оцінки по питаннях (matches[*]["questions"]), вже містять
+        ranges у координатах відповіді. Для старих перевірок ranges перераховуються
+        з об'єднаного тексту всіх питань на окреме питання.
         
         Args:
             question_text: Текст відповіді на окреме питання
             matches: Список matches з plagiarism_check.details
             question_offset: Tuple (start_offset, end_offset) позиції питання в об'єднаному тексті
+            question_id: ID питання (для перевірок з оцінками по питаннях)
         """
         if not matches or not question_text:
             return []
@@ -326,6 +326,17 @@ class ExamReviewService:
         import logging
         logger = logging.getLogger(__name__)
         
+        if question_id is not None and any("questions" in match for match in matches):
+            question_ranges = [
+                r
+                for match in matches
+                for entry in match.get("questions", [])
+                if entry.get("question_id") == str(question_id)
+                for r in entry.get("ranges", [])
+            ]
+            question_ranges.sort(key=lambda r: r.get("start", 0))
+            return ExamReviewService._merge_overlapping_ranges(question_ranges, question_text)
+        
         all_ranges = ExamReviewService._extract_ranges_from_matches(matches)
         if not all_ranges:
             return []
@@ -465,17 +476,14 @@ class ExamReviewService:
     def _build_short_answer_data(base_data, question, student_answer, show_correct_answers=True):
         # Отримуємо всі правильні відповіді
         correct_texts = [opt.text for opt in question.options if opt.is_correct]
-        # Визначаємо, чи питання числове
-        is_numeric = GradingService._is_numeric_question(correct_texts)
-        # Нормалізуємо правильні відповіді
-        correct_answers = {GradingService._normalize_short_answer(text, is_numeric) for text in correct_texts}
+        # Той самий ключ і порівняння (з числовим допуском), що й при оцінюванні
+        correct_key = GradingService._build_short_answer_key(correct_texts)
         
         student_ans_text = student_answer.answer_text if student_answer else ""
-        # Нормалізуємо відповідь студента для перевірки
-        normalized_student_answer = GradingService._normalize_short_answer(student_ans_text, is_numeric)
         earned_points = 0
         
-        if normalized_student_answer in correct_answers:
+        _, is_correct = GradingService._score_short_answer(base_data["points"], student_ans_text, correct_key)
+        if is_correct:
             earned_points = base_data["points"]
         
         # Приховуємо правильну відповідь, якщо не дозволено показувати правильні відповіді
@@ -0,0 +1,132 @@
+"""
+Версійовані знімки опублікованих іспитів (таблиця exam_snapshots).
+
+При публікації вміст іспиту матеріалізується в один незмінний JSON-рядок:
+питання для сторінки складання (як у AttemptsRepository.build_exam_questions),
+розподіл 100 балів між питаннями (distribute_largest_remainder) і
+скомпільований ключ відповідей (CompiledAnswerKey.to_json). Спроба запам'ятовує
+версію, з якою її розпочато (attempts.exam_version), тож деталі спроби,
+оцінювання й огляд читають один рядок замість графа ORM-об'єктів.
+Редагування опублікованого іспиту створює нову версію: уже розпочаті спроби
+лишаються на своїй, нові отримують останню. Видаляти питання й варіанти
+можна лише в чернетці — старі версії посилаються на них (ExamsService._ensure_draft).
+"""
+import logging
+from typing import Any, Dict, Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+from src.api.errors.app_errors import ConflictError, NotFoundError
+from src.api.repositories.attempts_repository import AttemptsRepository
+from src.api.repositories.exams_repository import ExamsRepository
+from src.api.repositories.weights_repository import WeightsRepository
+from src.api.services.grading_service import GradingService
+from src.models.exams import Exam, ExamStatusEnum, Question
+from src.utils.largest_remainder import distribute_largest_remainder
+
+logger = logging.getLogger(__name__)
+
+# Скільки разів пробувати наступний номер версії, якщо його паралельно зайняв інший запит
+MAX_VERSION_RETRIES = 3
+
+
+class ExamSnapshotService:
+    def __init__(self, grading_service: Optional[GradingService] = None) -> None:
+        self.grading_service = grading_service or GradingService()
+
+    @staticmethod
+    def points_distribution(questions: Iterable[Question], weights_map: Dict[Any, int]) -> Dict[UUID, int]:
+        """Розподіл 100 балів між питаннями пропорційно вагам їх типів (метод найбільшого залишку)."""
+        questions = list(questions)
+        total_exam_weight = sum(weights_map.get(q.question_type, 1) for q in questions)
+
+        if total_exam_weight == 0:
+            points_per_weight_unit = 0.0
+        else:
+            points_per_weight_unit = 100.0 / total_exam_weight
+
+        true_points_map = {
+            q.id: weights_map.get(q.question_type, 1) * points_per_weight_unit
+            for q in questions
+        }
+        return distribute_largest_remainder(true_points_map, target_total=100)
+
+    def build_content(self, db: Session, exam: Exam) -> Dict[str, Any]:
+        """Вміст знімка з поточних питань іспиту (exam з завантаженими питаннями та варіантами)."""
+        key = self.grading_service.compile_answer_key(db, exam)
+        points = self.points_distribution(exam.questions, WeightsRepository(db).get_all_weights())
+        return {
+            "questions": AttemptsRepository(db).build_exam_questions(exam.id),
+            "points_distribution": {str(question_id): value for question_id, value in points.items()},
+            "key": key.to_json(),
+        }
+
+    def create_version(self, db: Session, exam_id: UUID, first_only: bool = False) -> int:
+        """
+        Матеріалізує поточний вміст іспиту як нову версію знімка і комітить.
+        Викликається поза іншими незакоміченими змінами сесії.
+        З first_only створюється лише перша версія: якщо знімок уже є (або його
+        паралельно створив інший запит), повертається остання версія.
+        """
+        repo = ExamsRepository(db)
+        if first_only:
+            latest = repo.get_latest_snapshot_version(exam_id)
+            if latest is not None:
+                return latest
+
+        exam = (
+            db.query(Exam)
+            .options(
+                selectinload(Exam.questions).selectinload(Question.options),
+                selectinload(Exam.questions).selectinload(Question.matching_options),
+            )
+            .filter(Exam.id == exam_id)
+            .one_or_none()
+        )
+        if exam is None:
+            raise NotFoundError("Exam not found")
+
+        content = self.build_content(db, exam)
+        for _ in range(MAX_VERSION_RETRIES):
+            version = (repo.get_latest_snapshot_version(exam_id) or 0) + 1
+            try:
+                repo.add_snapshot(exam_id, version, content)
+            except IntegrityError:
+                db.rollback()
+                if first_only:
+                    return repo.get_latest_snapshot_version(exam_id)
+                continue
+            logger.info(f"Exam {exam_id} snapshot version {version} created")
+            return version
+        raise ConflictError("Не вдалося створити нову версію іспиту, спробуйте ще раз")
+
+    def current_version(self, db: Session, exam: Exam) -> Optional[int]:
+        """
+        Остання версія знімка для нових спроб. Опублікований іспит без знімка
+        (опублікований до появи знімків) отримує першу версію при першому запиті;
+        при одночасних перших стартах її створює лише один запит.
+        Чернетка знімків не має — спроби читають живі питання (None).
+        """
+        version = ExamsRepository(db).get_latest_snapshot_version(exam.id)
+        if version is None and exam.status != ExamStatusEnum.draft:
+            version = self.create_version(db, exam.id, first_only=True)
+        return version
+
+    def refresh_if_published(self, db: Session, exam_id: Optional[UUID]) -> Optional[int]:
+        """Після редагування опублікованого іспиту створює нову версію знімка."""
+        if exam_id is None:
+            return None
+        status = db.query(Exam.status).filter(Exam.id == exam_id).scalar()
+        if status is None or status == ExamStatusEnum.draft:
+            return None
+        return self.create_version(db, exam_id)
+
+    @staticmethod
+    def get_points_distribution(db: Session, exam_id: UUID, version: int) -> Optional[Dict[UUID, int]]:
+        """Розподіл балів версії знімка (None, якщо знімка немає)."""
+        content = ExamsRepository(db).get_snapshot_content(exam_id, version)
+        if content is None:
+            return None
+        return {UUID(question_id): value for question_id, value in content["points_distribution"].items()}
@@ -0,0 +1,119 @@
+"""
+Кеш перевірок допуску для старту спроби (ExamsService.start_attempt).
+
+У момент початку іспиту сотні студентів одночасно стартують спроби того
+самого іспиту: параметри іспиту (тривалість, ліміт спроб, версія знімка)
+однакові для всіх, а статус учасника змінюється рідко. Обидва читаються з БД
+один раз і тримаються ExamStartCache; ліміт спроб при цьому перевіряється
+не за кешем, а атомарно в самому INSERT спроби
+(AttemptsRepository.create_attempt_within_limit).
+
+Кеш скидається за подіями exam_invalidation від ExamsRepository (редагування,
+публікація, видалення іспиту, нова версія знімка) та ExamParticipantsRepository
+(додавання, видалення, відвідуваність учасника); TTL обмежує застарілість
+в інших процесах.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+
+from src.api.services import exam_invalidation
+from src.core.config import EXAM_START_CACHE_TTL_SECONDS
+from src.models.exam_participants import AttendanceStatusEnum
+
+# Верхня межа кількості закешованих учасників; при переповненні кеш учасників очищується
+MAX_CACHED_PARTICIPANTS = 100_000
+
+
+@dataclass
+class ExamStartInfo:
+    """Параметри іспиту, потрібні для створення спроби."""
+    exam_id: UUID
+    duration_minutes: int
+    max_attempts: int
+    exam_version: Optional[int]
+    cached_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class ParticipantInfo:
+    """Стан учасника іспиту (None у is_active — користувач не зареєстрований)."""
+    is_active: Optional[bool]
+    attendance_status: Optional[AttendanceStatusEnum]
+    cached_at: float = field(default_factory=time.monotonic)
+
+
+class ExamStartCache:
+    """Потокобезпечний in-process кеш ExamStartInfo та ParticipantInfo з лічильниками hits/misses."""
+    def __init__(self, ttl_seconds: Optional[float] = EXAM_START_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._exams: Dict[UUID, ExamStartInfo] = {}
+        self._participants: Dict[Tuple[UUID, UUID], ParticipantInfo] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.ttl_seconds)
+
+    def get_exam(self, exam_id: UUID) -> Optional[ExamStartInfo]:
+        with self._lock:
+            return self._lookup(self._exams, exam_id)
+
+    def put_exam(self, info: ExamStartInfo) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._exams[info.exam_id] = info
+
+    def get_participant(self, exam_id: UUID, user_id: UUID) -> Optional[ParticipantInfo]:
+        with self._lock:
+            return self._lookup(self._participants, (exam_id, user_id))
+
+    def put_participant(self, exam_id: UUID, user_id: UUID, info: ParticipantInfo) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if len(self._participants) >= MAX_CACHED_PARTICIPANTS:
+                self._participants.clear()
+            self._participants[(exam_id, user_id)] = info
+
+    def invalidate(self, exam_id: Optional[UUID]) -> None:
+        """Скидає параметри іспиту (учасників скидає invalidate_participant)."""
+        if exam_id is None:
+            return
+        with self._lock:
+            self._exams.pop(exam_id, None)
+
+    def invalidate_participant(self, exam_id: UUID, user_id: UUID) -> None:
+        with self._lock:
+            self._participants.pop((exam_id, user_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._exams.clear()
+            self._participants.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _lookup(self, entries: dict, key):
+        # Викликається під self._lock
+        entry = entries.get(key)
+        if entry is not None and time.monotonic() - entry.cached_at > self.ttl_seconds:
+            del entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+
+# Спільний для процесу кеш допуску до старту спроб
+exam_start_cache = ExamStartCache()
+exam_invalidation.exam_content_changed.connect(exam_start_cache.invalidate)
+exam_invalidation.exam_settings_changed.connect(exam_start_cache.invalidate)
+exam_invalidation.exam_snapshot_added.connect(exam_start_cache.invalidate)
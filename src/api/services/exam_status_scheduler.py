@@ -1,11 +1,17 @@
 """
 Сервіс для автоматичного оновлення статусів іспитів.
-Змінює статус з 'published' на 'open', коли настає час початку іспиту.
+Змінює статус з 'published' на 'open', коли настає час початку іспиту,
+а після закриття іспиту здає незавершені спроби та оцінює їх одним проходом.
 """
 import logging
 from datetime import datetime, timezone
+from typing import List, Optional
+from uuid import UUID
 from sqlalchemy.orm import Session
+from src.api.background.answer_buffer import AnswerWriteBuffer, answer_buffer as default_answer_buffer
 from src.api.database import SessionLocal
+from src.api.services.bulk_grading_service import BulkGradingService
+from src.models.attempts import Attempt, AttemptStatus
 from src.models.exams import Exam, ExamStatusEnum
 
 logger = logging.getLogger(__name__)
@@ -15,7 +21,8 @@ def update_exam_statuses():
     """
     Перевіряє всі іспити зі статусом 'published' та змінює їх статус на 'open',
     якщо час початку (start_at) вже настав.
-    Також змінює статус на 'closed', якщо час завершення (end_at) вже пройшов.
+    Також змінює статус на 'closed', якщо час завершення (end_at) вже пройшов,
+    і запускає масове оцінювання спроб закритих іспитів.
     """
     db: Session = SessionLocal()
     try:
@@ -51,6 +58,15 @@ def update_exam_statuses():
             logger.info(f"Updated exam statuses: {opened_count} opened, {closed_count} closed")
         else:
             logger.debug("No exam statuses to update")
+
+        # Закриті раніше іспити, де лишилися незавершені спроби (відкладене оцінювання або подовжений час)
+        postponed = [
+            exam_id for (exam_id,) in db.query(Attempt.exam_id).join(Exam, Exam.id == Attempt.exam_id).filter(
+                Exam.status == ExamStatusEnum.closed,
+                Attempt.status == AttemptStatus.in_progress,
+            ).distinct().all()
+        ]
+        grade_closed_exams(db, list(dict.fromkeys([exam.id for exam in exams_to_close] + postponed)))
             
     except Exception as e:
         logger.error(f"Error updating exam statuses: {e}", exc_info=True)
@@ -58,3 +74,33 @@ def update_exam_statuses():
     finally:
         db.close()
 
+
+def grade_closed_exams(
+    db: Session,
+    exam_ids: List[UUID],
+    grading_service: Optional[BulkGradingService] = None,
+    answer_buffer: Optional[AnswerWriteBuffer] = None,
+) -> int:
+    """
+    Здає та оцінює спроби щойно закритих іспитів (BulkGradingService).
+    Перед оцінюванням скидає буфер автозбережень, щоб врахувати всі підтверджені відповіді;
+    спроби, збереження яких записати не вдалося, не оцінюються — їх оцінить
+    наступний запуск планувальника (update_exam_statuses), коли буфер скинеться.
+    Помилка на одному іспиті не заважає іншим. Повертає кількість оцінених спроб.
+    """
+    if not exam_ids:
+        return 0
+    answer_buffer = answer_buffer if answer_buffer is not None else default_answer_buffer
+    answer_buffer.flush()
+    unflushed = answer_buffer.pending_attempt_ids()
+    if unflushed:
+        logger.warning(f"Postponing grading of {len(unflushed)} attempts with unflushed answers")
+    grading_service = grading_service or BulkGradingService()
+    graded = 0
+    for exam_id in exam_ids:
+        try:
+            graded += grading_service.grade_exam(db, exam_id, skip_attempt_ids=unflushed)
+        except Exception as e:
+            logger.error(f"Error grading attempts of closed exam {exam_id}: {e}", exc_info=True)
+            db.rollback()
+    return graded
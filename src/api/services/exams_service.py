@@ -1,10 +1,13 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from uuid import UUID
+from typing import Optional
 import uuid as uuid_lib
 from src.api.repositories.exams_repository import ExamsRepository
 from src.api.repositories.attempts_repository import AttemptsRepository
 from src.api.repositories.courses_repository import CoursesRepository
+from src.api.services.exam_snapshot_service import ExamSnapshotService
+from src.api.services.exam_start_cache import ExamStartInfo, ParticipantInfo, exam_start_cache
 from src.api.schemas.exams import Exam, ExamCreate, ExamUpdate, CourseExamsPage, ExamInList, ExamWithQuestions
 from src.api.schemas.attempts import Attempt
 from src.api.errors.app_errors import NotFoundError, ConflictError
@@ -147,7 +150,9 @@ class ExamsService:
         exam = repo.get(exam_id)
         if not exam:
             raise NotFoundError(EXAM_NOT_FOUND_MESSAGE)
-        return repo.create_question(exam_id, payload)
+        question = repo.create_question(exam_id, payload)
+        ExamSnapshotService().refresh_if_published(db, exam_id)
+        return question
 
     @staticmethod
     def update_question(db: Session, question_id: UUID, patch: dict) -> object:
@@ -155,11 +160,26 @@ class ExamsService:
         updated = repo.update_question(question_id, patch)
         if not updated:
             raise NotFoundError("Question not found")
+        ExamSnapshotService().refresh_if_published(db, repo.get_exam_id_for_question(question_id))
         return updated
 
+    @staticmethod
+    def _ensure_draft(repo: ExamsRepository, exam_id: Optional[UUID], message: str) -> None:
+        """
+        Видаляти питання й варіанти можна лише в чернетці: розпочаті спроби
+        опублікованого іспиту посилаються на них зі своєї версії знімка
+        (автозбереження, обрані варіанти, бали у ключі відповідей).
+        """
+        exam_status = repo.get_status(exam_id) if exam_id else None
+        if exam_status is not None and exam_status != ExamStatusEnum.draft:
+            raise ConflictError(message)
+
     @staticmethod
     def delete_question(db: Session, question_id: UUID) -> None:
         repo = ExamsRepository(db)
+        ExamsService._ensure_draft(
+            repo, repo.get_exam_id_for_question(question_id), "Питання опублікованого іспиту не можна видалити"
+        )
         ok = repo.delete_question(question_id)
         if not ok:
             raise NotFoundError("Question not found")
@@ -167,7 +187,9 @@ class ExamsService:
     @staticmethod
     def create_option(db: Session, question_id: UUID, payload) -> object:
         repo = ExamsRepository(db)
-        return repo.create_option(question_id, payload)
+        option = repo.create_option(question_id, payload)
+        ExamSnapshotService().refresh_if_published(db, repo.get_exam_id_for_question(question_id))
+        return option
 
     @staticmethod
     def update_option(db: Session, option_id: UUID, patch: dict) -> object:
@@ -175,11 +197,15 @@ class ExamsService:
         updated = repo.update_option(option_id, patch)
         if not updated:
             raise NotFoundError("Option not found")
+        ExamSnapshotService().refresh_if_published(db, repo.get_exam_id_for_option(option_id))
         return updated
 
     @staticmethod
     def delete_option(db: Session, option_id: UUID) -> None:
         repo = ExamsRepository(db)
+        ExamsService._ensure_draft(
+            repo, repo.get_exam_id_for_option(option_id), "Варіант відповіді опублікованого іспиту не можна видалити"
+        )
         ok = repo.delete_option(option_id)
         if not ok:
             raise NotFoundError("Option not found")
@@ -210,6 +236,8 @@ class ExamsService:
         updated = repo.update(exam_id, patch)
         if not updated:
             raise NotFoundError("Exam not found for update")
+        # Іспит, що перестав бути чернеткою через оновлення статусу, отримує першу версію знімка
+        ExamSnapshotService().current_version(db, updated)
         return updated
     
     @staticmethod
@@ -219,6 +247,9 @@ class ExamsService:
         updated = repo.publish(exam_id)
         if not updated:
             raise NotFoundError("Exam not found for publish")
+        # Фіксуємо вміст опублікованого іспиту як нову версію знімка
+        ExamSnapshotService().create_version(db, exam_id)
+        db.refresh(updated)
         return updated
 
     @staticmethod
@@ -286,36 +317,64 @@ class ExamsService:
 
     @staticmethod
     def start_attempt(db: Session, exam_id: UUID, user_id: UUID) -> Attempt:
-        exams_repo = ExamsRepository(db)
-        exam = exams_repo.get(exam_id)
-        attempts_repo = AttemptsRepository(db)
-
-        if not exam:
+        """
+        Старт спроби. Параметри іспиту й статус учасника беруться з exam_start_cache
+        (у пік старту іспиту БД для них не читається), а ліміт спроб перевіряється
+        атомарно в одному INSERT разом зі створенням спроби.
+        """
+        exam_info = ExamsService._get_start_info(db, exam_id)
+        if not exam_info:
             raise NotFoundError(EXAM_NOT_FOUND_MESSAGE)
 
         # Дозвіл лише для учасників іспиту та не "відсутніх"
-        participants_repo = ExamParticipantsRepository(db)
-        ep = participants_repo.get(exam_id, user_id)
-        if not ep or not ep.is_active:
+        participant = ExamsService._get_participant_info(db, exam_id, user_id)
+        if not participant.is_active:
             raise ConflictError("Користувач не зареєстрований як учасник іспиту")
 
-        if ep.attendance_status == AttendanceStatusEnum.absent:
+        if participant.attendance_status == AttendanceStatusEnum.absent:
             raise ConflictError("Користувача позначено як відсутнього — доступ до іспиту заборонено")
 
-        # Перевірка ліміту спроб
-        user_attempts_count = attempts_repo.get_user_attempt_count(
+        # Створення спроби, закріпленої за поточною версією знімка іспиту, з перевіркою ліміту спроб
+        attempt = AttemptsRepository(db).create_attempt_within_limit(
+            exam_id=exam_id,
             user_id=user_id,
-            exam_id=exam_id
+            duration_minutes=exam_info.duration_minutes,
+            max_attempts=exam_info.max_attempts,
+            exam_version=exam_info.exam_version,
         )
-        if user_attempts_count >= exam.max_attempts:
-            raise ConflictError(f"Maximum number of attempts ({exam.max_attempts}) reached for this exam.")
+        if attempt is None:
+            raise ConflictError(f"Maximum number of attempts ({exam_info.max_attempts}) reached for this exam.")
+        return attempt
 
-        # Створення спроби
-        return attempts_repo.create_attempt(
+    @staticmethod
+    def _get_start_info(db: Session, exam_id: UUID) -> Optional[ExamStartInfo]:
+        info = exam_start_cache.get_exam(exam_id)
+        if info is not None:
+            return info
+        exam = ExamsRepository(db).get(exam_id)
+        if not exam:
+            return None
+        info = ExamStartInfo(
             exam_id=exam_id,
-            user_id=user_id,
-            duration_minutes=exam.duration_minutes
+            duration_minutes=exam.duration_minutes,
+            max_attempts=exam.max_attempts,
+            exam_version=ExamSnapshotService().current_version(db, exam),
+        )
+        exam_start_cache.put_exam(info)
+        return info
+
+    @staticmethod
+    def _get_participant_info(db: Session, exam_id: UUID, user_id: UUID) -> ParticipantInfo:
+        info = exam_start_cache.get_participant(exam_id, user_id)
+        if info is not None:
+            return info
+        ep = ExamParticipantsRepository(db).get(exam_id, user_id)
+        info = ParticipantInfo(
+            is_active=ep.is_active if ep else None,
+            attendance_status=ep.attendance_status if ep else None,
         )
+        exam_start_cache.put_participant(exam_id, user_id, info)
+        return info
 
     @staticmethod
     def get_exams_for_course(db: Session, course_id: UUID) -> CourseExamsPage:
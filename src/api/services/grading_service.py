@@ -1,8 +1,19 @@
+import math
+import threading
+import time
 from collections import defaultdict
-from typing import Dict, Any, Tuple
-from sqlalchemy.orm import Session
+from typing import Dict, Any, Iterable, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy.orm import Session, selectinload
+from src.api.errors.app_errors import NotFoundError
+from src.api.services import exam_invalidation
+from src.core.config import ANSWER_KEY_CACHE_TTL_SECONDS
 from src.models.attempts import Attempt, Answer
-from src.models.exams import Exam, Question, QuestionType, QuestionTypeWeight
+from src.models.exams import Exam, ExamSnapshot, Question, QuestionType, QuestionTypeWeight
+
+# Допуск для числових short_answer: "42", "42.0" та "4.2e1" — та сама відповідь
+NUMERIC_REL_TOLERANCE = 1e-9
+NUMERIC_ABS_TOLERANCE = 1e-9
 
 class GradingResult:
     """Проста структура для повернення результатів оцінювання."""
@@ -13,7 +24,128 @@ class GradingResult:
         self.pending_count = 0
         self.total_answers_given = 0
 
+class CompiledQuestionKey:
+    """Ключ одного питання: тип, бали та правильні відповіді у вигляді незмінних структур."""
+    def __init__(self, question_type: QuestionType, points: float, correct: Dict[str, Any]):
+        self.question_type = question_type
+        self.points = points
+        self.correct = correct
+
+class CompiledAnswerKey:
+    """
+    Скомпільований ключ відповідей іспиту: усе, що потрібно для оцінювання
+    спроби, без звернень до ORM-об'єктів питань і без запитів до БД.
+    """
+    def __init__(self, exam_id: UUID, questions: Dict[UUID, CompiledQuestionKey], version: Optional[int] = None):
+        self.exam_id = exam_id
+        self.version = version
+        self.questions = questions
+        self.total_points = float(sum(q.points for q in questions.values()))
+        self.compiled_at = time.monotonic()
+
+    def to_json(self) -> Dict[str, Any]:
+        """Ключ у JSON-сумісному вигляді (для знімка іспиту)."""
+        questions: Dict[str, Any] = {}
+        for question_id, q in self.questions.items():
+            correct: Dict[str, Any] = {}
+            for name, value in q.correct.items():
+                if isinstance(value, (frozenset, set)):
+                    value = sorted(str(v) for v in value)
+                elif isinstance(value, tuple):
+                    value = list(value)
+                correct[name] = value
+            questions[str(question_id)] = {
+                "question_type": q.question_type.value,
+                "points": q.points,
+                "correct": correct,
+            }
+        return questions
+
+    @classmethod
+    def from_json(cls, exam_id: UUID, data: Dict[str, Any], version: Optional[int] = None) -> "CompiledAnswerKey":
+        """Відновлює ключ, збережений to_json: структури знову незмінні, id варіантів — UUID."""
+        questions: Dict[UUID, CompiledQuestionKey] = {}
+        for question_id, q in data.items():
+            correct = dict(q["correct"])
+            if "options" in correct:
+                correct["options"] = frozenset(UUID(v) for v in correct["options"])
+            if "texts" in correct:
+                correct["texts"] = frozenset(correct["texts"])
+            if "numbers" in correct:
+                correct["numbers"] = tuple(correct["numbers"])
+            questions[UUID(question_id)] = CompiledQuestionKey(QuestionType(q["question_type"]), q["points"], correct)
+        return cls(exam_id, questions, version)
+
+class AnswerKeyCache:
+    """
+    Потокобезпечний in-process кеш скомпільованих ключів по (exam_id, version).
+    Ключі знімків (version задано) незмінні; ключ живих питань (version=None)
+    скидається за подією exam_invalidation.exam_content_changed (зміна питань
+    і варіантів), а TTL обмежує застарілість у інших процесах, де редагування
+    не відбувалося.
+
+    Кожен invalidate збільшує лічильник поколінь іспиту. Читач бере покоління
+    до запиту в БД і передає його в put: ключ, скомпільований з даних до
+    редагування, відкидається, а не перезаписує вже скинутий кеш.
+    """
+    def __init__(self, ttl_seconds: Optional[float] = ANSWER_KEY_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._keys: Dict[Tuple[UUID, Optional[int]], CompiledAnswerKey] = {}
+        self._generations: Dict[UUID, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get(self, exam_id: UUID, version: Optional[int] = None) -> Optional[CompiledAnswerKey]:
+        with self._lock:
+            key = self._keys.get((exam_id, version))
+            if key is not None and self.ttl_seconds and time.monotonic() - key.compiled_at > self.ttl_seconds:
+                del self._keys[(exam_id, version)]
+                key = None
+            if key is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return key
+
+    def generation(self, exam_id: UUID) -> int:
+        with self._lock:
+            return self._generations.get(exam_id, 0)
+
+    def put(self, key: CompiledAnswerKey, generation: Optional[int] = None) -> bool:
+        """Кладе ключ у кеш; повертає False, якщо після `generation` іспит уже редагували."""
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key.exam_id, 0):
+                return False
+            self._keys[(key.exam_id, key.version)] = key
+            return True
+
+    def invalidate(self, exam_id: Optional[UUID]) -> None:
+        """Скидає всі ключі іспиту (живий і знімків) і починає нове покоління."""
+        if exam_id is None:
+            return
+        with self._lock:
+            self._generations[exam_id] = self._generations.get(exam_id, 0) + 1
+            for cache_key in [k for k in self._keys if k[0] == exam_id]:
+                del self._keys[cache_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+            self.hits = 0
+            self.misses = 0
+
+# Спільний для процесу кеш ключів відповідей
+answer_key_cache = AnswerKeyCache()
+exam_invalidation.exam_content_changed.connect(answer_key_cache.invalidate)
+
 class GradingService:
+    def __init__(self, key_cache: Optional[AnswerKeyCache] = None):
+        self.key_cache = key_cache if key_cache is not None else answer_key_cache
+
     @staticmethod
     def _normalize_short_answer(text: str, is_numeric: bool = False) -> str:
         """
@@ -67,89 +199,197 @@ class GradingService:
         for q in exam.questions:
             qt = q.question_type
             if qt in (QuestionType.single_choice, QuestionType.multi_choice):
-                data[q.id]["options"] = {opt.id for opt in q.options if getattr(opt, "is_correct", False)}
+                data[q.id]["options"] = frozenset(opt.id for opt in q.options if getattr(opt, "is_correct", False))
             elif qt == QuestionType.short_answer:
                 # Отримуємо всі правильні відповіді
                 correct_texts = [opt.text for opt in q.options if getattr(opt, "is_correct", False)]
-                # Визначаємо, чи питання числове
-                is_numeric = self._is_numeric_question(correct_texts)
-                # Нормалізуємо всі правильні відповіді
-                data[q.id]["texts"] = {self._normalize_short_answer(text, is_numeric) for text in correct_texts}
-                data[q.id]["is_numeric"] = is_numeric
+                data[q.id].update(self._build_short_answer_key(correct_texts))
             elif qt == QuestionType.matching:
                 data[q.id]["pairs"] = {str(p.id): str(p.id) for p in q.matching_options}
         return data
 
-    @staticmethod
-    def _points(q: Question) -> float:
-        return float(q.points or 0.0)
+    @classmethod
+    def _build_short_answer_key(cls, correct_texts: Iterable[str]) -> Dict[str, Any]:
+        """Нормалізовані правильні відповіді short_answer (+ числові значення для числових питань)."""
+        correct_texts = list(correct_texts)
+        # Визначаємо, чи питання числове
+        is_numeric = cls._is_numeric_question(correct_texts)
+        # Нормалізуємо всі правильні відповіді
+        texts = frozenset(cls._normalize_short_answer(text, is_numeric) for text in correct_texts)
+        return {
+            "texts": texts,
+            "is_numeric": is_numeric,
+            "numbers": tuple(float(t) for t in texts) if is_numeric else (),
+        }
 
-    @staticmethod
-    def _grade_long_answer(result: GradingResult, *_):
+    # ---------- Скомпільований ключ відповідей ----------
+
+    def get_answer_key(self, db: Session, exam_id: UUID, version: Optional[int] = None) -> CompiledAnswerKey:
+        """
+        Ключ відповідей іспиту з кешу. Для версії знімка ключ читається з одного
+        рядка exam_snapshots; для живих питань (version=None) питання з варіантами
+        завантажуються двома-трьома запитами, і ключ компілюється один раз.
+        """
+        key = self.key_cache.get(exam_id, version)
+        if key is not None:
+            return key
+        # Покоління до читання з БД: ключ зі старих даних не потрапить у кеш після редагування
+        generation = self.key_cache.generation(exam_id)
+
+        if version is not None:
+            content = (
+                db.query(ExamSnapshot.content)
+                .filter(ExamSnapshot.exam_id == exam_id, ExamSnapshot.version == version)
+                .scalar()
+            )
+            if content is not None:
+                key = CompiledAnswerKey.from_json(exam_id, content["key"], version)
+                self.key_cache.put(key, generation)
+                return key
+
+        exam = (
+            db.query(Exam)
+            .options(
+                selectinload(Exam.questions).selectinload(Question.options),
+                selectinload(Exam.questions).selectinload(Question.matching_options),
+            )
+            .filter(Exam.id == exam_id)
+            .one_or_none()
+        )
+        if exam is None:
+            raise NotFoundError("Exam not found")
+        key = self.compile_answer_key(db, exam)
+        self.key_cache.put(key, generation)
+        return key
+
+    def compile_answer_key(self, db: Session, exam: Exam) -> CompiledAnswerKey:
+        self._ensure_question_points_are_set(db, exam)
+        correct_data = self._build_correct_data(exam)
+        return CompiledAnswerKey(
+            exam.id,
+            {
+                q.id: CompiledQuestionKey(q.question_type, self._points(q), correct_data[q.id])
+                for q in exam.questions
+            },
+        )
+
+    def grade_values(
+        self,
+        question: CompiledQuestionKey,
+        selected_ids: Optional[Set[Any]] = None,
+        text: Optional[str] = None,
+        answer_json: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[float, Optional[bool]]:
         """
-        Довга відповідь оцінюється вручну: відмічаємо як pending.
+        Оцінює одну відповідь за скомпільованим ключем питання.
+        Повертає (бали, чи повністю правильна); None — потрібна ручна перевірка.
         """
-        result.pending_count += 1
-        return 0.0, None  # потребує ручної перевірки
+        qt = question.question_type
+        if qt == QuestionType.long_answer:
+            return 0.0, None
+        if qt == QuestionType.single_choice:
+            return self._score_single_choice(question.points, selected_ids or set(), question.correct)
+        if qt == QuestionType.multi_choice:
+            return self._score_multi_choice(question.points, selected_ids or set(), question.correct)
+        if qt == QuestionType.short_answer:
+            return self._score_short_answer(question.points, text, question.correct)
+        if qt == QuestionType.matching:
+            return self._score_matching(question.points, answer_json, question.correct)
+        return 0.0, False
+
+    @staticmethod
+    def _points(q: Question) -> float:
+        return float(q.points or 0.0)
 
     def _grade_single_choice(self, q: Question, a: Answer, correct: Dict[str, Any]) -> Tuple[float, bool]:
         user_ids = {opt.selected_option_id for opt in a.selected_options}
-        return (self._points(q), True) if user_ids == correct.get("options", set()) else (0.0, False)
+        return self._score_single_choice(self._points(q), user_ids, correct)
 
     def _grade_short_answer(self, q: Question, a: Answer, correct: Dict[str, Any]) -> Tuple[float, bool]:
+        return self._score_short_answer(self._points(q), a.answer_text, correct)
+
+    def _grade_multi_choice(self, q: Question, a: Answer, correct: Dict[str, Any]) -> Tuple[float, bool]:
+        user_ids = {o.selected_option_id for o in a.selected_options}
+        return self._score_multi_choice(self._points(q), user_ids, correct)
+
+    def _grade_matching(self, q: Question, a: Answer, correct: Dict[str, Any]) -> Tuple[float, bool]:
+        return self._score_matching(self._points(q), a.answer_json, correct)
+
+    # Оцінка за "сирими" значеннями відповіді: спільна для calculate_score
+    # і масового оцінювання (BulkGradingService), яке не створює ORM-об'єктів
+
+    @staticmethod
+    def _score_single_choice(points: float, user_ids: Set[Any], correct: Dict[str, Any]) -> Tuple[float, bool]:
+        return (points, True) if user_ids == correct.get("options", set()) else (0.0, False)
+
+    @classmethod
+    def _score_short_answer(cls, points: float, text: Optional[str], correct: Dict[str, Any]) -> Tuple[float, bool]:
         # Отримуємо інформацію про те, чи питання числове
         is_numeric = correct.get("is_numeric", False)
         # Нормалізуємо відповідь студента
-        user_text = self._normalize_short_answer(a.answer_text or "", is_numeric)
-        return (self._points(q), True) if user_text in correct.get("texts", set()) else (0.0, False)
+        user_text = cls._normalize_short_answer(text or "", is_numeric)
+        if user_text in correct.get("texts", set()):
+            return points, True
+        if is_numeric and correct.get("numbers"):
+            try:
+                value = float(user_text)
+            except ValueError:
+                return 0.0, False
+            if any(
+                math.isclose(value, n, rel_tol=NUMERIC_REL_TOLERANCE, abs_tol=NUMERIC_ABS_TOLERANCE)
+                for n in correct["numbers"]
+            ):
+                return points, True
+        return 0.0, False
 
-    def _grade_multi_choice(self, q: Question, a: Answer, correct: Dict[str, Any]) -> Tuple[float, bool]:
-        user_ids = {o.selected_option_id for o in a.selected_options}
+    @staticmethod
+    def _score_multi_choice(points: float, user_ids: Set[Any], correct: Dict[str, Any]) -> Tuple[float, bool]:
         correct_ids = correct.get("options", set())
         if not correct_ids:
             return 0.0, False
-        per_opt = self._points(q) / len(correct_ids)
+        per_opt = points / len(correct_ids)
         earned = sum(per_opt for oid in user_ids if oid in correct_ids)
         is_full = (user_ids == correct_ids)  # повністю правильним — лише при 100% збігу
         return earned, is_full
 
-    def _grade_matching(self, q: Question, a: Answer, correct: Dict[str, Any]) -> Tuple[float, bool]:
-        user_pairs = a.answer_json or {}
+    @staticmethod
+    def _score_matching(points: float, user_pairs: Optional[Dict[str, Any]], correct: Dict[str, Any]) -> Tuple[float, bool]:
+        user_pairs = user_pairs or {}
         correct_map = correct.get("pairs", {})
         if not correct_map:
             return 0.0, False
-        per_match = self._points(q) / len(correct_map)
+        per_match = points / len(correct_map)
         earned = sum(per_match for k, v in correct_map.items() if user_pairs.get(k) == v)
         is_full = (user_pairs == correct_map)
         return earned, is_full
 
     def calculate_score(self, db: Session, attempt: Attempt) -> GradingResult:
-        self._ensure_question_points_are_set(db, attempt.exam)
+        """
+        Оцінює спробу за скомпільованим ключем іспиту: при влученні в кеш
+        це лише пошук у словниках, без запитів до БД (відповіді й обрані
+        варіанти мають бути завантажені разом зі спробою).
+        """
+        key = self.get_answer_key(db, attempt.exam_id, attempt.exam_version)
 
         result = GradingResult()
         result.total_answers_given = len(attempt.answers)
-        correct_data = self._build_correct_data(attempt.exam)
-
-        handlers = {
-            QuestionType.long_answer:   lambda q, a: self._grade_long_answer(result, q, a),
-            QuestionType.single_choice: lambda q, a: self._grade_single_choice(q, a, correct_data[q.id]),
-            QuestionType.short_answer:  lambda q, a: self._grade_short_answer(q, a, correct_data[q.id]),
-            QuestionType.multi_choice:  lambda q, a: self._grade_multi_choice(q, a, correct_data[q.id]),
-            QuestionType.matching:      lambda q, a: self._grade_matching(q, a, correct_data[q.id]),
-        }
 
         for ans in attempt.answers:
-            q = ans.question
-            handler = handlers.get(q.question_type)
-            if handler is None:
+            q = key.questions.get(ans.question_id)
+            if q is None:
                 result.incorrect_count += 1
                 continue
 
-            earned, is_correct = handler(q, ans)
-
-            if is_correct is None:
+            if q.question_type == QuestionType.long_answer:
+                # Довга відповідь оцінюється вручну: відмічаємо як pending
+                result.pending_count += 1
                 continue
 
+            selected_ids = None
+            if q.question_type in (QuestionType.single_choice, QuestionType.multi_choice):
+                selected_ids = {o.selected_option_id for o in ans.selected_options}
+            earned, is_correct = self.grade_values(q, selected_ids, ans.answer_text, ans.answer_json)
+
             result.earned_weight += earned
             if is_correct:
                 result.correct_count += 1
@@ -7,9 +7,6 @@ from src.api.schemas.journal import ExamJournalResponse, StudentInJournal, Attem
 from src.models.attempts import AttemptStatus
 
 class JournalService:
-    def __init__(self):
-        self.repo = None
-
     @staticmethod
     def _get_overall_status(attempts: list) -> AttemptStatus | str:
         """Визначає загальний статус студента на основі його спроб."""
@@ -23,16 +20,16 @@ class JournalService:
         return attempts[0].status
 
     def get_journal_for_exam(self, db: Session, exam_id: UUID) -> ExamJournalResponse:
-        self.repo = JournalRepository(db)
+        repo = JournalRepository(db)
 
         # 1. Отримуємо іспит та пов'язаний курс
-        exam = self.repo.get_exam_with_course(exam_id)
+        exam = repo.get_exam_with_course(exam_id)
         if not exam or not exam.courses:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Іспит або пов'язаний курс не знайдено.")
         
         # 2. Отримуємо студентів курсу та їхні спроби для цього іспиту
         course_id = exam.courses[0].id
-        students_with_attempts = self.repo.get_students_with_attempts_for_exam(course_id, exam_id)
+        students_with_attempts = repo.get_students_with_attempts_for_exam(course_id, exam_id)
 
         # 3. Форматуємо дані для кожного студента
         students_list = []
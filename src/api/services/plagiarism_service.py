@@ -1,32 +1,78 @@
 from __future__ import annotations
 
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Tuple, Optional, Any
 from uuid import UUID
 
 from sqlalchemy.orm import Session
 
-from src.api.repositories.plagiarism_repository import PlagiarismRepository
-from src.models.attempts import Attempt, Answer, PlagiarismStatus
-from src.models.exams import Question, QuestionType
-from src.api.schemas.plagiarism import PlagiarismCheckSummary, PlagiarismComparisonResponse, PlagiarismReport, PlagiarismMatch
-
+from src.api.repositories.plagiarism_repository import (
+    ATTEMPT_TEXT_SEPARATOR,
+    EMPTY_SIGNATURE,
+    PlagiarismRepository,
+)
+from src.models.attempts import Attempt, PlagiarismCheckState, PlagiarismStatus
+from src.api.schemas.plagiarism import (
+    PlagiarismCheckStatusResponse,
+    PlagiarismCheckSummary,
+    PlagiarismComparisonResponse,
+    PlagiarismReport,
+    PlagiarismMatch,
+    PlagiarismQuestionMatch,
+)
+from src.api.errors.app_errors import NotFoundError
+from src.api.services import exam_invalidation
+from src.core.config import PLAGIARISM_MINHASH_MAX_INDEXES, PLAGIARISM_TFIDF_MAX_INDEXES
+
+import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import logging
-from src.models.paraphrase import ParaphraseModel
-from difflib import SequenceMatcher
+from src.models.paraphrase import ParaphraseModel, get_paraphrase_model
+from src.utils.tfidf_index import TfidfIndexRegistry
+from src.utils.minhash_lsh import MinHashIndexRegistry, MinHashLSHIndex
+from src.utils.text_spans import find_common_spans
 
 logger = logging.getLogger(__name__)
 
+# Скільки кандидатів fast-рівня передається на глибокий семантичний аналіз
+DEEP_ANALYSIS_MAX_CANDIDATES = 25
+
+# Спільний для процесу реєстр TF-IDF індексів (один індекс на питання)
+question_tfidf_indexes = TfidfIndexRegistry(max_size=PLAGIARISM_TFIDF_MAX_INDEXES)
+exam_invalidation.question_deleted.connect(question_tfidf_indexes.drop)
+
+# Скільки кандидатів з інших іспитів курсу (після LSH) оцінюється TF-IDF
+CROSS_EXAM_MAX_CANDIDATES = 20
+
+# Спільний для процесу реєстр LSH-індексів (один індекс на курс)
+course_minhash_indexes = MinHashIndexRegistry(max_size=PLAGIARISM_MINHASH_MAX_INDEXES)
+exam_invalidation.course_exams_changed.connect(course_minhash_indexes.drop)
+
+# Перекриття інкрементальної синхронізації індексів: created_at сигнатури і submitted_at
+# спроби ставляться до коміту, тож запис з довшої транзакції може з'явитися вже після
+# мітки попередньої синхронізації
+INDEX_SYNC_OVERLAP = timedelta(minutes=5)
+_SYNC_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite повертає created_at без часового поясу (UTC)
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
 
 class PlagiarismService:
     def __init__(
         self,
         repo: PlagiarismRepository,
         paraphrase_model: Optional[ParaphraseModel] = None,
+        tfidf_indexes: Optional[TfidfIndexRegistry] = None,
+        minhash_indexes: Optional[MinHashIndexRegistry] = None,
     ) -> None:
         self.repo = repo
-        self.paraphrase_model = paraphrase_model or ParaphraseModel()
+        self.paraphrase_model = paraphrase_model or get_paraphrase_model()
+        self.tfidf_indexes = tfidf_indexes or question_tfidf_indexes
+        self.minhash_indexes = minhash_indexes or course_minhash_indexes
 
     # ---------- ПУБЛІЧНИЙ ВХІДНИЙ МЕТОД ----------
 
@@ -41,8 +87,9 @@ class PlagiarismService:
         MAX_PROCESSING_TIME = 60  # Максимальний час обробки (секунди)
         
         try:
-            # 1. Зібрати текст для цієї спроби (тільки long_answer)
-            base_text = self._build_attempt_text(db, attempt.id)
+            # 1. Зібрати відповіді цієї спроби (тільки long_answer) по питаннях
+            base_answers = self.repo.get_long_answers(db, attempt_ids=[attempt.id]).get(attempt.id, {})
+            base_text = ATTEMPT_TEXT_SEPARATOR.join(base_answers.values())
             if not base_text.strip():
                 # Немає long_answer — вважаємо 100% унікальність
                 logger.info(f"Attempt {attempt.id} has no long_answer text, skipping plagiarism check")
@@ -56,12 +103,14 @@ class PlagiarismService:
                 )
                 return self._to_report(check)
 
-            # 2. Знайти кандидатів серед інших спроб цього ж іспиту
-            candidate_attempt_ids, candidate_texts = self._get_candidate_attempt_texts(
-                db, exam_id=attempt.exam_id, exclude_attempt_id=attempt.id
-            )
+            # 2. Порівняти кожну відповідь з відповідями інших здач на те саме питання
+            same_exam_matches, answers_by_attempt = self._run_per_question_filter(db, attempt, base_answers)
 
-            if not candidate_attempt_ids:
+            # Схожі роботи з інших іспитів того ж курсу (MinHash + LSH)
+            cross_matches, cross_answers = self._run_cross_exam_filter(db, attempt, base_answers, base_text)
+            answers_by_attempt.update(cross_answers)
+
+            if not same_exam_matches and not cross_matches:
                 # Нема з чим порівнювати — унікальність 100%
                 logger.info(f"No candidate attempts found for attempt {attempt.id}")
                 check = self.repo.create_or_update(
@@ -79,9 +128,7 @@ class PlagiarismService:
             if elapsed > MAX_PROCESSING_TIME:
                 logger.warning(f"Plagiarism check for attempt {attempt.id} exceeded time limit, using fast check only")
                 # Повертаємо результат на основі швидкої перевірки
-                fast_matches = self._run_fast_tfidf_filter(
-                    base_text, candidate_texts, candidate_attempt_ids, db
-                )
+                fast_matches = self._merge_matches(same_exam_matches, cross_matches)
                 max_similarity = max([m["similarity_score"] for m in fast_matches], default=0.0)
                 uniqueness = max(0.0, 100.0 - max_similarity * 100.0)
                 status = self._status_from_similarity(max_similarity)
@@ -95,10 +142,8 @@ class PlagiarismService:
                 )
                 return self._to_report(check)
 
-            # 3. Рівень 1: TF-IDF + cosine
-            fast_matches = self._run_fast_tfidf_filter(
-                base_text, candidate_texts, candidate_attempt_ids, db
-            )
+            # 3. Рівень 1: TF-IDF + cosine (вже пораховано по питаннях)
+            fast_matches = self._merge_matches(same_exam_matches, cross_matches)
 
             # Якщо є явний копіпаст (>0.98) — глибокий аналіз необов'язковий
             exact_match = next(
@@ -127,7 +172,7 @@ class PlagiarismService:
             else:
                 # 4. Рівень 2: глибокий семантичний аналіз (парафрази)
                 deep_matches, _ = self._run_deep_semantic_analysis(
-                    db, base_text, fast_matches
+                    db, base_answers, fast_matches, answers_by_attempt=answers_by_attempt
                 )
                 # Якщо глибокий аналіз нічого не додав — використовуємо fast рівень
                 final_matches = deep_matches or fast_matches
@@ -160,57 +205,264 @@ class PlagiarismService:
                 max_similarity=0.0,
                 status=PlagiarismStatus.ok,
                 details={"matches": [], "error": str(e)},
+                state=PlagiarismCheckState.failed,
             )
             return self._to_report(check)
 
-    # ---------- ДОПОМІЖНІ МЕТОДИ ДЛЯ TEКСТУ ----------
+    # ---------- ФОНОВА ЧЕРГА ПЕРЕВІРОК ----------
 
-    @staticmethod
-    def _build_attempt_text(db: Session, attempt_id: UUID) -> str:
+    def enqueue_check(self, db: Session, attempt_id: UUID) -> None:
         """
-        Формує "текст роботи" зі всіх відповідей типу long_answer цієї спроби.
+        Ставить спробу в чергу на перевірку (стан pending).
+        Не комітить: запис потрапляє в БД разом із транзакцією submit,
+        тому після падіння процесу перевірка не губиться.
         """
-        rows: List[Tuple[str]] = (
-            db.query(Answer.answer_text)
-            .join(Question, Question.id == Answer.question_id)
-            .filter(
-                Answer.attempt_id == attempt_id,
-                Question.question_type == QuestionType.long_answer,
-                Answer.answer_text.isnot(None),
-            )
-            .all()
+        self.repo.mark_pending(db, attempt_id)
+
+    def run_pending_check(self, db: Session, attempt_id: UUID) -> Optional[PlagiarismReport]:
+        """
+        Виконує перевірку з черги. Повертає None, якщо перевірку вже забрав
+        інший воркер або спроби не існує.
+        """
+        if not self.repo.claim_pending(db, attempt_id):
+            return None
+
+        attempt = db.query(Attempt).filter(Attempt.id == attempt_id).one_or_none()
+        if attempt is None:
+            logger.warning(f"Queued plagiarism check references missing attempt {attempt_id}")
+            return None
+
+        report = self.check_attempt(db, attempt)
+        db.commit()
+        return report
+
+    def get_check_status(self, db: Session, attempt_id: UUID) -> PlagiarismCheckStatusResponse:
+        """
+        Стан перевірки для опитування викладачем (pending / running / done / failed)
+        разом з результатом, коли він готовий.
+        """
+        check = self.repo.get_by_attempt_id(db, attempt_id)
+        if check is None:
+            raise NotFoundError("Plagiarism check not found")
+
+        report = self._to_report(check) if check.state == PlagiarismCheckState.done else None
+        return PlagiarismCheckStatusResponse(
+            attempt_id=attempt_id,
+            state=check.state.value,
+            queued_at=check.created_at,
+            started_at=check.started_at,
+            finished_at=check.finished_at,
+            report=report,
         )
-        texts = [t[0] for t in rows if t[0]]
-        return "\n\n".join(texts)
-
-    def _get_candidate_attempt_texts(
-        self, db: Session, *, exam_id: UUID, exclude_attempt_id: UUID
-    ) -> Tuple[List[UUID], List[str]]:
-        """
-        Знаходимо всі інші спроби цього іспиту, у яких є long_answer-відповіді.
-        Повертаємо списки attempt_ids і відповідних текстів.
-        """
-        # Знаходимо всі спроби цього екзамену, крім поточної
-        attempts_with_long = (
-            db.query(Attempt.id)
-            .join(Answer, Answer.attempt_id == Attempt.id)
-            .join(Question, Question.id == Answer.question_id)
-            .filter(
-                Attempt.exam_id == exam_id,
-                Attempt.id != exclude_attempt_id,
-                Question.question_type == QuestionType.long_answer,
-                Answer.answer_text.isnot(None),
-            )
-            .distinct()
-            .all()
+
+    # ---------- РІВЕНЬ 1 ПО ПИТАННЯХ: TF-IDF + COSINE ----------
+
+    def _run_per_question_filter(
+        self, db: Session, attempt: Attempt, base_answers: Dict[UUID, str]
+    ) -> Tuple[List[Dict[str, Any]], Dict[UUID, Dict[UUID, str]]]:
+        """
+        Відповідь на кожне питання порівнюється лише з відповідями інших здач
+        на те саме питання (окремий TF-IDF індекс на питання).
+        Повертає (матчі по спробах з оцінками по питаннях,
+        мапа attempt_id -> {question_id: текст}) для глибокого рівня.
+        """
+        self._sync_question_indexes(db, attempt.exam_id, list(base_answers))
+
+        entries_by_attempt: Dict[UUID, List[Dict[str, Any]]] = {}
+        answers_by_attempt: Dict[UUID, Dict[UUID, str]] = {}
+        for question_id, base_answer in base_answers.items():
+            index = self.tfidf_indexes.get_or_create(question_id)
+            index.add(attempt.id, base_answer)
+            other_ids, similarities, other_texts = index.query(attempt.id)
+            for other_id, sim, other_text in zip(other_ids, similarities, other_texts):
+                answers_by_attempt.setdefault(other_id, {})[question_id] = other_text
+                entries_by_attempt.setdefault(other_id, []).append(
+                    self._question_entry(question_id, sim, base_answer, other_text)
+                )
+
+        matches = []
+        for other_id, entries in entries_by_attempt.items():
+            score = self._aggregate_question_scores(base_answers, entries)
+            matches.append({
+                "other_attempt_id": str(other_id),
+                "similarity_score": score,
+                "match_type": "exact" if score >= 0.98 else "candidate",
+                "questions": entries,
+            })
+        matches.sort(key=lambda m: m["similarity_score"], reverse=True)
+        return matches, answers_by_attempt
+
+    def _sync_question_indexes(self, db: Session, exam_id: UUID, question_ids: List[UUID]) -> None:
+        """
+        Дозаповнює TF-IDF індекси питань відповідями здач, яких у них ще немає
+        (здачі, оброблені іншим воркером). Холодний індекс завантажується повністю;
+        далі читаються лише спроби, здані після мітки `synced_until`
+        (з перекриттям INDEX_SYNC_OVERLAP). Один запит на всі питання.
+        """
+        indexes = {question_id: self.tfidf_indexes.get_or_create(question_id) for question_id in question_ids}
+        if not indexes:
+            return
+        marks = [index.synced_until for index in indexes.values()]
+        since = None if any(mark is None for mark in marks) else min(marks)
+
+        rows = self.repo.list_submitted_long_answers(
+            db, exam_id, question_ids=list(indexes), submitted_after=since
         )
-        attempt_ids = [row[0] for row in attempts_with_long]
+        for attempt_id, question_id, text, _ in rows:
+            index = indexes[question_id]
+            if attempt_id not in index and text.strip():
+                index.add(attempt_id, text)
+
+        submitted = [_as_utc(submitted_at) for *_, submitted_at in rows if submitted_at is not None]
+        newest = max(submitted) - INDEX_SYNC_OVERLAP if submitted else None
+        for index in indexes.values():
+            if newest is not None and (index.synced_until is None or newest > index.synced_until):
+                index.synced_until = newest
+            elif index.synced_until is None:
+                index.synced_until = _SYNC_EPOCH
+
+    def _question_entry(
+        self, question_id: UUID, similarity: float, base_answer: str, other_answer: str
+    ) -> Dict[str, Any]:
+        """Оцінка по одному питанню; ranges — у координатах відповіді на це питання."""
+        entry: Dict[str, Any] = {"question_id": str(question_id), "similarity_score": float(similarity)}
+        if similarity >= 0.5:
+            try:
+                base_spans, _ = self._compute_highlight_spans(base_answer, other_answer, min_match_len=10)
+                if base_spans:
+                    entry["ranges"] = [{"start": start, "end": end} for start, end in base_spans]
+            except Exception as e:
+                logger.warning(f"Failed to compute highlight spans for question {question_id}: {e}")
+        return entry
 
-        texts: List[str] = []
-        for aid in attempt_ids:
-            texts.append(self._build_attempt_text(db, aid))
+    @staticmethod
+    def _aggregate_question_scores(base_answers: Dict[UUID, str], entries: List[Dict[str, Any]]) -> float:
+        """
+        Схожість спроб = середнє оцінок по питаннях, зважене довжиною відповіді
+        базової спроби: збіг на довгому есе важить більше, ніж на короткій відповіді.
+        Питання без відповіді в іншій спробі дає 0.
+        """
+        scores = {e["question_id"]: e["similarity_score"] for e in entries}
+        total = sum(len(text) for text in base_answers.values())
+        if total == 0:
+            return 0.0
+        weighted = sum(len(text) * scores.get(str(qid), 0.0) for qid, text in base_answers.items())
+        return max(0.0, min(1.0, weighted / total))
 
-        return attempt_ids, texts
+    @staticmethod
+    def _ranges_by_question(
+        base_answers: Dict[UUID, str], ranges: List[Dict[str, int]]
+    ) -> List[Dict[str, Any]]:
+        """Розкладає ranges з об'єднаного тексту спроби на ranges у відповідях на окремі питання."""
+        result: List[Dict[str, Any]] = []
+        offset = 0
+        for question_id, text in base_answers.items():
+            q_start, q_end = offset, offset + len(text)
+            question_ranges = [
+                {"start": max(r["start"], q_start) - q_start, "end": min(r["end"], q_end) - q_start}
+                for r in ranges
+                if r["start"] < q_end and r["end"] > q_start
+            ]
+            if question_ranges:
+                result.append({"question_id": str(question_id), "ranges": question_ranges})
+            offset = q_end + len(ATTEMPT_TEXT_SEPARATOR)
+        return result
+
+    # ---------- ПОШУК МІЖ ІСПИТАМИ КУРСУ: MINHASH + LSH ----------
+
+    def _run_cross_exam_filter(
+        self, db: Session, attempt: Attempt, base_answers: Dict[UUID, str], base_text: str
+    ) -> Tuple[List[Dict[str, Any]], Dict[UUID, Dict[UUID, str]]]:
+        """
+        Зберігає MinHash-сигнатуру спроби і через LSH-індекси курсів іспиту
+        знаходить схожі роботи з інших іспитів (інші потоки, минулі семестри).
+        Питання в різних іспитах різні, тому кандидати оцінюються TF-IDF
+        по всьому тексту спроби, а ranges розкладаються на питання базової спроби.
+        Повертає (матчі, мапа attempt_id -> {question_id: текст}) для глибокого рівня.
+        """
+        signature = self.minhash_indexes.signature(base_text)
+        self.repo.upsert_signature(
+            db,
+            attempt_id=attempt.id,
+            exam_id=attempt.exam_id,
+            num_perm=self.minhash_indexes.num_perm,
+            signature=signature.tobytes() if signature is not None else EMPTY_SIGNATURE,
+        )
+        if signature is None:
+            return [], {}
+        # Сесія без autoflush: без flush дозаповнення індексу курсу вважало б спробу непідписаною
+        db.flush()
+
+        estimates: Dict[UUID, float] = {}
+        for course_id in self.repo.get_course_ids_for_exam(db, attempt.exam_id):
+            index = self._get_course_minhash_index(db, course_id)
+            index.add((attempt.exam_id, attempt.id), signature)
+            for (exam_id, other_id), estimate in index.query(signature).items():
+                if exam_id != attempt.exam_id:
+                    estimates[other_id] = max(estimate, estimates.get(other_id, 0.0))
+
+        if not estimates:
+            return [], {}
+
+        top_ids = sorted(estimates, key=estimates.get, reverse=True)[:CROSS_EXAM_MAX_CANDIDATES]
+        answers_by_attempt = self.repo.get_long_answers(db, attempt_ids=top_ids)
+        candidate_ids = [aid for aid in top_ids if aid in answers_by_attempt]
+        candidate_texts = [ATTEMPT_TEXT_SEPARATOR.join(answers_by_attempt[aid].values()) for aid in candidate_ids]
+
+        matches = self._run_fast_tfidf_filter(base_text, candidate_texts, candidate_ids, db)
+        for m in matches:
+            m["cross_exam"] = True
+            m["questions"] = self._ranges_by_question(base_answers, m.pop("ranges", []))
+        return matches, {aid: answers_by_attempt[aid] for aid in candidate_ids}
+
+    def _get_course_minhash_index(self, db: Session, course_id: UUID) -> MinHashLSHIndex:
+        """
+        LSH-індекс курсу, синхронізований зі збереженими сигнатурами.
+        Перша синхронізація в процесі одноразово підписує здачі без сигнатури
+        (до появи індексу) і завантажує всі сигнатури курсу; далі читаються лише
+        записи, новіші за мітку `synced_until` (з перекриттям INDEX_SYNC_OVERLAP).
+        """
+        index = self.minhash_indexes.get_or_create(course_id)
+
+        if index.synced_until is None:
+            self._sign_unsigned_course_attempts(db, course_id, index)
+
+        rows = self.repo.list_course_signatures(
+            db, course_id, num_perm=index.num_perm, created_after=index.synced_until
+        )
+        for exam_id, attempt_id, raw, _ in rows:
+            if (exam_id, attempt_id) not in index:
+                index.add((exam_id, attempt_id), np.frombuffer(raw, dtype=np.uint32))
+        if rows:
+            newest = max(_as_utc(created_at) for *_, created_at in rows) - INDEX_SYNC_OVERLAP
+            if index.synced_until is None or newest > index.synced_until:
+                index.synced_until = newest
+        elif index.synced_until is None:
+            index.synced_until = _SYNC_EPOCH
+        return index
+
+    def _sign_unsigned_course_attempts(self, db: Session, course_id: UUID, index: MinHashLSHIndex) -> None:
+        """Підписує здачі курсу без сигнатури; текст без шинглів отримує маркер EMPTY_SIGNATURE."""
+        unsigned = self.repo.list_unsigned_course_attempts(db, course_id)
+        if not unsigned:
+            return
+        texts_by_attempt = self.repo.get_long_answer_texts(db, attempt_ids=[aid for _, aid in unsigned])
+        for exam_id, attempt_id in unsigned:
+            signature = index.signature(texts_by_attempt.get(attempt_id, ""))
+            self.repo.upsert_signature(
+                db,
+                attempt_id=attempt_id,
+                exam_id=exam_id,
+                num_perm=index.num_perm,
+                signature=signature.tobytes() if signature is not None else EMPTY_SIGNATURE,
+            )
+        db.flush()
+
+    @staticmethod
+    def _merge_matches(*groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        merged = [m for group in groups for m in group]
+        merged.sort(key=lambda m: m["similarity_score"], reverse=True)
+        return merged
 
     # ---------- РІВЕНЬ 1: TF-IDF + COSINE ----------
 
@@ -220,9 +472,11 @@ class PlagiarismService:
         candidate_texts: List[str],
         candidate_ids: List[UUID],
         db: Session = None,
+        similarities: Optional[List[float]] = None,
     ) -> List[Dict[str, Any]]:
         """
-        Будує TF-IDF матрицю і повертає список матчів за косинусною подібністю.
+        Повертає список матчів за косинусною подібністю TF-IDF.
+        Якщо similarities вже пораховані індексом іспиту — матриця не будується заново.
         """
         if not base_text or not base_text.strip():
             logger.warning("_run_fast_tfidf_filter called with empty base_text")
@@ -231,7 +485,8 @@ class PlagiarismService:
             logger.debug("_run_fast_tfidf_filter called with empty candidate_texts")
             return []
         
-        similarities = self._compute_tfidf_similarities(base_text, candidate_texts)
+        if similarities is None:
+            similarities = self._compute_tfidf_similarities(base_text, candidate_texts)
         if similarities is None:
             return []
         
@@ -256,7 +511,8 @@ class PlagiarismService:
         base_vec = tfidf_matrix[0:1]
         other_vecs = tfidf_matrix[1:]
         similarities = cosine_similarity(base_vec, other_vecs)[0]
-        return similarities.tolist()
+        # Похибка округлення може дати 1.0000000000000002 для ідентичних текстів
+        return np.clip(similarities, 0.0, 1.0).tolist()
     
     def _build_match_data_list(
         self,
@@ -312,53 +568,93 @@ class PlagiarismService:
     def _run_deep_semantic_analysis(
         self,
         db: Session,
-        base_text: str,
+        base_answers: Dict[UUID, str],
         fast_matches: List[Dict[str, Any]],
+        answers_by_attempt: Optional[Dict[UUID, Dict[UUID, str]]] = None,
     ) -> Tuple[List[Dict[str, Any]], float]:
         """
         Рівень 2: справжній семантичний аналіз через ParaphraseModel.
-        Для кожного кандидата з fast-матчів будуємо текст іншої спроби
-        і рахуємо семантичну схожість.
+        Для кандидатів свого іспиту відповідь на кожне питання порівнюється
+        з відповіддю на те саме питання (один батч на питання), оцінки
+        агрегуються так само, як на рівні 1. Кандидати з інших іспитів
+        порівнюються по всьому тексту спроби.
         """
 
         if not fast_matches:
             return [], 0.0
 
-        # Беремо тільки топ-кандидатів, щоб не вантажити модель на сотні текстів
-        top_candidates = [m for m in fast_matches if m["similarity_score"] >= 0.2][:5]
+        # Кандидати оцінюються батчами, але сотні текстів на модель не віддаємо
+        top_candidates = [
+            m for m in fast_matches if m["similarity_score"] >= 0.2
+        ][:DEEP_ANALYSIS_MAX_CANDIDATES]
 
-        deep_results: List[Dict[str, Any]] = []
-        max_sim = 0.0
-
-        for m in top_candidates:
-            other_attempt_id = UUID(m["other_attempt_id"])
-            other_text = self._build_attempt_text(db, other_attempt_id)
+        if answers_by_attempt is None:
+            answers_by_attempt = self.repo.get_long_answers(
+                db, attempt_ids=[UUID(m["other_attempt_id"]) for m in top_candidates]
+            )
 
-            if not other_text.strip():
+        same_exam = [m for m in top_candidates if not m.get("cross_exam")]
+        cross_exam = [m for m in top_candidates if m.get("cross_exam")]
+
+        entries_by_attempt: Dict[str, List[Dict[str, Any]]] = {}
+        for question_id, base_answer in base_answers.items():
+            candidates = [
+                (m["other_attempt_id"], answers_by_attempt.get(UUID(m["other_attempt_id"]), {}).get(question_id, ""))
+                for m in same_exam
+            ]
+            candidates = [(aid, text) for aid, text in candidates if text.strip()]
+            if not candidates:
                 continue
+            # Відповідь базової спроби кодується один раз на питання
+            semantic_sims = self.paraphrase_model.similarity_many(base_answer, [text for _, text in candidates])
+            for (aid, other_answer), semantic_sim in zip(candidates, semantic_sims):
+                entries_by_attempt.setdefault(aid, []).append(
+                    self._question_entry(question_id, semantic_sim, base_answer, other_answer)
+                )
 
-            # Семантична схожість з нейромережею
-            semantic_sim = self.paraphrase_model.similarity(base_text, other_text)
-
-            deep_match = {
+        deep_results: List[Dict[str, Any]] = []
+        for m in same_exam:
+            entries = entries_by_attempt.get(m["other_attempt_id"])
+            if not entries:
+                continue
+            score = self._aggregate_question_scores(base_answers, entries)
+            deep_results.append({
                 "other_attempt_id": m["other_attempt_id"],
-                "similarity_score": float(semantic_sim),
-                "match_type": "paraphrase" if semantic_sim >= 0.7 else "candidate",
-            }
-            
-            # Генеруємо ranges для виділення сплагіачених частин
-            if semantic_sim >= 0.5:  # Тільки для значущої схожості
-                try:
-                    base_spans, _ = self._compute_highlight_spans(base_text, other_text, min_match_len=10)
-                    # Конвертуємо spans (tuple) в ranges (dict)
-                    deep_match["ranges"] = [{"start": span[0], "end": span[1]} for span in base_spans]
-                except Exception as e:
-                    logger.warning(f"Failed to compute highlight spans for deep match {other_attempt_id}: {e}")
-            
-            deep_results.append(deep_match)
-            max_sim = max(max_sim, semantic_sim)
+                "similarity_score": score,
+                "match_type": "paraphrase" if score >= 0.7 else "candidate",
+                "questions": entries,
+            })
+
+        if cross_exam:
+            base_text = ATTEMPT_TEXT_SEPARATOR.join(base_answers.values())
+            candidates = [
+                (m, ATTEMPT_TEXT_SEPARATOR.join(answers_by_attempt.get(UUID(m["other_attempt_id"]), {}).values()))
+                for m in cross_exam
+            ]
+            candidates = [(m, text) for m, text in candidates if text.strip()]
+            semantic_sims = self.paraphrase_model.similarity_many(base_text, [text for _, text in candidates])
+            for (m, other_text), semantic_sim in zip(candidates, semantic_sims):
+                deep_match = {
+                    "other_attempt_id": m["other_attempt_id"],
+                    "similarity_score": float(semantic_sim),
+                    "match_type": "paraphrase" if semantic_sim >= 0.7 else "candidate",
+                    "cross_exam": True,
+                    "questions": [],
+                }
+                if semantic_sim >= 0.5:
+                    try:
+                        base_spans, _ = self._compute_highlight_spans(base_text, other_text, min_match_len=10)
+                        deep_match["questions"] = self._ranges_by_question(
+                            base_answers, [{"start": start, "end": end} for start, end in base_spans]
+                        )
+                    except Exception as e:
+                        logger.warning(
+                            f"Failed to compute highlight spans for deep match {m['other_attempt_id']}: {e}"
+                        )
+                deep_results.append(deep_match)
 
         deep_results.sort(key=lambda x: x["similarity_score"], reverse=True)
+        max_sim = max((m["similarity_score"] for m in deep_results), default=0.0)
         return deep_results, max_sim
 
 
@@ -383,6 +679,13 @@ class PlagiarismService:
                 other_attempt_id=UUID(m["other_attempt_id"]),
                 similarity_score=m["similarity_score"],
                 match_type=m["match_type"],
+                questions=[
+                    PlagiarismQuestionMatch(
+                        question_id=UUID(q["question_id"]),
+                        similarity_score=q.get("similarity_score"),
+                    )
+                    for q in m.get("questions", [])
+                ],
             )
             for m in matches_raw
         ]
@@ -420,7 +723,8 @@ class PlagiarismService:
                     student_id=attempt.user_id,
                     uniqueness_percent=ch.uniqueness_percent,
                     max_similarity=ch.max_similarity,
-                    status=ch.status.value if hasattr(ch.status, "value") else str(ch.status),
+                    status=ch.status.value if hasattr(ch.status, "value") else ch.status,
+                    state=ch.state.value if ch.state is not None else PlagiarismCheckState.done.value,
                 )
             )
         return results
@@ -435,8 +739,9 @@ class PlagiarismService:
         Повертає тексти long_answer для двох спроб та їх семантичну схожість
         (через ParaphraseModel).
         """
-        base_text = self._build_attempt_text(db, base_attempt_id)
-        other_text = self._build_attempt_text(db, other_attempt_id)
+        texts = self.repo.get_long_answer_texts(db, attempt_ids=[base_attempt_id, other_attempt_id])
+        base_text = texts.get(base_attempt_id, "")
+        other_text = texts.get(other_attempt_id, "")
 
         similarity_score = self.paraphrase_model.similarity(base_text, other_text)
 
@@ -459,8 +764,9 @@ class PlagiarismService:
         Повертає тексти двох спроб (long_answer-відповіді) + оцінку схожості
         та діапазони збігів для підсвітки.
         """
-        base_text = self._build_attempt_text(db, base_attempt_id)
-        other_text = self._build_attempt_text(db, other_attempt_id)
+        texts = self.repo.get_long_answer_texts(db, attempt_ids=[base_attempt_id, other_attempt_id])
+        base_text = texts.get(base_attempt_id, "")
+        other_text = texts.get(other_attempt_id, "")
 
         if not base_text.strip() or not other_text.strip():
             similarity_score = 0.0
@@ -469,7 +775,7 @@ class PlagiarismService:
         else:
             # Використовуємо нейромережу для оцінки загальної схожості
             similarity_score = self.paraphrase_model.similarity(base_text, other_text)
-            # А для підсвітки — SequenceMatcher
+            # А для підсвітки — пошук спільних фрагментів за хешами k-грамів
             base_spans, other_spans = self._compute_highlight_spans(base_text, other_text)
 
         return PlagiarismComparisonResponse(
@@ -493,15 +799,5 @@ class PlagiarismService:
         і повертає списки span'ів для підсвітки.
         min_match_len — мінімальна довжина фрагмента, щоб його підсвічувати.
         """
-        matcher = SequenceMatcher(None, base_text, other_text)
-        base_spans: List[Tuple[int, int]] = []
-        other_spans: List[Tuple[int, int]] = []
-
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-            # Нас цікавлять тільки однакові фрагменти достатньої довжини
-            if tag == "equal" and (i2 - i1) >= min_match_len:
-                base_spans.append((i1, i2))
-                other_spans.append((j1, j2))
-
-        return base_spans, other_spans
+        return find_common_spans(base_text, other_text, min_match_len=min_match_len)
 
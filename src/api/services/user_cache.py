@@ -0,0 +1,90 @@
+"""
+Кеш автентифікованих користувачів (CachedUser) для залежностей get_current_user.
+
+Ендпоінти профілю та перевірка застарілих токенів (get_current_principal)
+раніше на кожен запит читали users (з joinedload спеціальності) і ролі.
+Тепер ці дані збираються один раз і тримаються UserCache до TTL.
+
+Кеш скидає UserRepository: оновлення налаштувань сповіщень, аватара та
+зміна ролей (bump_token_version). TTL обмежує застарілість в інших процесах.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from src.core.config import USER_CACHE_TTL_SECONDS
+
+# Верхня межа кількості закешованих користувачів; при переповненні витісняється найстаріший запис
+MAX_CACHED_USERS = 50_000
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Легка копія користувача для запиту; `notification_settings` спільний для запитів — не змінювати."""
+    id: UUID
+    email: str
+    full_name: str
+    roles: Tuple[str, ...]
+    token_version: int
+    major_name: Optional[str]
+    avatar_url: Optional[str]
+    notification_settings: Dict[str, Any]
+    cached_at: float = field(default_factory=time.monotonic, compare=False)
+
+
+class UserCache:
+    """Потокобезпечний обмежений in-process кеш CachedUser з лічильниками hits/misses."""
+    def __init__(self, ttl_seconds: Optional[float] = USER_CACHE_TTL_SECONDS, max_size: int = MAX_CACHED_USERS):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._users: Dict[UUID, CachedUser] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.ttl_seconds)
+
+    def get(self, user_id: UUID) -> Optional[CachedUser]:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and time.monotonic() - entry.cached_at > self.ttl_seconds:
+                del self._users[user_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, user: CachedUser) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._users.pop(user.id, None)
+            if len(self._users) >= self.max_size:
+                # Словник зберігає порядок вставки: перший ключ — найстаріший запис
+                del self._users[next(iter(self._users))]
+            self._users[user.id] = user
+
+    def invalidate(self, user_id: Optional[UUID]) -> None:
+        if user_id is None:
+            return
+        with self._lock:
+            self._users.pop(UUID(str(user_id)), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Спільний для процесу кеш користувачів
+user_cache = UserCache()
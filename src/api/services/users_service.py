@@ -5,25 +5,26 @@ from uuid import UUID
 from sqlalchemy.orm import Session
 from src.models.users import User
 from src.api.repositories.user_repository import UserRepository
+from src.api.services.user_cache import CachedUser
 
 class UsersService:
     # stateless, __init__ не потрібен
 
     @staticmethod
-    def get_user_profile(user: User) -> dict:
+    def get_user_profile(user: CachedUser) -> dict:
         """Формує дані для відповіді профілю."""
         return {
             "id": user.id,
-            "full_name": f"{user.last_name or ''} {user.first_name or ''} {user.patronymic or ''}".strip(),
+            "full_name": user.full_name,
             "email": user.email,
-            "major_name": user.major.name if user.major else "Спеціальність не вказано", 
+            "major_name": user.major_name or "Спеціальність не вказано",
             "avatar_url": user.avatar_url
         }
 
     @staticmethod
-    def get_notification_settings(user: User) -> dict:
-        """Повертає налаштування сповіщень."""
-        return user.notification_settings
+    def get_notification_settings(user: CachedUser) -> dict:
+        """Повертає налаштування сповіщень (копію — закешований словник спільний для запитів)."""
+        return dict(user.notification_settings)
 
     @staticmethod
     def update_notification_settings(user_id: UUID, settings_data: dict, db: Session):
@@ -8,6 +8,10 @@ if not JWT_SECRET:
     raise ValueError("JWT_SECRET environment variable must be set")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRATION_MINUTES = int(os.getenv("JWT_EXPIRATION_MINUTES", 60))
+# Скільки секунд після видачі токена довіряємо його claim'у roles без запиту до БД.
+# Це і межа відкликання: після зміни ролей чи пароля (bump_token_version) старий
+# токен у будь-якому воркері лишається чинним, доки його claim не застаріє.
+ROLES_CLAIM_TTL_SECONDS = int(os.getenv("ROLES_CLAIM_TTL_SECONDS", 300))
 
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
@@ -22,11 +26,69 @@ SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 SMTP_FROM = os.getenv("SMTP_FROM")
 
-if all([DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASS]):
+# DATABASE_URL з оточення має пріоритет (наприклад, SQLite-файл для локального навантажувального тесту)
+if os.getenv("DATABASE_URL"):
+    DATABASE_URL = os.getenv("DATABASE_URL")
+elif all([DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASS]):
     DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 else:
     DATABASE_URL = "sqlite:///:memory:"
 
+# Пул з'єднань з БД (не застосовується до SQLite в пам'яті). За замовчуванням
+# pool_size + max_overflow дорівнює кількості потоків для запитів: потік не чекає на з'єднання
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 30))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+
+# statement_timeout PostgreSQL (мс): типовий, для автозбережень і для аналітики/журналу (read-only engine)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+AUTOSAVE_STATEMENT_TIMEOUT_MS = int(os.getenv("AUTOSAVE_STATEMENT_TIMEOUT_MS", 2000))
+ANALYTICS_STATEMENT_TIMEOUT_MS = int(os.getenv("ANALYTICS_STATEMENT_TIMEOUT_MS", 120000))
+
+# Аналітика, журнал і атестат читають через окремий read-only engine: репліка
+# (READ_DATABASE_URL) або власний пул на тій самій БД, щоб не забирати з'єднання в автозбережень
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL") or DATABASE_URL
+READ_DB_POOL_SIZE = int(os.getenv("READ_DB_POOL_SIZE", 5))
+READ_DB_MAX_OVERFLOW = int(os.getenv("READ_DB_MAX_OVERFLOW", 5))
+
+# Токен для внутрішнього ендпоінта метрик (/api/internal/metrics); без нього ендпоінт вимкнено
+INTERNAL_METRICS_TOKEN = os.getenv("INTERNAL_METRICS_TOKEN")
+
+# Потоки для синхронних обробників запитів (вся робота з БД іде в них, а не в event loop)
+REQUEST_THREADPOOL_SIZE = int(os.getenv("REQUEST_THREADPOOL_SIZE", 40))
+
+# Фонові перевірки на плагіат
+PLAGIARISM_WORKERS = int(os.getenv("PLAGIARISM_WORKERS", 2))
+PLAGIARISM_STALE_AFTER_MINUTES = int(os.getenv("PLAGIARISM_STALE_AFTER_MINUTES", 10))
+
+# Масове оцінювання при закритті іспиту: скільки спроб обробляється за одну транзакцію
+BULK_GRADING_CHUNK_SIZE = int(os.getenv("BULK_GRADING_CHUNK_SIZE", 500))
+
+# Буфер автозбережень відповідей: як часто скидати його в БД (0 — писати одразу, без буфера)
+AUTOSAVE_FLUSH_SECONDS = float(os.getenv("AUTOSAVE_FLUSH_SECONDS", 2))
+
+# Кеш скомпільованих ключів відповідей (GradingService); скидається при редагуванні питань
+ANSWER_KEY_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_KEY_CACHE_TTL_SECONDS", 300))
+
+# Кеш вмісту іспиту для сторінки складання (питання й варіанти); скидається при редагуванні іспиту
+EXAM_CONTENT_CACHE_TTL_SECONDS = int(os.getenv("EXAM_CONTENT_CACHE_TTL_SECONDS", 300))
+
+# Кеш допуску до старту спроби (параметри іспиту й статус учасника); 0 — вимкнено
+EXAM_START_CACHE_TTL_SECONDS = int(os.getenv("EXAM_START_CACHE_TTL_SECONDS", 30))
+
+# Кеш автентифікованих користувачів (профіль, ролі, версія токенів); скидається при зміні профілю чи ролей; 0 — вимкнено
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+
+# Скільки in-process індексів плагіату тримати одночасно (TF-IDF — на питання, MinHash — на курс);
+# при переповненні витісняється індекс, яким найдовше не користувалися
+PLAGIARISM_TFIDF_MAX_INDEXES = int(os.getenv("PLAGIARISM_TFIDF_MAX_INDEXES", 512))
+PLAGIARISM_MINHASH_MAX_INDEXES = int(os.getenv("PLAGIARISM_MINHASH_MAX_INDEXES", 128))
+
+# Кеш ембедингів ParaphraseModel (каталог — опційне сховище на диску)
+PARAPHRASE_EMBEDDING_CACHE_SIZE = int(os.getenv("PARAPHRASE_EMBEDDING_CACHE_SIZE", 2048))
+PARAPHRASE_EMBEDDING_CACHE_DIR = os.getenv("PARAPHRASE_EMBEDDING_CACHE_DIR")
+
 CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
 CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
 CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
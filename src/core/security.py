@@ -6,10 +6,13 @@ from typing import Iterable, Optional
 def create_access_token(data: dict):
     to_encode = data.copy()
     # Replace API Call / Use timezone-aware datetime
-    expire = datetime.now(timezone.utc) + timedelta(minutes=JWT_EXPIRATION_MINUTES)
-    to_encode.update({"exp": int(expire.timestamp())})
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(minutes=JWT_EXPIRATION_MINUTES)
+    # iat потрібен, щоб довіряти claim'у roles лише короткий час після видачі
+    to_encode.update({"iat": int(now.timestamp()), "exp": int(expire.timestamp())})
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+
 ALLOWED_ROLES: set[str] = {"student", "teacher", "supervisor"}
 ROLE_SYNONYMS: dict[str, str] = {
     "student": "student",
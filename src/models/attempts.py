@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, Integer, Float, ForeignKey, Enum as SQLAlchemyEnum, TIMESTAMP, func
+from sqlalchemy import Column, String, DateTime, Integer, Float, ForeignKey, Enum as SQLAlchemyEnum, TIMESTAMP, LargeBinary, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from src.api.database import Base, get_json_type
@@ -25,6 +25,8 @@ class Attempt(Base):
     correct_answers = Column(Integer, nullable=True)
     incorrect_answers = Column(Integer, nullable=True)
     pending_count = Column(Integer, nullable=True)
+    # Версія знімка іспиту (exam_snapshots.version), з якою розпочато спробу; NULL — живі питання
+    exam_version = Column(Integer, nullable=True)
     
     user = relationship("User", back_populates="attempts") 
     exam = relationship("Exam", back_populates="attempts")
@@ -33,6 +35,10 @@ class Attempt(Base):
 
 class Answer(Base):
     __tablename__ = "answers"
+    # Одна відповідь на питання в межах спроби; на цьому індексі тримається upsert (ON CONFLICT)
+    __table_args__ = (
+        UniqueConstraint("attempt_id", "question_id", name="student_answers_attempt_id_question_id_key"),
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     attempt_id = Column(UUID(as_uuid=True), ForeignKey("attempts.id"), nullable=False)
     question_id = Column(UUID(as_uuid=True), ForeignKey("questions.id"), nullable=False)
@@ -58,19 +64,45 @@ class PlagiarismStatus(str, enum.Enum):
     suspicious = "suspicious"
     high_risk = "high_risk"
 
+class PlagiarismCheckState(str, enum.Enum):
+    """Стан фонової перевірки на плагіат (черга в таблиці plagiarism_checks)"""
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
 class PlagiarismCheck(Base):
     __tablename__ = "plagiarism_checks"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     attempt_id = Column(UUID(as_uuid=True), ForeignKey("attempts.id"), nullable=False, unique=True)
-    uniqueness_percent = Column(Float, nullable=False)
-    max_similarity = Column(Float, nullable=False)
-    status = Column(SQLAlchemyEnum(PlagiarismStatus), nullable=False)
+    # Результати заповнюються воркером; поки перевірка в черзі — NULL
+    uniqueness_percent = Column(Float, nullable=True)
+    max_similarity = Column(Float, nullable=True)
+    status = Column(SQLAlchemyEnum(PlagiarismStatus), nullable=True)
+    state = Column(
+        SQLAlchemyEnum(PlagiarismCheckState),
+        nullable=False,
+        default=PlagiarismCheckState.done,
+        server_default=PlagiarismCheckState.done.value,
+    )
     details = Column(get_json_type(), nullable=True)
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
 
     attempt = relationship("Attempt", back_populates="plagiarism_check")
 
+class PlagiarismSignature(Base):
+    """MinHash-сигнатура long_answer тексту спроби для пошуку схожих робіт між іспитами курсу"""
+    __tablename__ = "plagiarism_signatures"
+
+    attempt_id = Column(UUID(as_uuid=True), ForeignKey("attempts.id", ondelete="CASCADE"), primary_key=True)
+    exam_id = Column(UUID(as_uuid=True), ForeignKey("exams.id", ondelete="CASCADE"), nullable=False, index=True)
+    num_perm = Column(Integer, nullable=False)
+    signature = Column(LargeBinary, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
 class FlaggedAnswer(Base):
     """Модель для зберігання відповідей, позначених вчителем для перевірки на плагіат"""
     __tablename__ = "flagged_answers"
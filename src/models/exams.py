@@ -1,8 +1,8 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Enum as SQLAlchemyEnum, Boolean
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Enum as SQLAlchemyEnum, Boolean, TIMESTAMP, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
-from src.api.database import Base
+from src.api.database import Base, get_json_type
 from src.models.matching_options import MatchingOption 
 import enum
 
@@ -54,6 +54,24 @@ class Exam(Base):
     questions = relationship("Question", back_populates="exam", cascade=CASCADE_ALL_DELETE_ORPHAN)
     attempts = relationship("Attempt", back_populates="exam", cascade="all, delete-orphan")
     courses = relationship("Course", secondary="course_exams", back_populates="exams")
+    snapshots = relationship("ExamSnapshot", back_populates="exam", cascade=CASCADE_ALL_DELETE_ORPHAN)
+
+class ExamSnapshot(Base):
+    """
+    Незмінний знімок вмісту опублікованого іспиту: питання для сторінки складання,
+    розподіл балів і скомпільований ключ відповідей. Редагування після публікації
+    створює нову версію; спроба читає ту версію, з якою її розпочато.
+    """
+    __tablename__ = "exam_snapshots"
+    __table_args__ = (UniqueConstraint("exam_id", "version", name="exam_snapshots_exam_id_version_key"),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    exam_id = Column(UUID(as_uuid=True), ForeignKey("exams.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False)
+    content = Column(get_json_type(), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+    exam = relationship("Exam", back_populates="snapshots")
 
 class Question(Base):
     __tablename__ = "questions"
@@ -5,22 +5,53 @@ pretrained model) for semantic similarity. If the package or model is not
 available in the runtime environment (common on CI or when Python/torch
 versions are incompatible), the class falls back to a lightweight TF-IDF
 cosine-similarity implementation so the application stays functional.
+
+Neural embeddings are cached by text hash (see `src.utils.embedding_cache`),
+so each long answer is encoded at most once per model version.
+
+Use `get_paraphrase_model()` instead of constructing the class: it returns a
+process-wide instance whose weights are loaded on first use (or by the
+warm-up in the FastAPI lifespan), so requests never pay for model loading
+and only one copy of the model lives in memory.
 """
 
-from typing import Optional
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
 
 try:
     # Prefer the fast neural model when available
-    from sentence_transformers import SentenceTransformer, util as _st_util
+    import sentence_transformers as _st
+    from sentence_transformers import SentenceTransformer
     _SENTENCE_TRANSFORMERS_AVAILABLE = True
 except Exception:
+    _st = None
     SentenceTransformer = None  # type: ignore
-    _st_util = None
     _SENTENCE_TRANSFORMERS_AVAILABLE = False
 
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+from src.core.config import PARAPHRASE_EMBEDDING_CACHE_DIR, PARAPHRASE_EMBEDDING_CACHE_SIZE
+from src.utils.embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = "paraphrase-MiniLM-L6-v2"
+
+# IDF of a term found in only one document of a two-document TF-IDF fit
+# (smooth_idf=True): ln((1 + 2) / (1 + 1)) + 1
+_PAIR_UNIQUE_TERM_IDF = float(np.log(1.5) + 1.0)
+
+# Process-wide cache shared by all ParaphraseModel instances
+default_embedding_cache = EmbeddingCache(
+    max_size=PARAPHRASE_EMBEDDING_CACHE_SIZE,
+    persist_dir=PARAPHRASE_EMBEDDING_CACHE_DIR,
+)
+
 
 class ParaphraseModel:
     """Wrapper providing a .similarity(text1, text2) -> float API.
@@ -30,24 +61,56 @@ class ParaphraseModel:
       much cheaper, but less semantically capable).
     """
 
-    def __init__(self, model_name: str = "paraphrase-MiniLM-L6-v2") -> None:
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        embedding_cache: Optional[EmbeddingCache] = None,
+    ) -> None:
         self._use_nn: bool = False
         self._model_name = model_name
         self._model = None
+        self._embedding_cache = embedding_cache if embedding_cache is not None else default_embedding_cache
+        # Cache namespace: embeddings of another model or library version are never reused
+        library_version = getattr(_st, "__version__", "none")
+        self.model_version = f"{model_name}@{library_version}"
 
-        if _SENTENCE_TRANSFORMERS_AVAILABLE and SentenceTransformer is not None:
-            try:
-                self._model = SentenceTransformer(model_name)
-                self._use_nn = True
-            except Exception:
-                # Model loading failed (e.g. incompatible torch wheel or no
-                # network). Fall back to TF-IDF below.
-                self._model = None
-                self._use_nn = False
+        # Weights are loaded on first use, not in the constructor
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
 
         # TF-IDF vectorizer is created on demand for fallback path
         self._vectorizer: Optional[TfidfVectorizer] = None
 
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def load(self) -> None:
+        """Load the neural model once; safe to call from several threads."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            started = time.perf_counter()
+            if _SENTENCE_TRANSFORMERS_AVAILABLE and SentenceTransformer is not None:
+                try:
+                    self._model = SentenceTransformer(self._model_name)
+                    self._use_nn = True
+                except Exception:
+                    # Model loading failed (e.g. incompatible torch wheel or no
+                    # network). Fall back to TF-IDF.
+                    logger.warning(f"Could not load {self._model_name}, using TF-IDF fallback", exc_info=True)
+                    self._model = None
+                    self._use_nn = False
+            self.load_seconds = time.perf_counter() - started
+            self._loaded = True
+            logger.info(
+                f"Paraphrase model {self._model_name} ready in {self.load_seconds:.3f}s "
+                f"({'neural' if self._use_nn else 'tf-idf fallback'})"
+            )
+
     def similarity(self, text1: str, text2: str) -> float:
         """Return a similarity score in [0.0, 1.0].
 
@@ -56,10 +119,12 @@ class ParaphraseModel:
         if not text1 or not text2:
             return 0.0
 
+        self.load()
+
         if self._use_nn and self._model is not None:
             try:
-                embeddings = self._model.encode([text1, text2], convert_to_tensor=True)
-                cos_sim = float(_st_util.cos_sim(embeddings[0], embeddings[1]).item())
+                vec1, vec2 = self.embed([text1, text2])
+                cos_sim = _cosine(vec1, vec2)
                 # Normalize [-1,1] -> [0,1]
                 return max(0.0, min(1.0, (cos_sim + 1.0) / 2.0))
             except Exception:
@@ -79,3 +144,138 @@ class ParaphraseModel:
         except Exception:
             # As a last resort, return 0 (no similarity)
             return 0.0
+
+    def similarity_many(self, base: str, candidates: List[str]) -> List[float]:
+        """Return similarity(base, c) for every candidate in one batched pass.
+
+        Scores are the same as calling `similarity` pair by pair; empty
+        texts score 0.0.
+        """
+        if not candidates:
+            return []
+        if not base:
+            return [0.0] * len(candidates)
+        return self._score_matrix([base], candidates)[0].tolist()
+
+    def pairwise_matrix(self, texts: List[str]) -> np.ndarray:
+        """Return an n x n matrix of `similarity` scores between all texts."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float64)
+        return self._score_matrix(texts, texts)
+
+    def _score_matrix(self, rows: List[str], cols: List[str]) -> np.ndarray:
+        self.load()
+        scores: Optional[np.ndarray] = None
+        if self._use_nn and self._model is not None:
+            try:
+                vectors = self.embed(list(dict.fromkeys(rows + cols)))
+                by_text = dict(zip(dict.fromkeys(rows + cols), vectors))
+                row_m = _normalize_rows(np.vstack([by_text[t] for t in rows]))
+                col_m = _normalize_rows(np.vstack([by_text[t] for t in cols]))
+                # Normalize [-1,1] -> [0,1]
+                scores = np.clip((row_m @ col_m.T + 1.0) / 2.0, 0.0, 1.0)
+            except Exception:
+                scores = None
+
+        if scores is None:
+            try:
+                scores = _pairwise_tfidf_scores(rows, cols)
+            except Exception:
+                scores = np.zeros((len(rows), len(cols)), dtype=np.float64)
+
+        empty_rows = np.array([not t for t in rows])
+        empty_cols = np.array([not t for t in cols])
+        scores[empty_rows, :] = 0.0
+        scores[:, empty_cols] = 0.0
+        return scores.astype(np.float64)
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        """Return one embedding per text, encoding only cache misses.
+
+        Misses are encoded in a single batch. Requires the neural model.
+        """
+        self.load()
+        if self._model is None:
+            raise RuntimeError("Neural paraphrase model is not loaded")
+
+        vectors: List[Optional[np.ndarray]] = [
+            self._embedding_cache.get(self.model_version, text) for text in texts
+        ]
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            encoded = np.asarray(self._model.encode(missing, convert_to_numpy=True), dtype=np.float32)
+            by_text = dict(zip(missing, encoded))
+            for text, vector in by_text.items():
+                self._embedding_cache.put(self.model_version, text, vector)
+            vectors = [v if v is not None else by_text[t] for t, v in zip(texts, vectors)]
+        return vectors  # type: ignore[return-value]
+
+
+def _cosine(vec1: np.ndarray, vec2: np.ndarray) -> float:
+    denom = float(np.linalg.norm(vec1) * np.linalg.norm(vec2))
+    if denom == 0.0:
+        return 0.0
+    return float(np.dot(vec1, vec2) / denom)
+
+
+_models: Dict[str, ParaphraseModel] = {}
+_models_lock = threading.Lock()
+
+
+def get_paraphrase_model(model_name: str = DEFAULT_MODEL_NAME) -> ParaphraseModel:
+    """Return the shared ParaphraseModel for `model_name` (weights load lazily)."""
+    with _models_lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = ParaphraseModel(model_name)
+            _models[model_name] = model
+        return model
+
+
+def warm_up_paraphrase_model(model_name: str = DEFAULT_MODEL_NAME) -> float:
+    """Load the shared model ahead of the first request; returns load time in seconds."""
+    model = get_paraphrase_model(model_name)
+    model.load()
+    return model.load_seconds or 0.0
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def _pairwise_tfidf_scores(rows: List[str], cols: List[str]) -> np.ndarray:
+    """TF-IDF fallback for a whole score matrix.
+
+    `similarity` fits TF-IDF on just the two compared texts, so a term's IDF
+    is 1 when both texts contain it and `_PAIR_UNIQUE_TERM_IDF` otherwise.
+    That makes every pairwise score expressible through term-count matrix
+    products, which reproduces the per-pair fit without fitting per pair.
+    """
+    texts = list(dict.fromkeys(rows + cols))
+    position = {t: i for i, t in enumerate(texts)}
+    try:
+        counts = CountVectorizer().fit_transform(texts).astype(np.float64).tocsr()
+    except ValueError:
+        # Empty vocabulary (no tokens in any text)
+        return np.zeros((len(rows), len(cols)), dtype=np.float64)
+
+    r = counts[[position[t] for t in rows]]
+    c = counts[[position[t] for t in cols]]
+    r_bin, c_bin = (r > 0).astype(np.float64), (c > 0).astype(np.float64)
+    r_sq, c_sq = r.multiply(r), c.multiply(c)
+
+    # Only shared terms contribute to the dot product, with IDF 1 on both sides
+    dots = np.asarray((r @ c.T).todense())
+    k_sq = _PAIR_UNIQUE_TERM_IDF ** 2
+    # ||row||^2 in the pair fit: unique terms weighted by k^2, shared ones by 1
+    row_total = np.asarray(r_sq.sum(axis=1)).reshape(-1, 1)
+    col_total = np.asarray(c_sq.sum(axis=1)).reshape(1, -1)
+    row_shared = np.asarray((r_sq @ c_bin.T).todense())
+    col_shared = np.asarray((r_bin @ c_sq.T).todense())
+    row_norm_sq = k_sq * row_total - (k_sq - 1.0) * row_shared
+    col_norm_sq = k_sq * col_total - (k_sq - 1.0) * col_shared
+
+    denom = np.sqrt(row_norm_sq * col_norm_sq)
+    scores = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+    return np.clip(scores, 0.0, 1.0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, TIMESTAMP, text
+from sqlalchemy import Column, Integer, String, TIMESTAMP, text
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from src.api.database import Base, get_json_type
@@ -20,6 +20,13 @@ class User(Base):
         server_default=text("'{\"enabled\": false, \"remind_before_hours\": []}'")
     )
     avatar_url = Column(String(255), nullable=True)
+    token_version = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+        comment="Лічильник відкликання токенів: збільшується при зміні ролей"
+    )
     
     major = relationship(
         "Major", 
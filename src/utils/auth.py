@@ -1,13 +1,16 @@
+import time
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
 from jose import jwt, JWTError
 from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from src.core.config import JWT_SECRET, JWT_ALGORITHM
+from src.core.config import JWT_SECRET, JWT_ALGORITHM, ROLES_CLAIM_TTL_SECONDS
 from sqlalchemy.orm import Session, joinedload
 from src.api.database import get_db
+from src.api.repositories.user_repository import UserRepository
+from src.api.services.user_cache import CachedUser, user_cache
 from src.models.users import User
-from src.models.roles import Role
-from src.models.user_roles import UserRole
 
 security = HTTPBearer()
 
@@ -90,55 +93,119 @@ def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(secu
             detail="Invalid authentication credentials"
         )
 
-def get_user_role(db: Session, user_id: UUID) -> str:
+
+def _normalize_roles(roles) -> Tuple[str, ...]:
+    return tuple(str(r).lower().strip() for r in roles if r)
+
+
+@dataclass(frozen=True)
+class Principal:
     """
-    Знаходить та повертає назву ролі для вказаного користувача.
-    Повертає роль у нижньому регістрі для консистентності.
+    Автентифікований користувач запиту: id і ролі з токена. `role` — перша
+    роль (або та, якої вимагає require_role), як раніше в User.role.
     """
-    role_name = db.query(Role.name).join(UserRole).filter(UserRole.user_id == user_id).scalar()
-    
-    if not role_name:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User has no assigned role. Access denied."
-        )
-    
-    # Повертаємо роль у нижньому регістрі для консистентності
-    return role_name.lower().strip()
+    id: UUID
+    roles: Tuple[str, ...]
+    role: Optional[str] = None
 
+    @classmethod
+    def from_roles(cls, user_id: UUID, roles) -> "Principal":
+        normalized = _normalize_roles(roles)
+        return cls(id=user_id, roles=normalized, role=normalized[0] if normalized else None)
 
-def get_current_user(db: Session = Depends(get_db), user_id: UUID = Depends(get_current_user_id)) -> User:
-    """
-    Залежність FastAPI, яка отримує ID користувача з токена,
-    завантажує об'єкт користувача, перевіряє наявність ролі та додає
-    її як атрибут до об'єкта.
+
+def _unauthorized(detail: str = "Invalid authentication credentials") -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+) -> Principal:
+    """Залежність FastAPI: користувач і його ролі з Bearer токена.
+
+    Підписаному claim'у `roles` довіряємо ROLES_CLAIM_TTL_SECONDS після
+    видачі токена (`iat`) — тоді запитів до БД немає. Для старіших токенів
+    ролі й версія (`ver`) звіряються з БД, тож відкликання через
+    users.token_version діє не пізніше ніж за ROLES_CLAIM_TTL_SECONDS.
+    FastAPI кешує результат у межах запиту, тож усі залежності запиту
+    отримують один і той самий principal.
+
+    Raises:
+        HTTPException: 401, якщо токен недійсний, відкликаний або
+                       користувача не існує.
     """
+    try:
+        payload = decode_jwt(credentials.credentials)
+        user_id = UUID(payload["sub"])
+    except (TokenDecodeError, KeyError, ValueError, TypeError):
+        raise _unauthorized()
+
+    roles, version, issued_at = payload.get("roles"), payload.get("ver"), payload.get("iat")
+    if (isinstance(roles, list) and version is not None and isinstance(issued_at, (int, float))
+            and time.time() - issued_at <= ROLES_CLAIM_TTL_SECONDS):
+        return Principal.from_roles(user_id, roles)
+
+    # Claim застарів або його немає: звіряємо версію та ролі з БД (через кеш користувачів)
+    user = get_cached_user(db, user_id)
+    if user is None:
+        raise _unauthorized("User not found")
+    if version is not None and version < user.token_version:
+        raise _unauthorized("Token has been revoked")
+    return Principal.from_roles(user_id, user.roles)
+
+
+def get_cached_user(db: Session, user_id: UUID) -> Optional[CachedUser]:
+    """Повертає CachedUser з кешу, а за його відсутності завантажує користувача
+    (разом зі спеціальністю та ролями) з БД і кешує. None — користувача немає."""
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
     user = db.query(User).options(
         joinedload(User.major)
     ).filter(User.id == user_id).first()
-
+    if not user:
+        return None
+
+    cached = CachedUser(
+        id=user.id,
+        email=user.email,
+        full_name=f"{user.last_name or ''} {user.first_name or ''} {user.patronymic or ''}".strip(),
+        roles=_normalize_roles(UserRepository(db).get_user_roles(str(user.id))),
+        token_version=user.token_version,
+        major_name=user.major.name if user.major else None,
+        avatar_url=user.avatar_url,
+        notification_settings=dict(user.notification_settings or {}),
+    )
+    user_cache.put(cached)
+    return cached
+
+
+def get_current_user(db: Session = Depends(get_db), principal: Principal = Depends(get_current_principal)) -> CachedUser:
+    """
+    Залежність FastAPI для ендпоінтів профілю: повертає закешовану копію
+    користувача (профіль, ролі, налаштування) для автентифікованого principal.
+    """
+    user = get_cached_user(db, principal.id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
-        )  
+        )
     return user
 
-def get_current_user_with_role(db: Session = Depends(get_db), user_id: UUID = Depends(get_current_user_id)) -> User:
+def get_current_user_with_role(principal: Principal = Depends(get_current_principal)) -> Principal:
     """
-    Завантажує об'єкт користувача та додає до нього атрибут 'role'.
+    Повертає автентифікованого користувача з атрибутом 'role' (перша роль).
+    Ролі беруться з токена, тож на гарячому шляху запитів до БД немає.
     """
-    user = db.query(User).options(
-        joinedload(User.major)
-    ).filter(User.id == user_id).first()
-    if not user:
+    if not principal.role:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User has no assigned role. Access denied."
         )
-    
-    user.role = get_user_role(db, user_id)
-    return user
+    return principal
 
 
 def require_role(role_name: str):
@@ -147,25 +214,19 @@ def require_role(role_name: str):
     Checks all user roles, not just the first one.
 
     Usage:
-        current_user: User = Depends(require_role('supervisor'))
+        current_user: Principal = Depends(require_role('supervisor'))
     """
-    def _require(
-        user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
-    ) -> User:
-        from src.api.repositories.user_repository import UserRepository
-        user_roles = UserRepository(db).get_user_roles(str(user.id))
+    def _require(principal: Principal = Depends(get_current_principal)) -> Principal:
         required_role = role_name.lower().strip()
         
         # Перевіряємо, чи користувач має потрібну роль
-        if not any(r.lower().strip() == required_role for r in user_roles):
+        if required_role not in principal.roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"This endpoint requires role '{role_name}'",
             )
         
-        # Додаємо роль як атрибут для сумісності
-        user.role = required_role
-        return user
+        # Роль, з якою користувач звертається до ендпоінта (спільний principal не змінюємо)
+        return replace(principal, role=required_role)
 
     return _require
\ No newline at end of file
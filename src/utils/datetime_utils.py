@@ -28,4 +28,11 @@ def to_utc_iso(dt: Optional[datetime]) -> Optional[str]:
         dt = dt.astimezone(timezone.utc)
 
     # isoformat() для UTC може повернути +00:00, замінюємо на Z для консистентності
-    return dt.isoformat().replace('+00:00', 'Z')
\ No newline at end of file
+    return dt.isoformat().replace('+00:00', 'Z')
+
+
+def as_utc(dt: datetime) -> datetime:
+    """Повертає aware datetime в UTC; naive datetime (як з SQLite) трактується як UTC."""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
@@ -0,0 +1,110 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 від тексту — ключ кешу, що не залежить від id відповіді чи спроби."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Кеш ембедингів текстів: обмежений LRU у пам'яті + опційне сховище на диску.
+
+    Ключ — пара (версія моделі, хеш тексту), тому той самий текст кодується
+    не більше одного разу для кожної моделі, а зміна моделі не повертає
+    застарілих векторів. Якщо задано `persist_dir`, кожен вектор зберігається
+    окремим `.npy` файлом і при промаху в пам'яті читається з диску —
+    кеш переживає рестарт процесу і спільний для воркерів на одному хості.
+    """
+
+    def __init__(self, max_size: int = 2048, persist_dir: Optional[str] = None) -> None:
+        self.max_size = max_size
+        self.persist_dir = persist_dir
+        self._items: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, model_version: str, text: str) -> Optional[np.ndarray]:
+        key = (model_version, text_hash(text))
+        with self._lock:
+            vector = self._items.get(key)
+            if vector is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        vector = self._load(key)
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store_in_memory(key, vector)
+            return vector
+
+    def put(self, model_version: str, text: str, vector: np.ndarray) -> None:
+        key = (model_version, text_hash(text))
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._store_in_memory(key, vector)
+        self._save(key, vector)
+
+    def clear(self) -> None:
+        """Очищає лише пам'ять; файли на диску лишаються."""
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    # ---------- внутрішні методи ----------
+
+    def _store_in_memory(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        self._items[key] = vector
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def _path(self, key: Tuple[str, str]) -> Optional[str]:
+        if not self.persist_dir:
+            return None
+        model_version, digest = key
+        safe_version = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_version)
+        return os.path.join(self.persist_dir, safe_version, f"{digest}.npy")
+
+    def _load(self, key: Tuple[str, str]) -> Optional[np.ndarray]:
+        path = self._path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            # Без mmap: кожен memmap у LRU тримав би власний файловий дескриптор
+            return np.load(path)
+        except Exception:
+            logger.warning(f"Corrupted embedding cache file {path}, ignoring", exc_info=True)
+            return None
+
+    def _save(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        path = self._path(key)
+        if path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Запис через тимчасовий файл, щоб паралельний читач не побачив напівзаписаний .npy
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, vector)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.warning(f"Could not persist embedding to {path}", exc_info=True)
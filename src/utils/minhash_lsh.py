@@ -0,0 +1,179 @@
+import re
+import threading
+from collections import OrderedDict
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Set
+
+import numpy as np
+
+# Просте число Мерсенна для універсального хешування (a * x + b) mod p.
+# a, b, x < 2^31, тому добуток уміщається в uint64 без переповнення.
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_MAX_HASH = np.uint32((1 << 31) - 1)
+
+_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+
+def word_shingles(text: str, size: int = 3) -> Set[str]:
+    """
+    Множина словесних шинглів (послідовностей з `size` слів) тексту.
+    Токенізація така сама, як у TfidfVectorizer (lowercase, слова від 2 символів).
+    Короткий текст (менше `size` слів) дає один шингл з усіх слів.
+    """
+    tokens = _TOKEN_RE.findall((text or "").lower())
+    if not tokens:
+        return set()
+    if len(tokens) < size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class MinHashLSHIndex:
+    """
+    MinHash-сигнатури словесних шинглів + LSH banding.
+
+    Сигнатура з `num_perm` мінхешів оцінює схожість Жаккара двох текстів;
+    сигнатура ділиться на `bands` смуг, і документи, що збіглися хоча б в одній
+    смузі, стають кандидатами. Запит переглядає лише свої кошики, тобто працює
+    за сублінійний від розміру індексу час. Поріг, з якого пара майже напевно
+    стає кандидатом, приблизно (1 / bands) ** (bands / num_perm).
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, shingle_size: int = 3, seed: int = 1) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm).astype(np.uint64)
+
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, Set[Hashable]]] = [{} for _ in range(bands)]
+        self._lock = threading.RLock()
+        # Мітка часу, до якої індекс синхронізовано з постійним сховищем (веде власник індексу)
+        self.synced_until: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._signatures
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash-сигнатура тексту або None, якщо в тексті немає жодного шингла."""
+        shingles = word_shingles(text, self.shingle_size)
+        if not shingles:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) & int(_MAX_HASH) for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        signature = np.asarray(signature, dtype=np.uint32)
+        if signature.shape != (self.num_perm,):
+            raise ValueError(f"Signature must have {self.num_perm} values")
+        with self._lock:
+            if key in self._signatures:
+                self.remove(key)
+            self._signatures[key] = signature
+            for band, band_key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(band_key, set()).add(key)
+
+    def remove(self, key: Hashable) -> bool:
+        with self._lock:
+            signature = self._signatures.pop(key, None)
+            if signature is None:
+                return False
+            for band, band_key in enumerate(self._band_keys(signature)):
+                bucket = self._buckets[band].get(band_key)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band][band_key]
+            return True
+
+    def query(
+        self,
+        signature: np.ndarray,
+        exclude: Optional[Set[Hashable]] = None,
+        min_jaccard: float = 0.0,
+    ) -> Dict[Hashable, float]:
+        """
+        Кандидати, що збіглися з сигнатурою хоча б в одній смузі,
+        з оцінкою схожості Жаккара (частка однакових мінхешів).
+        """
+        signature = np.asarray(signature, dtype=np.uint32)
+        with self._lock:
+            candidates: Set[Hashable] = set()
+            for band, band_key in enumerate(self._band_keys(signature)):
+                candidates |= self._buckets[band].get(band_key, set())
+            if exclude:
+                candidates -= exclude
+
+            result: Dict[Hashable, float] = {}
+            for key in candidates:
+                estimate = float(np.mean(self._signatures[key] == signature))
+                if estimate >= min_jaccard:
+                    result[key] = estimate
+            return result
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+
+class MinHashIndexRegistry:
+    """
+    Потокобезпечний реєстр LSH-індексів, один `MinHashLSHIndex` на ключ (course_id).
+    Тримає щонайбільше `max_size` індексів: при переповненні витісняється той,
+    до якого найдовше не зверталися (наступна перевірка курсу завантажить його з БД).
+    """
+
+    def __init__(self, max_size: int = 128, **index_kwargs: Any) -> None:
+        self.max_size = max_size
+        self._index_kwargs = index_kwargs
+        self._indexes: "OrderedDict[Any, MinHashLSHIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Усі індекси мають однакові параметри, тож сигнатури сумісні між курсами
+        self._hasher = MinHashLSHIndex(**index_kwargs)
+        self.num_perm = self._hasher.num_perm
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._indexes
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        return self._hasher.signature(text)
+
+    def get_or_create(self, key: Any) -> MinHashLSHIndex:
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = MinHashLSHIndex(**self._index_kwargs)
+                self._indexes[key] = index
+                while len(self._indexes) > self.max_size:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(key)
+            return index
+
+    def drop(self, key: Any) -> None:
+        with self._lock:
+            self._indexes.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
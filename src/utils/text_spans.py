@@ -0,0 +1,86 @@
+from typing import Dict, List, Tuple
+
+# Скільки позицій з однаковим k-грамом перевіряти (захист від текстів з повторами)
+MAX_CANDIDATES_PER_GRAM = 32
+
+
+def _common_prefix_len(a: str, i: int, b: str, j: int, limit: int) -> int:
+    """
+    Довжина спільного префікса a[i:] та b[j:] (не більше limit).
+    Порівнює шматками зі зростаючим кроком, тож працює на рівні C, а не посимвольно.
+    """
+    length = 0
+    step = 16
+    while length < limit:
+        size = min(step, limit - length)
+        if a[i + length:i + length + size] == b[j + length:j + length + size]:
+            length += size
+            step *= 2
+            continue
+        # Шматок відрізняється — добираємо посимвольно в межах нього
+        while length < limit and a[i + length] == b[j + length]:
+            length += 1
+        break
+    return length
+
+
+def find_common_spans(
+    base_text: str,
+    other_text: str,
+    min_match_len: int = 20,
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """
+    Знаходить спільні фрагменти довжиною від min_match_len символів.
+
+    Усі k-грами (k = min_match_len) other_text індексуються хешем рядка,
+    base_text сканується зліва направо: на збігу k-грама фрагмент
+    розширюється до максимальної довжини, і сканування продовжується
+    після нього. Час майже лінійний від довжини текстів (на відміну від
+    квадратичного SequenceMatcher), а переставлені місцями абзаци теж
+    знаходяться. Фрагменти не перетинаються ні в base_text, ні в other_text.
+
+    Повертає (span'и в base_text, відповідні span'и в other_text),
+    впорядковані за позицією в base_text.
+    """
+    base_spans: List[Tuple[int, int]] = []
+    other_spans: List[Tuple[int, int]] = []
+    k = max(1, min_match_len)
+    n, m = len(base_text), len(other_text)
+    if n < k or m < k:
+        return base_spans, other_spans
+
+    positions: Dict[str, List[int]] = {}
+    for j in range(m - k + 1):
+        bucket = positions.setdefault(other_text[j:j + k], [])
+        if len(bucket) < MAX_CANDIDATES_PER_GRAM:
+            bucket.append(j)
+
+    # Позначки вже використаних символів other_text
+    used = bytearray(m)
+
+    i = 0
+    while i <= n - k:
+        candidates = positions.get(base_text[i:i + k])
+        best_len, best_j = 0, -1
+        if candidates:
+            for j in candidates:
+                if used[j]:
+                    continue
+                length = k + _common_prefix_len(
+                    base_text, i + k, other_text, j + k, min(n - i, m - j) - k
+                )
+                taken = used.find(1, j, j + length)
+                if taken != -1:
+                    length = taken - j
+                if length > best_len:
+                    best_len, best_j = length, j
+
+        if best_len >= k:
+            base_spans.append((i, i + best_len))
+            other_spans.append((best_j, best_j + best_len))
+            used[best_j:best_j + best_len] = b"\x01" * best_len
+            i += best_len
+        else:
+            i += 1
+
+    return base_spans, other_spans
@@ -0,0 +1,217 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Позначка слоту видаленого документа (ключ None теж допустимий, тому окремий об'єкт)
+_REMOVED = object()
+
+
+class IncrementalTfidfIndex:
+    """
+    Інкрементальний TF-IDF індекс для одного набору документів (напр. відповідей на питання).
+
+    Зберігає словник, document frequency кожного терміну і частоти термінів усіх
+    документів у пласких масивах (рядок, стовпець, частота), що лише дописуються:
+    - `add` — O(довжина документа) амортизовано, без повторного fit і без перебудови матриці;
+    - `remove` — O(довжина документа): рядок позначається видаленим, а масиви
+      ущільнюються, коли видалених рядків стає більше, ніж живих;
+    - `query` — O(кількість ненульових частот): IDF змінюється з кожним новим
+      документом, тому ваги та L2-норми рядків рахуються під час запиту
+      векторизованим проходом по масивах (np.bincount).
+
+    Ваги та нормалізація ідентичні `TfidfVectorizer()` за замовчуванням
+    (smooth_idf=True, norm="l2"), тому результат `query` збігається з
+    `cosine_similarity(TfidfVectorizer().fit_transform(corpus))` для того ж корпусу.
+    """
+
+    def __init__(self) -> None:
+        # Той самий аналізатор (lowercase + token_pattern), що й у TfidfVectorizer
+        self._analyze = TfidfVectorizer().build_analyzer()
+        self._vocabulary: Dict[str, int] = {}
+        self._df: List[int] = []
+        # Слоти рядків у порядку додавання; видалений рядок має ключ _REMOVED
+        self._keys: List[Hashable] = []
+        self._texts: List[str] = []
+        self._spans: List[Tuple[int, int]] = []
+        self._positions: Dict[Hashable, int] = {}
+        # Пласкі масиви частот: (слот рядка, стовпець, частота); заповнено перші _nnz елементів
+        self._row_ids = np.zeros(0, dtype=np.int64)
+        self._cols = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.float64)
+        self._nnz = 0
+        self._lock = threading.RLock()
+        # Мітка часу, до якої індекс синхронізовано з постійним сховищем (веде власник індексу)
+        self.synced_until: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._positions
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return [k for k in self._keys if k is not _REMOVED]
+
+    def get_text(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            pos = self._positions.get(key)
+            return self._texts[pos] if pos is not None else None
+
+    def add(self, key: Hashable, text: str) -> None:
+        """Додає документ або замінює вже проіндексований документ з тим самим ключем."""
+        with self._lock:
+            if key in self._positions:
+                self.remove(key)
+
+            counts: Dict[int, int] = {}
+            for token in self._analyze(text or ""):
+                col = self._vocabulary.get(token)
+                if col is None:
+                    col = len(self._df)
+                    self._vocabulary[token] = col
+                    self._df.append(0)
+                counts[col] = counts.get(col, 0) + 1
+            for col in counts:
+                self._df[col] += 1
+
+            pos = len(self._keys)
+            start = self._nnz
+            self._reserve(start + len(counts))
+            end = start + len(counts)
+            self._row_ids[start:end] = pos
+            self._cols[start:end] = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            self._counts[start:end] = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            self._nnz = end
+
+            self._positions[key] = pos
+            self._keys.append(key)
+            self._texts.append(text or "")
+            self._spans.append((start, end))
+
+    def remove(self, key: Hashable) -> bool:
+        with self._lock:
+            pos = self._positions.pop(key, None)
+            if pos is None:
+                return False
+            start, end = self._spans[pos]
+            for col in self._cols[start:end]:
+                self._df[col] -= 1
+            self._keys[pos] = _REMOVED
+            self._texts[pos] = ""
+            if len(self._keys) - len(self._positions) > len(self._positions):
+                self._compact()
+            return True
+
+    def query(self, key: Hashable) -> Tuple[List[Hashable], List[float], List[str]]:
+        """
+        Повертає (ключі, схожості, тексти) усіх інших документів індексу
+        відносно документа `key`, у порядку додавання.
+        """
+        with self._lock:
+            pos = self._positions.get(key)
+            if pos is None:
+                raise KeyError(key)
+
+            others = [i for i, k in enumerate(self._keys) if k is not _REMOVED and i != pos]
+            if not others:
+                return [], [], []
+
+            idf_sq = self._idf() ** 2
+            n_slots = len(self._keys)
+            row_ids = self._row_ids[:self._nnz]
+            cols = self._cols[:self._nnz]
+            counts = self._counts[:self._nnz]
+
+            start, end = self._spans[pos]
+            weighted = np.zeros(len(self._df), dtype=np.float64)
+            weighted[self._cols[start:end]] = self._counts[start:end] * idf_sq[self._cols[start:end]]
+
+            dots = np.bincount(row_ids, weights=counts * weighted[cols], minlength=n_slots)
+            norms = np.sqrt(np.bincount(row_ids, weights=counts ** 2 * idf_sq[cols], minlength=n_slots))
+
+            denom = norms[others] * norms[pos]
+            sims = np.divide(dots[others], denom, out=np.zeros(len(others)), where=denom > 0)
+            sims = np.clip(sims, 0.0, 1.0)
+            return [self._keys[i] for i in others], sims.tolist(), [self._texts[i] for i in others]
+
+    # ---------- внутрішні методи ----------
+
+    def _idf(self) -> np.ndarray:
+        n_docs = len(self._positions)
+        df = np.asarray(self._df, dtype=np.float64)
+        return np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+
+    def _reserve(self, size: int) -> None:
+        """Розширює пласкі масиви з подвоєнням місткості (амортизовано O(1) на елемент)."""
+        capacity = len(self._cols)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 64)
+        for name in ("_row_ids", "_cols", "_counts"):
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:self._nnz] = old[:self._nnz]
+            setattr(self, name, grown)
+
+    def _compact(self) -> None:
+        """Прибирає видалені рядки з масивів і перенумеровує слоти живих документів."""
+        alive = [i for i, k in enumerate(self._keys) if k is not _REMOVED]
+        keep = np.concatenate(
+            [np.arange(*self._spans[i], dtype=np.int64) for i in alive]
+        ) if alive else np.zeros(0, dtype=np.int64)
+        lengths = [self._spans[i][1] - self._spans[i][0] for i in alive]
+
+        self._cols = self._cols[keep]
+        self._counts = self._counts[keep]
+        self._row_ids = np.repeat(np.arange(len(alive), dtype=np.int64), lengths)
+        self._nnz = len(keep)
+
+        self._keys = [self._keys[i] for i in alive]
+        self._texts = [self._texts[i] for i in alive]
+        offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+        self._spans = [(int(offsets[i]), int(offsets[i + 1])) for i in range(len(alive))]
+        self._positions = {k: i for i, k in enumerate(self._keys)}
+
+
+class TfidfIndexRegistry:
+    """
+    Потокобезпечний реєстр індексів, один `IncrementalTfidfIndex` на ключ (question_id).
+    Тримає щонайбільше `max_size` індексів: при переповненні витісняється той,
+    до якого найдовше не зверталися (його буде перебудовано з БД при потребі).
+    """
+
+    def __init__(self, max_size: int = 512) -> None:
+        self.max_size = max_size
+        self._indexes: "OrderedDict[Any, IncrementalTfidfIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._indexes
+
+    def get_or_create(self, key: Any) -> IncrementalTfidfIndex:
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = IncrementalTfidfIndex()
+                self._indexes[key] = index
+                while len(self._indexes) > self.max_size:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(key)
+            return index
+
+    def drop(self, key: Any) -> None:
+        with self._lock:
+            self._indexes.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
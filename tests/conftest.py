@@ -1,5 +1,6 @@
 """
-Shared pytest fixtures for tests - using mocks only to avoid database issues.
+Shared pytest fixtures for tests.
+Most tests use mocks only; the db_* fixtures provide an isolated in-memory SQLite database.
 """
 import pytest
 from uuid import uuid4
@@ -34,3 +35,132 @@ def test_question_id():
 def test_attempt_id():
     """Generate a test attempt ID."""
     return uuid4()
+
+
+# In-memory SQLite database for tests that need real SQL (query counts, upserts)
+@pytest.fixture
+def db_engine():
+    """Create an isolated in-memory SQLite engine with all tables."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+    from src.api.database import Base
+    from src.models import (  # noqa: F401 — реєструємо всі таблиці в metadata
+        users, roles, user_roles, exams, courses, majors, user_majors, attempts,
+        course_exams, course_supervisors, exam_participants, exam_email_notifications,
+    )
+
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(db_engine):
+    """Open a session bound to the in-memory test database."""
+    from sqlalchemy.orm import sessionmaker
+
+    session = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def count_queries(db_engine):
+    """Return a context manager factory that counts SQL statements sent to the test engine."""
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def _counter():
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", _before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db_engine, "before_cursor_execute", _before_cursor_execute)
+
+    return _counter
+
+
+@pytest.fixture
+def make_exam(db_session):
+    """
+    Return a factory that creates an exam owned by a fresh user, with questions,
+    registered students and attempts of the owner, and commits.
+
+    Questions are dicts with `question_type` and optional `title`, `position`
+    (defaults to list order), `points`, `options` ([(text, is_correct)]) and
+    `pairs` ([(prompt, correct_match)]). Attempt times are offsets from now.
+    Remaining keyword arguments are Exam columns; `db` overrides the session.
+    """
+    from datetime import datetime, timedelta, timezone
+    from types import SimpleNamespace
+    from src.models.attempts import Attempt, AttemptStatus
+    from src.models.exam_participants import ExamParticipant
+    from src.models.exams import Exam, Option, Question
+    from src.models.matching_options import MatchingOption
+    from src.models.users import User
+
+    def _make(questions=(), *, attempts=0, attempt_status=AttemptStatus.in_progress, started=timedelta(0),
+              due=timedelta(hours=1), students=0, db=None, **exam_fields):
+        db = db or db_session
+        now = datetime.now(timezone.utc)
+        owner = User(email=f"owner-{uuid4()}@test.com", hashed_password="x", first_name="O", last_name="W")
+        db.add(owner)
+        db.flush()
+        exam_fields.setdefault("title", "Іспит")
+        exam_fields.setdefault("start_at", now - timedelta(hours=1))
+        exam_fields.setdefault("end_at", now + timedelta(hours=1))
+        exam = Exam(owner_id=owner.id, **exam_fields)
+        db.add(exam)
+        db.flush()
+
+        created = [
+            Question(exam_id=exam.id, question_type=spec["question_type"], title=spec.get("title", f"Q{i}"),
+                     position=spec.get("position", i), points=spec.get("points"))
+            for i, spec in enumerate(questions, start=1)
+        ]
+        db.add_all(created)
+        db.flush()
+        options = [
+            [Option(question_id=q.id, text=text, is_correct=is_correct) for text, is_correct in spec.get("options", ())]
+            for q, spec in zip(created, questions)
+        ]
+        pairs = [
+            [MatchingOption(question_id=q.id, prompt=prompt, correct_match=match) for prompt, match in spec.get("pairs", ())]
+            for q, spec in zip(created, questions)
+        ]
+        db.add_all([row for rows in options + pairs for row in rows])
+
+        student_ids = []
+        for i in range(students):
+            student = User(email=f"student-{i}-{uuid4()}@test.com", hashed_password="x", first_name="S", last_name="T")
+            db.add(student)
+            db.flush()
+            db.add(ExamParticipant(exam_id=exam.id, user_id=student.id, is_active=True))
+            student_ids.append(student.id)
+
+        created_attempts = [
+            Attempt(exam_id=exam.id, user_id=owner.id, status=attempt_status,
+                    started_at=now + started, due_at=now + due)
+            for _ in range(attempts)
+        ]
+        db.add_all(created_attempts)
+        db.commit()
+        return SimpleNamespace(
+            now=now, owner=owner, exam=exam, questions=created, options=options, pairs=pairs,
+            students=student_ids, attempts=created_attempts,
+        )
+
+    return _make
@@ -0,0 +1,442 @@
+"""
+Tests for the autosave write-behind buffer (AnswerWriteBuffer): coalescing,
+immediate acknowledgement, batched flushes and the durability guarantees
+documented in src/api/background/answer_buffer.py.
+"""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from src.api.background.answer_buffer import AnswerWriteBuffer
+from src.api.errors.app_errors import ConflictError, NotFoundError
+from src.api.repositories import attempts_repository
+from src.api.repositories.attempts_repository import AttemptsRepository
+from src.api.schemas.attempts import AnswerUpsert
+from src.api.services.attempts_service import AttemptsService
+from src.api.services.bulk_grading_service import BulkGradingService
+from src.api.services.exam_status_scheduler import grade_closed_exams
+from src.models.attempts import Answer, AnswerOption, Attempt, AttemptStatus
+from src.models.exams import ExamStatusEnum, Option, QuestionType
+
+
+@pytest.fixture
+def seed(make_exam):
+    def _seed(n_attempts=1):
+        """Create an open exam with a single-choice and a short-answer question and in-progress attempts."""
+        made = make_exam(
+            [
+                {"question_type": QuestionType.single_choice, "title": "S", "points": 1,
+                 "options": [("a", True), ("b", False)]},
+                {"question_type": QuestionType.short_answer, "title": "T", "points": 1, "options": [("42", True)]},
+            ],
+            attempts=n_attempts, started=-timedelta(minutes=5), due=timedelta(minutes=55),
+            title="Autosave", status=ExamStatusEnum.open,
+        )
+        (right, wrong), _ = made.options
+        return {
+            "exam": made.exam.id, "single": made.questions[0].id, "short": made.questions[1].id,
+            "right": right.id, "wrong": wrong.id, "attempts": [attempt.id for attempt in made.attempts],
+        }
+    return _seed
+
+
+@pytest.fixture
+def buffer(db_engine):
+    return AnswerWriteBuffer(session_factory=sessionmaker(autoflush=False, bind=db_engine), flush_interval=5)
+
+
+def _time_out(db, ids):
+    """Move the attempts' deadline into the past, as at exam close."""
+    db.query(Attempt).filter(Attempt.id.in_(ids["attempts"])).update(
+        {Attempt.due_at: datetime.now(timezone.utc) - timedelta(minutes=1)}, synchronize_session=False
+    )
+    db.commit()
+
+
+def _bulk_grading():
+    return BulkGradingService(plagiarism_worker=MagicMock())
+
+
+def _answers(db, attempt_id):
+    db.expire_all()
+    return {answer.question_id: answer for answer in db.query(Answer).filter(Answer.attempt_id == attempt_id)}
+
+
+class TestBufferedSaves:
+    def test_save_is_acknowledged_without_writing(self, db_session, seed, buffer):
+        """A save returns a full acknowledgement but only lands in the database on flush."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        entry = buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="41"))
+
+        assert entry.answer_id is not None
+        assert _answers(db_session, attempt_id) == {}
+
+        assert buffer.flush() == 1
+        saved = _answers(db_session, attempt_id)[ids["short"]]
+        assert saved.id == entry.answer_id
+        assert saved.answer_text == "41"
+
+    def test_rapid_saves_are_coalesced(self, db_session, seed, buffer):
+        """Repeated saves of one question keep only the last value and the same answer id."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        first = buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["single"], selected_option_ids=[ids["wrong"]]))
+        for text in ("4", "42"):
+            buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text=text))
+        last = buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["single"], selected_option_ids=[ids["right"]]))
+
+        assert len(buffer) == 2
+        assert last.answer_id == first.answer_id
+        assert buffer.flush() == 2
+
+        saved = _answers(db_session, attempt_id)
+        assert saved[ids["short"]].answer_text == "42"
+        assert [o.selected_option_id for o in saved[ids["single"]].selected_options] == [ids["right"]]
+
+    def test_only_first_save_of_attempt_reads_database(self, db_session, seed, buffer, count_queries):
+        """Attempt state is cached: later saves of the same attempt issue no SQL at all."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        AttemptsRepository(db_session).get_exam_content(ids["exam"])  # shared by every attempt of the exam
+        with count_queries() as first:
+            buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="1"))
+        with count_queries() as later:
+            for i in range(10):
+                buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text=str(i)))
+
+        assert len(first) == 2
+        assert later == []
+
+    def test_flush_statement_count_is_independent_of_volume(self, db_session, seed, buffer, count_queries):
+        """Saves of many attempts are written with a fixed number of statements."""
+        ids = seed(n_attempts=20)
+        for attempt_id in ids["attempts"]:
+            buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="42"))
+            buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["single"], selected_option_ids=[ids["right"]]))
+
+        with count_queries() as statements:
+            assert buffer.flush() == 40
+
+        writes = [s for s in statements
+                  if not s.lstrip().upper().startswith(("SELECT", "BEGIN", "COMMIT", "SAVEPOINT", "RELEASE"))]
+        assert len(writes) <= 3
+        assert db_session.query(Answer).count() == 40
+
+    def test_existing_answer_keeps_its_id(self, db_session, seed, buffer):
+        """Updating an answer that is already stored reuses its row instead of inserting a new one."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        stored = Answer(attempt_id=attempt_id, question_id=ids["short"], answer_text="old",
+                        saved_at=datetime.now(timezone.utc))
+        db_session.add(stored)
+        db_session.commit()
+
+        entry = buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="new"))
+        buffer.flush()
+
+        assert entry.answer_id == stored.id
+        saved = _answers(db_session, attempt_id)
+        assert len(saved) == 1
+        assert saved[ids["short"]].answer_text == "new"
+
+    def test_rejects_unknown_attempt_question_and_closed_attempt(self, db_session, seed, buffer):
+        ids = seed(n_attempts=2)
+        open_id, submitted_id = ids["attempts"]
+        db_session.query(Attempt).filter(Attempt.id == submitted_id).update({"status": AttemptStatus.submitted})
+        db_session.commit()
+
+        with pytest.raises(NotFoundError):
+            buffer.put(db_session, uuid4(), AnswerUpsert(question_id=ids["short"], text="1"))
+        with pytest.raises(NotFoundError):
+            buffer.put(db_session, open_id, AnswerUpsert(question_id=uuid4(), text="1"))
+        with pytest.raises(ConflictError):
+            buffer.put(db_session, submitted_id, AnswerUpsert(question_id=ids["short"], text="1"))
+        assert len(buffer) == 0
+
+    def test_rejects_option_of_another_question(self, db_session, seed, buffer):
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        short_option = db_session.query(Option.id).filter(Option.question_id == ids["short"]).scalar()
+
+        with pytest.raises(NotFoundError):
+            buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["single"], selected_option_ids=[short_option]))
+        with pytest.raises(NotFoundError):
+            buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["single"], selected_option_ids=[uuid4()]))
+        assert len(buffer) == 0
+
+    def test_disabled_buffer_writes_through(self, db_session, seed, db_engine):
+        """With AUTOSAVE_FLUSH_SECONDS=0 every save is committed immediately."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        buffer = AnswerWriteBuffer(session_factory=sessionmaker(bind=db_engine), flush_interval=0)
+        entry = buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="42"))
+
+        assert len(buffer) == 0
+        assert _answers(db_session, attempt_id)[ids["short"]].id == entry.answer_id
+
+
+class TestDurability:
+    def test_failed_flush_is_retried(self, db_session, seed, buffer):
+        """A flush that fails puts its saves back; the next flush writes them."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="42"))
+
+        with patch.object(AttemptsRepository, "upsert_answers", side_effect=RuntimeError("db down")):
+            assert buffer.flush() == 0
+        assert len(buffer) == 1
+
+        assert buffer.flush() == 1
+        assert _answers(db_session, attempt_id)[ids["short"]].answer_text == "42"
+
+    @staticmethod
+    def _buffer_answer_to_deleted_option(db_session, db_engine, buffer, ids):
+        """Buffer a save for the first attempt whose option is deleted before the flush."""
+        with db_engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+        bad_attempt, good_attempt = ids["attempts"]
+        buffer.put(db_session, bad_attempt, AnswerUpsert(question_id=ids["single"], selected_option_ids=[ids["wrong"]]))
+        buffer.put(db_session, good_attempt, AnswerUpsert(question_id=ids["short"], text="42"))
+        db_session.query(Option).filter(Option.id == ids["wrong"]).delete()
+        db_session.commit()
+        return bad_attempt, good_attempt
+
+    def test_bad_answer_does_not_block_other_attempts(self, db_session, seed, db_engine, buffer):
+        """One attempt's failing row is set aside; the other attempts are still written."""
+        ids = seed(n_attempts=2)
+        bad_attempt, good_attempt = self._buffer_answer_to_deleted_option(db_session, db_engine, buffer, ids)
+
+        assert buffer.flush() == 1
+        assert _answers(db_session, good_attempt)[ids["short"]].answer_text == "42"
+        assert _answers(db_session, bad_attempt) == {}
+        assert buffer.pending_attempt_ids() == {bad_attempt}
+
+    def test_grading_skips_attempts_with_unflushed_answers(self, db_session, seed, db_engine, buffer):
+        ids = seed(n_attempts=2)
+        bad_attempt, good_attempt = self._buffer_answer_to_deleted_option(db_session, db_engine, buffer, ids)
+        _time_out(db_session, ids)
+
+        assert grade_closed_exams(db_session, [ids["exam"]], grading_service=_bulk_grading(), answer_buffer=buffer) == 1
+
+        db_session.expire_all()
+        statuses = dict(db_session.query(Attempt.id, Attempt.status).all())
+        assert statuses[bad_attempt] == AttemptStatus.in_progress
+        assert statuses[good_attempt] == AttemptStatus.completed
+
+    def test_newer_save_wins_over_restored_one(self, db_session, seed, buffer):
+        """Saves restored after a failed flush never overwrite a newer save of the same question."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="old"))
+
+        def _fail_after_new_save(*_args, **_kwargs):
+            buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="new"))
+            raise RuntimeError("db down")
+
+        with patch.object(AttemptsRepository, "upsert_answers", side_effect=_fail_after_new_save):
+            buffer.flush()
+
+        buffer.flush()
+        assert _answers(db_session, attempt_id)[ids["short"]].answer_text == "new"
+
+    def test_saves_of_submitted_attempt_are_dropped(self, db_session, seed, buffer):
+        """Buffered saves never modify an attempt that was submitted in the meantime."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="late"))
+        db_session.query(Attempt).filter(Attempt.id == attempt_id).update({"status": AttemptStatus.submitted})
+        db_session.commit()
+
+        assert buffer.flush() == 0
+        assert len(buffer) == 0
+        assert _answers(db_session, attempt_id) == {}
+
+    def test_submit_grades_buffered_answers(self, db_session, seed, buffer):
+        """Submit writes the attempt's buffered saves in its own transaction before grading."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        service = AttemptsService(plagiarism_service=MagicMock(), plagiarism_worker=MagicMock(), answer_buffer=buffer)
+        service.add_answer(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="42"))
+        service.add_answer(db_session, attempt_id, AnswerUpsert(question_id=ids["single"], selected_option_ids=[ids["right"]]))
+
+        service.submit(db_session, attempt_id)
+
+        assert len(buffer) == 0
+        attempt = db_session.query(Attempt).filter(Attempt.id == attempt_id).one()
+        assert attempt.status == AttemptStatus.completed
+        assert attempt.correct_answers == 2
+        assert attempt.earned_points == 100.0
+
+    def test_failed_submit_restores_buffered_answers(self, db_session, seed, buffer):
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        service = AttemptsService(plagiarism_service=MagicMock(), plagiarism_worker=MagicMock(), answer_buffer=buffer)
+        service.add_answer(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="42"))
+
+        with patch.object(AttemptsService, "_submit_loaded", side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError):
+                service.submit(db_session, attempt_id)
+
+        assert len(buffer) == 1
+        assert _answers(db_session, attempt_id) == {}
+
+    def test_closing_exam_flushes_buffer_before_grading(self, db_session, seed, buffer):
+        """Bulk grading of a closed exam sees every acknowledged save."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        buffer.put(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="42"))
+        _time_out(db_session, ids)
+
+        grade_closed_exams(db_session, [ids["exam"]], grading_service=_bulk_grading(), answer_buffer=buffer)
+
+        attempt = db_session.query(Attempt).filter(Attempt.id == attempt_id).one()
+        assert attempt.correct_answers == 1
+        assert db_session.query(AnswerOption).count() == 0
+
+
+class TestBatchUpsert:
+    @staticmethod
+    def _service(buffer):
+        return AttemptsService(plagiarism_service=MagicMock(), plagiarism_worker=MagicMock(), answer_buffer=buffer)
+
+    def test_batch_is_written_immediately_in_one_pass(self, db_session, seed, buffer, count_queries):
+        """A full exam state is stored with one commit and a fixed number of statements."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        payloads = [
+            AnswerUpsert(question_id=ids["short"], text="42"),
+            AnswerUpsert(question_id=ids["single"], selected_option_ids=[ids["right"]]),
+        ]
+        AttemptsRepository(db_session).get_exam_content(ids["exam"])
+        with count_queries() as statements:
+            result = self._service(buffer).add_answers(db_session, attempt_id, payloads)
+
+        assert [answer.question_id for answer in result] == [ids["short"], ids["single"]]
+        assert result[1].selected_option_ids == [ids["right"]]
+        assert len(buffer) == 0
+        # Контекст спроби (2), INSERT ... ON CONFLICT answers, DELETE + INSERT answer_options
+        assert len([s for s in statements if not s.lstrip().upper().startswith(("BEGIN", "COMMIT"))]) == 5
+        saved = _answers(db_session, attempt_id)
+        assert {question_id: answer.id for question_id, answer in saved.items()} == {
+            answer.question_id: answer.id for answer in result
+        }
+
+    def test_batch_updates_existing_answers_and_last_duplicate_wins(self, db_session, seed, buffer):
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        service = self._service(buffer)
+        first = service.add_answers(db_session, attempt_id, [AnswerUpsert(question_id=ids["short"], text="1")])
+
+        second = service.add_answers(db_session, attempt_id, [
+            AnswerUpsert(question_id=ids["short"], text="2"),
+            AnswerUpsert(question_id=ids["short"], text="3"),
+        ])
+
+        assert len(second) == 1
+        assert second[0].id == first[0].id
+        saved = _answers(db_session, attempt_id)
+        assert len(saved) == 1
+        assert saved[ids["short"]].answer_text == "3"
+
+    def test_batch_supersedes_older_buffered_saves(self, db_session, seed, buffer):
+        """A buffered autosave made before the batch never overwrites it on a later flush."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        service = self._service(buffer)
+        service.add_answer(db_session, attempt_id, AnswerUpsert(question_id=ids["short"], text="stale"))
+        service.add_answers(db_session, attempt_id, [AnswerUpsert(question_id=ids["short"], text="fresh")])
+
+        assert buffer.flush() == 0
+        assert _answers(db_session, attempt_id)[ids["short"]].answer_text == "fresh"
+
+    def test_unknown_question_rejects_whole_batch(self, db_session, seed, buffer):
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        with pytest.raises(NotFoundError):
+            self._service(buffer).add_answers(db_session, attempt_id, [
+                AnswerUpsert(question_id=ids["short"], text="42"),
+                AnswerUpsert(question_id=uuid4(), text="x"),
+            ])
+        assert _answers(db_session, attempt_id) == {}
+
+    def test_batch_route_is_registered(self):
+        from src.api.controllers.attempts_controller import AttemptsController
+
+        router = AttemptsController(MagicMock(), MagicMock()).router
+        routes = {(route.path, method) for route in router.routes for method in route.methods}
+        assert ("/attempts/{attempt_id}/answers:batch", "PUT") in routes
+
+
+class TestNativeUpsert:
+    @staticmethod
+    def _row(attempt_id, question_id, text, question_type=QuestionType.short_answer):
+        return {
+            "id": uuid4(), "attempt_id": attempt_id, "question_id": question_id,
+            "saved_at": datetime.now(timezone.utc),
+            **AttemptsRepository.answer_values(question_type, AnswerUpsert(question_id=question_id, text=text)),
+        }
+
+    def test_duplicate_answers_are_rejected_by_the_database(self, db_session, seed):
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        now = datetime.now(timezone.utc)
+        db_session.add_all([
+            Answer(attempt_id=attempt_id, question_id=ids["short"], saved_at=now),
+            Answer(attempt_id=attempt_id, question_id=ids["short"], saved_at=now),
+        ])
+        with pytest.raises(IntegrityError):
+            db_session.commit()
+
+    def test_upsert_is_one_statement(self, db_session, seed, count_queries):
+        """Answers are written with a single INSERT ... ON CONFLICT, without a lookup first."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        repo = AttemptsRepository(db_session)
+        first = repo.upsert_answers([self._row(attempt_id, ids["short"], "1")])
+
+        with count_queries() as statements:
+            second = repo.upsert_answers([
+                self._row(attempt_id, ids["short"], "2"),
+                self._row(attempt_id, ids["short"], "3"),
+            ])
+        db_session.commit()
+
+        assert len(statements) == 1
+        assert "ON CONFLICT" in statements[0].upper()
+        assert second == first
+        assert _answers(db_session, attempt_id)[ids["short"]].answer_text == "3"
+
+    def test_large_upsert_is_chunked(self, db_session, seed, monkeypatch):
+        ids = seed(n_attempts=7)
+        monkeypatch.setattr(attempts_repository, "UPSERT_CHUNK_SIZE", 3)
+        rows = [self._row(attempt_id, ids["short"], "42") for attempt_id in ids["attempts"]]
+
+        answer_ids = AttemptsRepository(db_session).upsert_answers(rows)
+        db_session.commit()
+
+        assert set(answer_ids) == {(attempt_id, ids["short"]) for attempt_id in ids["attempts"]}
+        assert db_session.query(Answer).count() == 7
+
+    def test_select_first_fallback_matches_native_upsert(self, db_session, seed):
+        """Databases without ON CONFLICT get the same result through SELECT + INSERT/UPDATE."""
+        ids = seed()
+        attempt_id = ids["attempts"][0]
+        repo = AttemptsRepository(db_session)
+        native = repo.upsert_answers([self._row(attempt_id, ids["short"], "1")])
+
+        with patch.object(attempts_repository, "_ON_CONFLICT_INSERTS", {}):
+            fallback = repo.upsert_answers([
+                self._row(attempt_id, ids["short"], "2"),
+                self._row(attempt_id, ids["single"], None, QuestionType.single_choice),
+            ])
+        db_session.commit()
+
+        assert fallback[(attempt_id, ids["short"])] == native[(attempt_id, ids["short"])]
+        saved = _answers(db_session, attempt_id)
+        assert saved[ids["short"]].answer_text == "2"
+        assert saved[ids["single"]].id == fallback[(attempt_id, ids["single"])]
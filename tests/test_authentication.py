@@ -89,3 +89,27 @@ def test_register_new_user(auth_service):
     assert result["email"] == "new@test.com"
     assert result["full_name"] == "New User"
     assert result["id"] is not None
+
+
+def test_login_against_database(db_session):
+    """The real AuthService login resolves roles by the string user id on SQLite as well."""
+    from src.api.schemas.auth import LoginRequest
+    from src.api.services.auth_service import AuthService
+    from src.models.roles import Role
+    from src.models.user_roles import UserRole
+    from src.models.users import User
+    from src.utils.hashing import get_password_hash
+
+    user = User(email="student@example.com", hashed_password=get_password_hash("secret-password"),
+                first_name="S", last_name="T")
+    role = Role(name="student")
+    db_session.add_all([user, role])
+    db_session.flush()
+    db_session.add(UserRole(user_id=user.id, role_id=role.id))
+    db_session.commit()
+
+    response = AuthService().login(db_session, LoginRequest(email="student@example.com", password="secret-password"))
+
+    assert response.user.roles == ["student"]
+    assert response.user.user_major is None
+    assert response.access_token
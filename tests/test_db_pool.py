@@ -0,0 +1,130 @@
+"""
+Tests for the configurable, instrumented connection pool: pool options from
+config, checkout wait metrics, per-route statement timeouts and the internal
+metrics endpoint.
+"""
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+
+from src.api import database
+from src.api.controllers import metrics_controller
+from src.api.database import apply_statement_timeout
+from src.api.pool_metrics import InstrumentedQueuePool, pool_metrics, pool_status
+from src.core import config
+
+
+@pytest.fixture(autouse=True)
+def _reset_pool_metrics():
+    pool_metrics.reset()
+    yield
+    pool_metrics.reset()
+
+
+class TestPoolOptions:
+    def test_in_memory_sqlite_keeps_the_default_pool(self):
+        assert database._pool_options("sqlite:///:memory:") == {}
+        assert database._pool_options("sqlite://") == {}
+
+    def test_file_and_server_databases_use_the_configured_pool(self):
+        options = database._pool_options("postgresql://u:p@localhost:5432/db")
+
+        assert options == {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": config.DB_POOL_SIZE,
+            "max_overflow": config.DB_MAX_OVERFLOW,
+            "pool_timeout": config.DB_POOL_TIMEOUT_SECONDS,
+            "pool_recycle": config.DB_POOL_RECYCLE_SECONDS,
+        }
+        assert database._pool_options("sqlite:////tmp/app.db")["poolclass"] is InstrumentedQueuePool
+
+
+class TestPoolMetrics:
+    def test_checkouts_in_use_and_timeouts_are_recorded(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+                               pool_size=1, max_overflow=0, pool_timeout=0.05)
+        held = engine.connect()
+        try:
+            assert pool_status(engine.pool)["checked_out"] == 1
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+        finally:
+            held.close()
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        engine.dispose()
+
+        snapshot = pool_metrics.snapshot()
+        assert snapshot["checkouts"] == 2
+        assert snapshot["timeouts"] == 1
+        assert snapshot["wait_seconds_max"] >= 0.05
+        assert pool_status(engine.pool)["checked_out"] == 0
+
+
+class TestStatementTimeout:
+    def test_noop_outside_postgresql(self, db_session):
+        apply_statement_timeout(db_session, 2000)
+        assert db_session.execute(text("SELECT 1")).scalar() == 1
+
+    def test_every_transaction_starts_with_set_local(self, tmp_path, monkeypatch):
+        engine = create_engine(f"sqlite:///{tmp_path / 'timeout.db'}")
+        monkeypatch.setattr(engine.dialect, "name", "postgresql")
+        statements = []
+
+        @event.listens_for(engine, "before_cursor_execute", retval=True)
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+            # SQLite has no SET LOCAL: record it and run a no-op instead
+            return ("SELECT 1", ()) if statement.startswith("SET LOCAL") else (statement, parameters)
+
+        db = sessionmaker(bind=engine)()
+        db.execute(text("SELECT 1"))  # transaction already begun, as after authentication
+        apply_statement_timeout(db, 2000)
+        db.commit()
+        db.execute(text("SELECT 2"))
+        db.close()
+        engine.dispose()
+
+        assert statements == [
+            "SELECT 1", "SET LOCAL statement_timeout = 2000", "SET LOCAL statement_timeout = 2000", "SELECT 2",
+        ]
+
+    def test_autosave_routes_set_a_short_timeout(self):
+        from src.api.main import app
+
+        def timeouts(path, method):
+            route = next(r for r in app.routes if isinstance(r, APIRoute) and r.path == path and method in r.methods)
+            return [d.call.__qualname__ for d in route.dependant.dependencies
+                    if d.call.__qualname__.startswith("statement_timeout")]
+
+        assert timeouts("/api/attempts/{attempt_id}/answers", "POST")
+        assert timeouts("/api/attempts/{attempt_id}/answers:batch", "PUT")
+        assert not timeouts("/api/attempts/{attempt_id}/submit", "POST")
+
+
+class TestMetricsEndpoint:
+    def test_hidden_without_a_configured_token(self, monkeypatch):
+        from src.api.main import app
+
+        monkeypatch.setattr(metrics_controller, "INTERNAL_METRICS_TOKEN", None)
+        assert TestClient(app).get("/api/internal/metrics").status_code == 404
+
+    def test_reports_pool_and_cache_metrics(self, monkeypatch):
+        from src.api.main import app
+
+        monkeypatch.setattr(metrics_controller, "INTERNAL_METRICS_TOKEN", "secret")
+        client = TestClient(app)
+
+        assert client.get("/api/internal/metrics", headers={"X-Metrics-Token": "wrong"}).status_code == 404
+        response = client.get("/api/internal/metrics", headers={"X-Metrics-Token": "secret"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert {"checkouts", "timeouts", "wait_seconds_p95", "pool_class"} <= set(body["db_pool"])
+        assert "checkouts" in body["db_read_pool"]
+        assert set(body["caches"]) == {"answer_key", "exam_content", "exam_start", "users"}
+        assert "hits" in body["caches"]["answer_key"]
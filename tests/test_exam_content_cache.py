@@ -0,0 +1,95 @@
+"""
+Tests for the cached exam content behind the attempt-taking page
+(AttemptsRepository.get_attempt_with_details and its pre-serialised JSON variant).
+"""
+import json
+from uuid import uuid4
+
+import pytest
+
+from src.api.repositories.attempts_repository import AttemptsRepository
+from src.api.repositories.exams_repository import ExamsRepository
+from src.api.services.exam_content_cache import exam_content_cache
+from src.models.exams import ExamStatusEnum, QuestionType
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    exam_content_cache.clear()
+    yield
+    exam_content_cache.clear()
+
+
+@pytest.fixture
+def seed(make_exam):
+    def _seed(n_attempts=2):
+        """Create an exam with choice, short-answer and matching questions plus in-progress attempts."""
+        made = make_exam(
+            [
+                {"question_type": QuestionType.single_choice, "title": "S", "points": 1,
+                 "options": [("так", True), ("ні", False)]},
+                {"question_type": QuestionType.short_answer, "title": "T", "points": 1},
+                {"question_type": QuestionType.matching, "title": "P", "points": 2, "pairs": [("p1", "c1")]},
+            ],
+            attempts=n_attempts, status=ExamStatusEnum.open, duration_minutes=60,
+        )
+        return made.exam.id, made.questions[0].id, [attempt.id for attempt in made.attempts]
+    return _seed
+
+
+class TestExamContentCache:
+    def test_content_is_loaded_once_per_exam(self, db_session, seed, count_queries):
+        """Opening the exam page for another attempt of the same exam costs one query."""
+        _, _, attempt_ids = seed()
+        repo = AttemptsRepository(db_session)
+
+        with count_queries() as cold:
+            first = repo.get_attempt_with_details(attempt_ids[0])
+        with count_queries() as warm:
+            second = repo.get_attempt_with_details(attempt_ids[1])
+
+        assert len(cold) == 4
+        assert len(warm) == 1
+        assert exam_content_cache.hits == 1
+        assert second["attempt_id"] == str(attempt_ids[1])
+        assert second["questions"] == first["questions"]
+        assert [q["question_type"] for q in first["questions"]] == ["single_choice", "short_answer", "matching"]
+        assert {o["text"] for o in first["questions"][0]["options"]} == {"так", "ні"}
+        assert first["questions"][2]["matching_data"]["prompts"][0]["text"] == "p1"
+
+    def test_json_payload_matches_dict_payload(self, db_session, seed):
+        """The pre-serialised response decodes to exactly the dict the endpoint used to return."""
+        _, _, attempt_ids = seed()
+        repo = AttemptsRepository(db_session)
+
+        payload = repo.get_attempt_with_details_json(attempt_ids[0])
+
+        assert json.loads(payload) == repo.get_attempt_with_details(attempt_ids[0])
+        assert list(json.loads(payload))[-1] == "questions"
+
+    def test_missing_attempt(self, db_session):
+        repo = AttemptsRepository(db_session)
+        assert repo.get_attempt_with_details(uuid4()) is None
+        assert repo.get_attempt_with_details_json(uuid4()) is None
+
+    @pytest.mark.parametrize("edit", ["update_question", "create_option", "publish"])
+    def test_edits_invalidate_content(self, db_session, seed, edit):
+        exam_id, single_id, attempt_ids = seed()
+        repo = AttemptsRepository(db_session)
+        repo.get_attempt_with_details(attempt_ids[0])
+        assert len(exam_content_cache) == 1
+
+        exams_repo = ExamsRepository(db_session)
+        if edit == "update_question":
+            exams_repo.update_question(single_id, {"title": "Нове"})
+        elif edit == "create_option":
+            exams_repo.create_option(single_id, {"text": "можливо"})
+        else:
+            exams_repo.publish(exam_id)
+
+        assert len(exam_content_cache) == 0
+        questions = repo.get_attempt_with_details(attempt_ids[0])["questions"]
+        if edit == "update_question":
+            assert questions[0]["title"] == "Нове"
+        elif edit == "create_option":
+            assert len(questions[0]["options"]) == 3
@@ -0,0 +1,83 @@
+"""
+Tests for the exam invalidation events: repositories notify the in-process
+caches after commit without importing them.
+"""
+import subprocess
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+from src.api.services import exam_invalidation
+from src.api.services.exam_invalidation import ExamEvent
+from src.api.services.grading_service import answer_key_cache
+from src.api.services.plagiarism_service import question_tfidf_indexes
+
+
+class TestExamEvent:
+    def test_failing_receiver_does_not_stop_others(self):
+        event, received = ExamEvent("test"), []
+
+        def fail(key):
+            raise RuntimeError("boom")
+
+        event.connect(fail)
+        event.connect(received.append)
+        event.send("exam")
+
+        assert received == ["exam"]
+
+    def test_missing_key_is_not_sent(self):
+        event, received = ExamEvent("test"), []
+        event.connect(received.append)
+
+        event.send(None)
+
+        assert received == []
+
+    def test_receiver_is_connected_once(self):
+        event, received = ExamEvent("test"), []
+        event.connect(received.append)
+        event.connect(received.append)
+
+        event.send("exam")
+        event.disconnect(received.append)
+        event.send("exam")
+
+        assert received == ["exam"]
+
+
+class TestSubscribers:
+    def test_answer_keys_follow_content_changes_only(self):
+        """Settings changes keep compiled answer keys; question edits start a new generation."""
+        exam_id = uuid4()
+        generation = answer_key_cache.generation(exam_id)
+
+        exam_invalidation.exam_settings_changed.send(exam_id)
+        assert answer_key_cache.generation(exam_id) == generation
+
+        exam_invalidation.exam_content_changed.send(exam_id)
+        assert answer_key_cache.generation(exam_id) == generation + 1
+
+    def test_question_delete_drops_its_index(self):
+        question_id = uuid4()
+        question_tfidf_indexes.get_or_create(question_id)
+
+        exam_invalidation.question_deleted.send(question_id)
+
+        assert question_id not in question_tfidf_indexes
+
+    def test_repositories_do_not_import_caches(self):
+        """Importing the repositories must not pull in the plagiarism stack or the cache modules."""
+        code = (
+            "import sys\n"
+            "import src.api.repositories.exams_repository, src.api.repositories.courses_repository\n"
+            "print(sorted(m for m in sys.modules if m == 'sklearn' or m in {\n"
+            "    'src.api.services.plagiarism_service', 'src.api.services.grading_service',\n"
+            "    'src.api.services.exam_content_cache', 'src.api.services.exam_start_cache'}))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parents[1],
+        )
+
+        assert result.stdout.strip() == "[]"
@@ -0,0 +1,212 @@
+"""
+Tests for versioned exam snapshots: publishing materialises the exam into
+exam_snapshots, edits after publishing create a new version, and attempts keep
+reading and being graded against the version they were started with.
+"""
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from src.api.background.answer_buffer import AnswerWriteBuffer
+from src.api.controllers.attempts_controller import AttemptsController
+from src.api.errors.app_errors import ConflictError, NotFoundError
+from src.api.repositories.attempts_repository import AttemptsRepository
+from src.api.schemas.attempts import AnswerScoreUpdate, AnswerUpsert
+from src.api.services.attempts_service import AttemptsService
+from src.api.services.exam_content_cache import exam_content_cache
+from src.api.services.exam_review_service import ExamReviewService
+from src.api.services.exams_service import ExamsService
+from src.api.services.grading_service import CompiledAnswerKey, GradingService, answer_key_cache
+from src.models.attempts import Answer, Attempt, AttemptStatus
+from src.models.exams import Exam, ExamSnapshot, ExamStatusEnum, Option, Question, QuestionType
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    exam_content_cache.clear()
+    answer_key_cache.clear()
+    yield
+    exam_content_cache.clear()
+    answer_key_cache.clear()
+
+
+@pytest.fixture
+def seed(make_exam):
+    def _seed():
+        """Create a draft exam with one single-choice question and a registered student."""
+        made = make_exam(
+            [{"question_type": QuestionType.single_choice, "title": "2+2?", "points": 1,
+              "options": [("4", True), ("5", False)]}],
+            students=1, title="Версії", status=ExamStatusEnum.draft, duration_minutes=60, max_attempts=5,
+        )
+        ((four, five),) = made.options
+        return {"exam": made.exam.id, "student": made.students[0], "question": made.questions[0].id,
+                "four": four.id, "five": five.id}
+    return _seed
+
+
+def _versions(db, exam_id):
+    return [v for (v,) in db.query(ExamSnapshot.version).filter(ExamSnapshot.exam_id == exam_id).order_by(ExamSnapshot.version)]
+
+
+class TestSnapshotVersions:
+    def test_publish_creates_first_version(self, db_session, seed):
+        ids = seed()
+        ExamsService.publish_exam(db_session, ids["exam"])
+
+        assert _versions(db_session, ids["exam"]) == [1]
+        content = db_session.query(ExamSnapshot.content).filter(ExamSnapshot.exam_id == ids["exam"]).scalar()
+        assert set(content) == {"questions", "points_distribution", "key"}
+        assert content["points_distribution"] == {str(ids["question"]): 100}
+
+        attempt = ExamsService.start_attempt(db_session, ids["exam"], ids["student"])
+        assert db_session.get(Attempt, attempt.id).exam_version == 1
+
+    def test_draft_edits_do_not_create_versions(self, db_session, seed):
+        ids = seed()
+        ExamsService.update_option(db_session, ids["five"], {"text": "6"})
+
+        assert _versions(db_session, ids["exam"]) == []
+        attempt = ExamsService.start_attempt(db_session, ids["exam"], ids["student"])
+        assert db_session.get(Attempt, attempt.id).exam_version is None
+
+    def test_published_exam_without_snapshot_gets_one_lazily(self, db_session, seed):
+        """Exams published before snapshots existed are materialised on the first attempt."""
+        ids = seed()
+        db_session.get(Exam, ids["exam"]).status = ExamStatusEnum.open
+        db_session.commit()
+
+        attempt = ExamsService.start_attempt(db_session, ids["exam"], ids["student"])
+        assert _versions(db_session, ids["exam"]) == [1]
+        assert db_session.get(Attempt, attempt.id).exam_version == 1
+
+
+    def test_deletes_are_refused_after_publishing(self, db_session, seed):
+        """Running attempts reference questions and options of their version, so they cannot be deleted."""
+        ids = seed()
+        ExamsService.publish_exam(db_session, ids["exam"])
+
+        with pytest.raises(ConflictError):
+            ExamsService.delete_option(db_session, ids["five"])
+        with pytest.raises(ConflictError):
+            ExamsService.delete_question(db_session, ids["question"])
+        assert db_session.query(Option).filter(Option.question_id == ids["question"]).count() == 2
+
+    def test_draft_questions_can_be_deleted(self, db_session, seed):
+        ids = seed()
+        ExamsService.delete_option(db_session, ids["five"])
+        ExamsService.delete_question(db_session, ids["question"])
+
+        assert db_session.query(Question).filter(Question.exam_id == ids["exam"]).count() == 0
+
+
+class TestPinnedAttempts:
+    def test_running_attempt_keeps_its_version(self, db_session, seed, db_engine):
+        """An edit after publishing creates v2; the attempt started on v1 is shown and graded with v1."""
+        ids = seed()
+        ExamsService.publish_exam(db_session, ids["exam"])
+        old = ExamsService.start_attempt(db_session, ids["exam"], ids["student"])
+
+        # The teacher changes the correct option and the question text after publishing
+        ExamsService.update_option(db_session, ids["four"], {"is_correct": False})
+        ExamsService.update_option(db_session, ids["five"], {"is_correct": True})
+        ExamsService.update_question(db_session, ids["question"], {"title": "2+3?"})
+        assert _versions(db_session, ids["exam"]) == [1, 2, 3, 4]
+
+        new = ExamsService.start_attempt(db_session, ids["exam"], ids["student"])
+        assert db_session.get(Attempt, new.id).exam_version == 4
+
+        repo = AttemptsRepository(db_session)
+        assert repo.get_attempt_with_details(old.id)["questions"][0]["title"] == "2+2?"
+        assert repo.get_attempt_with_details(new.id)["questions"][0]["title"] == "2+3?"
+
+        buffer = AnswerWriteBuffer(session_factory=sessionmaker(autoflush=False, bind=db_engine), flush_interval=0)
+        service = AttemptsService(plagiarism_service=MagicMock(), plagiarism_worker=MagicMock(), answer_buffer=buffer)
+        for attempt in (old, new):
+            service.add_answer(db_session, attempt.id, AnswerUpsert(question_id=ids["question"], selected_option_ids=[ids["four"]]))
+            service.submit(db_session, attempt.id)
+
+        db_session.expire_all()
+        assert db_session.get(Attempt, old.id).earned_points == 100
+        assert db_session.get(Attempt, new.id).earned_points == 0
+
+        review = ExamReviewService().get_attempt_review(old.id, db_session)
+        assert review["questions"][0]["points"] == 100
+
+    def test_autosave_is_validated_against_the_attempt_version(self, db_session, seed, db_engine):
+        """A question added after the attempt started is not part of that attempt's exam."""
+        ids = seed()
+        ExamsService.publish_exam(db_session, ids["exam"])
+        attempt = ExamsService.start_attempt(db_session, ids["exam"], ids["student"])
+        added = ExamsService.create_question(db_session, ids["exam"], {
+            "title": "3+3?", "question_type": QuestionType.short_answer, "position": 2,
+        })
+
+        buffer = AnswerWriteBuffer(session_factory=sessionmaker(autoflush=False, bind=db_engine), flush_interval=5)
+        with pytest.raises(NotFoundError):
+            buffer.put(db_session, attempt.id, AnswerUpsert(question_id=added.id, text="6"))
+        buffer.put(db_session, attempt.id, AnswerUpsert(question_id=ids["question"], selected_option_ids=[ids["four"]]))
+        assert buffer.flush() == 1
+
+    def test_manual_grading_uses_the_attempt_version(self, db_session, seed, db_engine):
+        """Long answers of a v1 attempt are graded with v1 points and key after the exam was edited."""
+        ids = seed()
+        essay = ExamsService.create_question(db_session, ids["exam"], {
+            "title": "Поясніть", "question_type": QuestionType.long_answer, "position": 2,
+        })
+        ExamsService.publish_exam(db_session, ids["exam"])
+        attempt = ExamsService.start_attempt(db_session, ids["exam"], ids["student"])
+
+        buffer = AnswerWriteBuffer(session_factory=sessionmaker(autoflush=False, bind=db_engine), flush_interval=0)
+        service = AttemptsService(plagiarism_service=MagicMock(), plagiarism_worker=MagicMock(), answer_buffer=buffer)
+        service.add_answer(db_session, attempt.id, AnswerUpsert(question_id=ids["question"], selected_option_ids=[ids["four"]]))
+        service.add_answer(db_session, attempt.id, AnswerUpsert(question_id=essay.id, text="Тому що"))
+        service.submit(db_session, attempt.id)
+
+        # After the attempt: a third question changes the live points split and the correct option flips
+        ExamsService.create_question(db_session, ids["exam"], {
+            "title": "3+3?", "question_type": QuestionType.short_answer, "position": 3,
+        })
+        ExamsService.update_option(db_session, ids["four"], {"is_correct": False})
+        ExamsService.update_option(db_session, ids["five"], {"is_correct": True})
+
+        max_points = AttemptsController._calculate_max_points(db_session, attempt.id, essay.id)
+        answer = db_session.query(Answer).filter(Answer.attempt_id == attempt.id, Answer.question_id == essay.id).one()
+        service.update_answer_score(db_session, attempt.id, answer.id, AnswerScoreUpdate(earned_points=50), max_points)
+
+        db_session.expire_all()
+        graded = db_session.get(Attempt, attempt.id)
+        assert max_points == 50
+        assert graded.earned_points == 100
+        assert graded.status == AttemptStatus.completed
+        assert graded.pending_count == 0
+
+    def test_versioned_reads_use_one_row(self, db_session, seed, count_queries):
+        ids = seed()
+        ExamsService.publish_exam(db_session, ids["exam"])
+        exam_content_cache.clear()
+        answer_key_cache.clear()
+
+        with count_queries() as key_queries:
+            key = GradingService().get_answer_key(db_session, ids["exam"], version=1)
+        with count_queries() as content_queries:
+            content = AttemptsRepository(db_session).get_exam_content(ids["exam"], version=1)
+
+        assert len(key_queries) == 1
+        assert len(content_queries) == 1
+        assert key.version == 1
+        assert content.questions[0]["title"] == "2+2?"
+
+
+class TestAnswerKeySerialisation:
+    def test_round_trip(self, db_session, seed):
+        ids = seed()
+        exam = db_session.get(Exam, ids["exam"])
+        key = GradingService().compile_answer_key(db_session, exam)
+
+        restored = CompiledAnswerKey.from_json(ids["exam"], key.to_json(), version=7)
+
+        assert restored.version == 7
+        assert restored.to_json() == key.to_json()
+        assert restored.questions[ids["question"]].correct == key.questions[ids["question"]].correct
@@ -0,0 +1,389 @@
+"""
+Tests for GradingService answer-key caching and BulkGradingService (grading
+every attempt of a closed exam in one pass) against a real (SQLite) database.
+"""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.orm import selectinload
+
+from src.api.errors.app_errors import ConflictError
+from src.api.repositories.attempts_repository import AttemptsRepository
+from src.api.repositories.plagiarism_repository import PlagiarismRepository
+from src.api.services.attempts_service import AttemptsService
+from src.api.services.bulk_grading_service import BulkGradingService
+from src.api.services.exam_status_scheduler import grade_closed_exams
+from src.api.repositories.exams_repository import ExamsRepository
+from src.api.services.grading_service import AnswerKeyCache, GradingService
+from src.models.attempts import Answer, AnswerOption, Attempt, AttemptStatus, PlagiarismCheck, PlagiarismCheckState
+from src.models.exams import ExamStatusEnum, QuestionType
+
+
+@pytest.fixture
+def seed_exam(db_session, make_exam):
+    def _seed_exam(n_attempts: int, status=AttemptStatus.in_progress):
+        """Create an exam with one question of every type and varied answers per attempt."""
+        db = db_session
+        made = make_exam(
+            [
+                {"question_type": QuestionType.single_choice, "title": "S", "points": 1,
+                 "options": [("a", True), ("b", False)]},
+                {"question_type": QuestionType.multi_choice, "title": "M", "points": 2,
+                 "options": [("x", True), ("y", True), ("z", False)]},
+                {"question_type": QuestionType.short_answer, "title": "T", "points": 1, "options": [("42", True)]},
+                {"question_type": QuestionType.matching, "title": "P", "points": 2,
+                 "pairs": [("p1", "c1"), ("p2", "c2")]},
+                {"question_type": QuestionType.long_answer, "title": "E", "points": 3},
+            ],
+            attempts=n_attempts, attempt_status=status, started=-timedelta(hours=3), due=-timedelta(hours=2),
+            title="Mixed", status=ExamStatusEnum.closed,
+            start_at=datetime.now(timezone.utc) - timedelta(hours=2),
+            end_at=datetime.now(timezone.utc) - timedelta(minutes=1),
+        )
+        now = made.now
+        single, multi, short, matching, essay = made.questions
+        (s_right, s_wrong), (m_right1, m_right2, m_wrong), _, _, _ = made.options
+        pair1, pair2 = made.pairs[3]
+
+        for i, attempt in enumerate(made.attempts):
+            answers = {
+                single: Answer(attempt_id=attempt.id, question_id=single.id, saved_at=now),
+                multi: Answer(attempt_id=attempt.id, question_id=multi.id, saved_at=now),
+                short: Answer(attempt_id=attempt.id, question_id=short.id, saved_at=now,
+                              answer_text=" 42 " if i % 2 else "41"),
+                matching: Answer(attempt_id=attempt.id, question_id=matching.id, saved_at=now,
+                                 answer_json={str(pair1.id): str(pair1.id),
+                                              str(pair2.id): str(pair2.id) if i % 3 else str(pair1.id)}),
+            }
+            if i % 4:
+                answers[essay] = Answer(attempt_id=attempt.id, question_id=essay.id, saved_at=now, answer_text="essay")
+            db.add_all(answers.values())
+            db.flush()
+            db.add(AnswerOption(answer_id=answers[single].id,
+                                selected_option_id=(s_right if i % 2 == 0 else s_wrong).id))
+            db.add(AnswerOption(answer_id=answers[multi].id, selected_option_id=m_right1.id))
+            db.add(AnswerOption(answer_id=answers[multi].id,
+                                selected_option_id=(m_right2 if i % 3 == 0 else m_wrong).id))
+        db.commit()
+        return made.exam, made.attempts
+    return _seed_exam
+
+
+def _expected(db, attempt_id):
+    """Grade one attempt the way AttemptsService.submit does."""
+    attempt = db.query(Attempt).options(
+        selectinload(Attempt.answers).selectinload(Answer.selected_options)
+    ).filter(Attempt.id == attempt_id).one()
+    result = GradingService().calculate_score(db, attempt)
+    total = sum(q.points for q in attempt.exam.questions)
+    return {
+        "earned_points": min(100.0, result.earned_weight / total * 100),
+        "correct_answers": result.correct_count,
+        "incorrect_answers": result.incorrect_count,
+        "pending_count": result.pending_count,
+    }
+
+
+def _load_attempt(db, attempt_id):
+    return db.query(Attempt).options(
+        selectinload(Attempt.answers).selectinload(Answer.selected_options)
+    ).filter(Attempt.id == attempt_id).one()
+
+
+class TestAnswerKeyCache:
+    """Tests for the compiled, cached per-exam answer key."""
+
+    def test_cached_key_grades_without_queries(self, db_session, seed_exam, count_queries):
+        """Test grading with a warm key is pure lookups on loaded answers."""
+        exam, attempts = seed_exam(1)
+        service = GradingService(key_cache=AnswerKeyCache())
+        service.get_answer_key(db_session, exam.id)
+        attempt = _load_attempt(db_session, attempts[0].id)
+
+        with count_queries() as statements:
+            result = service.calculate_score(db_session, attempt)
+
+        assert statements == []
+        assert result.correct_count + result.incorrect_count + result.pending_count == 4
+        assert service.key_cache.hits == 1
+
+    def test_key_holds_frozen_sets_and_points(self, db_session, seed_exam):
+        """Test the compiled key resolves points and freezes correct answers."""
+        exam, _ = seed_exam(1)
+
+        key = GradingService(key_cache=AnswerKeyCache()).get_answer_key(db_session, exam.id)
+
+        assert key.total_points == 9.0
+        short = next(q for q in key.questions.values() if q.question_type == QuestionType.short_answer)
+        assert short.correct["texts"] == frozenset({"42"})
+        assert short.correct["numbers"] == (42.0,)
+
+    @pytest.mark.parametrize("text, expected", [("42.0", True), ("4.2e1", True), ("42,00", True), ("42.1", False)])
+    def test_numeric_short_answer_tolerance(self, text, expected):
+        """Test numeric answers match by value, not only by normalised string."""
+        key = GradingService._build_short_answer_key(["42"])
+
+        assert GradingService._score_short_answer(1.0, text, key)[1] is expected
+
+    def test_option_edit_invalidates_key(self, db_session, seed_exam):
+        """Test moving the correct option regrades with the new key."""
+        exam, attempts = seed_exam(2)
+        service = GradingService()
+        single = next(q for q in exam.questions if q.question_type == QuestionType.single_choice)
+        right = next(o for o in single.options if o.is_correct)
+        wrong = next(o for o in single.options if not o.is_correct)
+        # Attempt 1 picked the wrong option
+        before = service.calculate_score(db_session, _load_attempt(db_session, attempts[1].id))
+
+        repo = ExamsRepository(db_session)
+        repo.update_option(right.id, {"is_correct": False})
+        repo.update_option(wrong.id, {"is_correct": True})
+
+        db_session.expire_all()
+        after = service.calculate_score(db_session, _load_attempt(db_session, attempts[1].id))
+        assert after.correct_count == before.correct_count + 1
+
+    def test_question_edit_invalidates_key(self, db_session, seed_exam):
+        """Test changing question points changes the cached total."""
+        exam, _ = seed_exam(1)
+        service = GradingService()
+        essay = next(q for q in exam.questions if q.question_type == QuestionType.long_answer)
+        assert service.get_answer_key(db_session, exam.id).total_points == 9.0
+
+        ExamsRepository(db_session).update_question(essay.id, {"points": 5})
+
+        assert service.get_answer_key(db_session, exam.id).total_points == 11.0
+
+    def test_expired_key_is_recompiled(self, db_session, seed_exam):
+        """Test a key older than the TTL is dropped."""
+        exam, _ = seed_exam(1)
+        service = GradingService(key_cache=AnswerKeyCache(ttl_seconds=60))
+        key = service.get_answer_key(db_session, exam.id)
+        key.compiled_at -= 61
+
+        assert service.key_cache.get(exam.id) is None
+
+
+    def test_key_compiled_before_an_edit_is_not_cached(self, db_session, seed_exam):
+        """Test a key read before a concurrent invalidate is returned but not stored."""
+        exam, _ = seed_exam(1)
+        cache = AnswerKeyCache()
+        service = GradingService(key_cache=cache)
+        compile_answer_key = service.compile_answer_key
+
+        def compile_then_edit(db, loaded_exam):
+            key = compile_answer_key(db, loaded_exam)
+            cache.invalidate(exam.id)  # an editor commits while this key is being built
+            return key
+
+        service.compile_answer_key = compile_then_edit
+        assert service.get_answer_key(db_session, exam.id).total_points == 9.0
+
+        assert cache.get(exam.id) is None
+
+        service.compile_answer_key = compile_answer_key
+        key = service.get_answer_key(db_session, exam.id)
+        assert cache.get(exam.id) is key
+
+class TestSubmitPath:
+    """Tests for the single-transaction submit path."""
+
+    @staticmethod
+    def _attempts_service() -> AttemptsService:
+        return AttemptsService(plagiarism_service=MagicMock(), plagiarism_worker=MagicMock())
+
+    def test_submit_statement_count(self, db_session, seed_exam, count_queries):
+        """Test a submit with a warm answer key is three reads and one write."""
+        exam, attempts = seed_exam(3)
+        GradingService().get_answer_key(db_session, exam.id)
+        attempt_id = attempts[1].id
+        db_session.expire_all()
+
+        with count_queries() as statements:
+            self._attempts_service().submit(db_session, attempt_id)
+
+        selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+        writes = [s for s in statements if not s.lstrip().upper().startswith("SELECT")]
+        # attempt, its answers, their selected options
+        assert len(selects) == 3
+        assert len(writes) == 1 and writes[0].lstrip().upper().startswith("UPDATE ATTEMPTS")
+        assert not any("FROM questions" in s for s in statements)
+
+    def test_submit_stores_results_in_one_commit(self, db_session, seed_exam):
+        """Test submit grades, times and queues the attempt and returns the stored state."""
+        exam, attempts = seed_exam(2)
+        expected = _expected(db_session, attempts[1].id)
+        service = self._attempts_service()
+        attempt_id = attempts[1].id
+        db_session.expire_all()
+
+        response = service.submit(db_session, attempt_id)
+
+        db_session.expire_all()
+        stored = db_session.get(Attempt, attempt_id)
+        assert stored.earned_points == pytest.approx(expected["earned_points"])
+        assert stored.pending_count == expected["pending_count"]
+        assert stored.time_spent_seconds >= 3 * 3600
+        assert response.status == stored.status.value
+        service.plagiarism_service.enqueue_check.assert_called_once()
+        service.plagiarism_worker.enqueue.assert_called_once_with(attempt_id)
+
+
+    def test_attempt_submitted_meanwhile_is_not_regraded(self, db_session, seed_exam):
+        """Test a submit that loses the race to another submit (or bulk grading) is rejected."""
+        _, attempts = seed_exam(1)
+        service = self._attempts_service()
+        attempt_id = attempts[0].id
+        calculate_score = GradingService.calculate_score
+
+        def submitted_meanwhile(grading, db, attempt):
+            db.query(Attempt).filter(Attempt.id == attempt_id).update(
+                {Attempt.status: AttemptStatus.completed}, synchronize_session=False
+            )
+            return calculate_score(grading, db, attempt)
+
+        with patch.object(GradingService, "calculate_score", submitted_meanwhile):
+            with pytest.raises(ConflictError):
+                service.submit(db_session, attempt_id)
+
+        service.plagiarism_service.enqueue_check.assert_not_called()
+        service.plagiarism_worker.enqueue.assert_not_called()
+
+def _bulk_grading(**kwargs) -> BulkGradingService:
+    return BulkGradingService(plagiarism_worker=MagicMock(), **kwargs)
+
+
+class TestBulkGradingService:
+    """Tests for grading all attempts of an exam in one pass."""
+
+    def test_results_match_single_attempt_grading(self, db_session, seed_exam):
+        """Test bulk scores equal what calculate_score gives attempt by attempt."""
+        exam, attempts = seed_exam(12)
+        expected = {a.id: _expected(db_session, a.id) for a in attempts}
+
+        graded = _bulk_grading(chunk_size=5).grade_exam(db_session, exam.id)
+
+        assert graded == 12
+        db_session.expire_all()
+        for attempt in attempts:
+            actual = db_session.get(Attempt, attempt.id)
+            assert actual.earned_points == pytest.approx(expected[attempt.id]["earned_points"])
+            assert actual.correct_answers == expected[attempt.id]["correct_answers"]
+            assert actual.incorrect_answers == expected[attempt.id]["incorrect_answers"]
+            assert actual.pending_count == expected[attempt.id]["pending_count"]
+            expected_status = AttemptStatus.submitted if actual.pending_count else AttemptStatus.completed
+            assert actual.status == expected_status
+
+    def test_in_progress_attempts_are_submitted(self, db_session, seed_exam):
+        """Test open attempts get a submit time, capped time spent and a queued plagiarism check."""
+        exam, attempts = seed_exam(2)
+
+        _bulk_grading().grade_exam(db_session, exam.id)
+
+        db_session.expire_all()
+        for attempt in attempts:
+            actual = db_session.get(Attempt, attempt.id)
+            assert actual.submitted_at is not None
+            assert actual.time_spent_seconds == 3600
+            check = PlagiarismRepository.get_by_attempt_id(db_session, attempt.id)
+            assert check.state == PlagiarismCheckState.pending
+
+    def test_extended_attempt_is_not_cut_short(self, db_session, seed_exam):
+        """Test an attempt whose due_at was extended past the exam end keeps running."""
+        exam, attempts = seed_exam(2)
+        attempts[0].due_at = datetime.now(timezone.utc) + timedelta(minutes=30)
+        db_session.commit()
+        service = _bulk_grading()
+
+        assert service.grade_exam(db_session, exam.id) == 1
+
+        db_session.expire_all()
+        assert db_session.get(Attempt, attempts[0].id).status == AttemptStatus.in_progress
+        assert PlagiarismRepository.get_by_attempt_id(db_session, attempts[0].id) is None
+        service.plagiarism_worker.enqueue.assert_called_once_with(attempts[1].id)
+
+    def test_graded_attempts_are_left_alone(self, db_session, seed_exam):
+        """Test attempts that already have a score (e.g. manual grading) are not regraded."""
+        exam, attempts = seed_exam(2, status=AttemptStatus.completed)
+        attempts[0].earned_points = 77.0
+        db_session.commit()
+
+        graded = _bulk_grading().grade_exam(db_session, exam.id)
+
+        assert graded == 1
+        db_session.expire_all()
+        assert db_session.get(Attempt, attempts[0].id).earned_points == 77.0
+        assert PlagiarismRepository.get_by_attempt_id(db_session, attempts[1].id) is None
+
+    def test_auto_submitted_attempts_are_handed_to_the_worker(self, db_session, seed_exam):
+        """Test queued checks of auto-submitted attempts are started right after the commit."""
+        exam, attempts = seed_exam(2)
+        service = _bulk_grading()
+
+        service.grade_exam(db_session, exam.id)
+
+        enqueued = [call.args[0] for call in service.plagiarism_worker.enqueue.call_args_list]
+        assert sorted(enqueued) == sorted(a.id for a in attempts)
+
+    def test_existing_plagiarism_checks_are_kept(self, db_session, seed_exam):
+        """Test a check already present for an attempt is neither reset nor enqueued again."""
+        exam, attempts = seed_exam(2)
+        db_session.add(PlagiarismCheck(attempt_id=attempts[0].id, state=PlagiarismCheckState.done, uniqueness_percent=90.0))
+        db_session.commit()
+        service = _bulk_grading()
+
+        service.grade_exam(db_session, exam.id)
+
+        db_session.expire_all()
+        check = PlagiarismRepository.get_by_attempt_id(db_session, attempts[0].id)
+        assert check.state == PlagiarismCheckState.done
+        assert check.uniqueness_percent == 90.0
+        service.plagiarism_worker.enqueue.assert_called_once_with(attempts[1].id)
+
+    def test_attempt_graded_meanwhile_is_not_overwritten(self, db_session, seed_exam):
+        """Test the bulk UPDATE skips an attempt submitted after the ungraded list was read."""
+        _, attempts = seed_exam(1)
+        attempt = attempts[0]
+        attempt.status = AttemptStatus.completed
+        attempt.earned_points = 55.0
+        db_session.commit()
+
+        AttemptsRepository(db_session).bulk_update_attempt_results(
+            [{"id": attempt.id, "earned_points": 0.0, "status": AttemptStatus.submitted}]
+        )
+        db_session.commit()
+
+        db_session.expire_all()
+        stored = db_session.get(Attempt, attempt.id)
+        assert (stored.status, stored.earned_points) == (AttemptStatus.completed, 55.0)
+
+    def test_query_count_independent_of_attempts(self, db_session, seed_exam, count_queries):
+        """Test grading 30 attempts costs as many statements as grading 3."""
+        counts = []
+        for n in (3, 30):
+            exam, _ = seed_exam(n)
+            with count_queries() as statements:
+                _bulk_grading(chunk_size=100).grade_exam(db_session, exam.id)
+            counts.append(len(statements))
+
+        assert counts[0] == counts[1]
+
+    def test_unknown_exam(self, db_session):
+        """Test a missing exam grades nothing."""
+        assert _bulk_grading().grade_exam(db_session, uuid4()) == 0
+
+
+class TestGradeClosedExams:
+    """Tests for the scheduler hook that grades freshly closed exams."""
+
+    def test_failure_on_one_exam_does_not_stop_others(self, db_session):
+        """Test an exception for one exam is logged and the rest are still graded."""
+        grading_service = MagicMock()
+        grading_service.grade_exam.side_effect = [RuntimeError("boom"), 4]
+
+        graded = grade_closed_exams(db_session, [uuid4(), uuid4()], grading_service=grading_service)
+
+        assert graded == 4
+        assert grading_service.grade_exam.call_count == 2
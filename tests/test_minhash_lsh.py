@@ -0,0 +1,116 @@
+"""
+Tests for MinHash + LSH candidate generation used for cross-exam plagiarism search.
+"""
+import numpy as np
+import pytest
+
+from src.utils.minhash_lsh import MinHashIndexRegistry, MinHashLSHIndex, word_shingles
+
+
+ESSAY = (
+    "Photosynthesis converts light energy into chemical energy stored in glucose. "
+    "Chlorophyll in the chloroplasts absorbs red and blue light while reflecting green."
+)
+UNRELATED = (
+    "The French revolution began in 1789 and ended the absolute monarchy, "
+    "leading to the rise of Napoleon and widespread political change in Europe."
+)
+
+
+def _jaccard(a: str, b: str) -> float:
+    sa, sb = word_shingles(a), word_shingles(b)
+    return len(sa & sb) / len(sa | sb)
+
+
+class TestWordShingles:
+    """Tests for word_shingles."""
+
+    def test_three_word_shingles(self):
+        """Test shingles are lowercase word trigrams."""
+        assert word_shingles("A Cat sat on mats") == {"cat sat on", "sat on mats"}
+
+    def test_short_and_empty_text(self):
+        """Test short texts give one shingle and empty texts none."""
+        assert word_shingles("two words") == {"two words"}
+        assert word_shingles("!!!") == set()
+
+
+class TestMinHashLSHIndex:
+    """Tests for MinHashLSHIndex."""
+
+    def test_signature_estimates_jaccard(self):
+        """Test the share of equal minhashes approximates shingle Jaccard similarity."""
+        index = MinHashLSHIndex(num_perm=256, bands=64)
+        edited = ESSAY.replace("red and blue", "blue and red")
+
+        estimate = np.mean(index.signature(ESSAY) == index.signature(edited))
+
+        assert estimate == pytest.approx(_jaccard(ESSAY, edited), abs=0.1)
+
+    def test_query_finds_near_copy_only(self):
+        """Test a lightly edited copy is a candidate and an unrelated text is not."""
+        index = MinHashLSHIndex()
+        index.add("copy", index.signature(ESSAY.replace("glucose", "sugar")))
+        index.add("other", index.signature(UNRELATED))
+
+        result = index.query(index.signature(ESSAY))
+
+        assert set(result) == {"copy"}
+        assert result["copy"] > 0.5
+
+    def test_exclude_and_remove(self):
+        """Test excluded and removed keys are not returned."""
+        index = MinHashLSHIndex()
+        signature = index.signature(ESSAY)
+        index.add("self", signature)
+        index.add("twin", signature)
+
+        assert set(index.query(signature, exclude={"self"})) == {"twin"}
+        assert index.remove("twin") is True
+        assert index.query(signature, exclude={"self"}) == {}
+
+    def test_signature_of_text_without_words(self):
+        """Test texts without words have no signature."""
+        assert MinHashLSHIndex().signature("?! ...") is None
+
+    def test_rejects_wrong_signature_length(self):
+        """Test signatures from a differently configured index are rejected."""
+        with pytest.raises(ValueError):
+            MinHashLSHIndex(num_perm=128).add("k", np.zeros(64, dtype=np.uint32))
+
+
+class TestMinHashIndexRegistry:
+    """Tests for MinHashIndexRegistry."""
+
+    def test_signatures_compatible_across_indexes(self):
+        """Test registry signatures can be added to any index it creates."""
+        registry = MinHashIndexRegistry(num_perm=64, bands=16)
+        signature = registry.signature(ESSAY)
+
+        registry.get_or_create("course-a").add("x", signature)
+
+        assert registry.num_perm == 64
+        assert set(registry.get_or_create("course-a").query(signature)) == {"x"}
+        assert len(registry.get_or_create("course-b")) == 0
+
+    def test_least_recently_used_index_is_evicted(self):
+        """Test the registry keeps at most max_size indexes and evicts the least recently used."""
+        registry = MinHashIndexRegistry(max_size=2, num_perm=64, bands=16)
+        first = registry.get_or_create("course-a")
+        registry.get_or_create("course-b")
+        registry.get_or_create("course-a")
+
+        registry.get_or_create("course-c")
+
+        assert len(registry) == 2
+        assert "course-b" not in registry
+        assert registry.get_or_create("course-a") is first
+
+    def test_drop_discards_index(self):
+        """Test dropping a key creates a fresh index on next access."""
+        registry = MinHashIndexRegistry(num_perm=64, bands=16)
+        registry.get_or_create("course-a").add("x", registry.signature(ESSAY))
+
+        registry.drop("course-a")
+
+        assert len(registry.get_or_create("course-a")) == 0
@@ -0,0 +1,228 @@
+"""
+Tests for ParaphraseModel: the text-hash embedding cache and batched similarity APIs.
+"""
+import numpy as np
+import pytest
+
+from src.models import paraphrase
+from src.models.paraphrase import ParaphraseModel, get_paraphrase_model, warm_up_paraphrase_model
+from src.utils.embedding_cache import EmbeddingCache, text_hash
+
+
+class FakeEncoder:
+    """Counts encoded texts; embeds a text as a deterministic vector."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, convert_to_numpy=True):
+        self.encoded.extend(texts)
+        return np.array([[len(t), t.count(" ") + 1.0, 1.0] for t in texts], dtype=np.float32)
+
+
+def _neural_model(cache: EmbeddingCache, model_name: str = "fake-model") -> ParaphraseModel:
+    model = ParaphraseModel(model_name=model_name, embedding_cache=cache)
+    model._model = FakeEncoder()
+    model._use_nn = True
+    model._loaded = True
+    return model
+
+
+class TestEmbeddingCache:
+    """Tests for EmbeddingCache."""
+
+    def test_hash_depends_on_content_only(self):
+        """Test equal texts share a key and different texts do not."""
+        assert text_hash("essay") == text_hash("essay")
+        assert text_hash("essay") != text_hash("essay.")
+
+    def test_get_put_and_counters(self):
+        """Test a stored vector is returned and hits/misses are counted."""
+        cache = EmbeddingCache(max_size=4)
+
+        assert cache.get("m", "text") is None
+        cache.put("m", "text", np.array([1.0, 2.0]))
+
+        assert cache.get("m", "text").tolist() == [1.0, 2.0]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_model_version_isolates_entries(self):
+        """Test embeddings of one model version are not served for another."""
+        cache = EmbeddingCache()
+        cache.put("model@1", "text", np.array([1.0]))
+
+        assert cache.get("model@2", "text") is None
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted first."""
+        cache = EmbeddingCache(max_size=2)
+        cache.put("m", "a", np.array([1.0]))
+        cache.put("m", "b", np.array([2.0]))
+        cache.get("m", "a")
+        cache.put("m", "c", np.array([3.0]))
+
+        assert len(cache) == 2
+        assert cache.get("m", "b") is None
+        assert cache.get("m", "a") is not None
+
+    def test_persistent_store_survives_new_instance(self, tmp_path):
+        """Test vectors written to disk are served to a fresh cache."""
+        EmbeddingCache(persist_dir=str(tmp_path)).put("model/v1", "text", np.array([0.5, 0.25]))
+
+        restored = EmbeddingCache(persist_dir=str(tmp_path)).get("model/v1", "text")
+
+        assert restored.tolist() == pytest.approx([0.5, 0.25])
+
+    def test_disk_hits_are_plain_arrays(self, tmp_path):
+        """Test vectors read from disk hold no memory map (and so no open file descriptor)."""
+        EmbeddingCache(persist_dir=str(tmp_path)).put("model/v1", "text", np.array([0.5, 0.25]))
+
+        restored = EmbeddingCache(persist_dir=str(tmp_path)).get("model/v1", "text")
+
+        assert not isinstance(restored, np.memmap)
+
+
+class TestParaphraseModelEmbeddingCache:
+    """Tests for cached encoding in ParaphraseModel."""
+
+    def test_each_text_encoded_once(self):
+        """Test repeated comparisons of the same essays do not re-encode them."""
+        model = _neural_model(EmbeddingCache())
+
+        first = model.similarity("essay one here", "essay two")
+        second = model.similarity("essay two", "essay one here")
+
+        assert first == pytest.approx(second)
+        assert sorted(model._model.encoded) == ["essay one here", "essay two"]
+
+    def test_cache_shared_between_instances(self):
+        """Test a new model instance reuses embeddings from the shared cache."""
+        cache = EmbeddingCache()
+        _neural_model(cache).similarity("a b", "c")
+        other = _neural_model(cache)
+
+        other.similarity("a b", "c")
+
+        assert other._model.encoded == []
+
+    def test_misses_encoded_in_one_batch(self):
+        """Test embed() sends only unique cache misses to the encoder."""
+        cache = EmbeddingCache()
+        model = _neural_model(cache)
+        model.embed(["x"])
+        model._model.encoded.clear()
+
+        vectors = model.embed(["x", "y z", "y z"])
+
+        assert model._model.encoded == ["y z"]
+        assert len(vectors) == 3
+
+    def test_fallback_model_does_not_use_cache(self):
+        """Test the TF-IDF fallback keeps working without embeddings."""
+        cache = EmbeddingCache()
+        model = ParaphraseModel(embedding_cache=cache)
+        model._use_nn = False
+        model._model = None
+        model._loaded = True
+
+        assert model.similarity("same text", "same text") == pytest.approx(1.0)
+        assert len(cache) == 0
+
+
+ESSAYS = [
+    "Binary search halves the sorted array on every step",
+    "Every step of binary search halves the sorted array",
+    "Hash tables map keys to buckets",
+    "",
+    "!!!",
+]
+
+
+class TestBatchedSimilarity:
+    """Tests for similarity_many and pairwise_matrix."""
+
+    def test_fallback_many_matches_pairwise_calls(self):
+        """Test the batched TF-IDF fallback equals per-pair similarity()."""
+        model = ParaphraseModel(embedding_cache=EmbeddingCache())
+        model._use_nn = False
+        model._loaded = True
+
+        expected = [model.similarity(ESSAYS[0], other) for other in ESSAYS[1:]]
+
+        assert model.similarity_many(ESSAYS[0], ESSAYS[1:]) == pytest.approx(expected)
+
+    def test_fallback_matrix_matches_pairwise_calls(self):
+        """Test every pairwise_matrix cell equals similarity() of that pair."""
+        model = ParaphraseModel(embedding_cache=EmbeddingCache())
+        model._use_nn = False
+        model._loaded = True
+
+        matrix = model.pairwise_matrix(ESSAYS)
+
+        expected = [[model.similarity(a, b) for b in ESSAYS] for a in ESSAYS]
+        assert matrix.shape == (5, 5)
+        assert matrix.tolist() == [pytest.approx(row) for row in expected]
+
+    def test_neural_many_encodes_base_once(self):
+        """Test the base text is encoded once for all candidates."""
+        model = _neural_model(EmbeddingCache())
+
+        scores = model.similarity_many("base text", ["one", "two words", "base text"])
+
+        assert model._model.encoded.count("base text") == 1
+        assert scores[2] == pytest.approx(1.0)
+        assert scores == pytest.approx([model.similarity("base text", c) for c in ["one", "two words", "base text"]])
+
+    def test_empty_inputs(self):
+        """Test empty base or candidate list returns zero-sized results."""
+        model = ParaphraseModel(embedding_cache=EmbeddingCache())
+
+        assert model.similarity_many("text", []) == []
+        assert model.similarity_many("", ["a", "b"]) == [0.0, 0.0]
+        assert model.pairwise_matrix([]).shape == (0, 0)
+
+
+class TestParaphraseModelRegistry:
+    """Tests for the shared, lazily loaded model."""
+
+    def test_constructor_does_not_load(self):
+        """Test creating the wrapper does not load weights."""
+        model = ParaphraseModel(embedding_cache=EmbeddingCache())
+
+        assert model.is_loaded is False
+        assert model.load_seconds is None
+
+    def test_first_use_loads_once(self, monkeypatch):
+        """Test the model is loaded on first use and only once."""
+        loads = []
+
+        class CountingTransformer(FakeEncoder):
+            def __init__(self, name):
+                super().__init__()
+                loads.append(name)
+
+        monkeypatch.setattr(paraphrase, "_SENTENCE_TRANSFORMERS_AVAILABLE", True)
+        monkeypatch.setattr(paraphrase, "SentenceTransformer", CountingTransformer)
+        model = ParaphraseModel(model_name="counting", embedding_cache=EmbeddingCache())
+
+        model.similarity("a b", "a c")
+        model.similarity("a b", "a d")
+
+        assert loads == ["counting"]
+        assert model.is_loaded and model.load_seconds is not None
+
+    def test_registry_returns_shared_instance(self, monkeypatch):
+        """Test get_paraphrase_model returns one instance per model name."""
+        monkeypatch.setattr(paraphrase, "_models", {})
+
+        assert get_paraphrase_model() is get_paraphrase_model()
+        assert get_paraphrase_model("other") is not get_paraphrase_model()
+
+    def test_warm_up_loads_shared_model(self, monkeypatch):
+        """Test warm-up loads the shared model and reports load time."""
+        monkeypatch.setattr(paraphrase, "_models", {})
+
+        seconds = warm_up_paraphrase_model()
+
+        assert seconds >= 0.0
+        assert get_paraphrase_model().is_loaded
@@ -0,0 +1,501 @@
+"""
+Tests for PlagiarismService text loading, per-question candidate lookup and
+the background check queue against a real (SQLite) database.
+"""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from src.api.background.plagiarism_worker import PlagiarismWorker
+from src.api.errors.app_errors import NotFoundError
+from src.api.repositories.exams_repository import ExamsRepository
+from src.api.repositories.plagiarism_repository import EMPTY_SIGNATURE, PlagiarismRepository
+from src.api.services.attempts_service import AttemptsService
+from src.api.services.exam_review_service import ExamReviewService
+from src.api.services.plagiarism_service import PlagiarismService, course_minhash_indexes, question_tfidf_indexes
+from src.models.attempts import Answer, AttemptStatus, PlagiarismCheckState, PlagiarismSignature
+from src.models.course_exams import CourseExam
+from src.models.courses import Course
+from src.models.exams import Question, QuestionType
+from src.utils.minhash_lsh import MinHashIndexRegistry
+from src.utils.tfidf_index import TfidfIndexRegistry
+
+
+ESSAYS = [
+    "Binary search halves the sorted array on every step until the target is found",
+    "Hash tables map keys to buckets so lookups take constant time on average",
+    "Merge sort splits the list recursively and merges the sorted halves back",
+    "Dynamic programming stores results of overlapping subproblems to avoid recomputation",
+    "Breadth first search explores a graph level by level using a queue",
+]
+
+
+class StubParaphraseModel:
+    """Deterministic stand-in so tests never load a neural model."""
+
+    def similarity(self, text1: str, text2: str) -> float:
+        return 1.0 if text1 == text2 else 0.3
+
+    def similarity_many(self, base: str, candidates: list) -> list:
+        return [self.similarity(base, c) for c in candidates]
+
+
+@pytest.fixture
+def seed_exam(db_session, make_exam):
+    def _seed_exam(n_attempts: int, status=AttemptStatus.submitted):
+        db = db_session
+        now = datetime.now(timezone.utc)
+        made = make_exam(
+            [
+                {"question_type": QuestionType.long_answer, "title": "Q2", "position": 2},
+                {"question_type": QuestionType.long_answer, "title": "Q1", "position": 1},
+            ],
+            attempts=n_attempts, attempt_status=status, due=timedelta(0),
+            title="Algorithms", start_at=now, end_at=now,
+        )
+        q_second, q_first = made.questions
+
+        for i, attempt in enumerate(made.attempts):
+            # Insert the second question's answer first to check ordering by position
+            db.add(Answer(attempt_id=attempt.id, question_id=q_second.id,
+                          answer_text=f"second part {i}", saved_at=now))
+            db.add(Answer(attempt_id=attempt.id, question_id=q_first.id,
+                          answer_text=ESSAYS[i % len(ESSAYS)], saved_at=now))
+        db.commit()
+        # Load attributes up front so query counters do not see lazy refreshes
+        for obj in [made.exam, *made.attempts]:
+            db.refresh(obj)
+        return made.exam, made.attempts
+    return _seed_exam
+
+
+def _service() -> PlagiarismService:
+    return PlagiarismService(
+        repo=PlagiarismRepository(),
+        paraphrase_model=StubParaphraseModel(),
+        tfidf_indexes=TfidfIndexRegistry(),
+        minhash_indexes=MinHashIndexRegistry(),
+    )
+
+
+class TestLongAnswerTextLoading:
+    """Tests for the bulk long-answer text loader."""
+
+    def test_texts_are_joined_in_position_order(self, db_session, seed_exam):
+        """Test answers are concatenated by question position, not insertion order."""
+        _, attempts = seed_exam(1)
+
+        texts = PlagiarismRepository.get_long_answer_texts(db_session, attempt_ids=[attempts[0].id])
+
+        assert texts == {attempts[0].id: f"{ESSAYS[0]}\n\nsecond part 0"}
+
+    def test_exam_texts_loaded_in_one_query(self, db_session, seed_exam, count_queries):
+        """Test all attempt texts of an exam are fetched with a single statement."""
+        exam, attempts = seed_exam(8)
+
+        with count_queries() as statements:
+            texts = PlagiarismRepository.get_long_answer_texts(db_session, exam_id=exam.id)
+
+        assert len(statements) == 1
+        assert set(texts) == {a.id for a in attempts}
+
+    def test_submitted_only_skips_in_progress(self, db_session, seed_exam):
+        """Test drafts are excluded when submitted_only is set."""
+        exam, _ = seed_exam(2, status=AttemptStatus.in_progress)
+
+        assert PlagiarismRepository.get_long_answer_texts(db_session, exam_id=exam.id, submitted_only=True) == {}
+
+    def test_empty_attempt_ids(self, db_session, count_queries):
+        """Test an empty id list returns without querying."""
+        with count_queries() as statements:
+            assert PlagiarismRepository.get_long_answer_texts(db_session, attempt_ids=[]) == {}
+        assert statements == []
+
+    def test_answers_grouped_by_question_in_one_query(self, db_session, seed_exam, count_queries):
+        """Test per-question answers of an exam come back in position order with one query."""
+        exam, attempts = seed_exam(4)
+        q_first, q_second = sorted(exam.questions, key=lambda q: q.position)
+
+        with count_queries() as statements:
+            answers = PlagiarismRepository.get_long_answers(db_session, exam_id=exam.id)
+
+        assert len(statements) == 1
+        assert set(answers) == {a.id for a in attempts}
+        assert list(answers[attempts[1].id].items()) == [
+            (q_first.id, ESSAYS[1]),
+            (q_second.id, "second part 1"),
+        ]
+
+
+class TestCheckAttemptQueryCount:
+    """Regression tests: plagiarism check must not issue one query per candidate."""
+
+    @staticmethod
+    def _count_check_queries(seed_exam, db_session, count_queries, n_attempts: int) -> int:
+        _, attempts = seed_exam(n_attempts)
+        service = _service()
+        with count_queries() as statements:
+            report = service.check_attempt(db_session, attempts[-1])
+        assert report.matches
+        return len(statements)
+
+    def test_query_count_independent_of_candidates(self, db_session, seed_exam, count_queries):
+        """Test a check over 12 candidates costs as many queries as over 3."""
+        small = self._count_check_queries(seed_exam, db_session, count_queries, 3)
+        large = self._count_check_queries(seed_exam, db_session, count_queries, 12)
+
+        assert small == large
+
+    def test_deep_analysis_reuses_loaded_texts(self, db_session, seed_exam, count_queries):
+        """Test the deep level does not reload candidate texts."""
+        _, attempts = seed_exam(3)
+        service = _service()
+        fast_matches = [
+            {"other_attempt_id": str(a.id), "similarity_score": 0.6, "match_type": "candidate"}
+            for a in attempts[1:]
+        ]
+        question_id = uuid4()
+        answers = {a.id: {question_id: ESSAYS[i]} for i, a in enumerate(attempts)}
+
+        with count_queries() as statements:
+            deep, _ = service._run_deep_semantic_analysis(
+                db_session, answers[attempts[0].id], fast_matches, answers_by_attempt=answers
+            )
+
+        assert statements == []
+        assert len(deep) == 2
+
+    @pytest.mark.parametrize("n_attempts", [2, 5])
+    def test_comparison_loads_both_texts_at_once(self, db_session, seed_exam, count_queries, n_attempts):
+        """Test teacher comparison fetches both attempt texts in one query."""
+        _, attempts = seed_exam(n_attempts)
+
+        with count_queries() as statements:
+            result = _service().compare_attempts_texts(db_session, attempts[0].id, attempts[1].id)
+
+        assert len(statements) == 1
+        assert result.base_text.startswith(ESSAYS[0])
+
+
+class TestPerQuestionScoring:
+    """Tests for comparing answers only against answers to the same question."""
+
+    def test_matches_carry_per_question_scores(self, db_session, seed_exam):
+        """Test a copied attempt is matched on every question with ranges in answer coordinates."""
+        exam, attempts = seed_exam(6)
+        q_first, q_second = sorted(exam.questions, key=lambda q: q.position)
+        # Attempt 5 repeats attempt 0 (ESSAYS wrap around, "second part N" differs only by a digit)
+
+        report = _service().check_attempt(db_session, attempts[5])
+        db_session.flush()
+
+        match = next(m for m in report.matches if m.other_attempt_id == attempts[0].id)
+        assert match.match_type == "exact"
+        assert [q.question_id for q in match.questions] == [q_first.id, q_second.id]
+        check = PlagiarismRepository.get_by_attempt_id(db_session, attempts[5].id)
+        stored = next(m for m in check.details["matches"] if m["other_attempt_id"] == str(attempts[0].id))
+        assert stored["questions"][0]["ranges"] == [{"start": 0, "end": len(ESSAYS[0])}]
+
+    def test_answers_to_different_questions_are_not_compared(self, db_session, seed_exam):
+        """Test an essay pasted under another question does not count as a match."""
+        _, attempts = seed_exam(2)
+        moved = next(a for a in attempts[1].answers if a.answer_text.startswith("second part"))
+        moved.answer_text = ESSAYS[0]
+        db_session.commit()
+
+        report = _service().check_attempt(db_session, attempts[1])
+
+        assert all(q.similarity_score < 0.5 for m in report.matches for q in m.questions)
+        assert report.uniqueness_percent > 50.0
+
+    def test_review_uses_per_question_ranges_without_offsets(self, db_session, seed_exam):
+        """Test the review page takes ranges straight from the per-question scores."""
+        exam, attempts = seed_exam(6)
+        q_first = min(exam.questions, key=lambda q: q.position)
+        _service().check_attempt(db_session, attempts[5])
+        db_session.flush()
+        check = PlagiarismRepository.get_by_attempt_id(db_session, attempts[5].id)
+
+        ranges = ExamReviewService._extract_plagiarism_ranges_for_question(
+            ESSAYS[0], check.details["matches"], question_offset=None, question_id=q_first.id
+        )
+
+        assert ranges == [{"start": 0, "end": len(ESSAYS[0])}]
+
+
+    def test_question_indexes_sync_incrementally(self, db_session, seed_exam, monkeypatch):
+        """Test only a cold index loads the whole exam; later checks read attempts submitted since."""
+        exam, attempts = seed_exam(3, status=AttemptStatus.in_progress)
+        hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+        for attempt in attempts[:2]:
+            attempt.status, attempt.submitted_at = AttemptStatus.submitted, hour_ago
+        db_session.commit()
+        service = _service()
+        submitted_after = []
+        list_answers = PlagiarismRepository.list_submitted_long_answers
+        monkeypatch.setattr(service.repo, "list_submitted_long_answers",
+                            lambda db, exam_id, **kw: submitted_after.append(kw["submitted_after"])
+                            or list_answers(db, exam_id, **kw))
+
+        service.check_attempt(db_session, attempts[0])
+        # Submitted through another worker after the first check
+        attempts[2].status, attempts[2].submitted_at = AttemptStatus.submitted, datetime.now(timezone.utc)
+        db_session.commit()
+        service.check_attempt(db_session, attempts[1])
+
+        assert submitted_after[0] is None
+        assert submitted_after[1] is not None
+        q_first = min(exam.questions, key=lambda q: q.position)
+        assert attempts[2].id in service.tfidf_indexes.get_or_create(q_first.id)
+
+class TestBackgroundPlagiarismPipeline:
+    """Tests for the DB-backed plagiarism queue and its worker."""
+
+    @staticmethod
+    def _worker(db_engine) -> PlagiarismWorker:
+        return PlagiarismWorker(
+            session_factory=sessionmaker(autocommit=False, autoflush=False, bind=db_engine),
+            service=_service(),
+        )
+
+    def test_enqueue_creates_pending_check(self, db_session, seed_exam):
+        """Test a queued check has no results and reports pending state."""
+        _, attempts = seed_exam(2)
+        service = _service()
+
+        service.enqueue_check(db_session, attempts[0].id)
+        db_session.commit()
+
+        status = service.get_check_status(db_session, attempts[0].id)
+        assert status.state == "pending"
+        assert status.report is None
+        check = PlagiarismRepository.get_by_attempt_id(db_session, attempts[0].id)
+        assert check.uniqueness_percent is None and check.status is None
+
+    def test_status_for_unknown_attempt_raises(self, db_session):
+        """Test polling an attempt without a check raises NotFoundError."""
+        with pytest.raises(NotFoundError):
+            _service().get_check_status(db_session, uuid4())
+
+    def test_worker_completes_pending_check(self, db_engine, db_session, seed_exam):
+        """Test the worker claims a pending check and stores its report."""
+        _, attempts = seed_exam(3)
+        attempt_id = attempts[-1].id
+        _service().enqueue_check(db_session, attempt_id)
+        db_session.commit()
+
+        self._worker(db_engine).run(attempt_id)
+
+        db_session.expire_all()
+        status = _service().get_check_status(db_session, attempt_id)
+        assert status.state == "done"
+        assert status.report is not None and status.report.matches
+        assert status.started_at is not None and status.finished_at is not None
+
+    def test_check_is_claimed_only_once(self, db_engine, db_session, seed_exam):
+        """Test a second run of the same check is a no-op."""
+        _, attempts = seed_exam(2)
+        service = _service()
+        service.enqueue_check(db_session, attempts[0].id)
+        db_session.commit()
+
+        assert service.run_pending_check(db_session, attempts[0].id) is not None
+        assert service.run_pending_check(db_session, attempts[0].id) is None
+
+    def test_process_pending_requeues_stale_checks(self, db_engine, db_session, seed_exam):
+        """Test the periodic job picks up pending and stuck running checks."""
+        _, attempts = seed_exam(3)
+        service = _service()
+        for attempt in attempts[:2]:
+            service.enqueue_check(db_session, attempt.id)
+        db_session.commit()
+        stuck = PlagiarismRepository.get_by_attempt_id(db_session, attempts[1].id)
+        stuck.state = PlagiarismCheckState.running
+        stuck.started_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        db_session.commit()
+
+        processed = self._worker(db_engine).process_pending()
+
+        assert processed == 2
+        db_session.expire_all()
+        states = {
+            PlagiarismRepository.get_by_attempt_id(db_session, a.id).state for a in attempts[:2]
+        }
+        assert states == {PlagiarismCheckState.done}
+
+    def test_exam_list_includes_pending_checks(self, db_session, seed_exam):
+        """Test teachers see queued checks with empty scores."""
+        exam, attempts = seed_exam(1)
+        service = _service()
+        service.enqueue_check(db_session, attempts[0].id)
+        db_session.commit()
+
+        [summary] = service.list_exam_checks(db_session, exam.id)
+
+        assert summary.state == "pending"
+        assert summary.uniqueness_percent is None
+
+    def test_submit_queues_check_instead_of_running_it(self, db_session, seed_exam):
+        """Test submit commits a pending check and hands it to the worker."""
+        _, attempts = seed_exam(1, status=AttemptStatus.in_progress)
+        attempt_id = attempts[0].id
+        plagiarism_service = _service()
+        plagiarism_service.check_attempt = MagicMock()
+        worker = MagicMock()
+        attempts_service = AttemptsService(plagiarism_service=plagiarism_service, plagiarism_worker=worker)
+
+        attempts_service.submit(db_session, attempt_id)
+
+        plagiarism_service.check_attempt.assert_not_called()
+        worker.enqueue.assert_called_once_with(attempt_id)
+        check = PlagiarismRepository.get_by_attempt_id(db_session, attempt_id)
+        assert check.state == PlagiarismCheckState.pending
+
+
+class TestIndexEviction:
+    """Tests that in-process plagiarism indexes are dropped with deleted exams and questions."""
+
+    def test_deleting_a_question_drops_its_index(self, db_session, seed_exam):
+        """Test the TF-IDF index of a deleted question is released."""
+        exam, _ = seed_exam(1)
+        question_id = db_session.query(Question.id).filter(Question.exam_id == exam.id).first()[0]
+        question_tfidf_indexes.get_or_create(question_id)
+
+        ExamsRepository(db_session).delete_question(question_id)
+
+        assert question_id not in question_tfidf_indexes
+
+    def test_deleting_an_exam_drops_question_indexes(self, db_session, seed_exam):
+        """Test every question index of a deleted exam is released."""
+        exam, _ = seed_exam(1)
+        question_ids = [qid for (qid,) in db_session.query(Question.id).filter(Question.exam_id == exam.id)]
+        for question_id in question_ids:
+            question_tfidf_indexes.get_or_create(question_id)
+
+        ExamsRepository(db_session).delete(exam.id)
+
+        assert not any(question_id in question_tfidf_indexes for question_id in question_ids)
+
+    def test_deleting_an_exam_drops_course_indexes(self, db_session, seed_exam):
+        """Test LSH indexes of courses holding the deleted exam's signatures are released."""
+        exam, _ = seed_exam(1)
+        course = TestCrossExamCandidates._link_to_course(db_session, exam)
+        course_minhash_indexes.get_or_create(course.id)
+
+        ExamsRepository(db_session).delete(exam.id)
+
+        assert course.id not in course_minhash_indexes
+
+
+class TestCrossExamCandidates:
+    """Tests for MinHash-LSH candidate search across exams of one course."""
+
+    @staticmethod
+    def _link_to_course(db, *exams):
+        course = Course(name=f"Course {uuid4()}", code=str(uuid4())[:8], owner_id=exams[0].owner_id)
+        db.add(course)
+        db.flush()
+        db.add_all([CourseExam(course_id=course.id, exam_id=exam.id) for exam in exams])
+        db.commit()
+        return course
+
+    def test_copy_from_other_exam_of_course_is_found(self, db_session, seed_exam):
+        """Test a submission copied from another exam of the same course is matched."""
+        old_exam, old_attempts = seed_exam(3)
+        new_exam, new_attempts = seed_exam(1)
+        self._link_to_course(db_session, old_exam, new_exam)
+        # The new attempt reuses the first essay from last semester's exam
+        copied_id = old_attempts[0].id
+
+        report = _service().check_attempt(db_session, new_attempts[0])
+        db_session.flush()
+
+        check = PlagiarismRepository.get_by_attempt_id(db_session, new_attempts[0].id)
+        cross = [m for m in check.details["matches"] if m.get("cross_exam")]
+        assert [m["other_attempt_id"] for m in cross] == [str(copied_id)]
+        assert report.matches[0].other_attempt_id == copied_id
+
+    def test_exam_outside_course_is_not_searched(self, db_session, seed_exam):
+        """Test attempts of exams not sharing a course are never candidates."""
+        seed_exam(2)
+        _, new_attempts = seed_exam(1)
+
+        report = _service().check_attempt(db_session, new_attempts[0])
+
+        assert report.matches == []
+        assert report.uniqueness_percent == 100.0
+
+    def test_signatures_are_persisted_and_backfilled(self, db_session, seed_exam):
+        """Test the checked attempt and older unsigned submissions get stored signatures."""
+        old_exam, old_attempts = seed_exam(2)
+        new_exam, new_attempts = seed_exam(1)
+        self._link_to_course(db_session, old_exam, new_exam)
+
+        _service().check_attempt(db_session, new_attempts[0])
+        db_session.commit()
+
+        stored = {row.attempt_id for row in db_session.query(PlagiarismSignature).all()}
+        assert stored == {a.id for a in old_attempts + new_attempts}
+
+    def test_unsignable_attempts_get_an_empty_marker(self, db_session, seed_exam):
+        """Test a text without shingles is stored as a marker and not listed as unsigned again."""
+        old_exam, old_attempts = seed_exam(1)
+        new_exam, new_attempts = seed_exam(1)
+        course = self._link_to_course(db_session, old_exam, new_exam)
+        for answer in db_session.query(Answer).filter(Answer.attempt_id == old_attempts[0].id):
+            answer.answer_text = "?"
+        db_session.commit()
+
+        _service().check_attempt(db_session, new_attempts[0])
+        db_session.commit()
+
+        marker = db_session.get(PlagiarismSignature, old_attempts[0].id)
+        assert marker.signature == EMPTY_SIGNATURE
+        assert PlagiarismRepository.list_unsigned_course_attempts(db_session, course.id) == []
+        listed = PlagiarismRepository.list_course_signatures(db_session, course.id, num_perm=marker.num_perm)
+        assert [attempt_id for _, attempt_id, _, _ in listed] == [new_attempts[0].id]
+
+    def test_repeated_checks_sync_incrementally(self, db_session, seed_exam, monkeypatch):
+        """Test only the first check of a course scans it; later ones read signatures past the mark."""
+        old_exam, _ = seed_exam(2)
+        new_exam, new_attempts = seed_exam(2)
+        self._link_to_course(db_session, old_exam, new_exam)
+        service = _service()
+        unsigned_calls, created_after = [], []
+        list_unsigned = PlagiarismRepository.list_unsigned_course_attempts
+        list_signatures = PlagiarismRepository.list_course_signatures
+        monkeypatch.setattr(service.repo, "list_unsigned_course_attempts",
+                            lambda db, course_id: unsigned_calls.append(course_id) or list_unsigned(db, course_id))
+        monkeypatch.setattr(service.repo, "list_course_signatures",
+                            lambda db, course_id, **kw: created_after.append(kw["created_after"])
+                            or list_signatures(db, course_id, **kw))
+
+        service.check_attempt(db_session, new_attempts[0])
+        db_session.commit()
+        service.check_attempt(db_session, new_attempts[1])
+
+        assert len(unsigned_calls) == 1
+        assert created_after[0] is None
+        assert created_after[1] is not None
+        # Recent signatures are re-read within the overlap window
+        course_id = PlagiarismRepository.get_course_ids_for_exam(db_session, new_exam.id)[0]
+        recent = PlagiarismRepository.list_course_signatures(
+            db_session, course_id, num_perm=service.minhash_indexes.num_perm, created_after=created_after[1]
+        )
+        assert len(recent) == 4
+
+    def test_fresh_process_restores_index_from_signatures(self, db_session, seed_exam, count_queries):
+        """Test a new registry loads persisted signatures instead of re-reading texts."""
+        old_exam, _ = seed_exam(2)
+        new_exam, new_attempts = seed_exam(2)
+        self._link_to_course(db_session, old_exam, new_exam)
+        _service().check_attempt(db_session, new_attempts[0])
+        db_session.commit()
+
+        with count_queries() as statements:
+            _service().check_attempt(db_session, new_attempts[1])
+
+        assert any("plagiarism_signatures.signature" in s for s in statements)
@@ -0,0 +1,145 @@
+"""
+Tests for token-based authorization: the signed `roles` claim is trusted for a
+short TTL without touching the database, and role changes revoke older tokens
+through the per-user token version.
+"""
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from src.api.repositories.user_repository import UserRepository
+from src.api.services.user_cache import user_cache
+from src.core.config import ROLES_CLAIM_TTL_SECONDS
+from src.core.security import create_access_token
+from src.utils import auth
+from src.utils.auth import Principal, get_current_principal, get_current_user_with_role, require_role
+
+
+@pytest.fixture(autouse=True)
+def _clear_user_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+@pytest.fixture
+def student(db_session):
+    from src.models.roles import Role
+    from src.models.user_roles import UserRole
+    from src.models.users import User
+
+    user = User(email="principal@test.com", hashed_password="x", first_name="P", last_name="R")
+    db_session.add_all([user, Role(name="student"), Role(name="supervisor")])
+    db_session.flush()
+    student_role = db_session.query(Role).filter(Role.name == "student").one()
+    db_session.add(UserRole(user_id=user.id, role_id=student_role.id))
+    db_session.commit()
+    return user
+
+
+def _credentials(user, roles=("student",), version=0):
+    token = create_access_token({"sub": str(user.id), "roles": list(roles), "ver": version})
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def _expire_roles_claim(monkeypatch):
+    now = time.time()
+    monkeypatch.setattr(auth.time, "time", lambda: now + ROLES_CLAIM_TTL_SECONDS + 1)
+
+
+class TestRolesClaim:
+    def test_fresh_token_needs_no_queries(self, db_session, student, count_queries):
+        credentials = _credentials(student)
+        with count_queries() as statements:
+            principal = get_current_principal(credentials, db_session)
+
+        assert statements == []
+        assert principal == Principal(id=student.id, roles=("student",), role="student")
+
+    def test_stale_claim_is_checked_against_the_database(self, db_session, student, count_queries, monkeypatch):
+        credentials = _credentials(student, roles=("supervisor",))
+        _expire_roles_claim(monkeypatch)
+
+        with count_queries() as statements:
+            principal = get_current_principal(credentials, db_session)
+
+        # Roles come from the database, not from the outdated claim
+        assert principal.roles == ("student",)
+        assert len(statements) == 2
+
+    def test_token_without_version_falls_back_to_the_database(self, db_session, student):
+        token = create_access_token({"sub": str(student.id), "roles": ["supervisor"]})
+        principal = get_current_principal(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), db_session)
+
+        assert principal.roles == ("student",)
+
+    def test_invalid_token_is_rejected(self, db_session):
+        with pytest.raises(HTTPException) as exc:
+            get_current_principal(HTTPAuthorizationCredentials(scheme="Bearer", credentials="garbage"), db_session)
+        assert exc.value.status_code == 401
+
+    def test_unknown_user_is_rejected_once_the_claim_is_stale(self, db_session, student, monkeypatch):
+        from src.models.users import User
+
+        credentials = _credentials(student)
+        db_session.query(User).delete()
+        db_session.commit()
+        _expire_roles_claim(monkeypatch)
+
+        with pytest.raises(HTTPException) as exc:
+            get_current_principal(credentials, db_session)
+        assert exc.value.detail == "User not found"
+
+
+class TestRevocation:
+    def test_bumped_version_revokes_tokens_once_the_claim_is_stale(self, db_session, student, monkeypatch):
+        credentials = _credentials(student)
+        version = UserRepository(db_session).bump_token_version(student.id)
+        db_session.commit()
+
+        # Within the TTL the signed claim is still trusted, in every process
+        assert version == 1
+        assert get_current_principal(credentials, db_session).roles == ("student",)
+
+        _expire_roles_claim(monkeypatch)
+        with pytest.raises(HTTPException) as exc:
+            get_current_principal(credentials, db_session)
+        assert exc.value.detail == "Token has been revoked"
+        assert get_current_principal(_credentials(student, version=version), db_session).roles == ("student",)
+
+
+class TestRoleDependencies:
+    def test_require_role_checks_all_roles(self):
+        principal = Principal.from_roles("id", ["student", "Supervisor"])
+
+        assert require_role("supervisor")(principal).role == "supervisor"
+        with pytest.raises(HTTPException) as exc:
+            require_role("teacher")(principal)
+        assert exc.value.status_code == 403
+
+    def test_user_without_roles_is_forbidden(self):
+        with pytest.raises(HTTPException) as exc:
+            get_current_user_with_role(Principal.from_roles("id", []))
+        assert exc.value.status_code == 403
+
+
+class TestTeacherChecks:
+    def test_attempts_service_uses_token_roles(self, db_session, count_queries):
+        from unittest.mock import MagicMock
+        from uuid import uuid4
+
+        from src.api.errors.app_errors import ConflictError
+        from src.api.services.attempts_service import AttemptsService
+
+        service = AttemptsService(plagiarism_service=MagicMock(), plagiarism_worker=MagicMock())
+        exam_id = uuid4()
+
+        with count_queries() as statements:
+            with pytest.raises(ConflictError):
+                service.get_exam_plagiarism_checks(db_session, exam_id, Principal.from_roles(uuid4(), ["student"]))
+            service.get_exam_plagiarism_checks(db_session, exam_id, Principal.from_roles(uuid4(), ["student", "teacher"]))
+
+        assert statements == []
+        service.plagiarism_service.list_exam_checks.assert_called_once()
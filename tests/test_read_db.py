@@ -0,0 +1,88 @@
+"""
+Tests for read/write session routing: analytics, journal and transcript
+routes read through get_read_db, whose engine has its own pool and refuses
+writes.
+"""
+import pytest
+from fastapi.routing import APIRoute
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src.api import database
+from src.api.database import create_read_engine, get_db, get_read_db
+from src.api.pool_metrics import ReadQueuePool, read_pool_metrics
+
+READ_ROUTES = [
+    ("/api/exams/{course_id}/analytics", "GET"),
+    ("/api/exams/{course_id}/exams/{exam_id}/statistics", "GET"),
+    ("/api/exams/{course_id}/exams/{exam_id}/progress", "GET"),
+    ("/api/exams/{exam_id}/journal", "GET"),
+    ("/api/transcript", "GET"),
+    ("/api/courses/{course_id}/analytics", "GET"),
+    ("/api/courses/{course_id}/group-analytics", "GET"),
+]
+
+
+def _endpoint_dependencies(app, path, method):
+    route = next(r for r in app.routes if isinstance(r, APIRoute) and r.path == path and method in r.methods)
+    # Direct parameters of the handler, not the ones pulled in by auth dependencies
+    return {d.call for d in route.dependant.dependencies}
+
+
+class TestReadEngine:
+    @pytest.fixture
+    def database_file(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'app.db'}"
+        writer = create_engine(url)
+        with writer.begin() as conn:
+            conn.execute(text("CREATE TABLE scores (value INTEGER)"))
+            conn.execute(text("INSERT INTO scores VALUES (42)"))
+        writer.dispose()
+        return url
+
+    def test_reads_through_its_own_pool(self, database_file):
+        read_pool_metrics.reset()
+        engine = create_read_engine(database_file)
+        try:
+            with engine.connect() as conn:
+                assert conn.execute(text("SELECT value FROM scores")).scalar() == 42
+            assert isinstance(engine.pool, ReadQueuePool)
+            assert read_pool_metrics.snapshot()["checkouts"] == 1
+        finally:
+            engine.dispose()
+            read_pool_metrics.reset()
+
+    def test_refuses_writes(self, database_file):
+        engine = create_read_engine(database_file)
+        try:
+            with pytest.raises(OperationalError, match="readonly"):
+                with engine.begin() as conn:
+                    conn.execute(text("INSERT INTO scores VALUES (1)"))
+        finally:
+            engine.dispose()
+
+    def test_in_memory_database_is_shared_with_the_writer(self):
+        # The test configuration runs on in-memory SQLite, which only exists in the writer's connection
+        assert database.read_engine is database.engine
+
+    def test_get_read_db_yields_a_read_session(self):
+        dependency = get_read_db()
+        session = next(dependency)
+        assert session.get_bind() is database.read_engine
+        dependency.close()
+
+
+class TestRouting:
+    @pytest.mark.parametrize("path,method", READ_ROUTES)
+    def test_reporting_routes_use_the_read_session(self, path, method):
+        from src.api.main import app
+
+        dependencies = _endpoint_dependencies(app, path, method)
+        assert get_read_db in dependencies
+        assert get_db not in dependencies
+
+    def test_exam_taking_routes_keep_the_write_session(self):
+        from src.api.main import app
+
+        assert get_db in _endpoint_dependencies(app, "/api/attempts/{attempt_id}/answers", "POST")
+        assert get_db in _endpoint_dependencies(app, "/api/exams/{exam_id}/attempts", "POST")
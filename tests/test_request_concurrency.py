@@ -0,0 +1,99 @@
+"""
+Route handlers run their synchronous SQLAlchemy work in the request thread
+pool, so a slow query neither stalls the event loop nor serialises other
+requests on the same worker.
+"""
+import asyncio
+import inspect
+import time
+
+import httpx
+import pytest
+from fastapi.routing import APIRoute
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.api.database import Base, get_db
+from src.api.main import app
+from src.models.majors import Major
+
+SLOW_QUERY_SECONDS = 0.5
+
+
+@pytest.fixture
+def slow_majors_db(tmp_path):
+    """A file SQLite database where every query on `majors` takes SLOW_QUERY_SECONDS."""
+    from src.models import (  # noqa: F401 — реєструємо всі таблиці в metadata
+        users, roles, user_roles, exams, courses, majors, user_majors, attempts,
+        course_exams, course_supervisors, exam_participants, exam_email_notifications,
+    )
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'slow.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autoflush=False, bind=engine)
+    with session_factory() as db:
+        db.add_all([Major(name="Computer Science"), Major(name="Mathematics")])
+        db.commit()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _slow_down(conn, cursor, statement, parameters, context, executemany):
+        if "FROM majors" in statement:
+            time.sleep(SLOW_QUERY_SECONDS)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    app.dependency_overrides.pop(get_db, None)
+    engine.dispose()
+
+
+async def _requests_with_loop_probe(count: int):
+    """Send `count` concurrent slow requests while measuring the longest event-loop stall."""
+    stop = asyncio.Event()
+    longest_gap = 0.0
+
+    async def probe():
+        nonlocal longest_gap
+        last = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            longest_gap = max(longest_gap, now - last)
+            last = now
+
+    probe_task = asyncio.create_task(probe())
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.get("/api/users/majors") for _ in range(count)))
+        elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    return responses, elapsed, longest_gap
+
+
+class TestRequestConcurrency:
+    def test_slow_queries_do_not_block_the_event_loop(self, slow_majors_db):
+        responses, elapsed, longest_gap = asyncio.run(_requests_with_loop_probe(4))
+
+        assert [r.status_code for r in responses] == [200] * 4
+        assert [m["name"] for m in responses[0].json()] == ["Computer Science", "Mathematics"]
+        # Four serialised queries would take 2 s; in the thread pool they overlap
+        assert elapsed < 3 * SLOW_QUERY_SECONDS
+        # The loop keeps serving other coroutines while the queries run
+        assert longest_gap < SLOW_QUERY_SECONDS / 2
+
+    def test_api_handlers_are_synchronous(self):
+        """Async handlers would run Session code on the event loop; API routes must be plain functions."""
+        coroutine_routes = [
+            route.path for route in app.routes
+            if isinstance(route, APIRoute) and route.path.startswith("/api")
+            and inspect.iscoroutinefunction(route.endpoint)
+        ]
+        assert coroutine_routes == []
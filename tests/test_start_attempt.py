@@ -0,0 +1,155 @@
+"""
+Tests for the start_attempt fast path: cached exam/participant eligibility,
+the atomic max_attempts guard and cache invalidation.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.api.database import Base
+from src.api.errors.app_errors import ConflictError, NotFoundError
+from src.api.repositories.exam_participants_repository import ExamParticipantsRepository
+from src.api.repositories.exams_repository import ExamsRepository
+from src.api.schemas.exams import ExamUpdate
+from src.api.services.exam_snapshot_service import ExamSnapshotService
+from src.api.services.exam_start_cache import exam_start_cache
+from src.api.services.exams_service import ExamsService
+from src.models.attempts import Attempt
+from src.models.exam_participants import AttendanceStatusEnum
+from src.models.exams import ExamStatusEnum, QuestionType
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    exam_start_cache.clear()
+    yield
+    exam_start_cache.clear()
+
+
+@pytest.fixture
+def seed(db_session, make_exam):
+    def _seed(max_attempts=2, students=1, db=None):
+        """Create a published exam with one question and registered students."""
+        db = db or db_session
+        made = make_exam(
+            [{"question_type": QuestionType.single_choice, "title": "Q", "points": 1, "options": [("a", True)]}],
+            students=students, db=db, title="Старт", status=ExamStatusEnum.published,
+            start_at=datetime.now(timezone.utc) - timedelta(minutes=1),
+            end_at=datetime.now(timezone.utc) + timedelta(hours=2), duration_minutes=90, max_attempts=max_attempts,
+        )
+        ExamSnapshotService().create_version(db, made.exam.id)
+        return made.exam.id, made.students
+    return _seed
+
+
+class TestFastPath:
+    def test_warm_start_is_a_single_statement(self, db_session, seed, count_queries):
+        """Once the exam and participant are cached, a start is one INSERT ... SELECT."""
+        exam_id, students = seed(students=2)
+        ExamsService.start_attempt(db_session, exam_id, students[0])
+        ExamsService.start_attempt(db_session, exam_id, students[1])
+
+        with count_queries() as statements:
+            attempt = ExamsService.start_attempt(db_session, exam_id, students[1])
+
+        assert len(statements) == 1
+        assert statements[0].startswith("INSERT INTO attempts")
+        assert attempt.status == "in_progress"
+        assert attempt.exam_version == 1
+        assert attempt.due_at - attempt.started_at == timedelta(minutes=90)
+
+    def test_attempt_limit(self, db_session, seed):
+        exam_id, (student,) = seed(max_attempts=2)
+        ExamsService.start_attempt(db_session, exam_id, student)
+        ExamsService.start_attempt(db_session, exam_id, student)
+
+        with pytest.raises(ConflictError, match="Maximum number of attempts"):
+            ExamsService.start_attempt(db_session, exam_id, student)
+        assert db_session.query(Attempt).filter(Attempt.exam_id == exam_id).count() == 2
+
+    def test_eligibility_errors(self, db_session, seed):
+        exam_id, (student,) = seed()
+
+        with pytest.raises(NotFoundError):
+            ExamsService.start_attempt(db_session, uuid4(), student)
+        with pytest.raises(ConflictError, match="не зареєстрований"):
+            ExamsService.start_attempt(db_session, exam_id, uuid4())
+
+        ExamParticipantsRepository(db_session).set_attendance(exam_id, student, AttendanceStatusEnum.absent)
+        with pytest.raises(ConflictError, match="відсутнього"):
+            ExamsService.start_attempt(db_session, exam_id, student)
+
+
+class TestCacheInvalidation:
+    def test_participant_changes_apply_immediately(self, db_session, seed):
+        exam_id, (student,) = seed()
+        repo = ExamParticipantsRepository(db_session)
+        ExamsService.start_attempt(db_session, exam_id, student)
+
+        repo.soft_remove(exam_id, student)
+        with pytest.raises(ConflictError):
+            ExamsService.start_attempt(db_session, exam_id, student)
+
+        repo.add(exam_id, student)
+        ExamsService.start_attempt(db_session, exam_id, student)
+
+    def test_exam_changes_apply_immediately(self, db_session, seed):
+        exam_id, (student,) = seed(max_attempts=1)
+        ExamsService.start_attempt(db_session, exam_id, student)
+
+        ExamsRepository(db_session).update(exam_id, ExamUpdate(max_attempts=2, duration_minutes=30))
+        ExamSnapshotService().create_version(db_session, exam_id)
+        attempt = ExamsService.start_attempt(db_session, exam_id, student)
+
+        assert attempt.due_at - attempt.started_at == timedelta(minutes=30)
+        assert attempt.exam_version == 2
+
+
+class TestConcurrentStarts:
+    def test_limit_holds_under_concurrent_starts(self, seed, tmp_path):
+        """Twenty simultaneous starts by one student create exactly max_attempts attempts."""
+        from src.models import (  # noqa: F401 — реєструємо всі таблиці в metadata
+            users, roles, user_roles, exams, courses, majors, user_majors, attempts,
+            course_exams, course_supervisors, exam_participants, exam_email_notifications,
+        )
+
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'start.db'}", connect_args={"timeout": 30, "check_same_thread": False}
+        )
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autoflush=False, bind=engine)
+        seed_db = session_factory()
+        exam_id, (student,) = seed(max_attempts=3, db=seed_db)
+        seed_db.close()
+
+        barrier = threading.Barrier(20)
+        outcomes = []
+
+        def start():
+            db = session_factory()
+            barrier.wait()
+            try:
+                ExamsService.start_attempt(db, exam_id, student)
+                outcomes.append("started")
+            except ConflictError:
+                outcomes.append("rejected")
+            finally:
+                db.close()
+
+        threads = [threading.Thread(target=start) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        check_db = session_factory()
+        try:
+            assert check_db.query(Attempt).filter(Attempt.user_id == student).count() == 3
+        finally:
+            check_db.close()
+            engine.dispose()
+        assert sorted(outcomes) == ["rejected"] * 17 + ["started"] * 3
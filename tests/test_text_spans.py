@@ -0,0 +1,80 @@
+"""
+Tests for the k-gram hash based common-fragment finder used for plagiarism highlighting.
+"""
+from difflib import SequenceMatcher
+
+import pytest
+
+from src.api.services.plagiarism_service import PlagiarismService
+from src.utils.text_spans import find_common_spans
+
+
+def _sequence_matcher_spans(a: str, b: str, min_len: int):
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    return [
+        ((i1, i2), (j1, j2)) for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag == "equal" and i2 - i1 >= min_len
+    ]
+
+
+class TestFindCommonSpans:
+    """Tests for find_common_spans."""
+
+    @pytest.mark.parametrize("a,b", [
+        ("The quick brown fox jumps over the lazy dog and runs away quickly.",
+         "A quick brown fox jumps over the lazy dog, then it runs away quickly!"),
+        ("Mitochondria are the powerhouse of the cell in all eukaryotes",
+         "Indeed mitochondria are the powerhouse of the cell in most eukaryotes"),
+    ])
+    def test_spans_match_sequence_matcher_on_ordered_copies(self, a, b):
+        """Test spans equal SequenceMatcher's equal blocks when the copy keeps order."""
+        base_spans, other_spans = find_common_spans(a, b, min_match_len=10)
+
+        assert list(zip(base_spans, other_spans)) == _sequence_matcher_spans(a, b, 10)
+
+    def test_spans_point_to_identical_text(self):
+        """Test every pair of spans covers the same characters in both texts."""
+        a = "alpha beta gamma delta epsilon zeta eta theta iota kappa"
+        b = "iota kappa xx alpha beta gamma delta yy epsilon zeta eta theta"
+
+        base_spans, other_spans = find_common_spans(a, b, min_match_len=8)
+
+        assert base_spans
+        for (s1, e1), (s2, e2) in zip(base_spans, other_spans):
+            assert a[s1:e1] == b[s2:e2]
+            assert e1 - s1 >= 8
+
+    def test_reordered_paragraphs_are_found(self):
+        """Test swapped paragraphs are both highlighted, unlike an ordered diff."""
+        p1 = "First paragraph explains how binary search works on arrays."
+        p2 = "Second paragraph explains why hash tables are fast on average."
+        base_spans, _ = find_common_spans(p1 + " " + p2, p2 + " " + p1, min_match_len=20)
+
+        covered = sum(end - start for start, end in base_spans)
+        assert covered >= len(p1) + len(p2) - 2
+
+    def test_other_spans_do_not_overlap(self):
+        """Test a repeated base passage is matched to the single copy only once."""
+        phrase = "this exact sentence was copied"
+        base_spans, other_spans = find_common_spans(phrase + " | " + phrase, "x " + phrase, min_match_len=10)
+
+        assert other_spans == [(2, 2 + len(phrase))]
+        assert len(base_spans) == 1
+
+    @pytest.mark.parametrize("a,b", [("", "text"), ("short", "short"), ("abc", "")])
+    def test_texts_shorter_than_min_len(self, a, b):
+        """Test no spans are produced for texts shorter than the minimum length."""
+        assert find_common_spans(a, b, min_match_len=10) == ([], [])
+
+    def test_repetitive_text_stays_fast(self):
+        """Test a degenerate repeated-character text still finds one full span."""
+        text = "a" * 20000
+
+        base_spans, other_spans = find_common_spans(text, text, min_match_len=20)
+
+        assert base_spans == [(0, 20000)] and other_spans == [(0, 20000)]
+
+    def test_service_uses_new_engine(self):
+        """Test PlagiarismService highlight spans come from find_common_spans."""
+        a = "The quick brown fox jumps over the lazy dog"
+        assert PlagiarismService._compute_highlight_spans(a, a, min_match_len=5) == ([(0, len(a))], [(0, len(a))])
@@ -0,0 +1,158 @@
+"""
+Tests for the incremental per-exam TF-IDF index used by PlagiarismService.
+"""
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from src.utils.tfidf_index import IncrementalTfidfIndex, TfidfIndexRegistry
+
+
+CORPUS = [
+    "The mitochondria is the powerhouse of the cell",
+    "Mitochondria produce energy for the cell via respiration",
+    "Photosynthesis happens in chloroplasts of plant cells",
+    "The cell membrane controls what enters and leaves the cell",
+    "Energy in the cell is produced by the mitochondria",
+]
+
+
+def _reference_similarities(base: str, others: list) -> list:
+    matrix = TfidfVectorizer().fit_transform([base] + others)
+    return cosine_similarity(matrix[0:1], matrix[1:])[0].tolist()
+
+
+class TestIncrementalTfidfIndex:
+    """Tests for IncrementalTfidfIndex."""
+
+    def test_query_matches_full_refit(self):
+        """Test incremental scores equal a TfidfVectorizer refit over the same corpus."""
+        index = IncrementalTfidfIndex()
+        for i, text in enumerate(CORPUS):
+            index.add(i, text)
+
+        keys, sims, texts = index.query(0)
+
+        assert keys == [1, 2, 3, 4]
+        assert texts == CORPUS[1:]
+        assert sims == pytest.approx(_reference_similarities(CORPUS[0], CORPUS[1:]))
+
+    def test_scores_follow_corpus_growth(self):
+        """Test IDF is updated as documents are added after the first query."""
+        index = IncrementalTfidfIndex()
+        index.add("a", CORPUS[0])
+        index.add("b", CORPUS[1])
+        index.query("a")
+
+        for i, text in enumerate(CORPUS[2:], start=2):
+            index.add(i, text)
+
+        _, sims, _ = index.query("b")
+        others = [CORPUS[0]] + CORPUS[2:]
+        assert sims == pytest.approx(_reference_similarities(CORPUS[1], others))
+
+    def test_add_replaces_existing_document(self):
+        """Test re-adding a key replaces its text and document frequencies."""
+        index = IncrementalTfidfIndex()
+        index.add("a", CORPUS[0])
+        index.add("b", "completely unrelated words")
+        index.add("b", CORPUS[1])
+
+        assert len(index) == 2
+        assert index.get_text("b") == CORPUS[1]
+        _, sims, _ = index.query("a")
+        assert sims == pytest.approx(_reference_similarities(CORPUS[0], [CORPUS[1]]))
+
+    def test_remove_document(self):
+        """Test removed documents are no longer returned as candidates."""
+        index = IncrementalTfidfIndex()
+        for i, text in enumerate(CORPUS):
+            index.add(i, text)
+
+        assert index.remove(2) is True
+        assert index.remove(2) is False
+        assert 2 not in index
+
+        keys, sims, _ = index.query(0)
+        others = [CORPUS[1], CORPUS[3], CORPUS[4]]
+        assert keys == [1, 3, 4]
+        assert sims == pytest.approx(_reference_similarities(CORPUS[0], others))
+
+    def test_scores_survive_compaction(self):
+        """Test removing most documents compacts storage without changing scores or order."""
+        index = IncrementalTfidfIndex()
+        for i, text in enumerate(CORPUS):
+            index.add(i, text)
+        for i in (0, 2, 3):
+            index.remove(i)
+        index.add("late", CORPUS[0])
+
+        keys, sims, texts = index.query(1)
+
+        assert keys == [4, "late"]
+        assert texts == [CORPUS[4], CORPUS[0]]
+        assert sims == pytest.approx(_reference_similarities(CORPUS[1], [CORPUS[4], CORPUS[0]]))
+
+    def test_identical_texts_score_one(self):
+        """Test copy-paste submissions get similarity 1.0."""
+        index = IncrementalTfidfIndex()
+        index.add("a", CORPUS[0])
+        index.add("b", CORPUS[0])
+        index.add("c", CORPUS[2])
+
+        _, sims, _ = index.query("a")
+        assert sims[0] == pytest.approx(1.0)
+
+    def test_single_document_has_no_candidates(self):
+        """Test querying the only document returns empty lists."""
+        index = IncrementalTfidfIndex()
+        index.add("a", CORPUS[0])
+
+        assert index.query("a") == ([], [], [])
+
+    def test_text_without_tokens_scores_zero(self):
+        """Test documents without tokens do not produce NaN scores."""
+        index = IncrementalTfidfIndex()
+        index.add("a", "!!! ???")
+        index.add("b", CORPUS[0])
+
+        _, sims, _ = index.query("a")
+        assert sims == [0.0]
+
+    def test_query_unknown_key_raises(self):
+        """Test querying a key that was never indexed raises KeyError."""
+        with pytest.raises(KeyError):
+            IncrementalTfidfIndex().query("missing")
+
+
+class TestTfidfIndexRegistry:
+    """Tests for TfidfIndexRegistry."""
+
+    def test_get_or_create_returns_same_index(self):
+        """Test one index is kept per key."""
+        registry = TfidfIndexRegistry()
+        assert registry.get_or_create("exam") is registry.get_or_create("exam")
+        assert registry.get_or_create("exam") is not registry.get_or_create("other")
+
+    def test_drop_discards_index(self):
+        """Test dropping a key creates a fresh index on next access."""
+        registry = TfidfIndexRegistry()
+        index = registry.get_or_create("exam")
+        index.add("a", CORPUS[0])
+
+        registry.drop("exam")
+
+        assert len(registry.get_or_create("exam")) == 0
+
+    def test_least_recently_used_index_is_evicted(self):
+        """Test the registry keeps at most max_size indexes and evicts the least recently used."""
+        registry = TfidfIndexRegistry(max_size=2)
+        first = registry.get_or_create("q1")
+        registry.get_or_create("q2")
+        registry.get_or_create("q1")
+
+        registry.get_or_create("q3")
+
+        assert len(registry) == 2
+        assert "q2" not in registry
+        assert registry.get_or_create("q1") is first
@@ -0,0 +1,146 @@
+"""
+Tests for the in-process user cache behind get_current_user: bounded TTL
+storage with hit/miss counters, and invalidation by profile changes and token version bumps.
+"""
+import time
+from uuid import uuid4
+
+import pytest
+
+from src.api.repositories.user_repository import UserRepository
+from src.api.services.user_cache import CachedUser, UserCache, user_cache
+from src.api.services.users_service import UsersService
+from src.core.config import ROLES_CLAIM_TTL_SECONDS
+from src.utils import auth
+from src.utils.auth import Principal, get_current_principal, get_current_user
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+@pytest.fixture
+def student(db_session):
+    from src.models.majors import Major
+    from src.models.roles import Role
+    from src.models.user_majors import UserMajor
+    from src.models.user_roles import UserRole
+    from src.models.users import User
+
+    user = User(email="cached@test.com", hashed_password="x", first_name="Olena", last_name="Koval")
+    role = Role(name="student")
+    major = Major(name="Computer Science")
+    db_session.add_all([user, role, major, Role(name="supervisor")])
+    db_session.flush()
+    db_session.add_all([UserRole(user_id=user.id, role_id=role.id), UserMajor(user_id=user.id, major_id=major.id)])
+    db_session.commit()
+    return user
+
+
+def _cached_user(user_id=None):
+    return CachedUser(id=user_id or uuid4(), email="a@test.com", full_name="A", roles=("student",), token_version=0,
+                      major_name=None, avatar_url=None, notification_settings={})
+
+
+class TestUserCache:
+    def test_counts_hits_and_misses(self):
+        cache = UserCache(ttl_seconds=60)
+        user = _cached_user()
+
+        assert cache.get(user.id) is None
+        cache.put(user)
+
+        assert cache.get(user.id) is user
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_expired_entries_are_dropped(self):
+        cache = UserCache(ttl_seconds=60)
+        user = _cached_user()
+        cache.put(user)
+        object.__setattr__(user, "cached_at", time.monotonic() - 61)
+
+        assert cache.get(user.id) is None
+        assert len(cache) == 0
+
+    def test_oldest_entry_is_evicted_when_full(self):
+        cache = UserCache(ttl_seconds=60, max_size=2)
+        first, second, third = _cached_user(), _cached_user(), _cached_user()
+        for user in (first, second, third):
+            cache.put(user)
+
+        assert len(cache) == 2
+        assert cache.get(first.id) is None
+        assert cache.get(third.id) is third
+
+    def test_disabled_with_zero_ttl(self):
+        cache = UserCache(ttl_seconds=0)
+        cache.put(_cached_user())
+        assert len(cache) == 0
+
+
+class TestCurrentUser:
+    def test_second_request_hits_the_cache(self, db_session, student, count_queries):
+        principal = Principal.from_roles(student.id, ["student"])
+
+        with count_queries() as first:
+            user = get_current_user(db_session, principal)
+        with count_queries() as second:
+            assert get_current_user(db_session, principal) is user
+
+        assert len(first) == 2
+        assert second == []
+        assert user.roles == ("student",)
+        assert UsersService.get_user_profile(user)["major_name"] == "Computer Science"
+        assert UsersService.get_user_profile(user)["full_name"] == "Koval Olena"
+
+    def test_stale_roles_claim_is_served_from_the_cache(self, db_session, student, count_queries, monkeypatch):
+        from fastapi.security import HTTPAuthorizationCredentials
+        from src.core.security import create_access_token
+
+        token = create_access_token({"sub": str(student.id), "roles": ["student"], "ver": 0})
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        now = time.time()
+        monkeypatch.setattr(auth.time, "time", lambda: now + ROLES_CLAIM_TTL_SECONDS + 1)
+        get_current_principal(credentials, db_session)
+
+        with count_queries() as statements:
+            assert get_current_principal(credentials, db_session).roles == ("student",)
+        assert statements == []
+
+    def test_unknown_user_is_rejected(self, db_session):
+        from fastapi import HTTPException
+
+        with pytest.raises(HTTPException) as exc:
+            get_current_user(db_session, Principal.from_roles(uuid4(), ["student"]))
+        assert exc.value.status_code == 401
+
+
+class TestInvalidation:
+    def test_settings_update(self, db_session, student):
+        principal = Principal.from_roles(student.id, ["student"])
+        get_current_user(db_session, principal)
+
+        UserRepository(db_session).update_user_settings(student, "notification_settings",
+                                                        {"enabled": True, "remind_before_hours": [24]})
+
+        assert get_current_user(db_session, principal).notification_settings["enabled"] is True
+
+    def test_avatar_update(self, db_session, student):
+        principal = Principal.from_roles(student.id, ["student"])
+        get_current_user(db_session, principal)
+
+        UserRepository(db_session).update_user_avatar_url(student, "https://img.test/a.png")
+
+        assert get_current_user(db_session, principal).avatar_url == "https://img.test/a.png"
+
+    def test_token_version_bump(self, db_session, student):
+        principal = Principal.from_roles(student.id, ["student"])
+        get_current_user(db_session, principal)
+
+        UserRepository(db_session).bump_token_version(student.id)
+        db_session.commit()
+
+        assert get_current_user(db_session, principal).token_version == 1